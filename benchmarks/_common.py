@@ -0,0 +1,50 @@
+"""Utilidades compartidas por los benchmarks: datos sintéticos y medición."""
+
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Tuple, TypeVar
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from generate_logs import Config, generate_line  # noqa: E402
+
+T = TypeVar("T")
+
+
+def make_log(path: Path, total_lines: int, seed: int = 1234) -> Path:
+    """Escribe ``total_lines`` líneas sintéticas con el generador del repo."""
+
+    random.seed(seed)
+    cfg = Config(output=path, target_bytes=0)
+    with open(path, "w", encoding="utf-8") as handle:
+        for _ in range(total_lines):
+            handle.write(generate_line(cfg))
+    return path
+
+
+def timed(func: Callable[[], T], repeat: int = 3) -> Tuple[T, float]:
+    """Ejecuta ``func`` ``repeat`` veces y devuelve el último valor y el mejor tiempo."""
+
+    best = float("inf")
+    value = None
+    for _ in range(repeat):
+        start = perf_counter()
+        value = func()
+        best = min(best, perf_counter() - start)
+    return value, best
+
+
+def report(label: str, lines: int, size_bytes: int, seconds: float) -> None:
+    """Imprime una fila de resultados con líneas/s y MB/s."""
+
+    print(
+        f"{label:<28} {seconds:8.3f} s  "
+        f"{lines / seconds:12,.0f} líneas/s  "
+        f"{size_bytes / seconds / 1024**2:8.1f} MB/s"
+    )
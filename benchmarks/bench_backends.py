@@ -0,0 +1,49 @@
+"""Compara los backends de lectura/parseo ``text`` y ``mmap``.
+
+Uso::
+
+    python benchmarks/bench_backends.py --lines 1000000 --workers 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from _common import make_log, report, timed
+
+from logproc.api import BACKENDS, process_log
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = make_log(Path(tmp) / "access.log", args.lines)
+        size_bytes = log_path.stat().st_size
+        print(f"Archivo: {args.lines:,} líneas, {size_bytes / 1024**2:.1f} MB, workers={args.workers}")
+
+        for backend in BACKENDS:
+            for sharded in (False, True):
+                result, seconds = timed(
+                    lambda: process_log(
+                        str(log_path),
+                        batch_size=args.batch_size,
+                        workers=args.workers,
+                        backend=backend,
+                        sharded=sharded,
+                    ),
+                    repeat=args.repeat,
+                )
+                assert result.total_lines == args.lines
+                report(f"{backend}{' (sharded)' if sharded else ''}", args.lines, size_bytes, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Compara una corrida completa contra re-ejecuciones desde la caché de columnas.
+
+Uso::
+
+    python benchmarks/bench_column_cache.py --lines 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from _common import make_log, report, timed
+
+from logproc.api import process_log
+from logproc.column_cache import ColumnCache
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = make_log(Path(tmp) / "access.log", args.lines)
+        size_bytes = log_path.stat().st_size
+        cache = ColumnCache(Path(tmp) / "cache")
+
+        _, seconds = timed(lambda: process_log(str(log_path), workers=args.workers), repeat=args.repeat)
+        report("sin caché", args.lines, size_bytes, seconds)
+
+        _, seconds = timed(lambda: process_log(str(log_path), workers=args.workers, column_cache=cache), repeat=1)
+        report("caché (construcción)", args.lines, size_bytes, seconds)
+
+        for threshold in (100, 500, 1000):
+            _, seconds = timed(
+                lambda: process_log(str(log_path), slow_threshold=threshold, workers=args.workers, column_cache=cache),
+                repeat=args.repeat,
+            )
+            report(f"caché (umbral {threshold})", args.lines, size_bytes, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Mide el throughput de ``process_log`` sobre logs comprimidos por códec.
+
+Compara texto plano contra gzip, bz2 y xz, con un solo miembro (descompresión
+en el padre) y con varios miembros (descompresión repartida entre workers).
+Los MB/s se calculan sobre el tamaño descomprimido.
+
+Uso::
+
+    python benchmarks/bench_compression.py --lines 1000000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import bz2
+import gzip
+import lzma
+import tempfile
+from pathlib import Path
+
+from _common import make_log, report, timed
+
+from logproc.api import process_log
+from logproc.compression import CODECS
+
+COMPRESSORS = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=6),
+    "bz2": bz2.compress,
+    "xz": lambda data: lzma.compress(data, preset=1),
+}
+
+
+def write_compressed(source: Path, target: Path, codec: str, member_bytes: int) -> Path:
+    """Comprime ``source`` en miembros de ``member_bytes`` bytes descomprimidos."""
+
+    compress = COMPRESSORS[codec]
+    with open(source, "rb") as reader, open(target, "wb") as writer:
+        while True:
+            block = reader.read(member_bytes)
+            if not block:
+                break
+            writer.write(compress(block))
+    return target
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--member-mb", type=int, default=4, help="Tamaño descomprimido de cada miembro")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = make_log(Path(tmp) / "access.log", args.lines)
+        size_bytes = log_path.stat().st_size
+        print(f"Archivo: {args.lines:,} líneas, {size_bytes / 1024**2:.1f} MB, workers={args.workers}")
+
+        def run(path: Path):
+            return process_log(str(path), batch_size=args.batch_size, workers=args.workers)
+
+        result, seconds = timed(lambda: run(log_path), repeat=args.repeat)
+        assert result.total_lines == args.lines
+        report("plano", args.lines, size_bytes, seconds)
+
+        for codec in CODECS:
+            layouts = (("1 miembro", size_bytes), ("multi-miembro", args.member_mb * 1024**2))
+            for label, member_bytes in layouts:
+                path = write_compressed(log_path, Path(tmp) / f"access.{codec}", codec, member_bytes)
+                ratio = size_bytes / path.stat().st_size
+                result, seconds = timed(lambda: run(path), repeat=args.repeat)
+                assert result.total_lines == args.lines
+                report(f"{codec} {label} (x{ratio:.1f})", args.lines, size_bytes, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compara los motores de conteo ``python`` y ``numpy`` (líneas/s).
+
+Uso::
+
+    python benchmarks/bench_engines.py --lines 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from _common import make_log, report, timed
+
+from logproc import columnar
+from logproc.api import process_log
+from logproc.worker import ENGINES
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not columnar.HAS_NUMPY:
+        print("NumPy no está instalado: el motor 'numpy' usará el motor puro Python.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = make_log(Path(tmp) / "access.log", args.lines)
+        size_bytes = log_path.stat().st_size
+
+        for backend in ("text", "mmap"):
+            for engine in ENGINES:
+                result, seconds = timed(
+                    lambda: process_log(
+                        str(log_path),
+                        batch_size=args.batch_size,
+                        workers=args.workers,
+                        backend=backend,
+                        engine=engine,
+                    ),
+                    repeat=args.repeat,
+                )
+                assert result.total_lines == args.lines
+                report(f"{engine} ({backend})", args.lines, size_bytes, seconds)
+
+
+if __name__ == "__main__":
+    main()
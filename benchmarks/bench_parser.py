@@ -0,0 +1,36 @@
+"""Compara la ruta rápida de ``parse_line`` contra ``parse_line_regex``.
+
+Uso::
+
+    python benchmarks/bench_parser.py --lines 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from _common import make_log, report, timed
+
+from logproc.parser import parse_line, parse_line_regex
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = make_log(Path(tmp) / "access.log", args.lines)
+        lines = log_path.read_text(encoding="utf-8").splitlines()
+        size_bytes = log_path.stat().st_size
+
+    for func in (parse_line, parse_line_regex):
+        _, seconds = timed(lambda: [func(line) for line in lines], repeat=args.repeat)
+        report(func.__name__, len(lines), size_bytes, seconds)
+
+
+if __name__ == "__main__":
+    main()
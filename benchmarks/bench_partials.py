@@ -0,0 +1,84 @@
+"""Compara el formato compacto de ``PartialStats`` contra el dataclass con diccionarios.
+
+Genera parciales reales (``worker.process_batch`` sobre lotes sintéticos),
+mide el tamaño serializado con pickle y el tiempo de deserializar y fusionar
+todos los parciales con ``merge_partials``: con el formato compacto
+(``PartialStats.__reduce__`` + ``UrlTable``) y con el estado del dataclass
+serializado como diccionarios, como antes.
+
+Uso::
+
+    python benchmarks/bench_partials.py --lines 500000 --urls 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import pickle
+import random
+from dataclasses import fields
+from time import perf_counter
+
+import _common  # noqa: F401 - agrega la raíz del repo a sys.path
+
+from logproc.metrics import PartialStats
+from logproc.reducer import merge_partials
+from logproc.worker import process_batch
+
+
+def _as_dict_pickle(part: PartialStats) -> bytes:
+    """Serializa el parcial campo por campo, con los conteos por URL como ``dict``."""
+
+    return pickle.dumps({item.name: getattr(part, item.name) for item in fields(part) if item.name != "packed_urls"})
+
+
+def _from_dict_pickle(payload: bytes) -> PartialStats:
+    return PartialStats(**pickle.loads(payload))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--urls", type=int, default=50_000, help="URLs distintas")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    partials = []
+    for start in range(0, args.lines, args.batch_size):
+        batch = [
+            f'10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /api/items/{rng.randint(0, args.urls)}?page=2" '
+            f'{rng.choice((200, 200, 500))} {rng.randint(1, 900)}\n'
+            for _ in range(min(args.batch_size, args.lines - start))
+        ]
+        partials.append(process_batch(batch, status_codes=[500], slow_threshold=200))
+    print(f"{len(partials)} parciales de {args.batch_size:,} líneas, {args.urls:,} URLs distintas")
+
+    formats = {
+        "dict (dataclass)": (_as_dict_pickle, _from_dict_pickle),
+        "compacto (__reduce__)": (pickle.dumps, pickle.loads),
+    }
+    merged = {}
+    for label, (dumps, loads) in formats.items():
+        payloads = [dumps(part) for part in partials]
+        size = sum(map(len, payloads))
+        best_loads = best_merge = float("inf")
+        for _ in range(args.repeat):
+            started = perf_counter()
+            restored = [loads(payload) for payload in payloads]
+            loaded = perf_counter()
+            merged[label] = merge_partials(restored)
+            best_loads = min(best_loads, loaded - started)
+            best_merge = min(best_merge, perf_counter() - loaded)
+        print(
+            f"{label:<24} pickle {size / 1024**2:8.2f} MB  "
+            f"loads {best_loads * 1000:8.1f} ms  merge {best_merge * 1000:8.1f} ms"
+        )
+
+    first, second = merged.values()
+    assert first.status_by_url == second.status_by_url and first.slow_by_url == second.slow_by_url
+
+
+if __name__ == "__main__":
+    main()
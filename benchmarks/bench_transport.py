@@ -0,0 +1,56 @@
+"""Compara el envío de lotes al pool por pickle contra memoria compartida.
+
+Mide la lectura en lotes desde el padre (``backend`` ``text`` y ``mmap``) y un
+archivo gzip de un solo miembro, que el padre descomprime, con
+``transport="pickle"`` y ``transport="shm"``.
+
+Uso::
+
+    python benchmarks/bench_transport.py --lines 1000000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import tempfile
+from pathlib import Path
+
+from _common import make_log, report, timed
+
+from logproc.api import TRANSPORTS, process_log
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = make_log(Path(tmp) / "access.log", args.lines)
+        size_bytes = log_path.stat().st_size
+        gz_path = Path(tmp) / "access.log.gz"
+        gz_path.write_bytes(gzip.compress(log_path.read_bytes(), compresslevel=6))
+        print(f"Archivo: {args.lines:,} líneas, {size_bytes / 1024**2:.1f} MB, workers={args.workers}")
+
+        for label, path, backend in (("text", log_path, "text"), ("mmap", log_path, "mmap"), ("gzip", gz_path, "text")):
+            for transport in TRANSPORTS:
+                result, seconds = timed(
+                    lambda: process_log(
+                        str(path),
+                        batch_size=args.batch_size,
+                        workers=args.workers,
+                        backend=backend,
+                        transport=transport,
+                    ),
+                    repeat=args.repeat,
+                )
+                assert result.total_lines == args.lines
+                report(f"{label} ({transport})", args.lines, size_bytes, seconds)
+
+
+if __name__ == "__main__":
+    main()
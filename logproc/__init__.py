@@ -3,7 +3,8 @@
 Núcleo reutilizable y eficiente para procesar logs desde CLI, web o scripts.
 """
 
-from .api import process_log
+from .api import process_log, process_queries
 from .metrics import ProcessingResult
+from .queries import QuerySpec
 
-__all__ = ["process_log", "ProcessingResult"]
+__all__ = ["process_log", "process_queries", "ProcessingResult", "QuerySpec"]
@@ -4,16 +4,43 @@ from __future__ import annotations
 
 import argparse
 import os
+import signal
+import sys
+import threading
+from typing import List, Optional
 
-from .api import process_log
-from .metrics import ProcessingResult
+from .api import BACKENDS, ENGINES, TRANSPORTS, process_log
+from .column_cache import DEFAULT_MAX_BYTES, ColumnCache
+from .follow import follow_log
+from .metrics import ProcessingResult, write_result_json
+from .normalize import DEFAULT_MEMO_SIZE, UrlNormalizer
+from .result_cache import ResultCache, default_cache_dir
+from .sketches import DEFAULT_CAPACITY, DEFAULT_DELTA, DEFAULT_EPSILON, DEFAULT_HLL_PRECISION, SketchConfig
+from .time_index import DEFAULT_STEP_BYTES, build_time_index, default_index_path, save_time_index
+
+
+def positive_int(value: str) -> int:
+    """Tipo de argparse para enteros > 0."""
+
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"entero inválido: {value!r}") from None
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"debe ser > 0: {value}")
+    return number
 
 
 def build_parser() -> argparse.ArgumentParser:
     """Construye y devuelve el parser de argumentos de la CLI."""
 
     parser = argparse.ArgumentParser(description="Procesador eficiente de logs en streaming")
-    parser.add_argument("--input", required=True, help="Ruta al archivo de logs")
+    parser.add_argument(
+        "--input",
+        required=True,
+        nargs="+",
+        help="Archivos, globs o directorios de logs (se procesan como un único conjunto)",
+    )
     parser.add_argument("--batch-size", type=int, default=10_000, help="Tamaño de lote (por defecto: 10000)")
     parser.add_argument("--slow-threshold", type=int, default=200, help="Umbral de request lenta en ms")
     parser.add_argument("--status", type=int, default=500, help="Código de estado a contabilizar")
@@ -23,8 +50,190 @@ def build_parser() -> argparse.ArgumentParser:
         default=os.cpu_count() or 1,
         help="Número de workers (por defecto: cpu_count)",
     )
+    parser.add_argument(
+        "--sharded",
+        action="store_true",
+        help="Divide el archivo en rangos de bytes que cada worker lee por su cuenta",
+    )
+    parser.add_argument(
+        "--accumulate-in-workers",
+        action="store_true",
+        help="Cada worker acumula sus lotes y los acumulados se fusionan en árbol",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="text",
+        help="Backend de lectura/parseo: text (decodifica líneas) o mmap (bytes)",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default="pickle",
+        help="Envío de lotes al pool: pickle (serializa cada lote) o shm (memoria compartida)",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=positive_int,
+        metavar="MB",
+        help="Presupuesto de memoria (padre y workers) en MB: lotes en bytes con tamaño y ventana adaptativos",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="python",
+        help="Motor de conteo por lote: python o numpy (requiere NumPy)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Máximo de lotes enviados al pool sin resultado (por defecto: 2 * workers)",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        metavar="DEPTH",
+        help="Lee en un hilo de fondo con hasta DEPTH bloques por adelantado (por defecto: 0, desactivado)",
+    )
+    parser.add_argument(
+        "--column-cache-dir",
+        help="Directorio de la caché de columnas parseadas (activa la caché)",
+    )
+    parser.add_argument(
+        "--column-cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // 1024**2,
+        help="Tamaño máximo de la caché de columnas en MB (desalojo LRU)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=f"Directorio de la caché de resultados (por defecto: {default_cache_dir()})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="No lee ni guarda resultados en la caché de resultados",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Archivo de checkpoint para procesar incrementalmente solo lo agregado al log",
+    )
+    parser.add_argument(
+        "--per-file",
+        action="store_true",
+        help="Incluye un resumen por archivo de entrada",
+    )
+    parser.add_argument(
+        "--approximate",
+        action="store_true",
+        help="Cuenta URLs con sketches de memoria acotada (tops aproximados con cotas de error)",
+    )
+    parser.add_argument(
+        "--approx-capacity",
+        type=int,
+        default=DEFAULT_CAPACITY,
+        help=f"URLs retenidas por contador en modo aproximado (por defecto: {DEFAULT_CAPACITY})",
+    )
+    parser.add_argument(
+        "--approx-epsilon",
+        type=float,
+        default=DEFAULT_EPSILON,
+        help=f"Error relativo de Count-Min en modo aproximado (por defecto: {DEFAULT_EPSILON})",
+    )
+    parser.add_argument(
+        "--approx-delta",
+        type=float,
+        default=DEFAULT_DELTA,
+        help=f"Probabilidad de exceder ese error (por defecto: {DEFAULT_DELTA})",
+    )
+    parser.add_argument(
+        "--strip-query",
+        action="store_true",
+        help="Descarta la query string de las URLs antes de contarlas",
+    )
+    parser.add_argument(
+        "--collapse-ids",
+        action="store_true",
+        help="Reemplaza segmentos numéricos por {id} y UUID por {uuid} en las URLs",
+    )
+    parser.add_argument(
+        "--rewrite",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("PATRON", "REEMPLAZO"),
+        help="Regla de reescritura de URLs (re.sub); puede repetirse y se aplica en orden",
+    )
+    parser.add_argument(
+        "--url-memo-size",
+        type=int,
+        default=DEFAULT_MEMO_SIZE,
+        help=f"Entradas del memo de URLs normalizadas por proceso (por defecto: {DEFAULT_MEMO_SIZE})",
+    )
+    parser.add_argument(
+        "--url-histograms",
+        action="store_true",
+        help="Calcula también percentiles de latencia por URL para las URLs de los tops",
+    )
+    parser.add_argument(
+        "--time-bucket",
+        type=int,
+        default=None,
+        metavar="SEGUNDOS",
+        help="Agrega una serie temporal con buckets de SEGUNDOS (p. ej. 60 para una por minuto)",
+    )
+    parser.add_argument(
+        "--distinct-ips",
+        type=int,
+        nargs="?",
+        const=DEFAULT_HLL_PRECISION,
+        default=None,
+        metavar="PRECISION",
+        help=(
+            "Estima IPs de clientes distintas (HyperLogLog), global y por URL de los tops; "
+            f"PRECISION en bits (por defecto: {DEFAULT_HLL_PRECISION}, ~0,8 %% de error)"
+        ),
+    )
+    parser.add_argument(
+        "--since",
+        help="Procesa solo desde esta fecha (ISO 8601 o dd/Mon/yyyy:HH:MM:SS; sin zona = UTC)",
+    )
+    parser.add_argument(
+        "--until",
+        help="Procesa solo hasta esta fecha (exclusiva), mismo formato que --since",
+    )
+    parser.add_argument(
+        "--time-index",
+        metavar="RUTA",
+        help="Índice de tiempo (ver 'logproc index'); se construye si falta o está desactualizado",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Sigue el archivo en vivo (como tail -F) emitiendo snapshots hasta SIGINT/SIGTERM",
+    )
+    parser.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=5.0,
+        help="Segundos entre snapshots en modo --follow (por defecto: 5)",
+    )
+    parser.add_argument(
+        "--snapshot-lines",
+        type=int,
+        default=None,
+        help="Emite además un snapshot cada N líneas nuevas en modo --follow",
+    )
+    parser.add_argument(
+        "--from-start",
+        action="store_true",
+        help="En modo --follow procesa también el contenido existente del archivo",
+    )
     parser.add_argument("--json-out", help="Ruta opcional para exportar resumen en JSON")
-    parser.add_argument("--profile", action="store_true", help="Ejecuta bajo cProfile")
+    parser.add_argument("--profile", action="store_true", help="Ejecuta bajo cProfile (padre y workers)")
     parser.add_argument(
         "--profile-stats-path",
         default="profile.stats",
@@ -33,6 +242,16 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
+# Etiquetas del resumen para cada etapa de ``timings.STAGES``.
+STAGE_LABELS = {
+    "read": "lectura",
+    "process": "parseo_conteo",
+    "wait": "espera_pool",
+    "merge": "fusion",
+    "top_n": "top_n",
+}
+
+
 def print_summary(result: ProcessingResult) -> None:
     """Imprime en stdout el resumen de procesamiento."""
 
@@ -43,13 +262,172 @@ def print_summary(result: ProcessingResult) -> None:
     print(f"total_lentas: {result.total_slow}")
     print(f"top_estado: {result.top_url_status[0]} ({result.top_url_status[1]})")
     print(f"top_lentas: {result.top_url_slow[0]} ({result.top_url_slow[1]})")
-    print(f"tiempo_total: {result.elapsed_seconds:.4f} s")
+    if result.latency and result.latency["count"]:
+        print(f"latencia_ms: {format_latency(result.latency)}")
+    print(f"tiempo_total: {result.elapsed_seconds:.4f} s{' (desde caché)' if result.from_cache else ''}")
+    if result.approximate and result.error_bounds:
+        for name in ("status", "slow"):
+            bounds = result.error_bounds.get(name)
+            if bounds:
+                print(
+                    f"cota_error_{name}: <= {bounds['max_error']} (Space-Saving), "
+                    f"<= {bounds['count_min_error']} con prob. {bounds['confidence']:.2f} (Count-Min)"
+                )
+    if result.distinct_ips is not None:
+        print(f"ips_distintas: ~{result.distinct_ips} (error típico {result.distinct_ips_error:.1%})")
+    if result.latency_by_url:
+        print("\n--- Latencia por URL (ms) ---")
+        for url, summary in result.latency_by_url.items():
+            print(f"{url}: {format_latency(summary)}")
+    if result.distinct_ips_by_url:
+        print("\n--- IPs distintas por URL ---")
+        for url, estimate in result.distinct_ips_by_url.items():
+            print(f"{url}: ~{estimate}")
+    if result.prefetch_wait_seconds is not None:
+        print(f"espera_lector: {result.prefetch_wait_seconds:.4f} s")
+    if result.byte_range:
+        print(f"rango_bytes: {result.byte_range[0]}..{result.byte_range[1]}")
+    if result.time_series:
+        print(f"\n--- Serie temporal ({result.time_bucket} s) ---")
+        first, last = result.time_series[0]["start"], result.time_series[-1]["start"]
+        print(f"buckets: {len(result.time_series)} ({first} .. {last})")
+        for key, label in (("total", "líneas"), ("status", "estado"), ("slow", "lentas")):
+            peak = max(result.time_series, key=lambda row: row[key])
+            print(f"pico_{label}: {peak['start']} ({peak[key]})")
+    if result.input_files > 1:
+        print(f"archivos_procesados: {result.input_files}")
+    if result.peak_rss_bytes is not None:
+        print(f"pico_rss_padre: {result.peak_rss_bytes / 1024**2:.1f} MB")
+    if result.worker_peak_rss_bytes is not None:
+        print(f"pico_rss_workers: {result.worker_peak_rss_bytes / 1024**2:.1f} MB")
+    if result.memory_budget:
+        budget = result.memory_budget
+        print(
+            f"presupuesto_memoria: {budget['budget_bytes'] / 1024**2:.0f} MB "
+            f"(lote final {budget['chunk_bytes'] / 1024:.0f} KB, en vuelo {budget['max_in_flight']}, "
+            f"achicado {budget['shrinks']} veces, agrandado {budget['grows']})"
+        )
+    if result.timings:
+        print("\n--- Tiempos por etapa ---")
+        for stage, label in STAGE_LABELS.items():
+            print(f"{label}: {result.timings[stage]:.4f} s")
+        print(f"lineas_por_segundo: {result.timings['lines_per_second']:.1f}")
+        print(f"mb_por_segundo: {result.timings['mb_per_second']:.3f}")
+    if result.per_file:
+        print("\n--- Por archivo ---")
+        for path, summary in result.per_file.items():
+            print(
+                f"{path}: líneas={summary['total_lines']} malformadas={summary['bad_lines']} "
+                f"estado={summary['total_status']} lentas={summary['total_slow']}"
+            )
+
+
+def format_latency(summary: dict) -> str:
+    """Formatea los cuantiles de un resumen de latencia en una línea."""
+
+    return " ".join(f"{key}={summary[key]}" for key in ("p50", "p95", "p99", "max"))
+
+
+def approximate_config(args: argparse.Namespace) -> Optional[SketchConfig]:
+    """Construye la configuración del modo aproximado si se pidió."""
 
+    if not args.approximate:
+        return None
+    return SketchConfig(capacity=args.approx_capacity, epsilon=args.approx_epsilon, delta=args.approx_delta)
 
-def main() -> int:
+
+def url_normalizer(args: argparse.Namespace) -> Optional[UrlNormalizer]:
+    """Construye el normalizador de URLs si se pidió alguna transformación."""
+
+    normalizer = UrlNormalizer(
+        strip_query=args.strip_query,
+        collapse_ids=args.collapse_ids,
+        rules=[tuple(rule) for rule in args.rewrite],
+        memo_size=args.url_memo_size,
+    )
+    return normalizer if normalizer.enabled else None
+
+
+def run_follow(args: argparse.Namespace) -> int:
+    """Ejecuta el modo ``--follow`` hasta recibir SIGINT o SIGTERM."""
+
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame) -> None:
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    for snapshot in follow_log(
+        input_path=args.input[0],
+        slow_threshold=args.slow_threshold,
+        status_code=args.status,
+        batch_size=args.batch_size,
+        snapshot_interval=args.snapshot_interval,
+        snapshot_lines=args.snapshot_lines,
+        from_start=args.from_start,
+        stop_event=stop_event,
+        approximate=approximate_config(args),
+        normalizer=url_normalizer(args),
+        url_histograms=args.url_histograms,
+        time_bucket=args.time_bucket,
+        distinct_ips=args.distinct_ips,
+    ):
+        print_summary(snapshot)
+        write_result_json(snapshot, args.json_out)
+    return 0
+
+
+def build_index_parser() -> argparse.ArgumentParser:
+    """Parser del subcomando ``index``."""
+
+    parser = argparse.ArgumentParser(
+        prog="logproc index",
+        description="Construye el índice disperso de tiempo a offset de un log (para --since/--until)",
+    )
+    parser.add_argument("--input", required=True, help="Archivo de log sin comprimir")
+    parser.add_argument("--output", help="Ruta del índice (por defecto: <input>.lpidx)")
+    parser.add_argument(
+        "--step-kb",
+        type=int,
+        default=DEFAULT_STEP_BYTES // 1024,
+        help=f"KB entre muestras del índice (por defecto: {DEFAULT_STEP_BYTES // 1024})",
+    )
+    return parser
+
+
+def run_index(args: argparse.Namespace) -> int:
+    """Ejecuta el subcomando ``index``."""
+
+    output = args.output or default_index_path(args.input)
+    index = build_time_index(args.input, step_bytes=args.step_kb * 1024)
+    save_time_index(index, output)
+    print(f"Índice guardado en: {output}")
+    print(f"muestras: {len(index.samples)} líneas: {index.total_lines} bytes: {index.size}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
     """Rutina principal de la CLI."""
 
-    args = build_parser().parse_args()
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["index"]:
+        return run_index(build_index_parser().parse_args(argv[1:]))
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.follow:
+        if len(args.input) > 1:
+            parser.error("--follow admite un solo --input")
+        if args.since or args.until or args.time_index:
+            parser.error("--since, --until y --time-index no aplican a --follow")
+        return run_follow(args)
+    column_cache = (
+        ColumnCache(args.column_cache_dir, max_bytes=args.column_cache_max_mb * 1024**2)
+        if args.column_cache_dir
+        else None
+    )
+    cache = None if args.no_cache else ResultCache(args.cache_dir or default_cache_dir())
     result = process_log(
         input_path=args.input,
         batch_size=args.batch_size,
@@ -59,6 +437,26 @@ def main() -> int:
         profile=args.profile,
         json_out_path=args.json_out,
         profile_stats_path=args.profile_stats_path,
+        sharded=args.sharded,
+        max_in_flight=args.max_in_flight,
+        accumulate_in_workers=args.accumulate_in_workers,
+        prefetch=args.prefetch,
+        transport=args.transport,
+        memory_budget=args.memory_budget * 1024**2 if args.memory_budget is not None else None,
+        backend=args.backend,
+        engine=args.engine,
+        column_cache=column_cache,
+        cache=cache,
+        checkpoint_path=args.checkpoint,
+        per_file=args.per_file,
+        approximate=approximate_config(args),
+        normalizer=url_normalizer(args),
+        url_histograms=args.url_histograms,
+        time_bucket=args.time_bucket,
+        distinct_ips=args.distinct_ips,
+        since=args.since,
+        until=args.until,
+        time_index=args.time_index,
     )
 
     print_summary(result)
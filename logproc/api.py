@@ -2,22 +2,61 @@
 
 from __future__ import annotations
 
-import json
 import os
-from concurrent.futures import ProcessPoolExecutor
+from collections import Counter, defaultdict
 from functools import partial
 from time import perf_counter
-from typing import Iterable, Optional, Sequence
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from .metrics import PartialStats, ProcessingResult, top_n_urls, top_url
+from .checkpoint import build_checkpoint, last_line_end, load_checkpoint, resume_offset, save_checkpoint
+from .column_cache import ColumnCache, build_range_columns
+from .compression import detect_compression, member_ranges
+from .fingerprint import file_fingerprint
+from .inputs import InputSpec, expand_inputs, plan_work
+from .memory import MemoryBudget, peak_rss_bytes
+from .metrics import MemberPartial, PartialStats, ProcessingResult, file_summary, result_from_partial, write_result_json
+from .normalize import UrlNormalizer, normalizer_key
 from .profiling import run_with_profile
-from .reader import read_batches
-from .reducer import merge_partials
-from .worker import process_batch
+from .queries import QuerySpec, process_unit_queries
+from .reader import (
+    PREFETCH_CHUNK_BYTES,
+    Prefetcher,
+    batches_from_chunks,
+    chunk_lines,
+    read_batches,
+    read_log_chunks,
+    read_mmap_chunks,
+    read_raw_chunks,
+    split_ranges,
+)
+from .reducer import StatsAccumulator, merge_partials
+from .result_cache import ResultCache, result_key
+from .scheduler import default_max_in_flight, parallel_map, parallel_reduce
+from .shared_chunks import SLOT_SLACK, TRANSPORTS, shared_memory_map
+from .sketches import MAX_HLL_PRECISION, MIN_HLL_PRECISION, SketchConfig
+from .time_index import TimeValue, ensure_time_index, parse_time, time_range_offsets
+from .timings import StageTimings, current_timings, recording
+from .worker import (
+    ENGINES,
+    batch_function,
+    chunk_bytes_for,
+    merge_member_partials,
+    process_member_range,
+    process_range,
+    process_unit,
+)
+
+# Rangos por worker en modo particionado: más de uno para balancear la cola
+# cuando algunos tramos resultan más costosos que otros.
+SHARDS_PER_WORKER = 4
+
+# Backends de lectura/parseo: "text" decodifica cada línea; "mmap" mapea el
+# archivo y parsea ``bytes``, decodificando solo las URLs contadas.
+BACKENDS = ("text", "mmap")
 
 
 def process_log(
-    input_path: str,
+    input_path: InputSpec,
     batch_size: int = 10_000,
     slow_threshold: int = 200,
     status_code: int = 500,
@@ -26,19 +65,163 @@ def process_log(
     profile: bool = False,
     json_out_path: Optional[str] = None,
     profile_stats_path: str = "profile.stats",
+    sharded: bool = False,
+    max_in_flight: Optional[int] = None,
+    accumulate_in_workers: bool = False,
+    prefetch: int = 0,
+    transport: str = "pickle",
+    memory_budget: Optional[int] = None,
+    backend: str = "text",
+    engine: str = "python",
+    column_cache: Optional[ColumnCache] = None,
+    cache: Optional[ResultCache] = None,
+    checkpoint_path: Optional[str] = None,
+    per_file: bool = False,
+    approximate: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+    since: Optional[TimeValue] = None,
+    until: Optional[TimeValue] = None,
+    time_index: Optional[str] = None,
 ) -> ProcessingResult:
     """Procesa un archivo de logs grande usando *streaming* y multiproceso opcional.
 
     Args:
-        input_path: Ruta al archivo de logs de entrada.
+        input_path: Ruta al archivo de logs de entrada, o varias rutas, globs
+            y directorios (ver ``inputs.expand_inputs``). Con más de un archivo
+            el trabajo se reparte en unidades de costo similar (archivos
+            grandes partidos en rangos, chicos agrupados) que el pool toma de
+            mayor a menor, y el resultado es uno solo fusionado.
         batch_size: Cantidad de líneas por lote.
         slow_threshold: Umbral de request lenta en milisegundos.
         status_code: Código HTTP a agregar por compatibilidad hacia atrás.
         status_codes: Lista de códigos HTTP a agregar.
         workers: Cantidad de procesos worker. ``None`` usa ``os.cpu_count()``.
-        profile: Si se ejecuta el procesamiento bajo cProfile.
+        profile: Si se ejecuta el procesamiento bajo cProfile, en el padre y
+            en cada worker del pool (ver ``profiling.run_with_profile``).
         json_out_path: Ruta opcional para exportar el resultado serializado.
-        profile_stats_path: Ruta de salida de cProfile cuando ``profile=True``.
+        profile_stats_path: Ruta de las estadísticas combinadas de todos los
+            procesos cuando ``profile=True``; las de cada proceso quedan al
+            lado (``.parent``, ``.worker-<pid>``).
+        sharded: Si se divide el archivo en rangos de bytes alineados a líneas
+            que cada worker lee y parsea por su cuenta. El padre solo recibe un
+            ``PartialStats`` por rango en lugar de serializar cada lote.
+        max_in_flight: Máximo de lotes (o rangos) enviados al pool sin resultado
+            recibido. ``None`` usa ``IN_FLIGHT_PER_WORKER * workers``.
+        accumulate_in_workers: Si cada worker es un proceso de larga vida que
+            acumula localmente los parciales de todos sus lotes (o rangos) y
+            los workers combinan sus acumulados en árbol (ver
+            ``scheduler.parallel_reduce``). El padre recibe un solo
+            ``PartialStats`` en lugar de uno por lote; conviene con lotes
+            chicos o muchas URLs distintas. Aplica a la lectura en lotes, a
+            ``sharded``, ``since``/``until``, ``checkpoint_path`` y a las
+            entradas comprimidas de un solo miembro.
+        prefetch: Si es mayor que cero, un hilo de fondo lee el archivo con
+            ``readinto`` en bloques grandes y deja hasta ``prefetch`` bloques
+            en una cola, de modo que la E/S se solapa con el parseo (con un
+            worker) o con el envío de lotes al pool. El tiempo que el
+            consumidor esperó al lector queda en
+            ``ProcessingResult.prefetch_wait_seconds``. Aplica a la lectura en
+            lotes de un único archivo sin comprimir (no a ``sharded``,
+            ``since``/``until``, ``checkpoint_path`` ni ``column_cache``).
+        transport: Cómo viajan los lotes que lee el padre hacia el pool, uno
+            de ``TRANSPORTS``. ``"pickle"`` serializa cada lote; ``"shm"``
+            escribe bloques crudos en un anillo de memoria compartida y envía
+            solo descriptores (ver ``shared_chunks``). Aplica a la lectura en
+            lotes y a las entradas comprimidas que descomprime el padre; los
+            modos por rangos (``sharded``, ``since``/``until``,
+            ``checkpoint_path``) ya envían solo offsets. No se combina con
+            ``accumulate_in_workers``.
+        memory_budget: Presupuesto de memoria en bytes para el padre y los
+            workers. Los lotes se miden en bytes (empiezan en el equivalente
+            de ``batch_size``, recortado a lo que admite el presupuesto) y
+            ``memory.MemoryBudget`` achica o agranda el tamaño de lote y la
+            ventana en vuelo según el RSS observado. Es un objetivo, no un
+            límite duro. Cada bloque se parsea con el ``backend`` elegido (con
+            ``"text"``, decodificado como en ``reader.read_batches``), así
+            que el resultado no depende del presupuesto. Aplica a la lectura
+            en lotes de un único archivo sin comprimir; no se combina con
+            ``sharded``, ``since``/``until``, ``checkpoint_path``,
+            ``column_cache``, ``prefetch``, ``transport="shm"`` ni
+            ``accumulate_in_workers``. El ajuste final queda en
+            ``ProcessingResult.memory_budget``.
+        backend: Backend de lectura/parseo, uno de ``BACKENDS``. ``"mmap"``
+            evita decodificar UTF-8 línea por línea; separa líneas solo en
+            ``\\n`` (no en ``\\r`` suelto, como el modo texto).
+        engine: Motor de conteo por lote, uno de ``ENGINES``. ``"numpy"``
+            vectoriza filtros y conteos; sin NumPy instalado usa ``"python"``.
+        column_cache: Caché persistente de columnas parseadas. Si se indica,
+            el archivo se parsea una sola vez a columnas y las corridas
+            siguientes (aun con otros umbrales o códigos) se responden desde
+            la caché sin re-parsear. ``backend``/``engine``/``sharded`` no
+            aplican en este modo.
+        cache: Caché de resultados. Si ya hay un resultado para la misma huella
+            de archivo, ``slow_threshold`` y conjunto de ``status_codes``, se
+            devuelve de inmediato (con ``from_cache=True``); si no, el resultado
+            calculado se guarda. Con ``profile=True`` no se lee de la caché y
+            con ``checkpoint_path`` no se usa: esa corrida omite la última
+            línea sin ``\\n`` y debe actualizar el checkpoint.
+        checkpoint_path: Modo incremental para logs que solo crecen. Si existe
+            un checkpoint compatible, se parsea solo la cola nueva y se fusiona
+            con lo guardado; si el archivo fue rotado o truncado, o cambiaron
+            los parámetros, se reprocesa completo. Solo se procesan líneas
+            terminadas en ``\\n``; al final se actualiza el checkpoint.
+        per_file: Si se incluye en ``ProcessingResult.per_file`` un resumen de
+            cada archivo de entrada.
+        approximate: Modo aproximado para URLs de alta cardinalidad. Los
+            conteos por URL se resumen en sketches fusionables (Space-Saving +
+            Count-Min) de tamaño acotado por ``SketchConfig.capacity``; los
+            tops informan la cota superior de cada URL y
+            ``ProcessingResult.error_bounds`` las cotas de error. No se
+            combina con ``checkpoint_path`` ni ``column_cache``.
+        normalizer: Normalización de URLs (query string, identificadores,
+            reglas de reescritura) aplicada antes de contar por URL, ver
+            ``normalize.UrlNormalizer``. Forma parte de la clave de ``cache``
+            y del checkpoint; con ``column_cache`` se aplica al evaluar, por
+            lo que la caché de columnas sirve para cualquier normalización.
+        url_histograms: Si además del histograma global de latencias (siempre
+            presente en ``ProcessingResult.latency``) se mantiene uno por URL;
+            el resultado incluye los cuantiles de las URLs de los tops en
+            ``latency_by_url``. La memoria crece con las URLs distintas, por lo
+            que no se combina con ``approximate``.
+        time_bucket: Si se indica, ancho en segundos de los buckets de la
+            serie temporal ``ProcessingResult.time_series`` (líneas, con código
+            objetivo y lentas por intervalo, según la fecha de cada línea).
+            Forma parte de la clave de ``cache`` y del checkpoint; la caché de
+            columnas guarda las fechas y sirve para cualquier ancho.
+        distinct_ips: Si se indica, precisión (bits, entre
+            ``sketches.MIN_HLL_PRECISION`` y ``MAX_HLL_PRECISION``) de los
+            sketches HyperLogLog con que se estiman las IPs de clientes
+            distintas: ``ProcessingResult.distinct_ips`` para todo el log y
+            ``distinct_ips_by_url`` para las URLs de los tops. Cada sketch
+            ocupa a lo sumo ``2**distinct_ips`` bytes (los de URLs con pocas
+            IPs, mucho menos) y el error relativo típico es
+            ``1.04 / sqrt(2**distinct_ips)``. Forma parte de la clave de
+            ``cache`` y del checkpoint; no se combina con ``approximate`` ni
+            ``column_cache`` (que no guarda las IPs).
+        since: Procesa solo las líneas desde este instante (inclusive): epoch,
+            ``datetime`` o texto (ver ``time_index.parse_time``; sin zona
+            horaria se asume UTC).
+        until: Procesa solo las líneas anteriores a este instante.
+            Con ``since``/``until`` se ubican por búsqueda (binaria o con
+            ``time_index``) los bytes donde empieza y termina el intervalo y
+            solo se lee ese tramo, repartido en rangos entre los workers; el
+            resultado informa el tramo en ``byte_range``. Supone líneas en
+            orden cronológico y requiere un único archivo sin comprimir; no se
+            combina con ``checkpoint_path`` ni ``column_cache``.
+        time_index: Ruta de un índice disperso de tiempo a offset (ver
+            ``time_index.build_time_index``). Si no existe o el archivo
+            cambió, se (re)construye antes de procesar; con ``since``/``until``
+            acota la búsqueda de cada extremo a un tramo del índice.
+
+    Las entradas comprimidas (gzip, bz2, xz) se detectan por sus *magic bytes*
+    y se leen sin descomprimir a disco; ``backend`` y ``sharded`` no aplican.
+    Con varios workers y un archivo de varios miembros, cada worker
+    descomprime y procesa los miembros de su rango; con un solo miembro el
+    padre descomprime en streaming y los workers parsean los lotes. No se
+    combinan con ``checkpoint_path`` ni ``column_cache``.
 
     Returns:
         Un dataclass ``ProcessingResult`` con métricas agregadas y URLs más frecuentes.
@@ -49,54 +232,915 @@ def process_log(
 
     Notes:
         La complejidad temporal es ``O(n)`` sobre las líneas del log y la memoria
-        queda acotada por ``batch_size`` más los diccionarios agregados por URL.
+        queda acotada por ``batch_size * max_in_flight`` más los diccionarios
+        agregados por URL.
     """
 
     worker_count = workers or (os.cpu_count() or 1)
+    in_flight = default_max_in_flight(worker_count) if max_in_flight is None else max_in_flight
+    if in_flight <= 0:
+        raise ValueError("max_in_flight debe ser > 0")
+    if prefetch < 0:
+        raise ValueError("prefetch debe ser >= 0")
+    if transport not in TRANSPORTS:
+        raise ValueError(f"transport debe ser uno de {TRANSPORTS}")
+    if transport == "shm" and accumulate_in_workers:
+        raise ValueError("transport='shm' no puede combinarse con accumulate_in_workers")
+    if memory_budget is not None and memory_budget <= 0:
+        raise ValueError("memory_budget debe ser > 0")
+    if memory_budget is not None and (
+        sharded or accumulate_in_workers or prefetch or transport == "shm" or checkpoint_path or column_cache
+    ):
+        raise ValueError(
+            "memory_budget no puede combinarse con sharded, accumulate_in_workers, prefetch, "
+            "transport='shm', checkpoint_path ni column_cache"
+        )
+    if backend not in BACKENDS:
+        raise ValueError(f"backend debe ser uno de {BACKENDS}")
+    if engine not in ENGINES:
+        raise ValueError(f"engine debe ser uno de {ENGINES}")
+    if checkpoint_path and column_cache is not None:
+        raise ValueError("checkpoint_path y column_cache no pueden combinarse")
+    if approximate is not None and (checkpoint_path or column_cache is not None):
+        raise ValueError("approximate no puede combinarse con checkpoint_path ni column_cache")
+    if approximate is not None and url_histograms:
+        raise ValueError("url_histograms no puede combinarse con approximate")
+    if time_bucket is not None and time_bucket <= 0:
+        raise ValueError("time_bucket debe ser > 0")
+    _check_distinct_ips(distinct_ips)
+    if distinct_ips is not None and (approximate is not None or column_cache is not None):
+        raise ValueError("distinct_ips no puede combinarse con approximate ni column_cache")
+    since_epoch = parse_time(since) if since is not None else None
+    until_epoch = parse_time(until) if until is not None else None
+    time_range = [since_epoch, until_epoch] if since is not None or until is not None else None
+    if time_range and (checkpoint_path or column_cache is not None):
+        raise ValueError("since/until no pueden combinarse con checkpoint_path ni column_cache")
+    paths = expand_inputs(input_path)
+    if len(paths) > 1 and (checkpoint_path or column_cache is not None):
+        raise ValueError("checkpoint_path y column_cache requieren un único archivo de entrada")
+    if len(paths) > 1 and (time_range or time_index):
+        raise ValueError("since/until y time_index requieren un único archivo de entrada")
+    if memory_budget is not None and (len(paths) > 1 or time_range or time_index):
+        raise ValueError("memory_budget requiere un único archivo de entrada, sin since/until ni time_index")
+    input_path = paths[0]
     selected_status_codes = tuple(status_codes or [status_code])
+    if normalizer is not None and not normalizer.enabled:
+        normalizer = None
+
+    stage_timings = StageTimings()
 
     def _run() -> ProcessingResult:
         start = perf_counter()
-        batch_iter = read_batches(input_path, batch_size=batch_size)
+        stage_timings.input_bytes = sum(os.path.getsize(path) for path in paths)
+        if len(paths) > 1:
+            merged, per_file_stats = _run_multi(
+                paths,
+                batch_size=batch_size,
+                status_code=status_code,
+                status_codes=selected_status_codes,
+                slow_threshold=slow_threshold,
+                workers=worker_count,
+                max_in_flight=in_flight,
+                backend=backend,
+                engine=engine,
+                per_file=per_file,
+                sketch=approximate,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            return _build_result(merged, perf_counter() - start, per_file_stats)
+
+        codec = detect_compression(input_path)
+        if codec is not None and (checkpoint_path or column_cache is not None):
+            raise ValueError("checkpoint_path y column_cache no admiten entradas comprimidas")
+        if codec is not None and (time_range or time_index):
+            raise ValueError("since/until y time_index no admiten entradas comprimidas")
+        if codec is not None and memory_budget is not None:
+            raise ValueError("memory_budget no admite entradas comprimidas")
+        index = ensure_time_index(input_path, time_index) if time_index else None
+
+        if time_range:
+            byte_range = time_range_offsets(input_path, since_epoch, until_epoch, index=index)
+            stage_timings.input_bytes = byte_range[1] - byte_range[0]
+            merged = _run_sharded(
+                input_path,
+                batch_size=batch_size,
+                status_code=status_code,
+                status_codes=selected_status_codes,
+                slow_threshold=slow_threshold,
+                workers=worker_count,
+                max_in_flight=in_flight,
+                accumulate=accumulate_in_workers,
+                backend=backend,
+                engine=engine,
+                start=byte_range[0],
+                end=byte_range[1],
+                sketch=approximate,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            result = _build_result(merged, perf_counter() - start)
+            result.byte_range = byte_range
+            return result
+
+        if checkpoint_path:
+            merged = _run_incremental(
+                input_path,
+                checkpoint_path,
+                batch_size=batch_size,
+                status_code=status_code,
+                status_codes=selected_status_codes,
+                slow_threshold=slow_threshold,
+                workers=worker_count,
+                max_in_flight=in_flight,
+                accumulate=accumulate_in_workers,
+                backend=backend,
+                engine=engine,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            return _build_result(merged, perf_counter() - start)
+
+        if column_cache is not None:
+            merged = _run_column_cache(
+                input_path,
+                column_cache,
+                batch_size=batch_size,
+                status_codes=selected_status_codes,
+                slow_threshold=slow_threshold,
+                workers=worker_count,
+                max_in_flight=in_flight,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+            )
+            return _build_result(merged, perf_counter() - start)
+
+        if codec is not None:
+            merged = _run_compressed(
+                input_path,
+                codec,
+                batch_size=batch_size,
+                status_code=status_code,
+                status_codes=selected_status_codes,
+                slow_threshold=slow_threshold,
+                workers=worker_count,
+                max_in_flight=in_flight,
+                accumulate=accumulate_in_workers,
+                transport=transport,
+                engine=engine,
+                sketch=approximate,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            return _build_result(merged, perf_counter() - start)
+
+        if sharded:
+            merged = _run_sharded(
+                input_path,
+                batch_size=batch_size,
+                status_code=status_code,
+                status_codes=selected_status_codes,
+                slow_threshold=slow_threshold,
+                workers=worker_count,
+                max_in_flight=in_flight,
+                accumulate=accumulate_in_workers,
+                backend=backend,
+                engine=engine,
+                sketch=approximate,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            return _build_result(merged, perf_counter() - start)
+
+        # Con "shm" los lotes viajan como bloques de bytes, sea cual sea el
+        # backend. Con presupuesto de memoria se leen bloques de bytes, pero
+        # el backend "text" los decodifica y parsea como el lector de texto.
+        chunked = backend == "mmap" or transport == "shm"
+        chunk_bytes = chunk_bytes_for(batch_size)
+        batch_iter: Iterable
+        prefetcher = None
+        budget = None
+        if memory_budget is not None:
+            budget = MemoryBudget(memory_budget, worker_count, chunk_bytes, in_flight)
+            raw_chunks = read_raw_chunks(input_path, chunk_bytes=budget.chunk_bytes, chunk_size=budget.next_chunk_bytes)
+            batch_iter = raw_chunks if chunked else map(chunk_lines, raw_chunks)
+        elif prefetch:
+            read_bytes = chunk_bytes if chunked else PREFETCH_CHUNK_BYTES
+            prefetcher = Prefetcher(read_raw_chunks(input_path, chunk_bytes=read_bytes), depth=prefetch)
+            batch_iter = prefetcher if chunked else batches_from_chunks(prefetcher, batch_size)
+        elif transport == "shm":
+            batch_iter = read_raw_chunks(input_path, chunk_bytes=chunk_bytes)
+        elif backend == "mmap":
+            batch_iter = read_mmap_chunks(input_path, chunk_bytes=chunk_bytes)
+        else:
+            batch_iter = read_batches(input_path, batch_size=batch_size)
+
         worker_func = partial(
-            process_batch,
+            batch_function("mmap" if chunked else backend, engine),
             status_code=status_code,
             status_codes=selected_status_codes,
             slow_threshold=slow_threshold,
+            normalizer=normalizer,
+            url_histograms=url_histograms,
+            time_bucket=time_bucket,
+            distinct_ips=distinct_ips,
         )
 
-        partials: Iterable[PartialStats]
-        if worker_count == 1:
-            partials = (worker_func(batch) for batch in batch_iter)
-            merged = merge_partials(partials)
-        else:
-            with ProcessPoolExecutor(max_workers=worker_count) as executor:
-                partials = executor.map(worker_func, batch_iter)
-                merged = merge_partials(partials)
-
-        elapsed = perf_counter() - start
-        return ProcessingResult(
-            total_lines=merged.total_lines,
-            bad_lines=merged.bad_lines,
-            total_status=merged.total_status,
-            total_slow=merged.total_slow,
-            top_url_status=top_url(merged.status_by_url),
-            top_url_slow=top_url(merged.slow_by_url),
-            top_10_status=top_n_urls(merged.status_by_url, limit=10),
-            top_10_slow=top_n_urls(merged.slow_by_url, limit=10),
+        try:
+            if transport == "shm":
+                merged = merge_partials(
+                    shared_memory_map(worker_func, batch_iter, worker_count, in_flight, chunk_bytes * SLOT_SLACK),
+                    sketch=approximate,
+                )
+            elif budget is not None:
+                merged = merge_partials(
+                    budget.track(parallel_map(worker_func, batch_iter, worker_count, in_flight, budget.window)),
+                    sketch=approximate,
+                )
+            else:
+                merged = _reduce_partials(
+                    worker_func, batch_iter, worker_count, in_flight, approximate, accumulate_in_workers
+                )
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+        result = _build_result(merged, perf_counter() - start)
+        if prefetcher is not None:
+            result.prefetch_wait_seconds = prefetcher.wait_seconds
+        if budget is not None:
+            result.memory_budget = budget.to_dict()
+        return result
+
+    def _build_result(
+        merged: PartialStats,
+        elapsed: float,
+        per_file_stats: Optional[Dict[str, PartialStats]] = None,
+    ) -> ProcessingResult:
+        result = result_from_partial(
+            merged,
             elapsed_seconds=elapsed,
-            status_code=selected_status_codes[0],
             status_codes=selected_status_codes,
             slow_threshold=slow_threshold,
             workers=worker_count,
         )
+        result.input_files = len(paths)
+        result.time_bucket = time_bucket
+        if per_file:
+            per_file_stats = per_file_stats or {input_path: merged}
+            result.per_file = {path: file_summary(stats) for path, stats in per_file_stats.items()}
+        stage_timings.add_partial(merged)
+        result.timings = stage_timings.to_dict(elapsed, result.total_lines)
+        _report_memory(result, merged)
+        return result
 
-    result = run_with_profile(_run, stats_path=profile_stats_path) if profile else _run()
+    cache_key = None
+    if cache is not None and not checkpoint_path:
+        lookup_start = perf_counter()
+        fingerprints = [file_fingerprint(path) for path in paths]
+        cache_key = result_key(
+            fingerprints,
+            slow_threshold,
+            selected_status_codes,
+            per_file=per_file,
+            approximate=approximate,
+            normalizer=normalizer_key(normalizer),
+            url_histograms=url_histograms,
+            time_bucket=time_bucket,
+            distinct_ips=distinct_ips,
+            time_range=time_range,
+            parser=_parser_family(backend, transport, column_cache),
+        )
+        cached = None if profile else cache.get(cache_key)
+        if cached is not None:
+            _mark_cached(cached, selected_status_codes, worker_count, perf_counter() - lookup_start)
+            write_result_json(cached, json_out_path)
+            return cached
+
+    with recording(stage_timings):
+        result = run_with_profile(_run, stats_path=profile_stats_path) if profile else _run()
     if profile:
         result.profile_stats_path = profile_stats_path
 
-    if json_out_path:
-        with open(json_out_path, "w", encoding="utf-8") as handle:
-            json.dump(result.to_dict(), handle, indent=2, ensure_ascii=False)
+    # Solo se guarda si ningún archivo cambió durante el procesamiento.
+    if cache_key is not None and [file_fingerprint(path) for path in paths] == fingerprints:
+        cache.put(cache_key, result)
 
+    write_result_json(result, json_out_path)
     return result
+
+
+def process_queries(
+    input_path: InputSpec,
+    queries: Sequence[QuerySpec],
+    batch_size: int = 10_000,
+    workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    backend: str = "text",
+    engine: str = "python",
+    column_cache: Optional[ColumnCache] = None,
+    cache: Optional[ResultCache] = None,
+    per_file: bool = False,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> List[ProcessingResult]:
+    """Evalúa varias consultas sobre la misma entrada en una sola pasada.
+
+    Equivale a llamar a ``process_log`` una vez por consulta (con los mismos
+    ``batch_size``, ``workers``, etc.), pero el archivo se lee y parsea una
+    sola vez: cada lote se evalúa para todas las consultas (ver
+    ``queries.process_batch_queries``).
+
+    Args:
+        input_path: Archivo(s), globs o directorios, como en ``process_log``.
+            Las entradas comprimidas no se admiten.
+        queries: Consultas (``slow_threshold`` y ``status_codes``) a evaluar.
+        batch_size: Cantidad de líneas por lote.
+        workers: Cantidad de procesos worker. ``None`` usa ``os.cpu_count()``.
+        max_in_flight: Máximo de unidades enviadas al pool sin resultado.
+        backend: Backend de lectura/parseo, uno de ``BACKENDS``.
+        engine: Motor de conteo, uno de ``ENGINES``.
+        column_cache: Caché de columnas; con un único archivo, se construye
+            (si falta) con una pasada y cada consulta se evalúa sobre ella.
+        cache: Caché de resultados compartida con ``process_log``: las
+            consultas ya calculadas se responden desde ahí y solo las
+            restantes se procesan; cada resultado nuevo se guarda.
+        per_file: Resumen por archivo de entrada, ver ``process_log``.
+        normalizer: Normalización de URLs, ver ``process_log``.
+        url_histograms: Histogramas de latencia por URL, ver ``process_log``.
+        time_bucket: Serie temporal por buckets, ver ``process_log``.
+        distinct_ips: IPs distintas, ver ``process_log``; no se combina con
+            ``column_cache``.
+
+    Returns:
+        Un ``ProcessingResult`` por consulta, en el orden de ``queries``.
+        ``elapsed_seconds`` es la duración de la pasada compartida.
+
+    Raises:
+        OSError: Si algún archivo no puede leerse.
+        ValueError: Si se proveen parámetros inválidos o entradas comprimidas.
+    """
+
+    if not queries:
+        raise ValueError("queries no puede estar vacío")
+    worker_count = workers or (os.cpu_count() or 1)
+    in_flight = default_max_in_flight(worker_count) if max_in_flight is None else max_in_flight
+    if in_flight <= 0:
+        raise ValueError("max_in_flight debe ser > 0")
+    if backend not in BACKENDS:
+        raise ValueError(f"backend debe ser uno de {BACKENDS}")
+    if engine not in ENGINES:
+        raise ValueError(f"engine debe ser uno de {ENGINES}")
+    if time_bucket is not None and time_bucket <= 0:
+        raise ValueError("time_bucket debe ser > 0")
+    _check_distinct_ips(distinct_ips)
+    if distinct_ips is not None and column_cache is not None:
+        raise ValueError("distinct_ips no puede combinarse con column_cache")
+    paths = expand_inputs(input_path)
+    if len(paths) > 1 and column_cache is not None:
+        raise ValueError("column_cache requiere un único archivo de entrada")
+    if any(detect_compression(path) is not None for path in paths):
+        raise ValueError("las consultas múltiples no admiten entradas comprimidas")
+    if normalizer is not None and not normalizer.enabled:
+        normalizer = None
+
+    results: List[Optional[ProcessingResult]] = [None] * len(queries)
+    keys: List[Optional[str]] = [None] * len(queries)
+    if cache is not None:
+        lookup_start = perf_counter()
+        fingerprints = [file_fingerprint(path) for path in paths]
+        for position, query in enumerate(queries):
+            keys[position] = result_key(
+                fingerprints,
+                query.slow_threshold,
+                query.status_codes,
+                per_file=per_file,
+                normalizer=normalizer_key(normalizer),
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+                parser=_parser_family(backend, column_cache=column_cache),
+            )
+            cached = cache.get(keys[position])
+            if cached is not None:
+                _mark_cached(cached, query.status_codes, worker_count, perf_counter() - lookup_start)
+                results[position] = cached
+
+    pending = [position for position, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    with recording(StageTimings()) as stage_timings:
+        stage_timings.input_bytes = sum(os.path.getsize(path) for path in paths)
+        computed = _run_queries(
+            paths,
+            [queries[position] for position in pending],
+            batch_size=batch_size,
+            workers=worker_count,
+            max_in_flight=in_flight,
+            backend=backend,
+            engine=engine,
+            column_cache=column_cache,
+            per_file=per_file,
+            normalizer=normalizer,
+            url_histograms=url_histograms,
+            time_bucket=time_bucket,
+            distinct_ips=distinct_ips,
+        )
+
+    unchanged = cache is not None and [file_fingerprint(path) for path in paths] == fingerprints
+    for position, result in zip(pending, computed):
+        if unchanged:
+            cache.put(keys[position], result)
+        results[position] = result
+    return results
+
+
+def _run_queries(
+    paths: List[str],
+    pending_queries: List[QuerySpec],
+    batch_size: int,
+    workers: int,
+    max_in_flight: int,
+    backend: str,
+    engine: str,
+    column_cache: Optional[ColumnCache],
+    per_file: bool,
+    normalizer: Optional[UrlNormalizer],
+    url_histograms: bool,
+    time_bucket: Optional[int],
+    distinct_ips: Optional[int],
+) -> List[ProcessingResult]:
+    """Pasada compartida de ``process_queries`` para las consultas sin caché.
+
+    Los tiempos por etapa son los de la pasada completa y se repiten en todos
+    los resultados (el parseo de cada lote es uno solo para todas).
+    """
+
+    start = perf_counter()
+    per_file_stats: List[Dict[str, PartialStats]] = [{} for _ in pending_queries]
+    if column_cache is not None:
+        merged = [
+            _run_column_cache(
+                paths[0],
+                column_cache,
+                batch_size=batch_size,
+                status_codes=query.status_codes,
+                slow_threshold=query.slow_threshold,
+                workers=workers,
+                max_in_flight=max_in_flight,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+            )
+            for query in pending_queries
+        ]
+    else:
+        accumulators = [StatsAccumulator() for _ in pending_queries]
+        files = [{path: StatsAccumulator() for path in paths} for _ in pending_queries] if per_file else None
+        unit_func = partial(
+            process_unit_queries,
+            queries=pending_queries,
+            batch_size=batch_size,
+            backend=backend,
+            engine=engine,
+            normalizer=normalizer,
+            url_histograms=url_histograms,
+            time_bucket=time_bucket,
+            distinct_ips=distinct_ips,
+        )
+        units = plan_work(paths, parts=workers * SHARDS_PER_WORKER)
+        for results_by_piece in parallel_map(unit_func, units, workers, max_in_flight):
+            for path, parts in results_by_piece:
+                for position, part in enumerate(parts):
+                    accumulators[position].add(part)
+                    if files is not None:
+                        files[position][path].add(part)
+        merged = [accumulator.result() for accumulator in accumulators]
+        if files is not None:
+            per_file_stats = [{path: item.result() for path, item in by_path.items()} for by_path in files]
+    elapsed = perf_counter() - start
+
+    results: List[ProcessingResult] = []
+    for query, stats, by_file in zip(pending_queries, merged, per_file_stats):
+        result = result_from_partial(
+            stats,
+            elapsed_seconds=elapsed,
+            status_codes=query.status_codes,
+            slow_threshold=query.slow_threshold,
+            workers=workers,
+        )
+        result.input_files = len(paths)
+        result.time_bucket = time_bucket
+        if per_file:
+            by_file = by_file or {paths[0]: stats}
+            result.per_file = {path: file_summary(item) for path, item in by_file.items()}
+        results.append(result)
+
+    stage_timings = current_timings()
+    if column_cache is not None:
+        # Cada consulta evalúa la caché por separado: los tiempos se suman.
+        for stats in merged:
+            stage_timings.add_partial(stats)
+    else:
+        stage_timings.add_partial(merged[0])
+    timings = stage_timings.to_dict(elapsed, merged[0].total_lines)
+    for result, stats in zip(results, merged):
+        result.timings = dict(timings)
+        _report_memory(result, stats)
+    return results
+
+
+def _report_memory(result: ProcessingResult, merged: PartialStats) -> None:
+    """Anota en ``result`` los picos de RSS del padre y de los workers."""
+
+    result.peak_rss_bytes = peak_rss_bytes()
+    result.worker_peak_rss_bytes = merged.peak_rss_bytes or None
+
+
+def _clear_memory(result: ProcessingResult) -> None:
+    """Un resultado de la caché no midió memoria en esta corrida."""
+
+    result.peak_rss_bytes = None
+    result.worker_peak_rss_bytes = None
+    result.memory_budget = None
+
+
+def _reduce_partials(
+    func: Callable[[Any], PartialStats],
+    items: Iterable[Any],
+    workers: int,
+    max_in_flight: int,
+    sketch: Optional[SketchConfig],
+    accumulate: bool,
+) -> PartialStats:
+    """Aplica ``func`` en el pool y fusiona sus parciales, en el padre o en los workers."""
+
+    if accumulate:
+        return parallel_reduce(func, items, workers, max_in_flight, partial(StatsAccumulator, sketch))
+    return merge_partials(parallel_map(func, items, workers, max_in_flight), sketch=sketch)
+
+
+def _mark_cached(result: ProcessingResult, status_codes: List[int], workers: int, elapsed: float) -> None:
+    """Ajusta un resultado servido desde ``cache`` a la llamada actual.
+
+    Los campos de ejecución (workers, tiempos, memoria, profiling) no
+    corresponden a esta llamada y se reemplazan o se vacían.
+    """
+
+    result.status_code = status_codes[0]
+    result.status_codes = status_codes
+    result.workers = workers
+    result.profile_stats_path = None
+    result.from_cache = True
+    result.elapsed_seconds = elapsed
+    result.prefetch_wait_seconds = None
+    result.timings = None
+    _clear_memory(result)
+
+
+def _parser_family(backend: str, transport: str = "pickle", column_cache: Optional[ColumnCache] = None) -> str:
+    """Parser de una corrida para la clave de ``cache``: ``"bytes"`` o ``"text"``.
+
+    ``parser.parse_line_bytes`` y ``parser.parse_line`` pueden diferir ante
+    bytes no ASCII. La caché de columnas siempre parsea texto.
+    """
+
+    if column_cache is None and (backend == "mmap" or transport == "shm"):
+        return "bytes"
+    return "text"
+
+
+def _check_distinct_ips(distinct_ips: Optional[int]) -> None:
+    if distinct_ips is not None and not MIN_HLL_PRECISION <= distinct_ips <= MAX_HLL_PRECISION:
+        raise ValueError(f"distinct_ips debe estar entre {MIN_HLL_PRECISION} y {MAX_HLL_PRECISION}")
+
+
+def _run_sharded(
+    input_path: str,
+    batch_size: int,
+    status_code: int,
+    status_codes: Sequence[int],
+    slow_threshold: int,
+    workers: int,
+    max_in_flight: int,
+    backend: str,
+    engine: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    sketch: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+    accumulate: bool = False,
+) -> PartialStats:
+    """Procesa el archivo (o ``[start, end)``) repartiendo rangos de bytes entre los workers."""
+
+    ranges = split_ranges(input_path, parts=workers * SHARDS_PER_WORKER, start=start, end=end)
+    range_func = partial(
+        process_range,
+        path=input_path,
+        batch_size=batch_size,
+        status_code=status_code,
+        status_codes=status_codes,
+        slow_threshold=slow_threshold,
+        backend=backend,
+        engine=engine,
+        sketch=sketch,
+        normalizer=normalizer,
+        url_histograms=url_histograms,
+        time_bucket=time_bucket,
+        distinct_ips=distinct_ips,
+    )
+
+    return _reduce_partials(range_func, ranges, workers, max_in_flight, sketch, accumulate)
+
+
+def _run_multi(
+    paths: Sequence[str],
+    batch_size: int,
+    status_code: int,
+    status_codes: Sequence[int],
+    slow_threshold: int,
+    workers: int,
+    max_in_flight: int,
+    backend: str,
+    engine: str,
+    per_file: bool,
+    sketch: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> Tuple[PartialStats, Optional[Dict[str, PartialStats]]]:
+    """Procesa varios archivos como un único conjunto de unidades balanceadas.
+
+    Retorna el parcial fusionado y, si ``per_file``, el parcial de cada archivo.
+    """
+
+    units = plan_work(paths, parts=workers * SHARDS_PER_WORKER)
+    member_counts: Counter[str] = Counter()
+    codecs: Dict[str, str] = {}
+    sizes: Dict[str, int] = {}
+    for unit in units:
+        for piece in unit.pieces:
+            if piece.codec is not None:
+                member_counts[piece.path] += 1
+                codecs[piece.path] = piece.codec
+                sizes[piece.path] = max(sizes.get(piece.path, 0), piece.end)
+
+    total = StatsAccumulator(sketch)
+    files = {path: StatsAccumulator(sketch) for path in paths} if per_file else None
+    pending: Dict[str, List[MemberPartial]] = defaultdict(list)
+
+    def add(path: str, stats: PartialStats) -> None:
+        total.add(stats)
+        if files is not None:
+            files[path].add(stats)
+
+    unit_func = partial(
+        process_unit,
+        batch_size=batch_size,
+        status_code=status_code,
+        status_codes=status_codes,
+        slow_threshold=slow_threshold,
+        backend=backend,
+        engine=engine,
+        sketch=sketch,
+        normalizer=normalizer,
+        url_histograms=url_histograms,
+        time_bucket=time_bucket,
+        distinct_ips=distinct_ips,
+    )
+    for results in parallel_map(unit_func, units, workers, max_in_flight):
+        for path, part in results:
+            if isinstance(part, PartialStats):
+                add(path, part)
+                continue
+            pending[path].append(part)
+            if len(pending[path]) < member_counts[path]:
+                continue
+            merged = merge_member_partials(
+                pending.pop(path),
+                size=sizes[path],
+                status_code=status_code,
+                status_codes=status_codes,
+                slow_threshold=slow_threshold,
+                engine=engine,
+                sketch=sketch,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            if merged is None:
+                merged = _run_compressed(
+                    path,
+                    codecs[path],
+                    batch_size=batch_size,
+                    status_code=status_code,
+                    status_codes=status_codes,
+                    slow_threshold=slow_threshold,
+                    workers=1,
+                    max_in_flight=max_in_flight,
+                    engine=engine,
+                    sketch=sketch,
+                    normalizer=normalizer,
+                    url_histograms=url_histograms,
+                    time_bucket=time_bucket,
+                    distinct_ips=distinct_ips,
+                )
+            add(path, merged)
+
+    per_file_stats = {path: stats.result() for path, stats in files.items()} if files is not None else None
+    return total.result(), per_file_stats
+
+
+def _run_compressed(
+    input_path: str,
+    codec: str,
+    batch_size: int,
+    status_code: int,
+    status_codes: Sequence[int],
+    slow_threshold: int,
+    workers: int,
+    max_in_flight: int,
+    engine: str,
+    sketch: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+    accumulate: bool = False,
+    transport: str = "pickle",
+) -> PartialStats:
+    """Procesa un archivo comprimido, descomprimiendo por miembros en los workers si es posible."""
+
+    if workers > 1:
+        ranges = member_ranges(input_path, codec, parts=workers * SHARDS_PER_WORKER)
+        if len(ranges) > 1:
+            member_func = partial(
+                process_member_range,
+                path=input_path,
+                codec=codec,
+                batch_size=batch_size,
+                status_code=status_code,
+                status_codes=status_codes,
+                slow_threshold=slow_threshold,
+                engine=engine,
+                sketch=sketch,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            merged = merge_member_partials(
+                parallel_map(member_func, ranges, workers, max_in_flight),
+                size=ranges[-1][1],
+                status_code=status_code,
+                status_codes=status_codes,
+                slow_threshold=slow_threshold,
+                engine=engine,
+                sketch=sketch,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            if merged is not None:
+                return merged
+
+    # Un solo miembro (o una frontera falsa): el padre descomprime en streaming
+    # y los workers parsean los lotes.
+    worker_func = partial(
+        batch_function("mmap" if transport == "shm" else "text", engine),
+        status_code=status_code,
+        status_codes=status_codes,
+        slow_threshold=slow_threshold,
+        normalizer=normalizer,
+        url_histograms=url_histograms,
+        time_bucket=time_bucket,
+        distinct_ips=distinct_ips,
+    )
+    if transport == "shm":
+        chunk_bytes = chunk_bytes_for(batch_size)
+        chunks = read_log_chunks(input_path, chunk_bytes=chunk_bytes)
+        return merge_partials(
+            shared_memory_map(worker_func, chunks, workers, max_in_flight, chunk_bytes * SLOT_SLACK), sketch=sketch
+        )
+    batches = read_batches(input_path, batch_size)
+    return _reduce_partials(worker_func, batches, workers, max_in_flight, sketch, accumulate)
+
+
+def _run_column_cache(
+    input_path: str,
+    column_cache: ColumnCache,
+    batch_size: int,
+    status_codes: Sequence[int],
+    slow_threshold: int,
+    workers: int,
+    max_in_flight: int,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+) -> PartialStats:
+    """Responde desde la caché columnar, construyendo la entrada si falta."""
+
+    fingerprint = file_fingerprint(input_path)
+    if not column_cache.lookup(fingerprint):
+        ranges = split_ranges(input_path, parts=workers * SHARDS_PER_WORKER, end=fingerprint.size)
+        build_func = partial(build_range_columns, path=input_path, batch_size=batch_size)
+        with column_cache.writer(fingerprint) as writer:
+            for block in parallel_map(build_func, ranges, workers, max_in_flight):
+                writer.append(block)
+
+    stats = column_cache.evaluate(
+        fingerprint, status_codes, slow_threshold, url_histograms=url_histograms, time_bucket=time_bucket
+    )
+    if normalizer is not None:
+        normalizer.apply(stats)
+    return stats
+
+
+def _run_incremental(
+    input_path: str,
+    checkpoint_path: str,
+    batch_size: int,
+    status_code: int,
+    status_codes: Sequence[int],
+    slow_threshold: int,
+    workers: int,
+    max_in_flight: int,
+    backend: str,
+    engine: str,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+    accumulate: bool = False,
+) -> PartialStats:
+    """Procesa solo la cola nueva del archivo y actualiza el checkpoint."""
+
+    options = {"normalizer": normalizer_key(normalizer)} if normalizer is not None else {}
+    if url_histograms:
+        options["url_histograms"] = True
+    if time_bucket:
+        options["time_bucket"] = time_bucket
+    if distinct_ips:
+        options["distinct_ips"] = distinct_ips
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is not None and not checkpoint.matches(slow_threshold, status_codes, options):
+        checkpoint = None
+
+    offset = resume_offset(checkpoint, input_path)
+    previous = checkpoint.stats if checkpoint is not None and offset else PartialStats()
+    end = last_line_end(input_path, offset, os.path.getsize(input_path))
+    timings = current_timings()
+    if timings is not None:
+        timings.input_bytes = end - offset
+
+    tail = _run_sharded(
+        input_path,
+        batch_size=batch_size,
+        status_code=status_code,
+        status_codes=status_codes,
+        slow_threshold=slow_threshold,
+        workers=workers,
+        max_in_flight=max_in_flight,
+        backend=backend,
+        engine=engine,
+        start=offset,
+        end=end,
+        normalizer=normalizer,
+        url_histograms=url_histograms,
+        time_bucket=time_bucket,
+        distinct_ips=distinct_ips,
+        accumulate=accumulate,
+    )
+    merged = merge_partials([previous, tail])
+
+    save_checkpoint(
+        checkpoint_path,
+        build_checkpoint(
+            input_path,
+            end,
+            merged,
+            slow_threshold=slow_threshold,
+            status_codes=status_codes,
+            options=options,
+        ),
+    )
+    return merged
@@ -0,0 +1,174 @@
+"""Checkpoints para procesar incrementalmente logs que solo crecen al final.
+
+Un checkpoint guarda hasta qué byte se procesó el archivo, datos para detectar
+rotación o truncado (inodo, tamaño y hash de la cabecera) y el ``PartialStats``
+fusionado hasta ese punto. La siguiente corrida parsea solo la cola nueva y la
+fusiona con lo guardado.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from .metrics import PartialStats
+
+# Bytes iniciales del archivo cubiertos por el hash de cabecera.
+HEAD_BYTES = 4096
+VERSION = 2
+
+_TAIL_SCAN_BYTES = 64 * 1024
+
+
+@dataclass(slots=True)
+class Checkpoint:
+    """Estado persistido de una corrida incremental.
+
+    Attributes:
+        offset: Byte siguiente a la última línea completa procesada.
+        inode: Inodo del archivo procesado.
+        size: Tamaño del archivo al guardar el checkpoint.
+        head_bytes: Cantidad de bytes iniciales cubiertos por ``head_hash``.
+        head_hash: BLAKE2b de los primeros ``head_bytes`` bytes.
+        slow_threshold: Umbral usado para ``stats``.
+        status_codes: Códigos usados para ``stats``.
+        stats: Parcial fusionado de ``[0, offset)``.
+        options: Otros parámetros que cambian ``stats`` (p. ej. la
+            normalización de URLs), en forma serializable.
+    """
+
+    offset: int
+    inode: int
+    size: int
+    head_bytes: int
+    head_hash: str
+    slow_threshold: int
+    status_codes: List[int]
+    stats: PartialStats = field(default_factory=PartialStats)
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    def matches(
+        self,
+        slow_threshold: int,
+        status_codes: Sequence[int],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Indica si el checkpoint se calculó con los mismos parámetros."""
+
+        return (
+            self.slow_threshold == slow_threshold
+            and sorted(set(self.status_codes)) == sorted(set(status_codes))
+            and self.options == (options or {})
+        )
+
+
+def head_hash(path: str, length: int) -> str:
+    """Calcula el hash de los primeros ``length`` bytes de ``path``."""
+
+    with open(path, "rb") as handle:
+        return hashlib.blake2b(handle.read(length), digest_size=16).hexdigest()
+
+
+def last_line_end(path: str, start: int, end: int) -> int:
+    """Devuelve el offset siguiente al último ``\\n`` en ``[start, end)``.
+
+    Si no hay ningún salto de línea en el rango devuelve ``start``: una línea
+    que todavía se está escribiendo no se procesa hasta que se complete.
+    """
+
+    with open(path, "rb") as handle:
+        position = end
+        while position > start:
+            block_start = max(start, position - _TAIL_SCAN_BYTES)
+            handle.seek(block_start)
+            block = handle.read(position - block_start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                return block_start + newline + 1
+            position = block_start
+    return start
+
+
+def resume_offset(checkpoint: Optional[Checkpoint], path: str) -> int:
+    """Devuelve desde qué byte retomar ``path`` según ``checkpoint``.
+
+    Retorna ``0`` (reprocesar todo) si no hay checkpoint o si el archivo fue
+    rotado (otro inodo), truncado (más chico que el offset guardado) o
+    reescrito (cambió el hash de cabecera).
+    """
+
+    if checkpoint is None:
+        return 0
+
+    stat = os.stat(path)
+    if getattr(stat, "st_ino", 0) != checkpoint.inode or stat.st_size < checkpoint.offset:
+        return 0
+    if head_hash(path, checkpoint.head_bytes) != checkpoint.head_hash:
+        return 0
+    return checkpoint.offset
+
+
+def build_checkpoint(
+    path: str,
+    offset: int,
+    stats: PartialStats,
+    slow_threshold: int,
+    status_codes: Sequence[int],
+    options: Optional[Dict[str, Any]] = None,
+) -> Checkpoint:
+    """Construye el checkpoint de ``path`` procesado hasta ``offset``."""
+
+    stat = os.stat(path)
+    head_length = min(HEAD_BYTES, offset)
+    return Checkpoint(
+        offset=offset,
+        inode=getattr(stat, "st_ino", 0),
+        size=stat.st_size,
+        head_bytes=head_length,
+        head_hash=head_hash(path, head_length),
+        slow_threshold=slow_threshold,
+        status_codes=list(status_codes),
+        stats=stats,
+        options=dict(options or {}),
+    )
+
+
+def load_checkpoint(path: str) -> Optional[Checkpoint]:
+    """Carga un checkpoint; devuelve ``None`` si no existe o es inválido."""
+
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        if data.get("version") != VERSION:
+            return None
+        data["stats"] = PartialStats.from_dict(data["stats"])
+        data.pop("version")
+        return Checkpoint(**data)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    """Guarda ``checkpoint`` de forma atómica en ``path``."""
+
+    data = {
+        "version": VERSION,
+        "offset": checkpoint.offset,
+        "inode": checkpoint.inode,
+        "size": checkpoint.size,
+        "head_bytes": checkpoint.head_bytes,
+        "head_hash": checkpoint.head_hash,
+        "slow_threshold": checkpoint.slow_threshold,
+        "status_codes": checkpoint.status_codes,
+        "stats": checkpoint.stats.to_dict(),
+        "options": checkpoint.options,
+    }
+    partial_path = f"{path}.tmp"
+    with open(partial_path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, ensure_ascii=False)
+    os.replace(partial_path, path)
@@ -0,0 +1,419 @@
+"""Caché persistente de columnas parseadas para re-ejecutar sin re-parsear.
+
+La primera corrida sobre un archivo lo parsea una sola vez a un *sidecar*
+binario compacto: una tabla de URLs más cuatro columnas (id de URL ``uint32``,
+status ``uint16``, latencia ``uint32`` y epoch ``int64``, ``-1`` si la fecha es
+inválida). Las corridas siguientes con otro ``slow_threshold``,
+``status_codes`` o ``time_bucket`` recorren solo esas columnas, sin leer ni
+parsear el log original.
+
+Las entradas se identifican por la ruta resuelta del archivo y se validan con
+tamaño, ``mtime`` y huella de contenido (ver ``logproc.fingerprint``); si el
+archivo cambió, la entrada se descarta. El directorio se acota por tamaño con
+desalojo LRU según la fecha de último uso.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import DefaultDict, Dict, Iterable, List, Optional, Sequence
+
+from . import columnar
+from .fingerprint import FileFingerprint
+from .histogram import LatencyHistogram, histograms_by_code, histograms_from_values, merge_histograms
+from .metrics import PartialStats
+from .parser import parse_record
+from .reader import ByteRange, read_range_batches
+from .timeseries import TimeSeries, TimestampParser, merge_series, series_from_counts
+from .timings import measured_partial
+
+MAGIC = b"LPCOLS2\n"
+SUFFIX = ".cols"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+# Filas leídas por iteración al evaluar una entrada.
+ROWS_PER_CHUNK = 1 << 20
+
+_HEADER_LEN = struct.Struct("<I")
+_RESPONSE_TIME_MAX = 2**32 - 1
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+@dataclass(slots=True)
+class ColumnBlock:
+    """Columnas parseadas de un tramo del archivo, con tabla de URLs local.
+
+    Attributes:
+        urls: Tabla de URLs; la posición es el id usado en ``url_ids``.
+        url_ids: Id de URL por línea válida (``array('I')``).
+        statuses: Código HTTP por línea válida (``array('H')``).
+        response_times: Latencia en ms por línea válida (``array('I')``).
+        epochs: Epoch de cada línea válida, ``-1`` si la fecha es inválida
+            (``array('q')``).
+        total_lines: Líneas vistas, incluidas las malformadas.
+        bad_lines: Líneas malformadas.
+    """
+
+    urls: List[str] = field(default_factory=list)
+    url_ids: array = field(default_factory=lambda: array("I"))
+    statuses: array = field(default_factory=lambda: array("H"))
+    response_times: array = field(default_factory=lambda: array("I"))
+    epochs: array = field(default_factory=lambda: array("q"))
+    total_lines: int = 0
+    bad_lines: int = 0
+
+
+def build_columns(lines: Iterable[str], block: Optional[ColumnBlock] = None) -> ColumnBlock:
+    """Parsea ``lines`` y las agrega a ``block`` (o a uno nuevo)."""
+
+    block = block or ColumnBlock()
+    url_ids: Dict[str, int] = {url: index for index, url in enumerate(block.urls)}
+    append_id = block.url_ids.append
+    append_status = block.statuses.append
+    append_response_time = block.response_times.append
+    append_epoch = block.epochs.append
+    timestamps = TimestampParser()
+
+    for line in lines:
+        block.total_lines += 1
+        parsed = parse_record(line)
+        if parsed is None:
+            block.bad_lines += 1
+            continue
+        url, status, response_time, date = parsed
+        url_id = url_ids.get(url)
+        if url_id is None:
+            url_id = url_ids[url] = len(block.urls)
+            block.urls.append(url)
+        append_id(url_id)
+        append_status(status)
+        append_response_time(min(response_time, _RESPONSE_TIME_MAX))
+        epoch = timestamps(date)
+        append_epoch(-1 if epoch is None else epoch)
+
+    return block
+
+
+def build_range_columns(byte_range: ByteRange, path: str, batch_size: int = 10_000) -> ColumnBlock:
+    """Parsea un rango de bytes del archivo a columnas (función de worker)."""
+
+    start, end = byte_range
+    block = ColumnBlock()
+    for batch in read_range_batches(path, start, end, batch_size=batch_size):
+        build_columns(batch, block)
+    return block
+
+
+class ColumnWriter:
+    """Escritor incremental de una entrada; se usa como context manager.
+
+    Los bloques se agregan en cualquier orden con ``append``; los ids de URL
+    se remapean a una tabla global. Las columnas se vuelcan a archivos
+    temporales, así que la memoria queda acotada por la tabla de URLs. Al salir
+    sin errores la entrada se publica de forma atómica y se aplica el desalojo.
+    """
+
+    def __init__(self, cache: "ColumnCache", fingerprint: FileFingerprint) -> None:
+        self._cache = cache
+        self._fingerprint = fingerprint
+        self._url_index: Dict[str, int] = {}
+        self._rows = 0
+        self._total_lines = 0
+        self._bad_lines = 0
+        self._tmpdir = tempfile.TemporaryDirectory(dir=cache.directory)
+        self._columns = [open(Path(self._tmpdir.name) / name, "wb") for name in ("ids", "statuses", "rts", "epochs")]
+
+    def append(self, block: ColumnBlock) -> None:
+        """Agrega un bloque remapeando sus ids de URL a la tabla global."""
+
+        mapping = [self._url_index.setdefault(url, len(self._url_index)) for url in block.urls]
+        if columnar.HAS_NUMPY:
+            np = columnar.np
+            ids = array("I", np.asarray(mapping, dtype=np.uint32)[np.frombuffer(block.url_ids, dtype=np.uint32)].tobytes())
+        else:
+            ids = array("I", (mapping[url_id] for url_id in block.url_ids))
+
+        columns = (ids, block.statuses, block.response_times, block.epochs)
+        for handle, column in zip(self._columns, columns):
+            if _BIG_ENDIAN:
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(handle)
+
+        self._rows += len(ids)
+        self._total_lines += block.total_lines
+        self._bad_lines += block.bad_lines
+
+    def __enter__(self) -> "ColumnWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        try:
+            for handle in self._columns:
+                handle.close()
+            if exc_type is None:
+                self._publish()
+        finally:
+            self._tmpdir.cleanup()
+
+    def _publish(self) -> None:
+        fingerprint = self._fingerprint
+        urls_blob = "\n".join(self._url_index).encode("utf-8")
+        header = json.dumps(
+            {
+                "path": fingerprint.path,
+                "size": fingerprint.size,
+                "mtime_ns": fingerprint.mtime_ns,
+                "digest": fingerprint.digest,
+                "total_lines": self._total_lines,
+                "bad_lines": self._bad_lines,
+                "rows": self._rows,
+                "urls": len(self._url_index),
+                "urls_bytes": len(urls_blob),
+            }
+        ).encode("utf-8")
+
+        target = self._cache.entry_path(fingerprint)
+        # Dentro del directorio temporal de este escritor: dos corridas que
+        # construyen la misma entrada no comparten el archivo a medio escribir.
+        partial_path = Path(self._tmpdir.name) / f"entry{SUFFIX}"
+        with open(partial_path, "wb") as out:
+            out.write(MAGIC)
+            out.write(_HEADER_LEN.pack(len(header)))
+            out.write(header)
+            out.write(urls_blob)
+            for handle in self._columns:
+                with open(handle.name, "rb") as column:
+                    while chunk := column.read(1 << 20):
+                        out.write(chunk)
+        os.replace(partial_path, target)
+        self._cache.evict()
+
+
+class ColumnCache:
+    """Directorio de entradas columnares con desalojo LRU por tamaño.
+
+    Parámetros:
+        directory: Directorio de la caché; se crea si no existe.
+        max_bytes: Tamaño máximo total de las entradas.
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            raise ValueError("max_bytes debe ser > 0")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def entry_path(self, fingerprint: FileFingerprint) -> Path:
+        """Ruta de la entrada para el archivo de ``fingerprint``."""
+
+        key = hashlib.blake2b(fingerprint.path.encode("utf-8"), digest_size=16).hexdigest()
+        return self.directory / f"{key}{SUFFIX}"
+
+    def _read_header(self, handle) -> Optional[dict]:
+        if handle.read(len(MAGIC)) != MAGIC:
+            return None
+        (header_len,) = _HEADER_LEN.unpack(handle.read(_HEADER_LEN.size))
+        return json.loads(handle.read(header_len))
+
+    def lookup(self, fingerprint: FileFingerprint) -> bool:
+        """Indica si hay una entrada vigente para ``fingerprint``.
+
+        Una entrada de la misma ruta que no coincide en tamaño, ``mtime`` o
+        huella (o que está corrupta) se elimina. Un acierto actualiza la fecha
+        de uso para el desalojo LRU.
+        """
+
+        path = self.entry_path(fingerprint)
+        try:
+            with open(path, "rb") as handle:
+                header = self._read_header(handle)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, struct.error):
+            header = None
+
+        valid = header is not None and all(
+            header.get(key) == getattr(fingerprint, key) for key in ("path", "size", "mtime_ns", "digest")
+        )
+        if not valid:
+            path.unlink(missing_ok=True)
+            return False
+
+        os.utime(path)
+        return True
+
+    def writer(self, fingerprint: FileFingerprint) -> ColumnWriter:
+        """Crea un escritor para la entrada de ``fingerprint``."""
+
+        return ColumnWriter(self, fingerprint)
+
+    @measured_partial
+    def evaluate(
+        self,
+        fingerprint: FileFingerprint,
+        status_codes: Sequence[int],
+        slow_threshold: int,
+        url_histograms: bool = False,
+        time_bucket: Optional[int] = None,
+    ) -> PartialStats:
+        """Calcula las métricas de una corrida a partir de la entrada cacheada.
+
+        Parámetros:
+            fingerprint: Huella del archivo (debe existir una entrada vigente).
+            status_codes: Códigos HTTP a contabilizar.
+            slow_threshold: Umbral en milisegundos para requests "lentas".
+            url_histograms: Si se arman histogramas de latencia por URL.
+            time_bucket: Ancho en segundos de la serie temporal, si se pide.
+
+        Retorna:
+            ``PartialStats`` equivalente al de procesar el archivo original.
+
+        Errores:
+            FileNotFoundError: Si no hay entrada para ``fingerprint``.
+        """
+
+        with open(self.entry_path(fingerprint), "rb") as handle:
+            header = self._read_header(handle)
+            if header is None:
+                raise ValueError("Entrada de caché inválida")
+            urls_blob = handle.read(header["urls_bytes"])
+            urls = urls_blob.decode("utf-8").split("\n") if header["urls"] else []
+            base = handle.tell()
+            rows = header["rows"]
+            offsets = (base, base + rows * 4, base + rows * 6, base + rows * 10)
+
+            evaluate = _evaluate_numpy if columnar.HAS_NUMPY else _evaluate_python
+            stats = evaluate(handle, offsets, rows, urls, status_codes, slow_threshold, url_histograms, time_bucket)
+
+        stats.total_lines = header["total_lines"]
+        stats.bad_lines = header["bad_lines"]
+        return stats
+
+    def evict(self) -> None:
+        """Elimina las entradas menos usadas hasta respetar ``max_bytes``."""
+
+        entries = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def _read_chunk(handle, offset: int, itemsize: int, start: int, count: int) -> bytes:
+    handle.seek(offset + start * itemsize)
+    return handle.read(count * itemsize)
+
+
+def _evaluate_python(
+    handle, offsets, rows, urls, status_codes, slow_threshold, url_histograms, time_bucket
+) -> PartialStats:
+    stats = PartialStats()
+    target_codes = set(status_codes)
+    status_counter: Counter[int] = Counter()
+    slow_counter: Counter[int] = Counter()
+    latencies: Counter[int] = Counter()
+    url_latencies: Optional[DefaultDict[int, List[int]]] = defaultdict(list) if url_histograms else None
+    series_counter: Counter = Counter()
+    layout = (("I", 4), ("H", 2), ("I", 4), ("q", 8))
+
+    for start in range(0, rows, ROWS_PER_CHUNK):
+        count = min(ROWS_PER_CHUNK, rows - start)
+        columns = []
+        for (typecode, itemsize), offset in zip(layout, offsets):
+            column = array(typecode, _read_chunk(handle, offset, itemsize, start, count))
+            if _BIG_ENDIAN:
+                column.byteswap()
+            columns.append(column)
+
+        for url_id, status, response_time, epoch in zip(*columns):
+            latencies[response_time] += 1
+            if url_latencies is not None:
+                url_latencies[url_id].append(response_time)
+            is_status = status in target_codes
+            if is_status:
+                stats.total_status += 1
+                status_counter[url_id] += 1
+            is_slow = response_time > slow_threshold
+            if is_slow:
+                stats.total_slow += 1
+                slow_counter[url_id] += 1
+            if time_bucket and epoch >= 0:
+                series_counter[(epoch - epoch % time_bucket, is_status, is_slow)] += 1
+
+    stats.status_by_url = {urls[url_id]: count for url_id, count in status_counter.items()}
+    stats.slow_by_url = {urls[url_id]: count for url_id, count in slow_counter.items()}
+    stats.latency.add_counts(latencies)
+    if url_latencies is not None:
+        stats.latency_by_url = {
+            urls[url_id]: histogram for url_id, histogram in histograms_from_values(url_latencies).items()
+        }
+    stats.time_series = series_from_counts(series_counter)
+    return stats
+
+
+def _evaluate_numpy(
+    handle, offsets, rows, urls, status_codes, slow_threshold, url_histograms, time_bucket
+) -> PartialStats:
+    np = columnar.np
+    stats = PartialStats()
+    target_codes = np.array(sorted(set(status_codes)), dtype=np.int64)
+    totals = [np.zeros(len(urls), dtype=np.int64) for _ in range(2)]
+    first_seen = [np.full(len(urls), rows, dtype=np.int64) for _ in range(2)]
+    by_id: Dict[int, LatencyHistogram] = {}
+    series: TimeSeries = {}
+
+    for start in range(0, rows, ROWS_PER_CHUNK):
+        count = min(ROWS_PER_CHUNK, rows - start)
+        ids = np.frombuffer(_read_chunk(handle, offsets[0], 4, start, count), dtype="<u4")
+        statuses = np.frombuffer(_read_chunk(handle, offsets[1], 2, start, count), dtype="<u2")
+        response_times = np.frombuffer(_read_chunk(handle, offsets[2], 4, start, count), dtype="<u4")
+
+        stats.latency.add_array(response_times)
+        if url_histograms:
+            merge_histograms(by_id, histograms_by_code(ids, response_times))
+
+        masks = (np.isin(statuses, target_codes), response_times > slow_threshold)
+        stats.total_status += int(np.count_nonzero(masks[0]))
+        stats.total_slow += int(np.count_nonzero(masks[1]))
+        if time_bucket:
+            epochs = np.frombuffer(_read_chunk(handle, offsets[3], 8, start, count), dtype="<i8")
+            merge_series(series, columnar._series_from_columns(epochs, masks[0], masks[1], time_bucket))
+        for mask, total, first in zip(masks, totals, first_seen):
+            selected = ids[mask]
+            if not selected.size:
+                continue
+            total += np.bincount(selected, minlength=len(urls))
+            unique_ids, first_index = np.unique(selected, return_index=True)
+            first_row = np.flatnonzero(mask)[first_index] + start
+            first[unique_ids] = np.minimum(first[unique_ids], first_row)
+
+    by_url = []
+    for total, first in zip(totals, first_seen):
+        present = np.flatnonzero(total)
+        ordered = present[np.argsort(first[present], kind="stable")]
+        by_url.append({urls[url_id]: int(total[url_id]) for url_id in ordered.tolist()})
+
+    stats.status_by_url, stats.slow_by_url = by_url
+    stats.latency_by_url = {urls[url_id]: histogram for url_id, histogram in by_id.items()}
+    stats.time_series = series
+    return stats
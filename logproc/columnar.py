@@ -0,0 +1,360 @@
+"""Motor columnar con NumPy para procesar lotes completos de una vez.
+
+El parseo sigue siendo línea a línea, pero en lugar de actualizar contadores
+por cada línea se arma una representación columnar del lote (status como
+``uint16``, tiempo de respuesta como ``uint64`` y URL como códigos de categoría)
+y los filtros y conteos por URL se resuelven con operaciones vectorizadas. Un
+lote con una latencia que no entra en ``uint64`` se procesa con el motor puro
+Python, para que el resultado sea siempre idéntico.
+
+NumPy es opcional: si no está instalado ``HAS_NUMPY`` es ``False`` y
+``worker.batch_function`` elige el motor puro Python.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .histogram import LatencyHistogram, histograms_by_code
+from .metrics import PartialStats
+from .normalize import UrlNormalizer
+from .parser import (
+    decode_url_counts,
+    decode_url_histograms,
+    decode_url_mergeables,
+    parse_entry,
+    parse_entry_bytes,
+    parse_line,
+    parse_line_bytes,
+    parse_record,
+    parse_record_bytes,
+)
+from .sketches import ip_sketches
+from .timeseries import TimeSeries, TimestampParser
+from .timings import measured_partial
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+HAS_NUMPY = np is not None
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("El motor 'numpy' requiere NumPy instalado")
+
+
+def _parse_columns(
+    lines: Iterable,
+    parse: Callable[..., Optional[tuple]],
+    timestamps: Optional[TimestampParser] = None,
+    ip_pairs: Optional[Set[Tuple[Hashable, Hashable]]] = None,
+) -> Tuple[List[Hashable], "np.ndarray", "np.ndarray", "np.ndarray", int, int, Optional["np.ndarray"]]:
+    """Parsea líneas a columnas: tabla de URLs, códigos, status y latencias.
+
+    Con ``timestamps``, ``parse`` debe devolver también la fecha (ver
+    ``parser.parse_record``) y el último elemento es la columna de epochs
+    (``-1`` si la fecha es inválida); si no, es ``None``. Con ``ip_pairs``,
+    ``parse`` debe devolver además la IP (ver ``parser.parse_entry``) y los
+    pares ``(url, ip)`` se agregan a ese conjunto.
+
+    Errores:
+        OverflowError: Si alguna latencia no entra en ``uint64``; quien llama
+            recurre al motor puro Python.
+    """
+
+    url_codes: Dict[Hashable, int] = {}
+    codes: List[int] = []
+    statuses: List[int] = []
+    response_times: List[int] = []
+    epochs: Optional[List[int]] = [] if timestamps is not None else None
+    total_lines = 0
+    bad_lines = 0
+
+    for line in lines:
+        total_lines += 1
+        parsed = parse(line)
+        if parsed is None:
+            bad_lines += 1
+            continue
+        if ip_pairs is not None:
+            url, status, response_time, date, ip = parsed
+            ip_pairs.add((url, ip))
+        elif epochs is None:
+            url, status, response_time = parsed
+        else:
+            url, status, response_time, date = parsed
+        if epochs is not None:
+            epoch = timestamps(date)
+            epochs.append(-1 if epoch is None else epoch)
+        codes.append(url_codes.setdefault(url, len(url_codes)))
+        statuses.append(status)
+        response_times.append(response_time)
+
+    return (
+        list(url_codes),
+        np.array(codes, dtype=np.uint32),
+        np.array(statuses, dtype=np.uint16),
+        np.array(response_times, dtype=np.uint64),
+        total_lines,
+        bad_lines,
+        np.array(epochs, dtype=np.int64) if epochs is not None else None,
+    )
+
+
+def _series_from_columns(
+    epochs: "np.ndarray",
+    status_mask: "np.ndarray",
+    slow_mask: "np.ndarray",
+    time_bucket: int,
+) -> TimeSeries:
+    """Serie temporal vectorizada (ver ``timeseries``); ignora epochs ``-1``."""
+
+    valid = epochs >= 0
+    if not valid.any():
+        return {}
+    starts = epochs[valid]
+    starts -= starts % time_bucket
+    unique_starts, inverse = np.unique(starts, return_inverse=True)
+    columns = (
+        np.bincount(inverse, minlength=unique_starts.size),
+        np.bincount(inverse, weights=status_mask[valid], minlength=unique_starts.size),
+        np.bincount(inverse, weights=slow_mask[valid], minlength=unique_starts.size),
+    )
+    rows = zip(*(column.astype(np.int64).tolist() for column in columns))
+    return {start: list(row) for start, row in zip(unique_starts.tolist(), rows)}
+
+
+def _count_by_url(urls: Sequence[Hashable], codes: "np.ndarray", mask: "np.ndarray") -> Dict[Hashable, int]:
+    """Cuenta ocurrencias por URL de las filas marcadas en ``mask``.
+
+    Las claves se insertan en orden de primera aparición, igual que el
+    ``Counter`` del motor puro Python, para que los desempates coincidan.
+    """
+
+    selected = codes[mask]
+    if not selected.size:
+        return {}
+    counts = np.bincount(selected)
+    unique_codes, first_seen = np.unique(selected, return_index=True)
+    ordered = unique_codes[np.argsort(first_seen, kind="stable")]
+    return {urls[code]: int(counts[code]) for code in ordered.tolist()}
+
+
+def partial_from_columns(
+    urls: Sequence[Hashable],
+    codes: "np.ndarray",
+    statuses: "np.ndarray",
+    response_times: "np.ndarray",
+    total_lines: int,
+    bad_lines: int,
+    status_codes: Sequence[int],
+    slow_threshold: int,
+    url_histograms: bool = False,
+    epochs: Optional["np.ndarray"] = None,
+    time_bucket: Optional[int] = None,
+) -> PartialStats:
+    """Calcula un ``PartialStats`` a partir de columnas ya parseadas.
+
+    Parámetros:
+        urls: Tabla de URLs indexada por código.
+        codes: Código de URL por fila válida.
+        statuses: Código HTTP por fila válida.
+        response_times: Latencia en milisegundos por fila válida.
+        total_lines: Líneas vistas, incluidas las malformadas.
+        bad_lines: Líneas malformadas (sin fila en las columnas).
+        status_codes: Códigos HTTP a contabilizar.
+        slow_threshold: Umbral en milisegundos para requests "lentas".
+        url_histograms: Si se arma también un histograma de latencias por URL.
+        epochs: Epoch de cada fila válida (``-1`` si no tiene fecha válida).
+        time_bucket: Ancho de los buckets de la serie temporal; requiere
+            ``epochs``.
+
+    Retorna:
+        ``PartialStats`` con las claves por URL tal como aparecen en ``urls``.
+    """
+
+    stats = counts_from_columns(
+        urls,
+        codes,
+        statuses,
+        response_times,
+        status_codes,
+        slow_threshold,
+        epochs=epochs,
+        time_bucket=time_bucket,
+    )
+    stats.total_lines = total_lines
+    stats.bad_lines = bad_lines
+    stats.latency.add_array(response_times)
+    if url_histograms:
+        stats.latency_by_url = url_histograms_from_columns(urls, codes, response_times)
+    return stats
+
+
+def counts_from_columns(
+    urls: Sequence[Hashable],
+    codes: "np.ndarray",
+    statuses: "np.ndarray",
+    response_times: "np.ndarray",
+    status_codes: Sequence[int],
+    slow_threshold: int,
+    epochs: Optional["np.ndarray"] = None,
+    time_bucket: Optional[int] = None,
+) -> PartialStats:
+    """Parte de ``partial_from_columns`` que depende de la consulta.
+
+    Calcula solo los conteos de status y lentas (y la serie temporal), sin
+    líneas ni histogramas: así varias consultas sobre las mismas columnas
+    comparten lo demás (ver ``queries``).
+    """
+
+    target_codes = np.array(sorted(set(status_codes)), dtype=np.int64)
+    status_mask = np.isin(statuses, target_codes)
+    slow_mask = response_times > slow_threshold
+
+    stats = PartialStats(
+        total_status=int(np.count_nonzero(status_mask)),
+        total_slow=int(np.count_nonzero(slow_mask)),
+        status_by_url=_count_by_url(urls, codes, status_mask),
+        slow_by_url=_count_by_url(urls, codes, slow_mask),
+    )
+    if time_bucket and epochs is not None:
+        stats.time_series = _series_from_columns(epochs, status_mask, slow_mask, time_bucket)
+    return stats
+
+
+def url_histograms_from_columns(
+    urls: Sequence[Hashable],
+    codes: "np.ndarray",
+    response_times: "np.ndarray",
+) -> Dict[Hashable, LatencyHistogram]:
+    """Histograma de latencias por URL a partir de columnas ya parseadas."""
+
+    return {urls[code]: histogram for code, histogram in histograms_by_code(codes, response_times).items()}
+
+
+@measured_partial
+def process_batch_columnar(
+    batch: Iterable[str],
+    status_code: int = 500,
+    slow_threshold: int = 200,
+    status_codes: Sequence[int] | None = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> PartialStats:
+    """Equivalente vectorizado de ``worker.process_batch``.
+
+    Parámetros:
+        batch: Iterable de líneas crudas del log.
+        status_code: Código HTTP a contabilizar (compatibilidad).
+        slow_threshold: Umbral en milisegundos para requests "lentas".
+        status_codes: Lista de códigos HTTP a contabilizar.
+        normalizer: Normalización de URLs, ver ``worker.process_batch``.
+        url_histograms: Histogramas de latencia por URL, ver ``worker.process_batch``.
+        time_bucket: Serie temporal por buckets, ver ``worker.process_batch``.
+        distinct_ips: IPs distintas, ver ``worker.process_batch``.
+
+    Retorna:
+        ``PartialStats`` idéntico al del motor puro Python (que se usa para
+        el lote si alguna latencia no entra en ``uint64``).
+
+    Errores:
+        RuntimeError: Si NumPy no está instalado.
+    """
+
+    _require_numpy()
+    batch = batch if isinstance(batch, list) else list(batch)
+    timestamps = TimestampParser() if time_bucket else None
+    ip_pairs: Optional[Set[Tuple[str, str]]] = set() if distinct_ips else None
+    parse = parse_entry if distinct_ips else parse_record if time_bucket else parse_line
+    try:
+        *columns, epochs = _parse_columns(batch, parse, timestamps, ip_pairs)
+    except OverflowError:
+        from .worker import process_batch
+
+        return process_batch(
+            batch,
+            status_code=status_code,
+            slow_threshold=slow_threshold,
+            status_codes=status_codes,
+            normalizer=normalizer,
+            url_histograms=url_histograms,
+            time_bucket=time_bucket,
+            distinct_ips=distinct_ips,
+        )
+    stats = partial_from_columns(
+        *columns,
+        status_codes=status_codes or [status_code],
+        slow_threshold=slow_threshold,
+        url_histograms=url_histograms,
+        epochs=epochs,
+        time_bucket=time_bucket,
+    )
+    if ip_pairs is not None:
+        stats.ip_sketch, stats.ip_sketch_by_url = ip_sketches(ip_pairs, distinct_ips)
+    if normalizer is not None:
+        normalizer.apply(stats)
+    return stats
+
+
+@measured_partial
+def process_chunk_columnar(
+    chunk: bytes,
+    status_code: int = 500,
+    slow_threshold: int = 200,
+    status_codes: Sequence[int] | None = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> PartialStats:
+    """Equivalente vectorizado de ``worker.process_chunk`` para el backend ``mmap``.
+
+    Errores:
+        RuntimeError: Si NumPy no está instalado.
+    """
+
+    _require_numpy()
+    lines = chunk.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+
+    timestamps = TimestampParser() if time_bucket else None
+    ip_pairs: Optional[Set[Tuple[bytes, bytes]]] = set() if distinct_ips else None
+    parse = parse_entry_bytes if distinct_ips else parse_record_bytes if time_bucket else parse_line_bytes
+    try:
+        *columns, epochs = _parse_columns(lines, parse, timestamps, ip_pairs)
+    except OverflowError:
+        from .worker import process_chunk
+
+        return process_chunk(
+            chunk,
+            status_code=status_code,
+            slow_threshold=slow_threshold,
+            status_codes=status_codes,
+            normalizer=normalizer,
+            url_histograms=url_histograms,
+            time_bucket=time_bucket,
+            distinct_ips=distinct_ips,
+        )
+    stats = partial_from_columns(
+        *columns,
+        status_codes=status_codes or [status_code],
+        slow_threshold=slow_threshold,
+        url_histograms=url_histograms,
+        epochs=epochs,
+        time_bucket=time_bucket,
+    )
+    stats.status_by_url = decode_url_counts(stats.status_by_url)
+    stats.slow_by_url = decode_url_counts(stats.slow_by_url)
+    stats.latency_by_url = decode_url_histograms(stats.latency_by_url)
+    if ip_pairs is not None:
+        stats.ip_sketch, by_url = ip_sketches(ip_pairs, distinct_ips)
+        stats.ip_sketch_by_url = decode_url_mergeables(by_url)
+    if normalizer is not None:
+        normalizer.apply(stats)
+    return stats
@@ -0,0 +1,147 @@
+"""Formato compacto de los conteos por URL para el envío entre procesos.
+
+Cada ``PartialStats`` que vuelve de un worker traía ``status_by_url`` y
+``slow_by_url`` como diccionarios: cada lote volvía a serializar las URLs que
+contó, y el padre las sumaba con ``Counter.update`` clave por clave. Al
+serializarse (``PartialStats.__reduce__``), los conteos viajan como una tabla
+de URLs del parcial (cada URL una vez) más columnas ``array`` de conteos cuyos
+ids son las posiciones en esa tabla, y el acumulador del padre (``UrlTable``)
+traduce los ids locales a una tabla global una vez por URL distinta del
+parcial y suma las columnas por índice.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Hashable, List, Mapping, Tuple
+
+try:  # pragma: no cover - depende del entorno
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Por debajo de estas entradas el recorrido en Python es más barato que armar
+# las vistas de NumPy.
+_NUMPY_MIN_ENTRIES = 256
+
+
+class PackedUrlCounts:
+    """Conteos por URL de un parcial en columnas.
+
+    Las URLs se ordenan en la tabla como: solo con código objetivo, con ambos
+    y solo lentas. Así los ids de cada columna son un tramo contiguo de la
+    tabla y no hace falta enviarlos: ``status_counts[i]`` es el conteo de
+    ``urls[i]`` y ``slow_counts[i]`` el de ``urls[len(urls) - len(slow_counts) + i]``.
+
+    Attributes:
+        urls: Tabla de URLs del parcial.
+        status_counts: Conteos con el código objetivo.
+        slow_counts: Conteos de respuestas lentas.
+    """
+
+    __slots__ = ("urls", "status_counts", "slow_counts")
+
+    def __init__(self, urls: List[Hashable], status_counts: array, slow_counts: array) -> None:
+        self.urls = urls
+        self.status_counts = status_counts
+        self.slow_counts = slow_counts
+
+    def __reduce__(self):
+        return PackedUrlCounts, (self.urls, self.status_counts, self.slow_counts)
+
+    @property
+    def slow_offset(self) -> int:
+        """Id de la primera URL de ``slow_counts``."""
+
+        return len(self.urls) - len(self.slow_counts)
+
+    @classmethod
+    def pack(cls, status_by_url: Mapping[Hashable, int], slow_by_url: Mapping[Hashable, int]) -> "PackedUrlCounts":
+        """Arma la tabla y las columnas a partir de los diccionarios de conteos."""
+
+        status_only = [url for url in status_by_url if url not in slow_by_url]
+        both = [url for url in status_by_url if url in slow_by_url]
+        slow_only = [url for url in slow_by_url if url not in status_by_url]
+        return cls(
+            status_only + both + slow_only,
+            _narrow_array([status_by_url[url] for url in status_only + both]),
+            _narrow_array([slow_by_url[url] for url in both + slow_only]),
+        )
+
+    def unpack(self) -> Tuple[Dict[Hashable, int], Dict[Hashable, int]]:
+        """Devuelve ``(status_by_url, slow_by_url)`` como diccionarios."""
+
+        return (
+            dict(zip(self.urls, self.status_counts)),
+            dict(zip(self.urls[self.slow_offset :], self.slow_counts)),
+        )
+
+
+class UrlTable:
+    """Tabla global de URLs con los conteos sumados de varios ``PackedUrlCounts``."""
+
+    __slots__ = ("ids", "urls", "status", "slow")
+
+    def __init__(self) -> None:
+        self.ids: Dict[Hashable, int] = {}
+        self.urls: List[Hashable] = []
+        self.status = array("Q")
+        self.slow = array("Q")
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def add(self, packed: PackedUrlCounts) -> None:
+        """Suma los conteos de ``packed``, remapeando sus ids a la tabla global."""
+
+        ids = self.ids
+        urls = self.urls
+        remap = array("I")
+        for url in packed.urls:
+            global_id = ids.get(url)
+            if global_id is None:
+                global_id = ids[url] = len(urls)
+                urls.append(url)
+            remap.append(global_id)
+
+        missing = len(urls) - len(self.status)
+        if missing > 0:
+            zeros = bytes(missing * self.status.itemsize)
+            self.status.frombytes(zeros)
+            self.slow.frombytes(zeros)
+        _scatter_add(self.status, remap, 0, packed.status_counts)
+        _scatter_add(self.slow, remap, packed.slow_offset, packed.slow_counts)
+
+    def counts(self) -> Tuple[Dict[Hashable, int], Dict[Hashable, int]]:
+        """Devuelve ``(status_by_url, slow_by_url)`` sin las URLs en cero."""
+
+        urls = self.urls
+        return (
+            {url: count for url, count in zip(urls, self.status) if count},
+            {url: count for url, count in zip(urls, self.slow) if count},
+        )
+
+
+def _narrow_array(values: List[int]) -> array:
+    """``array`` sin signo del tipo más angosto que admite ``values``."""
+
+    largest = max(values, default=0)
+    typecode = "H" if largest < 1 << 16 else "I" if largest < 1 << 32 else "Q"
+    return array(typecode, values)
+
+
+def _scatter_add(target: array, remap: array, first_id: int, counts: array) -> None:
+    """``target[remap[first_id + i]] += counts[i]`` para cada ``i``.
+
+    Los ids de un parcial son distintos entre sí, así que con NumPy alcanza
+    una suma indexada sin ``np.add.at``.
+    """
+
+    if HAS_NUMPY and len(counts) >= _NUMPY_MIN_ENTRIES:
+        global_ids = np.frombuffer(remap, dtype=f"u{remap.itemsize}")[first_id : first_id + len(counts)]
+        np.frombuffer(target, dtype=f"u{target.itemsize}")[global_ids] += np.asarray(counts, dtype=np.uint64)
+        return
+    for global_id, count in zip(remap[first_id:], counts):
+        target[global_id] += count
@@ -0,0 +1,237 @@
+"""Soporte de logs comprimidos (gzip, bz2, xz) con la biblioteca estándar.
+
+El formato se detecta por los *magic bytes* del inicio del archivo, no por la
+extensión. Los archivos con varios miembros (``pigz``, ``bgzip``, ``pbzip2``,
+concatenaciones con ``cat a.gz b.gz``...) pueden descomprimirse en paralelo:
+el padre busca inicios de miembro candidatos y cada worker descomprime los
+miembros que empiezan en su rango de bytes (ver ``MemberReader``).
+"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import zlib
+from typing import IO, Dict, Generator, List, Optional, Tuple
+
+CODECS = ("gzip", "bz2", "xz")
+
+# Firma con la que empieza cada miembro/stream. Para bz2 se incluye la firma
+# del primer bloque para que los falsos candidatos sean prácticamente imposibles.
+_MAGIC: Dict[str, bytes] = {
+    "gzip": b"\x1f\x8b\x08",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+}
+_BZ2_BLOCK_MAGIC = b"\x31\x41\x59\x26\x53\x59"
+_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+DECOMPRESS_ERRORS = (OSError, EOFError, zlib.error, lzma.LZMAError)
+READ_BYTES = 1 << 16
+# Bytes necesarios para validar la cabecera de un miembro de cualquier códec.
+_HEADER_BYTES = 10
+PROBE_BYTES = 1 << 16
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Devuelve el códec de ``path`` (uno de ``CODECS``) o ``None`` si es texto plano.
+
+    Errores:
+        OSError: Si el archivo no puede abrirse/leerse.
+    """
+
+    with open(path, "rb") as handle:
+        head = handle.read(16)
+    for codec in CODECS:
+        if _is_member_header(head, 0, codec):
+            return codec
+    return None
+
+
+def open_log(path: str) -> IO[str]:
+    """Abre ``path`` en modo texto, descomprimiendo en *streaming* si hace falta.
+
+    Las líneas se decodifican como UTF-8 reemplazando bytes inválidos, igual
+    que en la lectura de archivos planos.
+    """
+
+    codec = detect_compression(path)
+    opener = _OPENERS.get(codec, open)
+    return opener(path, "rt", encoding="utf-8", errors="replace")
+
+
+def open_log_bytes(path: str) -> IO[bytes]:
+    """Abre ``path`` en modo binario, descomprimiendo en *streaming* si hace falta."""
+
+    codec = detect_compression(path)
+    opener = _OPENERS.get(codec, open)
+    return opener(path, "rb")
+
+
+def new_decompressor(codec: str):
+    """Crea un descompresor incremental para un único miembro/stream de ``codec``.
+
+    Los tres exponen la misma interfaz: ``decompress(data)``, ``eof`` y
+    ``unused_data`` con los bytes posteriores al fin del miembro.
+    """
+
+    if codec == "gzip":
+        return zlib.decompressobj(zlib.MAX_WBITS | 16)
+    if codec == "bz2":
+        return bz2.BZ2Decompressor()
+    if codec == "xz":
+        return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+    raise ValueError(f"codec debe ser uno de {CODECS}")
+
+
+def _is_member_header(data, offset: int, codec: str) -> bool:
+    magic = _MAGIC[codec]
+    if data[offset : offset + len(magic)] != magic:
+        return False
+    if codec == "gzip":
+        # Los bits 5-7 de FLG están reservados y deben ser cero.
+        flags = data[offset + 3 : offset + 4]
+        return len(flags) == 1 and not flags[0] & 0xE0
+    if codec == "bz2":
+        level = data[offset + 3 : offset + 4]
+        return len(level) == 1 and level in b"123456789" and data[offset + 4 : offset + 10] == _BZ2_BLOCK_MAGIC
+    return True
+
+
+def _probe_member(mapped: mmap.mmap, offset: int, codec: str) -> bool:
+    """Verifica que un candidato decodifique sin error sus primeros bytes."""
+
+    try:
+        new_decompressor(codec).decompress(mapped[offset : offset + PROBE_BYTES])
+    except DECOMPRESS_ERRORS:
+        return False
+    return True
+
+
+def _next_member(mapped: mmap.mmap, codec: str, start: int, end: int) -> int:
+    """Devuelve el primer inicio de miembro válido en ``[start, end)`` o ``-1``."""
+
+    magic = _MAGIC[codec]
+    position = mapped.find(magic, start, end)
+    while position != -1:
+        if _is_member_header(mapped, position, codec) and _probe_member(mapped, position, codec):
+            return position
+        position = mapped.find(magic, position + 1, end)
+    return -1
+
+
+def member_ranges(path: str, codec: str, parts: int) -> List[Tuple[int, int]]:
+    """Divide un archivo comprimido en rangos que empiezan en un inicio de miembro.
+
+    Cada frontera es el primer miembro válido a partir de ``k * tamaño / parts``;
+    solo se leen los bytes comprimidos alrededor de cada frontera. Un archivo de
+    un solo miembro devuelve un único rango que cubre todo el archivo.
+
+    Errores:
+        ValueError: Si ``parts <= 0``.
+        OSError: Si el archivo no puede abrirse/mapearse.
+    """
+
+    if parts <= 0:
+        raise ValueError("parts debe ser > 0")
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    boundaries = [0]
+    chunk = size // parts or 1
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for index in range(1, parts):
+            target = max(index * chunk, boundaries[-1] + 1)
+            if target >= size:
+                break
+            found = _next_member(mapped, codec, target, size)
+            if found == -1:
+                break
+            if found > boundaries[-1]:
+                boundaries.append(found)
+    boundaries.append(size)
+
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def _fill(handle, data: bytes, size: int) -> bytes:
+    """Completa ``data`` leyendo de ``handle`` hasta tener ``size`` bytes o EOF."""
+
+    while len(data) < size:
+        more = handle.read(READ_BYTES)
+        if not more:
+            break
+        data += more
+    return data
+
+
+class MemberReader:
+    """Descomprime los miembros consecutivos que empiezan en ``[start, end)``.
+
+    Se itera para obtener los bytes descomprimidos. El primer miembro debe
+    empezar exactamente en ``start``; si no decodifica, ``valid`` queda en
+    ``False`` y no se entrega nada más. Al terminar, ``stop`` indica dónde
+    empieza el primer miembro que ya no le corresponde (o el fin del archivo),
+    lo que permite al padre comprobar que los rangos se encadenan sin huecos.
+    """
+
+    def __init__(self, path: str, codec: str, start: int, end: int) -> None:
+        self.path = path
+        self.codec = codec
+        self.start = start
+        self.end = end
+        self.stop = start
+        self.valid = True
+
+    def __iter__(self) -> Generator[bytes, None, None]:
+        with open(self.path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            handle.seek(self.start)
+            offset = self.start
+            leftover = b""
+            first = True
+            while True:
+                decompressor = new_decompressor(self.codec)
+                fed = 0
+                data = leftover
+                try:
+                    while not decompressor.eof:
+                        if not data:
+                            data = handle.read(READ_BYTES)
+                            if not data:
+                                raise EOFError("miembro comprimido truncado")
+                        fed += len(data)
+                        output = decompressor.decompress(data)
+                        data = b""
+                        if output:
+                            yield output
+                except DECOMPRESS_ERRORS:
+                    if not first:
+                        raise
+                    self.valid = False
+                    return
+                first = False
+
+                leftover = decompressor.unused_data
+                offset += fed - len(leftover)
+                # Saltea el relleno con ceros permitido entre miembros.
+                while True:
+                    leftover = _fill(handle, leftover, _HEADER_BYTES)
+                    stripped = leftover.lstrip(b"\0")
+                    offset += len(leftover) - len(stripped)
+                    if stripped or not leftover:
+                        leftover = stripped
+                        break
+                    leftover = stripped
+
+                if not leftover or not _is_member_header(leftover, 0, self.codec):
+                    self.stop = size
+                    return
+                if offset >= self.end:
+                    self.stop = offset
+                    return
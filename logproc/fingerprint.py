@@ -0,0 +1,64 @@
+"""Huellas baratas de archivos de entrada para cachés y checkpoints."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+
+# Bytes muestreados al inicio y al final del archivo para la huella de contenido.
+SAMPLE_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class FileFingerprint:
+    """Identidad de un archivo de entrada en un momento dado.
+
+    Attributes:
+        path: Ruta absoluta y resuelta del archivo.
+        size: Tamaño en bytes.
+        mtime_ns: Fecha de modificación en nanosegundos.
+        inode: Número de inodo (``st_ino``); ``0`` si la plataforma no lo expone.
+        digest: BLAKE2b del tamaño más las muestras inicial y final del contenido.
+    """
+
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    digest: str
+
+
+def file_fingerprint(path: str, sample_bytes: int = SAMPLE_BYTES) -> FileFingerprint:
+    """Calcula la huella de ``path`` leyendo solo sus extremos.
+
+    Parámetros:
+        path: Ruta al archivo.
+        sample_bytes: Bytes a leer al inicio y al final del archivo.
+
+    Retorna:
+        ``FileFingerprint`` con metadatos y digest de contenido.
+
+    Errores:
+        OSError: Si el archivo no puede abrirse/leerse.
+
+    Rendimiento:
+        ``O(sample_bytes)`` sin importar el tamaño del archivo.
+    """
+
+    resolved = os.path.realpath(path)
+    with open(resolved, "rb") as handle:
+        stat = os.fstat(handle.fileno())
+        digest = hashlib.blake2b(str(stat.st_size).encode("ascii"), digest_size=16)
+        digest.update(handle.read(sample_bytes))
+        if stat.st_size > sample_bytes:
+            handle.seek(max(sample_bytes, stat.st_size - sample_bytes))
+            digest.update(handle.read(sample_bytes))
+
+    return FileFingerprint(
+        path=resolved,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        inode=getattr(stat, "st_ino", 0) or 0,
+        digest=digest.hexdigest(),
+    )
@@ -0,0 +1,234 @@
+"""Modo *follow*: procesa un log en vivo y emite snapshots periódicos.
+
+El seguimiento replica la semántica de ``tail -F``: espera a que el archivo
+exista, detecta rotaciones (cambio de inodo) y truncamientos, y nunca procesa
+una línea incompleta hasta que llega su salto de línea. Las líneas nuevas se
+procesan en micro-lotes con ``process_batch`` y se acumulan en un
+``StatsAccumulator``, por lo que la memoria depende de la cantidad de URLs
+distintas y no del volumen seguido.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import BinaryIO, Generator, List, Optional, Sequence
+
+from .metrics import ProcessingResult, result_from_partial
+from .normalize import UrlNormalizer
+from .reducer import StatsAccumulator
+from .sketches import MAX_HLL_PRECISION, MIN_HLL_PRECISION, SketchConfig
+from .worker import process_batch
+
+
+class _FileTail:
+    """Lector incremental de un archivo que puede crecer, rotar o truncarse."""
+
+    def __init__(self, path: str, from_start: bool) -> None:
+        self.path = path
+        self.handle: Optional[BinaryIO] = None
+        self.inode: Optional[int] = None
+        self.pending = b""
+        self._open(seek_end=not from_start)
+
+    def _open(self, seek_end: bool) -> None:
+        try:
+            handle = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        self.handle = handle
+        self.inode = os.fstat(handle.fileno()).st_ino
+        if seek_end:
+            handle.seek(0, os.SEEK_END)
+
+    def close(self) -> None:
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def read_lines(self, limit: int) -> List[str]:
+        """Lee hasta ``limit`` líneas completas disponibles."""
+
+        if self.handle is None:
+            # El archivo aún no existía (o fue rotado): uno nuevo se lee entero.
+            self._open(seek_end=False)
+            if self.handle is None:
+                return []
+
+        lines: List[str] = []
+        while len(lines) < limit:
+            raw = self.handle.readline()
+            if not raw:
+                break
+            if not raw.endswith(b"\n"):
+                self.pending += raw
+                break
+            if self.pending:
+                raw = self.pending + raw
+                self.pending = b""
+            lines.append(raw.decode("utf-8", errors="replace"))
+        return lines
+
+    def check_rotation(self) -> List[str]:
+        """Detecta rotación o truncamiento cuando no hay datos nuevos.
+
+        Retorna la línea final sin salto de línea del archivo anterior (si la
+        había) para que no se pierda al rotar.
+        """
+
+        if self.handle is None:
+            return []
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotado y todavía sin reemplazo: seguimos esperando.
+            return []
+
+        if stat.st_ino != self.inode:
+            leftover = self._flush_pending()
+            self.close()
+            self._open(seek_end=False)
+            return leftover
+        if stat.st_size < self.handle.tell():
+            self.pending = b""
+            self.handle.seek(0)
+        return []
+
+    def _flush_pending(self) -> List[str]:
+        if not self.pending:
+            return []
+        line = self.pending.decode("utf-8", errors="replace")
+        self.pending = b""
+        return [line]
+
+
+def follow_log(
+    input_path: str,
+    slow_threshold: int = 200,
+    status_code: int = 500,
+    status_codes: Optional[Sequence[int]] = None,
+    batch_size: int = 1_000,
+    snapshot_interval: Optional[float] = 5.0,
+    snapshot_lines: Optional[int] = None,
+    poll_interval: float = 0.2,
+    from_start: bool = False,
+    stop_event: Optional[threading.Event] = None,
+    approximate: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> Generator[ProcessingResult, None, None]:
+    """Sigue ``input_path`` y produce snapshots acumulados del procesamiento.
+
+    Parámetros:
+        input_path: Ruta del log a seguir (puede no existir todavía).
+        slow_threshold: Umbral de lentitud en milisegundos.
+        status_code: Código HTTP a contar si no se indica ``status_codes``.
+        status_codes: Conjunto de códigos HTTP a contar.
+        batch_size: Máximo de líneas por micro-lote.
+        snapshot_interval: Segundos entre snapshots (``None`` lo desactiva).
+        snapshot_lines: Emite además un snapshot cada N líneas nuevas.
+        poll_interval: Espera entre sondeos cuando no hay datos nuevos.
+        from_start: Procesa el contenido existente en lugar de empezar al final.
+        stop_event: Evento que, al activarse, procesa lo pendiente, emite un
+            snapshot final y termina el generador.
+        approximate: Modo aproximado con sketches de memoria acotada (ver
+            ``api.process_log``); útil para seguimientos de larga duración.
+        normalizer: Normalización de URLs aplicada a cada micro-lote.
+        url_histograms: Si se mantienen histogramas de latencia por URL.
+        time_bucket: Ancho en segundos de la serie temporal de los snapshots.
+        distinct_ips: Precisión de los sketches de IPs distintas (ver
+            ``api.process_log``); no se combina con ``approximate``.
+
+    Retorna:
+        Un generador de ``ProcessingResult`` acumulados desde el inicio.
+
+    Errores:
+        ValueError: Si algún parámetro numérico es inválido.
+    """
+
+    if batch_size <= 0:
+        raise ValueError("batch_size debe ser > 0")
+    if slow_threshold < 0:
+        raise ValueError("slow_threshold debe ser >= 0")
+    if snapshot_interval is not None and snapshot_interval <= 0:
+        raise ValueError("snapshot_interval debe ser > 0")
+    if snapshot_lines is not None and snapshot_lines <= 0:
+        raise ValueError("snapshot_lines debe ser > 0")
+    if poll_interval <= 0:
+        raise ValueError("poll_interval debe ser > 0")
+    if approximate is not None and url_histograms:
+        raise ValueError("url_histograms no puede combinarse con approximate")
+    if time_bucket is not None and time_bucket <= 0:
+        raise ValueError("time_bucket debe ser > 0")
+    if distinct_ips is not None and not MIN_HLL_PRECISION <= distinct_ips <= MAX_HLL_PRECISION:
+        raise ValueError(f"distinct_ips debe estar entre {MIN_HLL_PRECISION} y {MAX_HLL_PRECISION}")
+    if distinct_ips is not None and approximate is not None:
+        raise ValueError("distinct_ips no puede combinarse con approximate")
+
+    codes = tuple(status_codes) if status_codes else (status_code,)
+    status_filter = frozenset(codes)
+    accumulator = StatsAccumulator(approximate)
+    tail = _FileTail(input_path, from_start=from_start)
+
+    start = time.perf_counter()
+    last_snapshot = start
+    lines_since_snapshot = 0
+
+    def snapshot() -> ProcessingResult:
+        result = result_from_partial(
+            accumulator.result(),
+            elapsed_seconds=time.perf_counter() - start,
+            status_codes=codes,
+            slow_threshold=slow_threshold,
+            workers=1,
+        )
+        result.time_bucket = time_bucket
+        return result
+
+    try:
+        while True:
+            stopping = stop_event is not None and stop_event.is_set()
+            lines = tail.read_lines(batch_size)
+            if not lines:
+                lines = tail.check_rotation()
+                idle = not lines
+            else:
+                idle = False
+
+            if lines:
+                accumulator.add(
+                    process_batch(
+                        lines,
+                        codes[0],
+                        slow_threshold,
+                        status_filter,
+                        normalizer=normalizer,
+                        url_histograms=url_histograms,
+                        time_bucket=time_bucket,
+                        distinct_ips=distinct_ips,
+                    )
+                )
+                lines_since_snapshot += len(lines)
+
+            if stopping and idle:
+                yield snapshot()
+                return
+
+            now = time.perf_counter()
+            due_by_lines = snapshot_lines is not None and lines_since_snapshot >= snapshot_lines
+            due_by_time = snapshot_interval is not None and now - last_snapshot >= snapshot_interval
+            if due_by_lines or due_by_time:
+                yield snapshot()
+                last_snapshot = now
+                lines_since_snapshot = 0
+
+            if idle:
+                if stop_event is not None:
+                    stop_event.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
+    finally:
+        tail.close()
@@ -0,0 +1,289 @@
+"""Histogramas de latencia fusionables con buckets logarítmicos (estilo HDR).
+
+Con un único ``total_slow`` contra un ``slow_threshold`` fijo, responder "cuál
+es el p99 de /checkout" exige reprocesar con muchos umbrales. Un histograma de
+latencias permite responder cualquier umbral o cuantil después de la pasada.
+
+Disposición de buckets (log-lineal, ``SUB_BUCKET_BITS = 5``):
+
+- los valores ``0..63`` ms tienen un bucket propio (exactos);
+- a partir de 64 ms, cada potencia de dos se divide en 32 buckets iguales, por
+  lo que el error relativo de un bucket es ``<= 1/32`` (~3 %).
+
+Todos los histogramas comparten esa disposición fija (``BUCKET_COUNT``
+buckets hasta ``MAX_VALUE``), así que fusionar es sumar arreglos alineados.
+Cada histograma guarda solo el tramo de buckets ocupado (``offset`` +
+``array("Q")``), de modo que uno vacío o concentrado ocupa poco al serializarse
+entre procesos.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Dict, Hashable, Iterable, Mapping, Optional, Sequence, Tuple
+
+try:  # NumPy es opcional: vectoriza el cálculo de buckets en el motor columnar.
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Máximo representable: coincide con la columna ``uint32`` de latencias.
+MAX_VALUE = 2**32 - 1
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def bucket_index(value: int) -> int:
+    """Índice del bucket de ``value`` (acotado a ``[0, MAX_VALUE]``)."""
+
+    if value <= 0:
+        return 0
+    if value > MAX_VALUE:
+        value = MAX_VALUE
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return value
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Rango ``[inferior, superior)`` de valores del bucket ``index``."""
+
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    mantissa = index - (shift << SUB_BUCKET_BITS)
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+BUCKET_COUNT = bucket_index(MAX_VALUE) + 1
+
+
+def bucket_indices(values: "np.ndarray") -> "np.ndarray":
+    """Versión vectorizada de ``bucket_index`` para un arreglo de enteros."""
+
+    # Se acota antes de convertir: un ``uint64`` grande se volvería negativo.
+    values = np.clip(values, 0, MAX_VALUE).astype(np.int64)
+    bits = np.frexp(values.astype(np.float64))[1].astype(np.int64)
+    shift = np.maximum(bits - SUB_BUCKET_BITS - 1, 0)
+    return (shift << SUB_BUCKET_BITS) + (values >> shift)
+
+
+class LatencyHistogram:
+    """Histograma de latencias en milisegundos con buckets de ``bucket_index``.
+
+    Attributes:
+        offset: Índice del primer bucket guardado en ``counts``.
+        counts: Conteos de los buckets ``offset .. offset + len(counts) - 1``.
+        total: Cantidad de valores registrados.
+    """
+
+    __slots__ = ("offset", "counts", "total")
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.counts = array("Q")
+        self.total = 0
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, LatencyHistogram):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"LatencyHistogram(total={self.total}, buckets={len(self.counts)})"
+
+    def _ensure(self, low: int, high: int) -> None:
+        """Extiende ``counts`` para cubrir los buckets ``[low, high]``."""
+
+        if not self.counts:
+            self.offset = low
+            self.counts = array("Q", bytes(8 * (high - low + 1)))
+            return
+        end = self.offset + len(self.counts) - 1
+        if low < self.offset:
+            self.counts = array("Q", bytes(8 * (self.offset - low))) + self.counts
+            self.offset = low
+        if high > end:
+            self.counts.extend(array("Q", bytes(8 * (high - end))))
+
+    def add_counts(self, counts: Mapping[int, int]) -> None:
+        """Registra ``counts`` (``latencia -> repeticiones``), p. ej. de un lote."""
+
+        if not counts:
+            return
+        by_bucket: Dict[int, int] = {}
+        for value, count in counts.items():
+            index = bucket_index(value)
+            by_bucket[index] = by_bucket.get(index, 0) + count
+        self.add_buckets(by_bucket)
+
+    def add_values(self, values: Iterable[int]) -> None:
+        """Registra cada valor de ``values``."""
+
+        by_bucket: Dict[int, int] = {}
+        for value in values:
+            index = bucket_index(value)
+            by_bucket[index] = by_bucket.get(index, 0) + 1
+        self.add_buckets(by_bucket)
+
+    def add_array(self, values: "np.ndarray") -> None:
+        """Registra un arreglo NumPy de latencias de forma vectorizada."""
+
+        if not values.size:
+            return
+        indices = bucket_indices(values)
+        low = int(indices.min())
+        self._add_dense(low, np.bincount(indices - low))
+
+    def add_buckets(self, by_bucket: Mapping[int, int]) -> None:
+        """Suma conteos ya agrupados por índice de bucket."""
+
+        if not by_bucket:
+            return
+        self._ensure(min(by_bucket), max(by_bucket))
+        counts = self.counts
+        offset = self.offset
+        for index, count in by_bucket.items():
+            counts[index - offset] += count
+            self.total += count
+
+    def _add_dense(self, low: int, dense: Sequence[int]) -> None:
+        self._ensure(low, low + len(dense) - 1)
+        start = low - self.offset
+        if np is not None:
+            target = np.frombuffer(self.counts, dtype=np.uint64)[start : start + len(dense)]
+            added = np.asarray(dense, dtype=np.uint64)
+            target += added
+            self.total += int(added.sum())
+            return
+        counts = self.counts
+        for position, count in enumerate(dense, start):
+            counts[position] += count
+            self.total += count
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Suma ``other`` a este histograma."""
+
+        if other.counts:
+            self._add_dense(other.offset, other.counts)
+
+    def copy(self) -> "LatencyHistogram":
+        """Devuelve una copia independiente."""
+
+        clone = LatencyHistogram()
+        clone.offset = self.offset
+        clone.counts = array("Q", self.counts)
+        clone.total = self.total
+        return clone
+
+    def quantile(self, q: float) -> Optional[int]:
+        """Cuantil ``q`` (en ``[0, 1]``) como el mayor valor de su bucket.
+
+        Nunca subestima la latencia real y la excede a lo sumo en el ancho del
+        bucket (exacto por debajo de 64 ms). Devuelve ``None`` si está vacío.
+        """
+
+        if not 0 <= q <= 1:
+            raise ValueError("q debe estar en [0, 1]")
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(round(q * self.total, 6)))
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return bucket_bounds(self.offset + position)[1] - 1
+        return bucket_bounds(self.offset + len(self.counts) - 1)[1] - 1
+
+    def count_above(self, threshold: int) -> int:
+        """Cantidad de valores ``> threshold``.
+
+        Es exacto si ``threshold < 64`` o si ``threshold + 1`` es el inicio de
+        un bucket; si no, es una cota inferior que omite los valores del bucket
+        que contiene a ``threshold`` (a lo sumo ~3 % por encima del umbral).
+        """
+
+        if threshold < 0:
+            return self.total
+        start = bucket_index(threshold) + 1 - self.offset
+        return sum(self.counts[max(start, 0) :])
+
+    def summary(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> dict:
+        """Resumen serializable: cantidad, cuantiles y máximo."""
+
+        data = {"count": self.total}
+        for q in quantiles:
+            data[f"p{q * 100:g}"] = self.quantile(q)
+        data["max"] = self.quantile(1.0)
+        return data
+
+    def to_dict(self) -> dict:
+        return {"offset": self.offset, "counts": list(self.counts)}
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "LatencyHistogram":
+        histogram = cls()
+        counts = data.get("counts") or []
+        if counts:
+            histogram.offset = int(data.get("offset", 0))
+            histogram.counts = array("Q", counts)
+            histogram.total = sum(counts)
+        return histogram
+
+
+def histograms_from_values(values_by_key: Mapping[Hashable, Iterable[int]]) -> Dict[Hashable, LatencyHistogram]:
+    """Construye un histograma por clave a partir de sus latencias crudas."""
+
+    histograms: Dict[Hashable, LatencyHistogram] = {}
+    for key, values in values_by_key.items():
+        histogram = histograms[key] = LatencyHistogram()
+        histogram.add_values(values)
+    return histograms
+
+
+def histograms_by_code(codes: "np.ndarray", values: "np.ndarray") -> Dict[int, LatencyHistogram]:
+    """Versión vectorizada: un histograma por código (p. ej. de URL) de ``codes``."""
+
+    if not codes.size:
+        return {}
+    keys = codes.astype(np.int64) * BUCKET_COUNT + bucket_indices(values)
+    unique_keys, counts = np.unique(keys, return_counts=True)
+    buckets: Dict[int, Dict[int, int]] = {}
+    for key, count in zip(unique_keys.tolist(), counts.tolist()):
+        code, index = divmod(key, BUCKET_COUNT)
+        buckets.setdefault(code, {})[index] = count
+
+    histograms: Dict[int, LatencyHistogram] = {}
+    for code, by_bucket in buckets.items():
+        histogram = histograms[code] = LatencyHistogram()
+        histogram.add_buckets(by_bucket)
+    return histograms
+
+
+def merge_histograms(target: Dict[Hashable, LatencyHistogram], source: Mapping[Hashable, LatencyHistogram]) -> None:
+    """Fusiona en ``target`` los histogramas de ``source``, clave por clave.
+
+    Los histogramas de ``source`` no se modifican: las claves nuevas se copian.
+    Sirve igual para otros objetos con ``copy``/``merge``, como los sketches
+    ``sketches.HyperLogLog`` por URL.
+    """
+
+    for key, histogram in source.items():
+        current = target.get(key)
+        if current is None:
+            target[key] = histogram.copy()
+        else:
+            current.merge(histogram)
+
+
+def count_above(histogram: Optional[Mapping], threshold: int) -> int:
+    """``count_above`` sobre un histograma serializado con ``to_dict``."""
+
+    if not histogram:
+        return 0
+    return LatencyHistogram.from_dict(histogram).count_above(threshold)
@@ -0,0 +1,168 @@
+"""Entradas múltiples: expansión de rutas/globs/directorios y plan de trabajo.
+
+Un día de tráfico suele repartirse en cientos de archivos de tamaños muy
+distintos. ``plan_work`` los convierte en unidades de trabajo de costo
+parecido: los archivos grandes se parten en rangos (de líneas o de miembros
+comprimidos) y los chicos se agrupan. Las unidades se ordenan de mayor a menor
+y el pool las toma a demanda, así ningún worker queda esperando al final con
+un archivo enorme en otro worker.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
+
+from .compression import detect_compression, member_ranges
+from .reader import split_ranges
+
+InputSpec = Union[str, "os.PathLike[str]", Sequence[Union[str, "os.PathLike[str]"]]]
+
+_GLOB_CHARS = frozenset("*?[")
+
+# Un byte comprimido rinde varios bytes de texto a parsear; este factor
+# aproxima ese costo al balancear unidades mezcladas de planos y comprimidos.
+COMPRESSED_COST_FACTOR = 4
+
+
+def expand_inputs(inputs: InputSpec) -> List[str]:
+    """Expande rutas, globs y directorios a una lista de archivos.
+
+    Parámetros:
+        inputs: Una ruta o una secuencia de rutas. Cada elemento puede ser un
+            archivo, un glob (``logs/*/access.log*``, admite ``**``) o un
+            directorio, que se recorre recursivamente omitiendo los archivos
+            y subdirectorios ocultos.
+
+    Retorna:
+        Rutas de archivos sin duplicados, en el orden de ``inputs`` (ordenadas
+        alfabéticamente dentro de cada glob o directorio).
+
+    Errores:
+        ValueError: Si la expansión no produce ningún archivo.
+    """
+
+    items = [inputs] if isinstance(inputs, (str, os.PathLike)) else list(inputs)
+    seen = set()
+    paths: List[str] = []
+    for item in items:
+        item = os.fspath(item)
+        if os.path.isdir(item):
+            candidates = _walk_files(item)
+        elif _GLOB_CHARS.intersection(item) and not os.path.exists(item):
+            candidates = sorted(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        else:
+            candidates = [item]
+
+        for path in candidates:
+            key = os.path.realpath(path)
+            if key not in seen:
+                seen.add(key)
+                paths.append(path)
+
+    if not paths:
+        raise ValueError("no se encontraron archivos de entrada")
+    return paths
+
+
+def _walk_files(directory: str) -> List[str]:
+    files: List[str] = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        files.extend(os.path.join(root, name) for name in sorted(names) if not name.startswith("."))
+    return files
+
+
+@dataclass(frozen=True, slots=True)
+class WorkPiece:
+    """Tramo ``[start, end)`` de un archivo.
+
+    En archivos planos el tramo está alineado a líneas; en comprimidos
+    (``codec`` distinto de ``None``) empieza en un inicio de miembro.
+    """
+
+    path: str
+    codec: Optional[str]
+    start: int
+    end: int
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+    @property
+    def cost(self) -> int:
+        """Costo estimado de procesar el tramo, en bytes de texto."""
+
+        return self.size * (COMPRESSED_COST_FACTOR if self.codec else 1)
+
+
+@dataclass(frozen=True, slots=True)
+class WorkUnit:
+    """Conjunto de tramos que un worker procesa en una sola tarea."""
+
+    pieces: Tuple[WorkPiece, ...]
+
+    @property
+    def cost(self) -> int:
+        return sum(piece.cost for piece in self.pieces)
+
+
+def plan_work(paths: Sequence[str], parts: int) -> List[WorkUnit]:
+    """Reparte ``paths`` en unidades de trabajo de tamaño similar.
+
+    Parámetros:
+        paths: Archivos de entrada (planos o comprimidos).
+        parts: Cantidad deseada de unidades; el costo objetivo de cada una es
+            ``costo_total / parts`` (ver ``WorkPiece.cost``).
+
+    Retorna:
+        Unidades ordenadas de mayor a menor costo estimado.
+        Los archivos más grandes que el objetivo se dividen con
+        ``reader.split_ranges`` o ``compression.member_ranges``; un comprimido
+        de un solo miembro queda entero en una unidad. Los archivos chicos se
+        agrupan hasta alcanzar el objetivo.
+
+    Errores:
+        ValueError: Si ``parts <= 0``.
+        OSError: Si algún archivo no puede leerse.
+    """
+
+    if parts <= 0:
+        raise ValueError("parts debe ser > 0")
+
+    whole: List[WorkPiece] = []
+    for path in paths:
+        size = os.path.getsize(path)
+        whole.append(WorkPiece(path, detect_compression(path) if size else None, 0, size))
+    target = max(sum(piece.cost for piece in whole) // parts, 1)
+
+    units: List[WorkUnit] = []
+    small: List[WorkPiece] = []
+    for piece in whole:
+        if piece.cost <= target:
+            small.append(piece)
+            continue
+        pieces = -(-piece.cost // target)
+        if piece.codec is None:
+            ranges = split_ranges(piece.path, parts=pieces, end=piece.end)
+        else:
+            ranges = member_ranges(piece.path, piece.codec, parts=pieces)
+        units.extend(WorkUnit((WorkPiece(piece.path, piece.codec, start, end),)) for start, end in ranges)
+
+    group: List[WorkPiece] = []
+    group_cost = 0
+    for piece in sorted(small, key=lambda item: item.cost, reverse=True):
+        group.append(piece)
+        group_cost += piece.cost
+        if group_cost >= target:
+            units.append(WorkUnit(tuple(group)))
+            group = []
+            group_cost = 0
+    if group:
+        units.append(WorkUnit(tuple(group)))
+
+    units.sort(key=lambda unit: unit.cost, reverse=True)
+    return units
@@ -0,0 +1,183 @@
+"""Medición de memoria (RSS) y tamaño adaptativo de lotes bajo un presupuesto.
+
+``batch_size`` cuenta líneas, pero el largo de las líneas varía mucho (las
+query strings pueden sumar decenas de bytes por línea), así que la memoria
+real de cada lote no es predecible. Con ``memory_budget`` los lotes se miden
+en bytes y ``MemoryBudget`` ajusta su tamaño y la cantidad de lotes en vuelo
+según el RSS observado del padre y de los workers:
+
+- si la estimación supera ``HIGH_WATERMARK`` del presupuesto, primero achica
+  los lotes (hasta ``MIN_CHUNK_BYTES``) y luego la ventana en vuelo;
+- si queda por debajo de ``LOW_WATERMARK``, primero recupera la ventana (para
+  no dejar workers ociosos) y luego agranda los lotes (hasta
+  ``MAX_CHUNK_BYTES``), que amortizan mejor el costo fijo de cada envío. Entre
+  un crecimiento y el siguiente se espera a que vuelva una ventana completa
+  de lotes, para ver el efecto del cambio antes de volver a crecer.
+
+El RSS se lee de ``/proc/self/statm`` (actual) y de ``resource.getrusage``
+(pico). Sin ``resource`` (p. ej. en Windows) los picos no se informan y el
+presupuesto solo fija el tamaño inicial de los lotes. ``tracemalloc`` no se usa:
+su costo por asignación no es aceptable en una medición siempre activa.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from typing import Iterable, Iterator, Optional, TypeVar
+
+try:  # pragma: no cover - depende del entorno
+    import resource
+except ImportError:  # pragma: no cover - depende del entorno
+    resource = None
+
+HAS_RESOURCE = resource is not None
+
+T = TypeVar("T")
+
+MIN_CHUNK_BYTES = 64 * 1024
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+HIGH_WATERMARK = 0.85
+LOW_WATERMARK = 0.6
+
+# Memoria de un lote en un worker por cada byte de entrada: líneas
+# decodificadas, registros parseados y contadores. Solo fija el tamaño
+# inicial; después manda el RSS observado.
+EXPANSION_ESTIMATE = 6
+
+_STATM = "/proc/self/statm"
+_PAGE_BYTES = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de RSS del proceso actual en bytes, o ``None`` sin ``resource``."""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB; macOS, bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> Optional[int]:
+    """RSS actual del proceso en bytes; sin ``/proc`` recurre al pico."""
+
+    try:
+        with open(_STATM, "rb") as handle:
+            return int(handle.read().split()[1]) * _PAGE_BYTES
+    except (OSError, IndexError, ValueError):
+        return peak_rss_bytes()
+
+
+class MemoryBudget:
+    """Ajusta tamaño de lote (bytes) y lotes en vuelo para respetar un presupuesto.
+
+    La memoria estimada es el RSS actual del padre más, con varios workers,
+    ``workers`` veces el último RSS informado por un worker
+    (``PartialStats.rss_bytes``). Con un solo worker los lotes corren en el
+    padre y su RSS ya lo incluye.
+
+    Parámetros:
+        budget_bytes: Presupuesto total (padre y workers) en bytes.
+        workers: Cantidad de procesos worker.
+        chunk_bytes: Tamaño de lote de partida (p. ej. el de ``batch_size``);
+            se recorta a lo que el presupuesto admite.
+        max_in_flight: Ventana de lotes en vuelo de partida y máxima.
+
+    Errores:
+        ValueError: Si ``budget_bytes``, ``workers`` o ``max_in_flight`` no
+            son positivos.
+    """
+
+    __slots__ = (
+        "budget_bytes",
+        "workers",
+        "chunk_bytes",
+        "max_in_flight",
+        "max_window",
+        "shrinks",
+        "grows",
+        "estimate_bytes",
+        "_cooldown",
+    )
+
+    def __init__(self, budget_bytes: int, workers: int, chunk_bytes: int, max_in_flight: int) -> None:
+        if budget_bytes <= 0:
+            raise ValueError("memory_budget debe ser > 0")
+        if workers <= 0:
+            raise ValueError("workers debe ser > 0")
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight debe ser > 0")
+        self.budget_bytes = budget_bytes
+        self.workers = workers
+        self.max_window = max_in_flight
+        self.max_in_flight = max_in_flight
+        self.shrinks = 0
+        self.grows = 0
+        self.estimate_bytes = 0
+        self._cooldown = 0
+
+        # Los workers arrancan con (a lo sumo) la memoria del padre.
+        processes = 1 + workers if workers > 1 else 1
+        baseline = (current_rss_bytes() or 0) * processes
+        # Cada lote vive en el padre (leído, en vuelo) y en un worker.
+        per_chunk = (max_in_flight + workers) * EXPANSION_ESTIMATE
+        fitting = (budget_bytes * LOW_WATERMARK - baseline) // per_chunk
+        self.chunk_bytes = int(min(chunk_bytes, max(MIN_CHUNK_BYTES, fitting), MAX_CHUNK_BYTES))
+
+    def window(self) -> int:
+        """Lotes en vuelo admitidos ahora (ver ``scheduler.bounded_map``)."""
+
+        return self.max_in_flight
+
+    def next_chunk_bytes(self) -> int:
+        """Tamaño de la próxima lectura (ver ``reader.read_raw_chunks``)."""
+
+        return self.chunk_bytes
+
+    def observe(self, worker_rss_bytes: Optional[int]) -> None:
+        """Recalcula la estimación con el RSS de un worker y ajusta los límites."""
+
+        estimate = current_rss_bytes() or 0
+        if self.workers > 1 and worker_rss_bytes:
+            estimate += self.workers * worker_rss_bytes
+        self.estimate_bytes = estimate
+        self._cooldown = max(0, self._cooldown - 1)
+
+        if estimate > self.budget_bytes * HIGH_WATERMARK:
+            if self.chunk_bytes > MIN_CHUNK_BYTES:
+                self.chunk_bytes = max(MIN_CHUNK_BYTES, self.chunk_bytes // 2)
+            elif self.max_in_flight > 1:
+                self.max_in_flight -= 1
+            else:
+                return
+            self.shrinks += 1
+        elif estimate < self.budget_bytes * LOW_WATERMARK and not self._cooldown:
+            if self.max_in_flight < self.max_window:
+                self.max_in_flight += 1
+            elif self.chunk_bytes < MAX_CHUNK_BYTES:
+                self.chunk_bytes = min(MAX_CHUNK_BYTES, self.chunk_bytes * 2)
+            else:
+                return
+            self.grows += 1
+            self._cooldown = self.max_in_flight
+
+    def track(self, partials: Iterable[T]) -> Iterator[T]:
+        """Entrega ``partials`` observando el ``rss_bytes`` de cada uno."""
+
+        for part in partials:
+            self.observe(part.rss_bytes)
+            yield part
+
+    def to_dict(self) -> dict:
+        """Resumen para ``ProcessingResult.memory_budget``."""
+
+        return {
+            "budget_bytes": self.budget_bytes,
+            "chunk_bytes": self.chunk_bytes,
+            "max_in_flight": self.max_in_flight,
+            "shrinks": self.shrinks,
+            "grows": self.grows,
+            "last_estimate_bytes": self.estimate_bytes,
+        }
@@ -7,8 +7,21 @@ preservar un uso de memoria acotado.
 
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass, field
-from typing import Dict, Optional, Sequence, Tuple
+import json
+import os
+from dataclasses import asdict, dataclass, field, fields
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .compact import PackedUrlCounts
+from .histogram import LatencyHistogram, count_above
+from .sketches import HeavyHitters, HyperLogLog, top_from_sketch
+from .timeseries import series_rows
+from .timings import add_time
+
+# Campos de ``PartialStats`` que no forman parte de su forma JSON: el formato
+# de transporte y las mediciones de tiempo y memoria.
+_NOT_SERIALIZED = ("packed_urls", "process_seconds", "read_seconds", "merge_seconds", "rss_bytes", "peak_rss_bytes")
 
 
 @dataclass(slots=True)
@@ -22,6 +35,29 @@ class PartialStats:
         total_slow: Cantidad de líneas con latencia por encima del umbral.
         status_by_url: Frecuencias por URL para el código objetivo.
         slow_by_url: Frecuencias por URL para respuestas lentas.
+        status_sketch: En modo aproximado, reemplaza a ``status_by_url``.
+        slow_sketch: En modo aproximado, reemplaza a ``slow_by_url``.
+        latency: Histograma de latencias de todas las líneas válidas.
+        latency_by_url: Histogramas por URL (solo con ``url_histograms``).
+        time_series: Con ``time_bucket``, ``inicio_bucket -> [total, status,
+            lentas]`` (ver ``timeseries``).
+        ip_sketch: Con ``distinct_ips``, sketch de las IPs de todas las
+            líneas válidas.
+        ip_sketch_by_url: Con ``distinct_ips``, sketch de IPs por URL.
+        packed_urls: En un parcial deserializado, ``status_by_url`` y
+            ``slow_by_url`` en columnas (ver ``compact``); los diccionarios
+            quedan vacíos hasta llamar a ``unpack_urls``.
+        process_seconds: Segundos de parseo y conteo (ver ``timings``).
+        read_seconds: Segundos de lectura en el worker (lectura por rangos).
+        merge_seconds: Segundos de fusión hecha dentro de los workers
+            (``accumulate_in_workers``); la del padre va directo a ``timings``.
+        rss_bytes: RSS del proceso que generó el parcial al terminar su
+            último lote (máximo al fusionar; ver ``memory``).
+        peak_rss_bytes: Pico de RSS de ese proceso (máximo al fusionar).
+
+    Al serializarse con pickle los conteos por URL viajan en columnas con una
+    sola tabla de URLs (ver ``__reduce__``), y ``reducer.StatsAccumulator``
+    los suma sin volver a armar los diccionarios.
     """
 
     total_lines: int = 0
@@ -30,6 +66,159 @@ class PartialStats:
     total_slow: int = 0
     status_by_url: Dict[str, int] = field(default_factory=dict)
     slow_by_url: Dict[str, int] = field(default_factory=dict)
+    status_sketch: Optional[HeavyHitters] = None
+    slow_sketch: Optional[HeavyHitters] = None
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    latency_by_url: Dict[str, LatencyHistogram] = field(default_factory=dict)
+    time_series: Dict[int, List[int]] = field(default_factory=dict)
+    ip_sketch: Optional[HyperLogLog] = None
+    ip_sketch_by_url: Dict[str, HyperLogLog] = field(default_factory=dict)
+    packed_urls: Optional[PackedUrlCounts] = field(default=None, repr=False, compare=False)
+    process_seconds: float = field(default=0.0, repr=False, compare=False)
+    read_seconds: float = field(default=0.0, repr=False, compare=False)
+    merge_seconds: float = field(default=0.0, repr=False, compare=False)
+    rss_bytes: int = field(default=0, repr=False, compare=False)
+    peak_rss_bytes: int = field(default=0, repr=False, compare=False)
+
+    def __reduce__(self):
+        packed = self.packed_urls
+        if self.status_by_url or self.slow_by_url:
+            self.unpack_urls()
+            packed = PackedUrlCounts.pack(self.status_by_url, self.slow_by_url)
+        return _restore_partial, (
+            self.total_lines,
+            self.bad_lines,
+            self.total_status,
+            self.total_slow,
+            packed,
+            self.status_sketch,
+            self.slow_sketch,
+            self.latency,
+            self.latency_by_url,
+            self.time_series,
+            self.ip_sketch,
+            self.ip_sketch_by_url,
+            self.process_seconds,
+            self.read_seconds,
+            self.merge_seconds,
+            self.rss_bytes,
+            self.peak_rss_bytes,
+        )
+
+    def unpack_urls(self) -> None:
+        """Vuelca ``packed_urls`` en ``status_by_url``/``slow_by_url``."""
+
+        if self.packed_urls is None:
+            return
+        status_by_url, slow_by_url = self.packed_urls.unpack()
+        self.packed_urls = None
+        for target, source in ((self.status_by_url, status_by_url), (self.slow_by_url, slow_by_url)):
+            for url, count in source.items():
+                target[url] = target.get(url, 0) + count
+
+    def to_dict(self) -> dict:
+        """Devuelve una representación serializable a JSON."""
+
+        self.unpack_urls()
+        data = {item.name: getattr(self, item.name) for item in fields(self) if item.name not in _NOT_SERIALIZED}
+        data["status_by_url"] = dict(self.status_by_url)
+        data["slow_by_url"] = dict(self.slow_by_url)
+        data["latency"] = self.latency.to_dict()
+        data["latency_by_url"] = {url: histogram.to_dict() for url, histogram in self.latency_by_url.items()}
+        data["time_series"] = {start: list(counts) for start, counts in self.time_series.items()}
+        data["ip_sketch"] = self.ip_sketch.to_dict() if self.ip_sketch is not None else None
+        data["ip_sketch_by_url"] = {url: sketch.to_dict() for url, sketch in self.ip_sketch_by_url.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PartialStats":
+        """Reconstruye un parcial a partir de la salida de ``to_dict``."""
+
+        known = {item.name for item in fields(cls)}
+        values = {key: value for key, value in data.items() if key in known}
+        if "latency" in values:
+            values["latency"] = LatencyHistogram.from_dict(values["latency"])
+        if "latency_by_url" in values:
+            values["latency_by_url"] = {
+                url: LatencyHistogram.from_dict(histogram) for url, histogram in values["latency_by_url"].items()
+            }
+        if "time_series" in values:
+            # JSON guarda las claves como texto.
+            values["time_series"] = {int(start): list(counts) for start, counts in values["time_series"].items()}
+        if values.get("ip_sketch"):
+            values["ip_sketch"] = HyperLogLog.from_dict(values["ip_sketch"])
+        if "ip_sketch_by_url" in values:
+            values["ip_sketch_by_url"] = {
+                url: HyperLogLog.from_dict(sketch) for url, sketch in values["ip_sketch_by_url"].items()
+            }
+        return cls(**values)
+
+
+def _restore_partial(
+    total_lines: int,
+    bad_lines: int,
+    total_status: int,
+    total_slow: int,
+    packed_urls: Optional[PackedUrlCounts],
+    status_sketch: Optional[HeavyHitters],
+    slow_sketch: Optional[HeavyHitters],
+    latency: LatencyHistogram,
+    latency_by_url: Dict[str, LatencyHistogram],
+    time_series: Dict[int, List[int]],
+    ip_sketch: Optional[HyperLogLog],
+    ip_sketch_by_url: Dict[str, HyperLogLog],
+    process_seconds: float = 0.0,
+    read_seconds: float = 0.0,
+    merge_seconds: float = 0.0,
+    rss_bytes: int = 0,
+    peak_rss_bytes: int = 0,
+) -> PartialStats:
+    return PartialStats(
+        total_lines=total_lines,
+        bad_lines=bad_lines,
+        total_status=total_status,
+        total_slow=total_slow,
+        status_sketch=status_sketch,
+        slow_sketch=slow_sketch,
+        latency=latency,
+        latency_by_url=latency_by_url,
+        time_series=time_series,
+        ip_sketch=ip_sketch,
+        ip_sketch_by_url=ip_sketch_by_url,
+        packed_urls=packed_urls,
+        process_seconds=process_seconds,
+        read_seconds=read_seconds,
+        merge_seconds=merge_seconds,
+        rss_bytes=rss_bytes,
+        peak_rss_bytes=peak_rss_bytes,
+    )
+
+
+@dataclass(slots=True)
+class MemberPartial:
+    """Salida de un worker que descomprimió un rango de miembros comprimidos.
+
+    Los bordes del texto descomprimido no coinciden con bordes de línea, así
+    que el worker devuelve aparte el fragmento previo al primer ``\n`` y el
+    posterior al último para que el padre los una con los rangos vecinos.
+
+    Attributes:
+        start: Offset comprimido donde empieza el rango.
+        stop: Offset donde empieza el primer miembro que no le corresponde.
+        valid: ``False`` si ``start`` no era un inicio de miembro real.
+        stats: Contadores de las líneas completas del rango.
+        head: Bytes antes del primer ``\n`` (o todo el texto si no hay).
+        tail: Bytes después del último ``\n``.
+        has_newline: Si el texto descomprimido contiene algún ``\n``.
+    """
+
+    start: int
+    stop: int
+    valid: bool = True
+    stats: PartialStats = field(default_factory=PartialStats)
+    head: bytes = b""
+    tail: bytes = b""
+    has_newline: bool = False
 
 
 @dataclass(slots=True)
@@ -51,6 +240,36 @@ class ProcessingResult:
         slow_threshold: Umbral de lentitud en milisegundos.
         workers: Cantidad de workers usados.
         profile_stats_path: Ruta al archivo de cProfile, cuando corresponde.
+        from_cache: Si el resultado se obtuvo de la caché de resultados.
+        input_files: Cantidad de archivos de entrada procesados.
+        per_file: Desglose opcional por archivo (ver ``file_summary``).
+        approximate: Si los tops provienen de sketches (conteos = cota superior).
+        error_bounds: En modo aproximado, cotas de error por contador y por
+            URL del top (ver ``sketches.HeavyHitters.error_bounds``).
+        latency: Cuantiles de latencia (``count``, ``p50``, ``p95``, ``p99``,
+            ``max``) y el histograma serializado en ``histogram``.
+        latency_by_url: Lo mismo para cada URL de los tops, si se calcularon
+            histogramas por URL.
+        time_bucket: Ancho en segundos de los buckets de ``time_series``.
+        time_series: Filas ``{start, total, status, slow}`` ordenadas por
+            tiempo (ver ``timeseries.series_rows``), si se pidió ``time_bucket``.
+        byte_range: Tramo ``[inicio, fin)`` de bytes procesado cuando se
+            filtró por ``since``/``until``.
+        distinct_ips: IPs de clientes distintas estimadas (HyperLogLog), si
+            se pidió ``distinct_ips``.
+        distinct_ips_error: Error relativo típico de esas estimaciones.
+        distinct_ips_by_url: IPs distintas estimadas de cada URL de los tops.
+        prefetch_wait_seconds: Con ``prefetch``, tiempo que el consumidor
+            esperó bloqueado al hilo lector (ver ``reader.Prefetcher``).
+        timings: Segundos por etapa (``read``, ``process``, ``wait``,
+            ``merge``, ``top_n``) más ``lines_per_second`` y
+            ``mb_per_second``; ver ``timings``. ``None`` si vino de la caché.
+        peak_rss_bytes: Pico de RSS del proceso padre (en un proceso de
+            larga vida, como el dashboard, es el pico de toda su vida).
+        worker_peak_rss_bytes: Mayor pico de RSS informado por los procesos
+            que procesaron lotes (el padre mismo con un solo worker).
+        memory_budget: Con ``memory_budget``, presupuesto y ajuste final de
+            tamaño de lote y ventana (ver ``memory.MemoryBudget.to_dict``).
     """
 
     total_lines: int
@@ -67,12 +286,72 @@ class ProcessingResult:
     slow_threshold: int
     workers: int
     profile_stats_path: Optional[str] = None
+    from_cache: bool = False
+    input_files: int = 1
+    per_file: Optional[Dict[str, dict]] = None
+    approximate: bool = False
+    error_bounds: Optional[dict] = None
+    latency: Optional[dict] = None
+    latency_by_url: Optional[Dict[str, dict]] = None
+    time_bucket: Optional[int] = None
+    time_series: Optional[List[dict]] = None
+    byte_range: Optional[Tuple[int, int]] = None
+    distinct_ips: Optional[int] = None
+    distinct_ips_error: Optional[float] = None
+    distinct_ips_by_url: Optional[Dict[str, int]] = None
+    prefetch_wait_seconds: Optional[float] = None
+    timings: Optional[Dict[str, float]] = None
+    peak_rss_bytes: Optional[int] = None
+    worker_peak_rss_bytes: Optional[int] = None
+    memory_budget: Optional[Dict[str, int]] = None
 
     def to_dict(self) -> dict:
         """Devuelve una representación serializable a JSON."""
 
         return asdict(self)
 
+    def count_above(self, threshold: int, url: Optional[str] = None) -> int:
+        """Cuenta requests con latencia ``> threshold`` sin volver a procesar.
+
+        Usa el histograma global o, con ``url``, el de esa URL (debe estar en
+        ``latency_by_url``). Ver ``histogram.LatencyHistogram.count_above``
+        para la precisión.
+
+        Errores:
+            KeyError: Si ``url`` no tiene histograma en el resultado.
+        """
+
+        summary = self.latency if url is None else (self.latency_by_url or {})[url]
+        return count_above((summary or {}).get("histogram"), threshold)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProcessingResult":
+        """Reconstruye un resultado a partir de la salida de ``to_dict``.
+
+        Ignora claves desconocidas y restaura como tuplas los pares que JSON
+        serializa como listas.
+        """
+
+        known = {item.name for item in fields(cls)}
+        values = {key: value for key, value in data.items() if key in known}
+        for key in ("top_url_status", "top_url_slow"):
+            values[key] = tuple(values[key])
+        for key in ("top_10_status", "top_10_slow"):
+            values[key] = [tuple(pair) for pair in values[key]]
+        values["status_codes"] = tuple(values["status_codes"])
+        if values.get("byte_range"):
+            values["byte_range"] = tuple(values["byte_range"])
+        for summary in (values.get("per_file") or {}).values():
+            for key in ("top_url_status", "top_url_slow"):
+                summary[key] = tuple(summary[key])
+        return cls(**values)
+
+
+def _rank_key(item: Tuple[str, int]) -> Tuple[int, str]:
+    """Orden de los tops: conteo descendente y, ante empates, URL ascendente."""
+
+    return -item[1], item[0]
+
 
 def top_url(counts: Dict[str, int]) -> Tuple[Optional[str], int]:
     """Devuelve la URL con mayor frecuencia.
@@ -82,11 +361,12 @@ def top_url(counts: Dict[str, int]) -> Tuple[Optional[str], int]:
 
     Retorna:
         Tupla ``(url, conteo)``. Si ``counts`` está vacío, devuelve ``(None, 0)``.
+        Ante un empate gana la URL menor en orden lexicográfico.
     """
 
     if not counts:
         return None, 0
-    return max(counts.items(), key=lambda item: item[1])
+    return min(counts.items(), key=_rank_key)
 
 
 def top_n_urls(counts: Dict[str, int], limit: int = 10) -> Sequence[Tuple[str, int]]:
@@ -97,10 +377,154 @@ def top_n_urls(counts: Dict[str, int], limit: int = 10) -> Sequence[Tuple[str, i
         limit: Cantidad máxima de pares a devolver.
 
     Retorna:
-        Lista de pares ``(url, conteo)``.
+        Lista de pares ``(url, conteo)``. Los empates se ordenan por URL: con
+        varios workers los parciales se fusionan en orden de finalización y
+        el orden de inserción de ``counts`` varía entre corridas.
 
     Complejidad:
         Ejecuta en ``O(m log m)`` sobre ``m`` URLs únicas.
     """
 
-    return sorted(counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+    started = perf_counter()
+    top = sorted(counts.items(), key=_rank_key)[:limit]
+    add_time("top_n", perf_counter() - started)
+    return top
+
+
+def result_from_partial(
+    merged: PartialStats,
+    elapsed_seconds: float,
+    status_codes: Sequence[int],
+    slow_threshold: int,
+    workers: int,
+) -> ProcessingResult:
+    """Construye el ``ProcessingResult`` final a partir del parcial fusionado.
+
+    Parámetros:
+        merged: Parcial con todos los contadores fusionados.
+        elapsed_seconds: Duración del procesamiento.
+        status_codes: Códigos de estado usados para filtrar (el primero se
+            reporta también como ``status_code``).
+        slow_threshold: Umbral de lentitud en milisegundos.
+        workers: Cantidad de workers usados.
+
+    En modo aproximado (parcial con sketches) los tops usan la cota superior
+    de cada URL y ``error_bounds`` informa las cotas de error.
+    """
+
+    merged.unpack_urls()
+    approximate = merged.status_sketch is not None or merged.slow_sketch is not None
+    error_bounds = None
+    if approximate:
+        top_10_status = top_from_sketch(merged.status_sketch)
+        top_10_slow = top_from_sketch(merged.slow_sketch)
+        error_bounds = {
+            name: sketch.error_bounds()
+            for name, sketch in (("status", merged.status_sketch), ("slow", merged.slow_sketch))
+            if sketch is not None
+        }
+        sketch = merged.status_sketch or merged.slow_sketch
+        error_bounds["config"] = sketch.config.to_dict()
+    else:
+        top_10_status = top_n_urls(merged.status_by_url, limit=10)
+        top_10_slow = top_n_urls(merged.slow_by_url, limit=10)
+
+    return ProcessingResult(
+        total_lines=merged.total_lines,
+        bad_lines=merged.bad_lines,
+        total_status=merged.total_status,
+        total_slow=merged.total_slow,
+        top_url_status=_first_or_top(top_10_status, merged.status_by_url, approximate),
+        top_url_slow=_first_or_top(top_10_slow, merged.slow_by_url, approximate),
+        top_10_status=top_10_status,
+        top_10_slow=top_10_slow,
+        elapsed_seconds=elapsed_seconds,
+        status_code=status_codes[0],
+        status_codes=tuple(status_codes),
+        slow_threshold=slow_threshold,
+        workers=workers,
+        approximate=approximate,
+        error_bounds=error_bounds,
+        latency=latency_summary(merged.latency),
+        latency_by_url=_top_latencies(merged, top_10_status, top_10_slow),
+        time_series=series_rows(merged.time_series) if merged.time_series else None,
+        distinct_ips=merged.ip_sketch.estimate() if merged.ip_sketch is not None else None,
+        distinct_ips_error=merged.ip_sketch.relative_error() if merged.ip_sketch is not None else None,
+        distinct_ips_by_url=_top_distinct_ips(merged, top_10_status, top_10_slow),
+    )
+
+
+def latency_summary(histogram: LatencyHistogram) -> dict:
+    """Cuantiles de ``histogram`` junto con su forma serializada."""
+
+    summary = histogram.summary()
+    summary["histogram"] = histogram.to_dict()
+    return summary
+
+
+def _top_latencies(
+    merged: PartialStats,
+    top_10_status: Sequence[Tuple[str, int]],
+    top_10_slow: Sequence[Tuple[str, int]],
+) -> Optional[Dict[str, dict]]:
+    if not merged.latency_by_url:
+        return None
+    urls = dict.fromkeys(url for url, _ in [*top_10_status, *top_10_slow])
+    return {url: latency_summary(merged.latency_by_url[url]) for url in urls if url in merged.latency_by_url}
+
+
+def _top_distinct_ips(
+    merged: PartialStats,
+    top_10_status: Sequence[Tuple[str, int]],
+    top_10_slow: Sequence[Tuple[str, int]],
+) -> Optional[Dict[str, int]]:
+    if merged.ip_sketch is None:
+        return None
+    urls = dict.fromkeys(url for url, _ in [*top_10_status, *top_10_slow])
+    return {url: merged.ip_sketch_by_url[url].estimate() for url in urls if url in merged.ip_sketch_by_url}
+
+
+def _first_or_top(
+    top: List[Tuple[str, int]],
+    counts: Dict[str, int],
+    approximate: bool,
+) -> Tuple[Optional[str], int]:
+    if not approximate:
+        return top_url(counts)
+    return top[0] if top else (None, 0)
+
+
+def file_summary(stats: PartialStats) -> dict:
+    """Resume el parcial de un archivo para el desglose ``per_file``."""
+
+    stats.unpack_urls()
+    summary = {
+        "total_lines": stats.total_lines,
+        "bad_lines": stats.bad_lines,
+        "total_status": stats.total_status,
+        "total_slow": stats.total_slow,
+        "top_url_status": _first_or_top(
+            top_from_sketch(stats.status_sketch, 1), stats.status_by_url, stats.status_sketch is not None
+        ),
+        "top_url_slow": _first_or_top(
+            top_from_sketch(stats.slow_sketch, 1), stats.slow_by_url, stats.slow_sketch is not None
+        ),
+    }
+    if stats.ip_sketch is not None:
+        summary["distinct_ips"] = stats.ip_sketch.estimate()
+    return summary
+
+
+def write_result_json(result: ProcessingResult, json_out_path: Optional[str]) -> None:
+    """Exporta ``result`` como JSON si se indicó una ruta.
+
+    La escritura es atómica (archivo temporal + ``os.replace``) para que un
+    lector nunca vea un JSON a medio escribir, p. ej. en modo ``follow``.
+    """
+
+    if not json_out_path:
+        return
+    partial_path = f"{json_out_path}.tmp"
+    with open(partial_path, "w", encoding="utf-8") as handle:
+        json.dump(result.to_dict(), handle, indent=2, ensure_ascii=False)
+    os.replace(partial_path, json_out_path)
@@ -0,0 +1,187 @@
+"""Normalización de URLs para reducir la cardinalidad antes de contar.
+
+Buena parte de las URLs distintas de un log son variantes de la misma ruta:
+query strings aleatorias (``/search?q=...&p=...``) o identificadores en el
+path (``/products/123``). Contarlas por separado infla los diccionarios por
+URL, el tamaño de los parciales serializados y el costo de ordenar los tops.
+
+``UrlNormalizer`` agrupa esas variantes antes de que los conteos salgan del
+lote: cada función de lote cuenta con las URLs crudas (acotadas por
+``batch_size``) y reagrupa los conteos bajo la URL normalizada, de modo que la
+normalización cuesta una búsqueda en el memo LRU por URL distinta del lote y
+no por línea.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+from .metrics import PartialStats
+from .parser import Mergeable
+
+DEFAULT_MEMO_SIZE = 65_536
+
+ID_PLACEHOLDER = "{id}"
+UUID_PLACEHOLDER = "{uuid}"
+
+_UUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+# Una instancia por configuración y proceso: al deserializarse en un worker,
+# el normalizador reutiliza el memo de las tareas anteriores (ver ``__reduce__``).
+_INSTANCES: Dict[tuple, "UrlNormalizer"] = {}
+
+
+class UrlNormalizer:
+    """Transforma URLs crudas en plantillas de menor cardinalidad.
+
+    Las transformaciones se aplican en este orden:
+
+    1. ``strip_query``: descarta la query string y el fragmento (``?...``/``#...``).
+    2. ``collapse_ids``: reemplaza los segmentos del path puramente numéricos
+       por ``{id}`` y los UUID por ``{uuid}``.
+    3. ``rules``: pares ``(patrón, reemplazo)`` aplicados con ``re.sub`` sobre
+       el resultado, en orden (p. ej. ``(r"^/users/[^/]+", "/users/{user}")``).
+
+    Parámetros:
+        strip_query: Si se descarta la query string.
+        collapse_ids: Si se colapsan segmentos numéricos y UUID.
+        rules: Reglas de reescritura definidas por el usuario.
+        memo_size: Entradas del memo LRU de URL cruda a normalizada; ``0`` lo
+            desactiva.
+
+    Errores:
+        ValueError: Si ``memo_size < 0`` o alguna regla no es una expresión
+            regular válida.
+
+    El memo no se serializa: al enviarse a un worker solo viaja la
+    configuración, y cada proceso conserva su propio memo entre tareas.
+    """
+
+    __slots__ = ("strip_query", "collapse_ids", "rules", "memo_size", "_rules", "_normalize_cached")
+
+    def __init__(
+        self,
+        strip_query: bool = False,
+        collapse_ids: bool = False,
+        rules: Sequence[Tuple[str, str]] = (),
+        memo_size: int = DEFAULT_MEMO_SIZE,
+    ) -> None:
+        if memo_size < 0:
+            raise ValueError("memo_size debe ser >= 0")
+        self.strip_query = bool(strip_query)
+        self.collapse_ids = bool(collapse_ids)
+        self.rules = tuple((str(pattern), str(replacement)) for pattern, replacement in rules)
+        self.memo_size = memo_size
+        try:
+            self._rules = tuple((re.compile(pattern), replacement) for pattern, replacement in self.rules)
+        except re.error as exc:
+            raise ValueError(f"regla de reescritura inválida: {exc}") from exc
+        self._normalize_cached: Callable[[str], str] = (
+            lru_cache(maxsize=memo_size)(self._normalize) if memo_size else self._normalize
+        )
+
+    def __reduce__(self):
+        return _restore, (self.strip_query, self.collapse_ids, self.rules, self.memo_size)
+
+    def __repr__(self) -> str:
+        return (
+            f"UrlNormalizer(strip_query={self.strip_query}, collapse_ids={self.collapse_ids}, "
+            f"rules={list(self.rules)})"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Indica si alguna transformación está activa."""
+
+        return self.strip_query or self.collapse_ids or bool(self.rules)
+
+    def to_dict(self) -> dict:
+        """Configuración que afecta al resultado (sin ``memo_size``)."""
+
+        return {
+            "strip_query": self.strip_query,
+            "collapse_ids": self.collapse_ids,
+            "rules": [list(rule) for rule in self.rules],
+        }
+
+    def __call__(self, url: str) -> str:
+        return self._normalize_cached(url)
+
+    def _normalize(self, url: str) -> str:
+        path, separator, query = url.partition("?")
+        if "#" in path:
+            path, fragment_separator, fragment = path.partition("#")
+            separator, query = fragment_separator, fragment + separator + query
+        if self.strip_query:
+            separator = query = ""
+
+        if self.collapse_ids:
+            segments = path.split("/")
+            for index, segment in enumerate(segments):
+                if segment.isdigit() and segment.isascii():
+                    segments[index] = ID_PLACEHOLDER
+                elif len(segment) == 36 and _UUID_RE.fullmatch(segment):
+                    segments[index] = UUID_PLACEHOLDER
+            path = "/".join(segments)
+
+        url = path + separator + query
+        for pattern, replacement in self._rules:
+            url = pattern.sub(replacement, url)
+        return url
+
+    def normalize_counts(self, counts: Mapping[str, int]) -> Dict[str, int]:
+        """Reagrupa conteos por URL cruda bajo la URL normalizada."""
+
+        normalize = self._normalize_cached
+        normalized: Dict[str, int] = {}
+        for url, count in counts.items():
+            key = normalize(url)
+            normalized[key] = normalized.get(key, 0) + count
+        return normalized
+
+    def apply(self, stats: PartialStats) -> PartialStats:
+        """Normaliza en el lugar los conteos, histogramas y sketches por URL de ``stats`` y lo devuelve."""
+
+        stats.unpack_urls()
+        stats.status_by_url = self.normalize_counts(stats.status_by_url)
+        stats.slow_by_url = self.normalize_counts(stats.slow_by_url)
+        if stats.latency_by_url:
+            stats.latency_by_url = self._normalize_mergeables(stats.latency_by_url)
+        if stats.ip_sketch_by_url:
+            stats.ip_sketch_by_url = self._normalize_mergeables(stats.ip_sketch_by_url)
+        return stats
+
+    def _normalize_mergeables(self, values: Mapping[str, Mergeable]) -> Dict[str, Mergeable]:
+        normalize = self._normalize_cached
+        normalized: Dict[str, Mergeable] = {}
+        for url, value in values.items():
+            key = normalize(url)
+            current = normalized.get(key)
+            if current is None:
+                normalized[key] = value
+            else:
+                current.merge(value)
+        return normalized
+
+
+def _restore(
+    strip_query: bool,
+    collapse_ids: bool,
+    rules: Tuple[Tuple[str, str], ...],
+    memo_size: int,
+) -> UrlNormalizer:
+    key = (strip_query, collapse_ids, rules, memo_size)
+    instance = _INSTANCES.get(key)
+    if instance is None:
+        instance = _INSTANCES[key] = UrlNormalizer(strip_query, collapse_ids, rules, memo_size)
+    return instance
+
+
+def normalizer_key(normalizer: Optional[UrlNormalizer]) -> Optional[dict]:
+    """Forma serializable de ``normalizer`` para claves de caché y checkpoints."""
+
+    if normalizer is None or not normalizer.enabled:
+        return None
+    return normalizer.to_dict()
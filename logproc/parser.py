@@ -6,18 +6,109 @@ El parser es puro y sin estado para ser seguro en multiproceso y testeable.
 from __future__ import annotations
 
 import re
-from typing import Optional, Tuple
+from typing import Dict, Mapping, Optional, Tuple, TypeVar
+
+from .histogram import LatencyHistogram
 
 ParsedLine = Tuple[str, int, int]
+ParsedBytesLine = Tuple[bytes, int, int]
+ParsedRecord = Tuple[str, int, int, str]
+ParsedBytesRecord = Tuple[bytes, int, int, bytes]
+ParsedEntry = Tuple[str, int, int, str, str]
+ParsedBytesEntry = Tuple[bytes, int, int, bytes, bytes]
+
+# Histogramas o sketches por URL: cualquier objeto con ``merge``.
+Mergeable = TypeVar("Mergeable")
 
 _LOG_RE = re.compile(
     r'^(?P<ip>\S+)\s+-\s+-\s+\[(?P<date>[^\]]+)\]\s+"(?P<method>[A-Z]+)\s+(?P<url>\S+)"\s+(?P<status>\d{3})\s+(?P<response_time>\d+)$'
 )
 
+# Variante sobre ``bytes`` con grupos posicionales: (url, status, response_time).
+_LOG_RE_BYTES = re.compile(
+    rb'^\S+\s+-\s+-\s+\[[^\]]+\]\s+"[A-Z]+\s+(\S+)"\s+(\d{3})\s+(\d+)$'
+)
+
+# Igual que ``_LOG_RE_BYTES`` pero capturando también la fecha (último grupo).
+_LOG_RE_BYTES_RECORD = re.compile(
+    rb'^\S+\s+-\s+-\s+\[([^\]]+)\]\s+"[A-Z]+\s+(\S+)"\s+(\d{3})\s+(\d+)$'
+)
+
+# Igual que ``_LOG_RE_BYTES_RECORD`` capturando además la IP (primer grupo).
+_LOG_RE_BYTES_ENTRY = re.compile(
+    rb'^(\S+)\s+-\s+-\s+\[([^\]]+)\]\s+"[A-Z]+\s+(\S+)"\s+(\d{3})\s+(\d+)$'
+)
+
+
+# Métodos aceptados por la ruta rápida (con la comilla de apertura incluida).
+# Otros métodos en mayúsculas siguen siendo válidos vía ``_LOG_RE``.
+_FAST_METHODS = frozenset('"' + method for method in ("GET", "POST", "PUT", "DELETE", "HEAD", "PATCH", "OPTIONS"))
+
+
+def _parse_fast(line: str) -> Optional[ParsedLine]:
+    """Parsea sin regex el layout fijo ``IP - - [date] "METHOD URL" STATUS RT``.
+
+    Separa la línea (ya sin espacios en los extremos) por espacios simples y
+    valida cada token en su posición. Solo acepta la forma canónica de 8 tokens
+    que ``_LOG_RE`` aceptaría con el mismo resultado; ante cualquier duda
+    devuelve ``None`` y ``parse_line`` delega en la regex.
+    """
+
+    parts = line.split(" ")
+    if len(parts) != 8:
+        return None
+
+    ip, dash1, dash2, date, method, url, status, response_time = parts
+    if (
+        method not in _FAST_METHODS
+        or dash1 != "-"
+        or dash2 != "-"
+        or date[:1] != "["
+        or not date.find("]") == len(date) - 1 >= 2
+        or url[-1:] != '"'
+        or len(url) < 2
+        or len(status) != 3
+        or not status.isdecimal()
+        or not response_time.isdecimal()
+        or not ip.isprintable()
+    ):
+        return None
+
+    url = url[:-1]
+    if not url.isprintable():
+        return None
+
+    return url, int(status), int(response_time)
+
+
+def parse_line_regex(line: str) -> Optional[ParsedLine]:
+    """Parsea una línea usando únicamente ``_LOG_RE``.
+
+    Es la implementación de referencia: define qué es una línea malformada y
+    contra ella se valida la ruta rápida de ``parse_line``.
+
+    Parámetros:
+        line: Línea cruda del log.
+
+    Retorna:
+        Tupla ``(url, status_code, response_time_ms)`` o ``None``.
+    """
+
+    match = _LOG_RE.match(line.strip())
+    if not match:
+        return None
+
+    groups = match.groupdict()
+    return groups["url"], int(groups["status"]), int(groups["response_time"])
+
 
 def parse_line(line: str) -> Optional[ParsedLine]:
     """Parsea una línea cruda a campos normalizados.
 
+    Intenta primero la ruta sin regex (``_parse_fast``) y recurre a
+    ``_LOG_RE`` solo para las líneas que esa ruta no puede resolver con
+    certeza, por lo que el resultado es idéntico al de ``parse_line_regex``.
+
     Parámetros:
         line: Línea cruda del log.
 
@@ -29,7 +120,12 @@ def parse_line(line: str) -> Optional[ParsedLine]:
         ``O(k)`` donde ``k`` es la longitud de la línea.
     """
 
-    match = _LOG_RE.match(line.strip())
+    stripped = line.strip()
+    parsed = _parse_fast(stripped)
+    if parsed is not None:
+        return parsed
+
+    match = _LOG_RE.match(stripped)
     if not match:
         return None
 
@@ -37,7 +133,141 @@ def parse_line(line: str) -> Optional[ParsedLine]:
     return groups["url"], int(groups["status"]), int(groups["response_time"])
 
 
+def parse_record(line: str) -> Optional[ParsedRecord]:
+    """Como ``parse_line`` pero conservando la fecha cruda de la línea.
+
+    Retorna:
+        Tupla ``(url, status_code, response_time_ms, fecha)`` donde ``fecha``
+        es el texto entre corchetes (ver ``timeseries.TimestampParser``), o
+        ``None`` para líneas malformadas.
+    """
+
+    stripped = line.strip()
+    parsed = _parse_fast(stripped)
+    if parsed is not None:
+        # La ruta rápida validó la forma ``IP - - [fecha] ...`` y la IP no
+        # tiene espacios, así que la primera aparición de " - - [" abre la fecha.
+        start = stripped.find(" - - [") + 6
+        return parsed[0], parsed[1], parsed[2], stripped[start : stripped.find("]", start)]
+
+    match = _LOG_RE.match(stripped)
+    if not match:
+        return None
+
+    groups = match.groupdict()
+    return groups["url"], int(groups["status"]), int(groups["response_time"]), groups["date"]
+
+
+def parse_entry(line: str) -> Optional[ParsedEntry]:
+    """Como ``parse_record`` pero conservando también la IP del cliente.
+
+    Retorna:
+        Tupla ``(url, status_code, response_time_ms, fecha, ip)`` o ``None``
+        para líneas malformadas.
+    """
+
+    stripped = line.strip()
+    parsed = _parse_fast(stripped)
+    if parsed is not None:
+        ip, _, rest = stripped.partition(" - - [")
+        return parsed[0], parsed[1], parsed[2], rest[: rest.find("]")], ip
+
+    match = _LOG_RE.match(stripped)
+    if not match:
+        return None
+
+    groups = match.groupdict()
+    return groups["url"], int(groups["status"]), int(groups["response_time"]), groups["date"], groups["ip"]
+
+
 def parse_log_line(line: str) -> Optional[ParsedLine]:
     """Alias retrocompatible para el nombre público anterior del parser."""
 
     return parse_line(line)
+
+
+def parse_line_bytes(line: bytes) -> Optional[ParsedBytesLine]:
+    """Parsea una línea cruda en ``bytes`` sin decodificarla.
+
+    Parámetros:
+        line: Línea cruda del log, tal como sale de ``reader.read_mmap_chunks``.
+
+    Retorna:
+        Tupla ``(url, status_code, response_time_ms)`` con la URL todavía en
+        ``bytes``; ``None`` para líneas malformadas. Decodificar la URL queda a
+        cargo de quien la cuenta, una sola vez por URL distinta.
+
+    Notas:
+        Para logs ASCII el resultado coincide con ``parse_line``. Con bytes no
+        ASCII, ``\\s``/``\\d`` solo reconocen espacios y dígitos ASCII.
+
+    Complejidad:
+        ``O(k)`` donde ``k`` es la longitud de la línea.
+    """
+
+    match = _LOG_RE_BYTES.match(line.strip())
+    if not match:
+        return None
+
+    url, status, response_time = match.groups()
+    return url, int(status), int(response_time)
+
+
+def parse_record_bytes(line: bytes) -> Optional[ParsedBytesRecord]:
+    """Como ``parse_line_bytes`` pero conservando la fecha cruda (en ``bytes``)."""
+
+    match = _LOG_RE_BYTES_RECORD.match(line.strip())
+    if not match:
+        return None
+
+    date, url, status, response_time = match.groups()
+    return url, int(status), int(response_time), date
+
+
+def parse_entry_bytes(line: bytes) -> Optional[ParsedBytesEntry]:
+    """Como ``parse_record_bytes`` pero conservando también la IP (en ``bytes``)."""
+
+    match = _LOG_RE_BYTES_ENTRY.match(line.strip())
+    if not match:
+        return None
+
+    ip, date, url, status, response_time = match.groups()
+    return url, int(status), int(response_time), date, ip
+
+
+def decode_url_counts(counts: Mapping[bytes, int]) -> Dict[str, int]:
+    """Decodifica una vez cada URL en ``bytes``, sumando las que colisionan.
+
+    Dos URLs distintas en ``bytes`` pueden decodificar al mismo ``str`` cuando
+    contienen secuencias UTF-8 inválidas (ambas pasan a ``U+FFFD``).
+    """
+
+    decoded: Dict[str, int] = {}
+    for raw_url, count in counts.items():
+        url = raw_url.decode("utf-8", errors="replace")
+        decoded[url] = decoded.get(url, 0) + count
+    return decoded
+
+
+def decode_url_histograms(histograms: Mapping[bytes, LatencyHistogram]) -> Dict[str, LatencyHistogram]:
+    """Como ``decode_url_counts`` para histogramas por URL, fusionando colisiones."""
+
+    return decode_url_mergeables(histograms)
+
+
+def decode_url_mergeables(values: Mapping[bytes, Mergeable]) -> Dict[str, Mergeable]:
+    """Decodifica las claves de objetos fusionables por URL (histogramas, sketches).
+
+    Los objetos de URLs que colisionan se fusionan con ``merge`` sobre el
+    primero, que debe ser propio del llamador.
+    """
+
+    decoded: Dict[str, Mergeable] = {}
+    for raw_url, value in values.items():
+        url = raw_url.decode("utf-8", errors="replace")
+        current = decoded.get(url)
+        if current is None:
+            decoded[url] = value
+        else:
+            current.merge(value)
+    return decoded
@@ -1,35 +1,128 @@
-"""Utilidades para ejecutar funciones bajo cProfile."""
+"""Utilidades para ejecutar funciones bajo cProfile.
+
+Con varios workers el profile del padre solo muestra esperas al pool: el
+parseo ocurre en otros procesos. Mientras corre ``run_with_profile``, los
+pools de ``scheduler`` y ``shared_chunks`` arrancan cada worker con
+``worker_initializer``, que activa cProfile en el worker y vuelca sus
+estadísticas al terminar el proceso en ``<stats_path>.worker-<pid>``. Al
+final el padre guarda las suyas en ``<stats_path>.parent`` y combina todo en
+``stats_path``; los archivos por proceso quedan al lado.
+"""
 
 from __future__ import annotations
 
 import cProfile
+import os
 import pstats
+from contextvars import ContextVar
+from multiprocessing import util
 from pathlib import Path
-from typing import Callable, TypeVar
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
 
 T = TypeVar("T")
 
+WORKER_SUFFIX = ".worker-"
+PARENT_SUFFIX = ".parent"
+
+# Prioridad de salida del volcado en el worker: corre antes que los
+# finalizadores de ``multiprocessing`` sin prioridad explícita.
+_DUMP_EXIT_PRIORITY = 10
+
+# Ruta base de los volcados de workers mientras corre ``run_with_profile``.
+_WORKER_STATS_PATH: ContextVar[Optional[str]] = ContextVar("logproc_worker_stats_path", default=None)
+
 
 def run_with_profile(func: Callable[[], T], stats_path: str = "profile.stats", top_n: int = 20) -> T:
-    """Ejecuta ``func`` bajo cProfile y persiste estadísticas del profiler.
+    """Ejecuta ``func`` bajo cProfile, incluidos sus workers, y persiste las estadísticas.
 
     Parámetros:
         func: Callable sin argumentos a ejecutar.
-        stats_path: Ruta destino para estadísticas de profile.
+        stats_path: Ruta destino de las estadísticas combinadas. Si hubo
+            workers, las de cada proceso quedan en ``<stats_path>.parent`` y
+            ``<stats_path>.worker-<pid>``.
         top_n: Cantidad de hotspots a imprimir por tiempo acumulado.
 
     Retorna:
         El valor retornado por ``func``.
     """
 
+    output = Path(stats_path)
+    for stale in worker_stats_paths(stats_path):
+        stale.unlink()
+    Path(f"{stats_path}{PARENT_SUFFIX}").unlink(missing_ok=True)
+
     profiler = cProfile.Profile()
+    token = _WORKER_STATS_PATH.set(str(output))
     profiler.enable()
-    result = func()
-    profiler.disable()
+    try:
+        result = func()
+    finally:
+        profiler.disable()
+        _WORKER_STATS_PATH.reset(token)
 
-    output = Path(stats_path)
-    profiler.dump_stats(str(output))
+    stats = combine_profiles(profiler, stats_path)
 
     print(f"\n[profile] Estadísticas guardadas en: {output}")
-    pstats.Stats(profiler).sort_stats("cumtime").print_stats(top_n)
+    stats.sort_stats("cumtime").print_stats(top_n)
     return result
+
+
+def combine_profiles(profiler: cProfile.Profile, stats_path: str) -> pstats.Stats:
+    """Combina el profile del padre con los volcados de workers en ``stats_path``.
+
+    Retorna:
+        Las estadísticas combinadas (solo las del padre si no hubo workers).
+    """
+
+    stats = pstats.Stats(profiler)
+    workers = worker_stats_paths(stats_path)
+    if workers:
+        profiler.dump_stats(f"{stats_path}{PARENT_SUFFIX}")
+        for path in workers:
+            stats.add(str(path))
+    stats.dump_stats(stats_path)
+    return stats
+
+
+def worker_stats_paths(stats_path: str) -> List[Path]:
+    """Volcados de workers asociados a ``stats_path``, ordenados por nombre."""
+
+    output = Path(stats_path)
+    return sorted(output.parent.glob(f"{output.name}{WORKER_SUFFIX}*"))
+
+
+def worker_initializer() -> Tuple[Optional[Callable[..., None]], Tuple[Any, ...]]:
+    """``(initializer, initargs)`` para los pools creados en este contexto.
+
+    Dentro de ``run_with_profile`` activa el profiling de cada worker; fuera,
+    devuelve ``(None, ())``.
+    """
+
+    stats_path = _WORKER_STATS_PATH.get()
+    if stats_path is None:
+        return None, ()
+    return start_worker_profile, (stats_path,)
+
+
+def start_worker_profile(stats_path: str) -> None:
+    """Inicializador de worker: activa cProfile y programa su volcado al salir.
+
+    El volcado se registra como finalizador de ``multiprocessing``, que corre
+    cuando el proceso worker termina normalmente (al cerrarse el pool). Un
+    worker terminado a la fuerza no deja archivo.
+    """
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    util.Finalize(None, _dump_worker_profile, args=(profiler, stats_path), exitpriority=_DUMP_EXIT_PRIORITY)
+
+
+def _dump_worker_profile(profiler: cProfile.Profile, stats_path: str) -> None:
+    profiler.disable()
+    path = f"{stats_path}{WORKER_SUFFIX}{os.getpid()}"
+    # Un mismo pid puede repetirse entre pools de la misma corrida.
+    suffix = 1
+    while os.path.exists(path):
+        path = f"{stats_path}{WORKER_SUFFIX}{os.getpid()}-{suffix}"
+        suffix += 1
+    profiler.dump_stats(path)
@@ -0,0 +1,356 @@
+"""Varias consultas sobre un mismo archivo en una sola pasada de lectura y parseo.
+
+En el dashboard es habitual lanzar varias corridas sobre el mismo archivo que
+solo difieren en ``slow_threshold`` y ``status_codes``. Procesarlas por
+separado relee y reparsea el archivo una vez por corrida, aunque lo único que
+cambia es el filtro final.
+
+Aquí cada lote se parsea una sola vez y se evalúa para todas las consultas
+(``QuerySpec``):
+
+- motor ``python``: las líneas se agrupan en registros distintos
+  ``(url, status, latencia[, bucket])`` con su cantidad, y cada consulta
+  recorre esos registros en lugar de las líneas;
+- motor ``numpy``: las columnas del lote se arman una vez y cada consulta
+  aplica sus máscaras (ver ``columnar.counts_from_columns``).
+
+Lo que no depende de la consulta (líneas, malformadas, histogramas de
+latencia, sketches de IPs) se calcula una vez por lote y se comparte entre los
+parciales.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import DefaultDict, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from . import columnar
+from .histogram import LatencyHistogram
+from .inputs import WorkUnit
+from .metrics import PartialStats
+from .normalize import UrlNormalizer
+from .parser import parse_entry, parse_entry_bytes, parse_line, parse_line_bytes, parse_record, parse_record_bytes
+from .reader import ByteRange, read_mmap_chunks, read_range_batches
+from .reducer import StatsAccumulator
+from .sketches import HyperLogLog, ip_sketches
+from .timeseries import TimestampParser, series_from_counts
+from .timings import TimedIterator, measured_partial
+from .worker import chunk_bytes_for
+
+
+@dataclass(frozen=True, slots=True)
+class QuerySpec:
+    """Parámetros de una consulta que cambian solo el filtrado.
+
+    Attributes:
+        slow_threshold: Umbral en milisegundos para requests "lentas".
+        status_codes: Códigos HTTP a contabilizar.
+    """
+
+    slow_threshold: int = 200
+    status_codes: Tuple[int, ...] = (500,)
+
+    def __post_init__(self) -> None:
+        codes = tuple(self.status_codes)
+        if not codes:
+            raise ValueError("status_codes no puede estar vacío")
+        if self.slow_threshold < 0:
+            raise ValueError("slow_threshold debe ser >= 0")
+        object.__setattr__(self, "status_codes", codes)
+
+
+@measured_partial
+def process_batch_queries(
+    batch: Union[Iterable[str], bytes],
+    queries: Sequence[QuerySpec],
+    backend: str = "text",
+    engine: str = "python",
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> List[PartialStats]:
+    """Parsea un lote una vez y devuelve un ``PartialStats`` por consulta.
+
+    Parámetros:
+        batch: Líneas (``backend="text"``) o bloque de bytes con líneas
+            completas (``backend="mmap"``).
+        queries: Consultas a evaluar.
+        backend: ``"text"`` o ``"mmap"``, ver ``api.BACKENDS``.
+        engine: ``"python"`` o ``"numpy"``; sin NumPy se usa ``"python"``.
+        normalizer: Normalización de URLs, ver ``worker.process_batch``.
+        url_histograms: Histogramas de latencia por URL, ver ``worker.process_batch``.
+        time_bucket: Serie temporal por buckets, ver ``worker.process_batch``.
+        distinct_ips: IPs distintas, ver ``worker.process_batch``.
+
+    Retorna:
+        Parciales en el orden de ``queries``, cada uno idéntico al de
+        ``worker.batch_function(backend, engine)`` con esa consulta. Los
+        histogramas de latencia y los sketches de IPs son el mismo objeto en
+        todos (no se modifican al fusionar).
+    """
+
+    decode = backend == "mmap"
+    if decode:
+        lines: Iterable = batch.split(b"\n")
+        if lines and not lines[-1]:
+            lines.pop()
+        parse = parse_entry_bytes if distinct_ips else parse_record_bytes if time_bucket else parse_line_bytes
+    else:
+        lines = batch
+        parse = parse_entry if distinct_ips else parse_record if time_bucket else parse_line
+
+    evaluate = _evaluate_columns if engine == "numpy" and columnar.HAS_NUMPY else _evaluate_records
+    return evaluate(lines, parse, queries, decode, normalizer, url_histograms, time_bucket, distinct_ips)
+
+
+def _ip_sketches(
+    ip_pairs: Set[Tuple[Hashable, Hashable]],
+    distinct_ips: int,
+    decode: bool,
+    normalizer: Optional[UrlNormalizer],
+) -> Tuple[HyperLogLog, Dict[Hashable, HyperLogLog]]:
+    total, by_url = ip_sketches(ip_pairs, distinct_ips)
+    if decode or normalizer is not None:
+        rekeyed: Dict[Hashable, HyperLogLog] = {}
+        for url, sketch in by_url.items():
+            key = _url_key(url, decode, normalizer)
+            current = rekeyed.get(key)
+            if current is None:
+                rekeyed[key] = sketch
+            else:
+                current.merge(sketch)
+        by_url = rekeyed
+    return total, by_url
+
+
+def _url_key(url: Hashable, decode: bool, normalizer: Optional[UrlNormalizer]) -> Hashable:
+    if decode:
+        url = url.decode("utf-8", errors="replace")
+    return normalizer(url) if normalizer is not None else url
+
+
+def _evaluate_records(
+    lines, parse, queries, decode, normalizer, url_histograms, time_bucket, distinct_ips
+) -> List[PartialStats]:
+    records: Counter[tuple] = Counter()
+    total_lines = 0
+    bad_lines = 0
+    timestamps = TimestampParser() if time_bucket else None
+    ip_pairs: Optional[Set[Tuple[Hashable, Hashable]]] = set() if distinct_ips else None
+
+    for line in lines:
+        total_lines += 1
+        parsed = parse(line)
+        if parsed is None:
+            bad_lines += 1
+            continue
+        if ip_pairs is not None:
+            ip_pairs.add((parsed[0], parsed[4]))
+            parsed = parsed[:4] if timestamps is not None else parsed[:3]
+        if timestamps is None:
+            records[parsed] += 1
+        else:
+            url, status, response_time, date = parsed
+            epoch = timestamps(date)
+            records[(url, status, response_time, -1 if epoch is None else epoch - epoch % time_bucket)] += 1
+
+    if decode or normalizer is not None:
+        # Una decodificación/normalización por URL distinta, no por registro.
+        keys: Dict[Hashable, Hashable] = {}
+        rekeyed: Counter[tuple] = Counter()
+        for record, count in records.items():
+            url = record[0]
+            key = keys.get(url)
+            if key is None:
+                key = keys[url] = _url_key(url, decode, normalizer)
+            rekeyed[(key,) + record[1:]] += count
+        records = rekeyed
+
+    latencies: Counter[int] = Counter()
+    url_latencies: DefaultDict[Hashable, Counter[int]] = defaultdict(Counter)
+    for record, count in records.items():
+        latencies[record[2]] += count
+        if url_histograms:
+            url_latencies[record[0]][record[2]] += count
+    latency = LatencyHistogram()
+    latency.add_counts(latencies)
+    latency_by_url: Dict[Hashable, LatencyHistogram] = {}
+    for url, counts in url_latencies.items():
+        histogram = latency_by_url[url] = LatencyHistogram()
+        histogram.add_counts(counts)
+    ip_sketch, ip_sketch_by_url = (
+        _ip_sketches(ip_pairs, distinct_ips, decode, normalizer) if ip_pairs is not None else (None, {})
+    )
+
+    partials: List[PartialStats] = []
+    for query in queries:
+        target_codes = set(query.status_codes)
+        slow_threshold = query.slow_threshold
+        stats = PartialStats(
+            total_lines=total_lines,
+            bad_lines=bad_lines,
+            latency=latency,
+            latency_by_url=latency_by_url,
+            ip_sketch=ip_sketch,
+            ip_sketch_by_url=ip_sketch_by_url,
+        )
+        status_by_url: Dict[Hashable, int] = {}
+        slow_by_url: Dict[Hashable, int] = {}
+        series_counter: Counter[Tuple[int, bool, bool]] = Counter()
+        for record, count in records.items():
+            url = record[0]
+            is_status = record[1] in target_codes
+            if is_status:
+                stats.total_status += count
+                status_by_url[url] = status_by_url.get(url, 0) + count
+            is_slow = record[2] > slow_threshold
+            if is_slow:
+                stats.total_slow += count
+                slow_by_url[url] = slow_by_url.get(url, 0) + count
+            if time_bucket and record[3] >= 0:
+                series_counter[(record[3], is_status, is_slow)] += count
+        stats.status_by_url = status_by_url
+        stats.slow_by_url = slow_by_url
+        stats.time_series = series_from_counts(series_counter)
+        partials.append(stats)
+    return partials
+
+
+def _evaluate_columns(
+    lines, parse, queries, decode, normalizer, url_histograms, time_bucket, distinct_ips
+) -> List[PartialStats]:
+    np = columnar.np
+    lines = lines if isinstance(lines, list) else list(lines)
+    timestamps = TimestampParser() if time_bucket else None
+    ip_pairs: Optional[Set[Tuple[Hashable, Hashable]]] = set() if distinct_ips else None
+    try:
+        urls, codes, statuses, response_times, total_lines, bad_lines, epochs = columnar._parse_columns(
+            lines, parse, timestamps, ip_pairs
+        )
+    except OverflowError:
+        # Alguna latencia no entra en ``uint64`` (ver ``columnar``).
+        return _evaluate_records(lines, parse, queries, decode, normalizer, url_histograms, time_bucket, distinct_ips)
+    ip_sketch, ip_sketch_by_url = (
+        _ip_sketches(ip_pairs, distinct_ips, decode, normalizer) if ip_pairs is not None else (None, {})
+    )
+
+    if decode or normalizer is not None:
+        # Se reescribe la tabla de URLs y se remapean los códigos que colisionan.
+        index: Dict[Hashable, int] = {}
+        remap = [index.setdefault(_url_key(url, decode, normalizer), len(index)) for url in urls]
+        if codes.size:
+            codes = np.asarray(remap, dtype=np.uint32)[codes]
+        urls = list(index)
+
+    latency = LatencyHistogram()
+    latency.add_array(response_times)
+    latency_by_url = columnar.url_histograms_from_columns(urls, codes, response_times) if url_histograms else {}
+
+    partials: List[PartialStats] = []
+    for query in queries:
+        stats = columnar.counts_from_columns(
+            urls,
+            codes,
+            statuses,
+            response_times,
+            query.status_codes,
+            query.slow_threshold,
+            epochs=epochs,
+            time_bucket=time_bucket,
+        )
+        stats.total_lines = total_lines
+        stats.bad_lines = bad_lines
+        stats.latency = latency
+        stats.latency_by_url = latency_by_url
+        stats.ip_sketch = ip_sketch
+        stats.ip_sketch_by_url = ip_sketch_by_url
+        partials.append(stats)
+    return partials
+
+
+def process_range_queries(
+    byte_range: ByteRange,
+    path: str,
+    queries: Sequence[QuerySpec],
+    batch_size: int = 10_000,
+    backend: str = "text",
+    engine: str = "python",
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> List[PartialStats]:
+    """Como ``worker.process_range`` pero con un parcial por consulta.
+
+    Retorna:
+        Un ``PartialStats`` por consulta para todo el rango, en el orden de
+        ``queries``.
+    """
+
+    start, end = byte_range
+    if backend == "mmap":
+        batches: Iterable = read_mmap_chunks(path, chunk_bytes=chunk_bytes_for(batch_size), start=start, end=end)
+    else:
+        batches = read_range_batches(path, start, end, batch_size=batch_size)
+    batches = TimedIterator(batches)
+
+    accumulators = [StatsAccumulator() for _ in queries]
+    for batch in batches:
+        parts = process_batch_queries(
+            batch,
+            queries,
+            backend=backend,
+            engine=engine,
+            normalizer=normalizer,
+            url_histograms=url_histograms,
+            time_bucket=time_bucket,
+            distinct_ips=distinct_ips,
+        )
+        for accumulator, part in zip(accumulators, parts):
+            accumulator.add(part)
+    results = [accumulator.result() for accumulator in accumulators]
+    for stats in results:
+        stats.read_seconds += batches.seconds
+    return results
+
+
+def process_unit_queries(
+    unit: WorkUnit,
+    queries: Sequence[QuerySpec],
+    batch_size: int = 10_000,
+    backend: str = "text",
+    engine: str = "python",
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> List[Tuple[str, List[PartialStats]]]:
+    """Procesa los tramos de una unidad de ``inputs.plan_work`` para todas las consultas.
+
+    Retorna:
+        Un par ``(ruta, parciales)`` por tramo, con un parcial por consulta.
+
+    Errores:
+        ValueError: Si algún tramo es de un archivo comprimido.
+    """
+
+    results: List[Tuple[str, List[PartialStats]]] = []
+    for piece in unit.pieces:
+        if piece.codec is not None:
+            raise ValueError("las consultas múltiples no admiten entradas comprimidas")
+        parts = process_range_queries(
+            (piece.start, piece.end),
+            piece.path,
+            queries,
+            batch_size=batch_size,
+            backend=backend,
+            engine=engine,
+            normalizer=normalizer,
+            url_histograms=url_histograms,
+            time_bucket=time_bucket,
+            distinct_ips=distinct_ips,
+        )
+        results.append((piece.path, parts))
+    return results
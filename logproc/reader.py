@@ -2,12 +2,34 @@
 
 from __future__ import annotations
 
-from typing import Generator, List
+import io
+import mmap
+import os
+import queue
+import threading
+from time import perf_counter
+from typing import BinaryIO, Callable, Generator, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from .compression import open_log, open_log_bytes
+
+ByteRange = Tuple[int, int]
+T = TypeVar("T")
+
+# Tamaño de cada ``readinto`` del hilo lector: bloques grandes amortizan la
+# latencia de cada lectura en almacenamiento de red.
+PREFETCH_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Cada cuánto (segundos) el hilo lector revisa si el consumidor abandonó la
+# lectura mientras espera lugar en la cola.
+_STOP_POLL_SECONDS = 0.1
 
 
 def read_batches(path: str, batch_size: int = 10_000) -> Generator[List[str], None, None]:
     """Entrega lotes de tamaño fijo a partir de un archivo de texto.
 
+    Los archivos comprimidos con gzip, bz2 o xz se descomprimen en *streaming*
+    (ver ``compression.open_log``), sin escribir una copia en disco.
+
     Parámetros:
         path: Ruta al archivo de entrada.
         batch_size: Cantidad de líneas por lote emitido.
@@ -28,7 +50,7 @@ def read_batches(path: str, batch_size: int = 10_000) -> Generator[List[str], No
         raise ValueError("batch_size debe ser > 0")
 
     batch: List[str] = []
-    with open(path, "r", encoding="utf-8", errors="replace") as handle:
+    with open_log(path) as handle:
         for line in handle:
             batch.append(line)
             if len(batch) == batch_size:
@@ -37,3 +59,371 @@ def read_batches(path: str, batch_size: int = 10_000) -> Generator[List[str], No
 
     if batch:
         yield batch
+
+
+def split_ranges(path: str, parts: int, start: int = 0, end: Optional[int] = None) -> List[ByteRange]:
+    """Divide un archivo en rangos de bytes alineados a fin de línea.
+
+    Cada rango ``(inicio, fin)`` comienza al inicio de una línea y termina justo
+    después de un ``\\n`` (o en ``end``), de modo que ninguna línea queda partida
+    entre dos rangos.
+
+    Parámetros:
+        path: Ruta al archivo de entrada.
+        parts: Cantidad deseada de rangos; puede devolver menos en archivos chicos.
+        start: Offset inicial (debe coincidir con un inicio de línea).
+        end: Offset final exclusivo. ``None`` usa el tamaño del archivo.
+
+    Retorna:
+        Lista ordenada de rangos no vacíos y contiguos que cubren ``[start, end)``.
+
+    Errores:
+        ValueError: Si ``parts <= 0``.
+        OSError: Si el archivo no puede abrirse/leerse.
+
+    Rendimiento:
+        Solo lee una línea por frontera, así que el costo es ``O(parts)`` lecturas.
+    """
+
+    if parts <= 0:
+        raise ValueError("parts debe ser > 0")
+
+    if end is None:
+        end = os.path.getsize(path)
+    if end <= start:
+        return []
+
+    chunk = (end - start) // parts or 1
+    boundaries = [start]
+    with open(path, "rb") as handle:
+        for index in range(1, parts):
+            target = start + index * chunk
+            if target <= boundaries[-1]:
+                continue
+            if target >= end:
+                break
+            handle.seek(target - 1)
+            handle.readline()
+            aligned = min(handle.tell(), end)
+            if aligned > boundaries[-1]:
+                boundaries.append(aligned)
+    if boundaries[-1] < end:
+        boundaries.append(end)
+
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def read_range_batches(
+    path: str,
+    start: int,
+    end: int,
+    batch_size: int = 10_000,
+) -> Generator[List[str], None, None]:
+    """Entrega lotes de líneas contenidas en el rango de bytes ``[start, end)``.
+
+    Pensado para que cada worker abra y lea su propio tramo del archivo, en
+    lugar de recibir las líneas serializadas desde el proceso padre.
+
+    Parámetros:
+        path: Ruta al archivo de entrada.
+        start: Offset inicial, alineado a inicio de línea (ver ``split_ranges``).
+        end: Offset final exclusivo, alineado a fin de línea.
+        batch_size: Cantidad de líneas por lote emitido.
+
+    Entrega:
+        Listas de líneas decodificadas como en ``read_batches``.
+
+    Errores:
+        ValueError: Si ``batch_size <= 0``.
+        OSError: Si el archivo no puede abrirse/leerse.
+    """
+
+    if batch_size <= 0:
+        raise ValueError("batch_size debe ser > 0")
+
+    batch: List[str] = []
+    position = start
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        while position < end:
+            raw = handle.readline()
+            if not raw:
+                break
+            position += len(raw)
+            batch.append(raw.decode("utf-8", errors="replace"))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+def read_mmap_chunks(
+    path: str,
+    chunk_bytes: int = 1 << 20,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Generator[bytes, None, None]:
+    """Entrega bloques de bytes alineados a fin de línea usando ``mmap``.
+
+    No decodifica ni separa líneas: el consumidor trabaja directamente sobre
+    ``bytes`` (ver ``parser.parse_line_bytes``). Se entregan copias ``bytes`` en
+    lugar de ``memoryview`` para poder cerrar el mapeo aunque el consumidor
+    conserve el bloque o lo envíe a otro proceso.
+
+    Parámetros:
+        path: Ruta al archivo de entrada.
+        chunk_bytes: Tamaño aproximado de cada bloque; se extiende hasta el
+            siguiente ``\n`` para no cortar líneas.
+        start: Offset inicial, alineado a inicio de línea.
+        end: Offset final exclusivo. ``None`` usa el tamaño del archivo.
+
+    Entrega:
+        Bloques ``bytes`` que contienen solo líneas completas (la última línea
+        del archivo puede no terminar en ``\n``).
+
+    Errores:
+        ValueError: Si ``chunk_bytes <= 0``.
+        OSError: Si el archivo no puede abrirse/mapearse.
+
+    Rendimiento:
+        - Tiempo: ``O(n)`` sobre los bytes del rango, sin decodificación UTF-8.
+        - Memoria: ``O(chunk_bytes)`` residente más las páginas mapeadas.
+    """
+
+    if chunk_bytes <= 0:
+        raise ValueError("chunk_bytes debe ser > 0")
+
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if end <= start:
+            return
+
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+            position = start
+            while position < end:
+                limit = position + chunk_bytes
+                if limit >= end:
+                    cut = end
+                else:
+                    newline = mapped.find(b"\n", limit - 1, end)
+                    cut = end if newline == -1 else newline + 1
+                yield mapped[position:cut]
+                position = cut
+
+
+def read_raw_chunks(
+    path: str,
+    chunk_bytes: int = PREFETCH_CHUNK_BYTES,
+    start: int = 0,
+    end: Optional[int] = None,
+    chunk_size: Optional[Callable[[], int]] = None,
+) -> Generator[bytes, None, None]:
+    """Entrega bloques de bytes alineados a fin de línea leídos con ``readinto``.
+
+    Cada lectura llena un buffer de ``chunk_bytes``; la línea incompleta del
+    final se arrastra al bloque siguiente. A diferencia de
+    ``read_mmap_chunks``, el costo de E/S ocurre dentro de este generador (y no
+    al tocar las páginas mapeadas), por lo que puede correr en el hilo de
+    ``Prefetcher`` mientras otro hilo parsea.
+
+    Parámetros:
+        path: Ruta al archivo de entrada (sin comprimir).
+        chunk_bytes: Bytes pedidos en cada lectura.
+        start: Offset inicial, alineado a inicio de línea.
+        end: Offset final exclusivo. ``None`` lee hasta el final del archivo.
+        chunk_size: Si se da, se consulta antes de cada lectura y reemplaza a
+            ``chunk_bytes`` (p. ej. ``memory.MemoryBudget.next_chunk_bytes``).
+
+    Entrega:
+        Bloques ``bytes`` con solo líneas completas (la última línea del
+        archivo puede no terminar en ``\n``). Una línea más larga que
+        ``chunk_bytes`` se entrega entera en un bloque mayor.
+
+    Errores:
+        ValueError: Si ``chunk_bytes <= 0``.
+        OSError: Si el archivo no puede abrirse/leerse.
+    """
+
+    if chunk_bytes <= 0:
+        raise ValueError("chunk_bytes debe ser > 0")
+
+    with open(path, "rb", buffering=0) as handle:
+        size = os.fstat(handle.fileno()).st_size
+        end = size if end is None else min(end, size)
+        handle.seek(start)
+        yield from _aligned_chunks(handle, chunk_bytes, max(0, end - start), chunk_size)
+
+
+def read_log_chunks(path: str, chunk_bytes: int = PREFETCH_CHUNK_BYTES) -> Generator[bytes, None, None]:
+    """Como ``read_raw_chunks``, pero descomprimiendo gzip/bz2/xz en *streaming*.
+
+    Errores:
+        ValueError: Si ``chunk_bytes <= 0``.
+        OSError: Si el archivo no puede abrirse/leerse.
+    """
+
+    if chunk_bytes <= 0:
+        raise ValueError("chunk_bytes debe ser > 0")
+
+    with open_log_bytes(path) as handle:
+        yield from _aligned_chunks(handle, chunk_bytes, None)
+
+
+def _aligned_chunks(
+    handle: BinaryIO,
+    chunk_bytes: int,
+    remaining: Optional[int],
+    chunk_size: Optional[Callable[[], int]] = None,
+) -> Generator[bytes, None, None]:
+    """Lee ``handle`` con ``readinto`` y arrastra la línea incompleta de cada bloque."""
+
+    carry = b""
+    while remaining is None or remaining > 0:
+        wanted = chunk_size() if chunk_size is not None else chunk_bytes
+        buffer = bytearray(wanted if remaining is None else min(wanted, remaining))
+        read = handle.readinto(buffer)
+        if not read:
+            break
+        if remaining is not None:
+            remaining -= read
+        del buffer[read:]
+        cut = buffer.rfind(b"\n") + 1
+        if not cut:
+            carry += buffer
+            continue
+        block = carry + buffer[:cut] if carry else bytes(buffer[:cut])
+        carry = bytes(buffer[cut:])
+        yield block
+    if carry:
+        yield carry
+
+
+def chunk_lines(chunk: bytes) -> List[str]:
+    """Separa un bloque alineado a fin de línea en líneas como ``read_batches``.
+
+    Decodifica UTF-8 reemplazando bytes inválidos y reconoce ``\\n``,
+    ``\\r\\n`` y ``\\r`` como fin de línea (saltos universales del modo
+    texto), que quedan como ``\\n`` al final de cada línea.
+    """
+
+    return list(io.StringIO(chunk.decode("utf-8", errors="replace"), newline=None))
+
+
+def batches_from_chunks(chunks: Iterable[bytes], batch_size: int = 10_000) -> Generator[List[str], None, None]:
+    """Convierte bloques alineados a fin de línea en los mismos lotes que ``read_batches``.
+
+    Los bloques se cortan solo en ``\\n`` (ver ``read_raw_chunks``): un log
+    con fines de línea ``\\r`` sin ``\\n`` llega como un único bloque, aunque
+    los lotes resultantes son los mismos.
+
+    Errores:
+        ValueError: Si ``batch_size <= 0``.
+    """
+
+    if batch_size <= 0:
+        raise ValueError("batch_size debe ser > 0")
+
+    batch: List[str] = []
+    for chunk in chunks:
+        lines = chunk_lines(chunk)
+        while lines:
+            room = batch_size - len(batch)
+            batch.extend(lines[:room])
+            del lines[:room]
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+class Prefetcher(Generic[T]):
+    """Consume ``items`` en un hilo de fondo y los entrega por una cola acotada.
+
+    Pensado para solapar la E/S del lector (p. ej. ``read_raw_chunks``, cuyas
+    lecturas liberan el GIL) con el parseo en el hilo principal o con el envío
+    de lotes al pool.
+
+    Parámetros:
+        items: Iterable a consumir en segundo plano.
+        depth: Máximo de elementos leídos por adelantado.
+
+    Attributes:
+        wait_seconds: Tiempo total que el consumidor pasó bloqueado esperando
+            un elemento. Cercano a cero indica que la lectura va por delante;
+            alto, que el cuello de botella es la E/S.
+        items_read: Elementos entregados hasta ahora.
+
+    Errores:
+        ValueError: Si ``depth <= 0``. Las excepciones del hilo lector se
+        relanzan en el consumidor.
+    """
+
+    _DONE = object()
+
+    def __init__(self, items: Iterable[T], depth: int = 2) -> None:
+        if depth <= 0:
+            raise ValueError("depth debe ser > 0")
+        self.wait_seconds = 0.0
+        self.items_read = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._items = items
+        # El hilo arranca al empezar a iterar, no al construir.
+        self._thread = threading.Thread(target=self._produce, args=(items,), daemon=True)
+
+    def _produce(self, items: Iterable[T]) -> None:
+        try:
+            for item in items:
+                if not self._put((False, item)):
+                    return
+        except BaseException as exc:  # noqa: BLE001 - se relanza en el consumidor
+            self._put((True, exc))
+            return
+        self._put((False, self._DONE))
+
+    def _put(self, entry: Tuple[bool, object]) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(entry, timeout=_STOP_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[T]:
+        self._thread.start()
+        try:
+            while True:
+                started = perf_counter()
+                failed, item = self._queue.get()
+                self.wait_seconds += perf_counter() - started
+                if failed:
+                    raise item
+                if item is self._DONE:
+                    return
+                self.items_read += 1
+                yield item
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Detiene el hilo lector y cierra ``items`` (los pendientes se descartan).
+
+        Cerrar el generador de origen (p. ej. ``read_raw_chunks``) libera su
+        archivo aunque el consumidor haya cortado antes del final.
+        """
+
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        close = getattr(self._items, "close", None)
+        if close is not None:
+            close()
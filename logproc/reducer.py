@@ -3,16 +3,185 @@
 from __future__ import annotations
 
 from collections import Counter
-from typing import Iterable
+from time import perf_counter
+from typing import Dict, Iterable, Mapping, Optional, Tuple
 
+from .compact import UrlTable
+from .histogram import LatencyHistogram, merge_histograms
 from .metrics import PartialStats
+from .sketches import HeavyHitters, HyperLogLog, SketchConfig
+from .timeseries import TimeSeries, merge_series
+from .timings import add_time, current_timings
 
 
-def merge_partials(partials: Iterable[PartialStats]) -> PartialStats:
+class StatsAccumulator:
+    """Acumulador incremental de ``PartialStats``.
+
+    Permite ir sumando parciales a medida que llegan (p. ej. en modo
+    ``follow``) y materializar el estado fusionado en cualquier momento.
+
+    Con ``sketch`` los conteos por URL (exactos o ya resumidos) se pliegan en
+    sketches ``HeavyHitters`` y la memoria queda acotada por su capacidad.
+
+    Sin ``sketch``, los parciales que llegan de otro proceso traen sus conteos
+    en columnas (``PartialStats.packed_urls``) y se suman en una ``UrlTable``
+    remapeando ids, sin pasar por diccionarios; los generados en el mismo
+    proceso se suman con ``Counter.update``.
+
+    El tiempo de ``add`` y ``result`` se registra como etapa ``merge`` (ver
+    ``timings``); en un worker, donde no hay registro activo, se acumula en
+    ``merge_seconds`` y viaja en el parcial resultante. Los
+    ``process_seconds``/``read_seconds``/``merge_seconds`` de los parciales
+    se suman y de sus ``rss_bytes``/``peak_rss_bytes`` se guarda el máximo.
+    """
+
+    __slots__ = (
+        "total_lines",
+        "bad_lines",
+        "total_status",
+        "total_slow",
+        "status_counter",
+        "slow_counter",
+        "url_table",
+        "sketch",
+        "status_sketch",
+        "slow_sketch",
+        "latency",
+        "latency_by_url",
+        "time_series",
+        "ip_sketch",
+        "ip_sketch_by_url",
+        "process_seconds",
+        "read_seconds",
+        "merge_seconds",
+        "rss_bytes",
+        "peak_rss_bytes",
+    )
+
+    def __init__(self, sketch: Optional[SketchConfig] = None) -> None:
+        self.total_lines = 0
+        self.bad_lines = 0
+        self.total_status = 0
+        self.total_slow = 0
+        self.status_counter: Counter[str] = Counter()
+        self.slow_counter: Counter[str] = Counter()
+        self.url_table = UrlTable()
+        self.sketch = sketch
+        self.status_sketch = HeavyHitters(sketch) if sketch is not None else None
+        self.slow_sketch = HeavyHitters(sketch) if sketch is not None else None
+        self.latency = LatencyHistogram()
+        self.latency_by_url: Dict[str, LatencyHistogram] = {}
+        self.time_series: TimeSeries = {}
+        self.ip_sketch: Optional[HyperLogLog] = None
+        self.ip_sketch_by_url: Dict[str, HyperLogLog] = {}
+        self.process_seconds = 0.0
+        self.read_seconds = 0.0
+        self.merge_seconds = 0.0
+        self.rss_bytes = 0
+        self.peak_rss_bytes = 0
+
+    def add(self, part: PartialStats) -> None:
+        """Suma ``part`` al estado acumulado."""
+
+        started = perf_counter()
+        self._add(part)
+        self._record_merge(perf_counter() - started)
+
+    def _add(self, part: PartialStats) -> None:
+        self.process_seconds += part.process_seconds
+        self.read_seconds += part.read_seconds
+        self.merge_seconds += part.merge_seconds
+        self.rss_bytes = max(self.rss_bytes, part.rss_bytes)
+        self.peak_rss_bytes = max(self.peak_rss_bytes, part.peak_rss_bytes)
+        self.total_lines += part.total_lines
+        self.bad_lines += part.bad_lines
+        self.total_status += part.total_status
+        self.total_slow += part.total_slow
+        self.latency.merge(part.latency)
+        if part.latency_by_url:
+            merge_histograms(self.latency_by_url, part.latency_by_url)
+        if part.time_series:
+            merge_series(self.time_series, part.time_series)
+        if part.ip_sketch is not None:
+            if self.ip_sketch is None:
+                self.ip_sketch = part.ip_sketch.copy()
+            else:
+                self.ip_sketch.merge(part.ip_sketch)
+            merge_histograms(self.ip_sketch_by_url, part.ip_sketch_by_url)
+        if self.sketch is None:
+            if part.packed_urls is not None:
+                self.url_table.add(part.packed_urls)
+            self.status_counter.update(part.status_by_url)
+            self.slow_counter.update(part.slow_by_url)
+            return
+        part.unpack_urls()
+        _fold(self.status_sketch, part.status_sketch, part.status_by_url)
+        _fold(self.slow_sketch, part.slow_sketch, part.slow_by_url)
+
+    def result(self) -> PartialStats:
+        """Devuelve un ``PartialStats`` con el estado acumulado hasta ahora."""
+
+        started = perf_counter()
+        merged = self._result()
+        self._record_merge(perf_counter() - started)
+        merged.merge_seconds = self.merge_seconds
+        return merged
+
+    def _record_merge(self, seconds: float) -> None:
+        if current_timings() is None:
+            self.merge_seconds += seconds
+        else:
+            add_time("merge", seconds)
+
+    def _result(self) -> PartialStats:
+        if self.sketch is not None:
+            self.status_sketch.compact()
+            self.slow_sketch.compact()
+        status_by_url, slow_by_url = self._url_counts()
+        return PartialStats(
+            total_lines=self.total_lines,
+            bad_lines=self.bad_lines,
+            total_status=self.total_status,
+            total_slow=self.total_slow,
+            status_by_url=status_by_url,
+            slow_by_url=slow_by_url,
+            status_sketch=self.status_sketch,
+            slow_sketch=self.slow_sketch,
+            latency=self.latency.copy(),
+            latency_by_url=dict(self.latency_by_url),
+            time_series={start: list(counts) for start, counts in self.time_series.items()},
+            ip_sketch=self.ip_sketch.copy() if self.ip_sketch is not None else None,
+            ip_sketch_by_url=dict(self.ip_sketch_by_url),
+            process_seconds=self.process_seconds,
+            read_seconds=self.read_seconds,
+            merge_seconds=self.merge_seconds,
+            rss_bytes=self.rss_bytes,
+            peak_rss_bytes=self.peak_rss_bytes,
+        )
+
+    def _url_counts(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        if not self.url_table:
+            return dict(self.status_counter), dict(self.slow_counter)
+        status_by_url, slow_by_url = self.url_table.counts()
+        for target, counter in ((status_by_url, self.status_counter), (slow_by_url, self.slow_counter)):
+            for url, count in counter.items():
+                target[url] = target.get(url, 0) + count
+        return status_by_url, slow_by_url
+
+
+def _fold(target: HeavyHitters, sketch: Optional[HeavyHitters], counts: Mapping[str, int]) -> None:
+    if sketch is not None:
+        target.merge(sketch)
+    if counts:
+        target.update(counts)
+
+
+def merge_partials(partials: Iterable[PartialStats], sketch: Optional[SketchConfig] = None) -> PartialStats:
     """Fusiona un flujo de ``PartialStats`` en un único ``PartialStats``.
 
     Parámetros:
         partials: Iterable con salidas parciales de workers.
+        sketch: Activa el modo aproximado (ver ``StatsAccumulator``).
 
     Retorna:
         Un objeto ``PartialStats`` fusionado.
@@ -21,18 +190,7 @@ def merge_partials(partials: Iterable[PartialStats]) -> PartialStats:
         ``O(p + u)`` donde ``p`` es la cantidad de parciales y ``u`` URLs únicas.
     """
 
-    merged = PartialStats()
-    merged_status_counter: Counter[str] = Counter()
-    merged_slow_counter: Counter[str] = Counter()
-
+    accumulator = StatsAccumulator(sketch)
     for part in partials:
-        merged.total_lines += part.total_lines
-        merged.bad_lines += part.bad_lines
-        merged.total_status += part.total_status
-        merged.total_slow += part.total_slow
-        merged_status_counter.update(part.status_by_url)
-        merged_slow_counter.update(part.slow_by_url)
-
-    merged.status_by_url = dict(merged_status_counter)
-    merged.slow_by_url = dict(merged_slow_counter)
-    return merged
+        accumulator.add(part)
+    return accumulator.result()
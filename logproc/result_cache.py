@@ -0,0 +1,206 @@
+"""Caché acotada de resultados para llamadas idénticas a ``process_log``.
+
+Una entrada se identifica por la huella de los archivos de entrada (ver
+``logproc.fingerprint``) y los parámetros que cambian el resultado
+(``slow_threshold``, el conjunto de ``status_codes`` y el parser, de texto o de
+bytes, que pueden diferir ante bytes no ASCII); parámetros de ejecución como
+``batch_size`` o ``workers`` no forman parte de la clave.
+
+Las entradas viven en memoria (LRU + TTL) y, si se indica un directorio,
+también en disco como JSON para reutilizarlas entre procesos (p. ej. la CLI).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union
+
+from .fingerprint import FileFingerprint
+from .metrics import ProcessingResult
+from .sketches import SketchConfig
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+SUFFIX = ".json"
+
+# Se incrementa cuando cambia el contenido de ``ProcessingResult`` para no
+# devolver entradas guardadas sin los campos nuevos (p. ej. ``latency``) o
+# con otro orden de empates en los tops.
+KEY_VERSION = 4
+
+
+def default_cache_dir() -> Path:
+    """Directorio por defecto: ``$XDG_CACHE_HOME/logproc/results`` o ``~/.cache/...``."""
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "logproc" / "results"
+
+
+def result_key(
+    fingerprint: Union[FileFingerprint, Sequence[FileFingerprint]],
+    slow_threshold: int,
+    status_codes: Sequence[int],
+    per_file: bool = False,
+    approximate: Optional[SketchConfig] = None,
+    normalizer: Optional[dict] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    time_range: Optional[Sequence[Optional[int]]] = None,
+    distinct_ips: Optional[int] = None,
+    parser: str = "text",
+) -> str:
+    """Construye la clave de caché para uno o varios archivos y parámetros semánticos.
+
+    ``normalizer`` es la configuración serializada de la normalización de URLs
+    (ver ``normalize.normalizer_key``) y ``time_bucket`` el ancho de la serie
+    temporal, si se pidió. ``time_range`` es el intervalo ``[since, until)``
+    en epoch (extremos ``None`` si abiertos). ``distinct_ips`` es la precisión
+    de los sketches de IPs distintas, si se pidieron. ``parser`` es la familia
+    de parser de la corrida (``"text"`` o ``"bytes"``).
+    """
+
+    fingerprints = [fingerprint] if isinstance(fingerprint, FileFingerprint) else list(fingerprint)
+    payload = json.dumps(
+        [
+            [[item.path, item.size, item.mtime_ns, item.digest] for item in fingerprints],
+            slow_threshold,
+            sorted(set(status_codes)),
+            per_file,
+            approximate.to_dict() if approximate is not None else None,
+            normalizer,
+            url_histograms,
+            time_bucket,
+            list(time_range) if time_range else None,
+            distinct_ips,
+            parser,
+            KEY_VERSION,
+        ]
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """Caché de ``ProcessingResult`` con desalojo LRU y expiración por TTL.
+
+    Parámetros:
+        directory: Directorio opcional para persistir entradas entre procesos.
+        max_entries: Máximo de entradas (en memoria y en disco).
+        ttl_seconds: Antigüedad máxima de una entrada; ``None`` no expira.
+
+    Es seguro usarla desde varios hilos (p. ej. el runner del dashboard).
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries debe ser > 0")
+        self.directory = Path(directory) if directory is not None else None
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, Tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[ProcessingResult]:
+        """Devuelve el resultado guardado para ``key`` o ``None``."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key)
+            if entry is None:
+                return None
+
+            created, data = entry
+            if self._expired(created):
+                self._discard(key)
+                return None
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._trim_memory()
+            if self.directory is not None:
+                try:
+                    os.utime(self._path(key))
+                except FileNotFoundError:
+                    pass
+            return ProcessingResult.from_dict(data)
+
+    def put(self, key: str, result: ProcessingResult) -> None:
+        """Guarda ``result`` bajo ``key`` y aplica el desalojo."""
+
+        entry = (time.time(), result.to_dict())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._trim_memory()
+            if self.directory is not None:
+                path = self._path(key)
+                partial_path = path.with_suffix(".tmp")
+                with open(partial_path, "w", encoding="utf-8") as handle:
+                    json.dump({"created": entry[0], "result": entry[1]}, handle, ensure_ascii=False)
+                os.replace(partial_path, path)
+                self._trim_disk()
+
+    def clear(self) -> None:
+        """Elimina todas las entradas."""
+
+        with self._lock:
+            self._entries.clear()
+            if self.directory is not None:
+                for path in self.directory.glob(f"*{SUFFIX}"):
+                    path.unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{key}{SUFFIX}"
+
+    def _load(self, key: str) -> Optional[Tuple[float, dict]]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as handle:
+                stored = json.load(handle)
+            return stored["created"], stored["result"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            self._path(key).unlink(missing_ok=True)
+            return None
+
+    def _discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self.directory is not None:
+            self._path(key).unlink(missing_ok=True)
+
+    def _trim_memory(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _trim_disk(self) -> None:
+        # El mtime puede empatar entre escrituras cercanas; el orden LRU en
+        # memoria desempata.
+        recency = {key: rank for rank, key in enumerate(self._entries)}
+        entries = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            try:
+                entries.append((path.stat().st_mtime_ns, recency.get(path.stem, -1), path))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+        for _, _, path in entries[: max(0, len(entries) - self.max_entries)]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,328 @@
+"""Planificación de envíos al pool de procesos con ventana acotada.
+
+Hay dos formas de repartir trabajo:
+
+- ``parallel_map``: cada tarea devuelve su resultado al padre, que los fusiona.
+- ``parallel_reduce``: cada worker es un proceso de larga vida que acumula
+  localmente los resultados de todas sus tareas; al terminar, los workers
+  combinan sus acumulados en árbol y el padre recibe uno solo.
+
+Ambas registran en ``timings`` el tiempo de obtención de la entrada
+(``read``) y el que el padre pasa bloqueado esperando al pool (``wait``).
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import pickle
+import queue
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from time import perf_counter
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Protocol, Sequence, Set, Tuple, TypeVar
+
+from .profiling import worker_initializer
+from .timings import TimedIterator, add_time, stop_recording
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Cada cuánto (segundos) el padre revisa que los workers sigan vivos mientras
+# espera lugar en la cola de tareas o el resultado final.
+_POLL_SECONDS = 0.2
+
+# Tareas en vuelo por worker cuando no se indica una ventana explícita: dos
+# alcanzan para que ningún worker quede ocioso mientras el padre fusiona.
+IN_FLIGHT_PER_WORKER = 2
+
+
+def default_max_in_flight(workers: int) -> int:
+    """Devuelve la ventana de tareas en vuelo por defecto para ``workers``."""
+
+    return max(1, workers) * IN_FLIGHT_PER_WORKER
+
+
+def bounded_map(
+    executor: Executor,
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_in_flight: int,
+    window: Optional[Callable[[], int]] = None,
+) -> Iterator[R]:
+    """Aplica ``func`` en ``executor`` con a lo sumo ``max_in_flight`` tareas pendientes.
+
+    A diferencia de ``Executor.map``, no consume ``items`` por adelantado: el
+    siguiente elemento se toma del iterable recién cuando se libera un lugar en
+    la ventana, aplicando contrapresión al lector.
+
+    Parámetros:
+        executor: Pool donde se envían las tareas.
+        func: Función a aplicar sobre cada elemento (debe ser serializable).
+        items: Iterable de entrada, típicamente un generador de lotes.
+        max_in_flight: Máximo de tareas enviadas sin resultado recibido.
+        window: Si se da, se consulta después de cada envío y reemplaza a
+            ``max_in_flight``; permite achicar o agrandar la ventana durante
+            la corrida (ver ``memory.MemoryBudget``).
+
+    Entrega:
+        Resultados en orden de finalización, no de envío.
+
+    Errores:
+        ValueError: Si ``max_in_flight <= 0``.
+
+    Rendimiento:
+        La memoria del padre queda acotada por ``max_in_flight`` elementos de
+        entrada más los resultados aún no consumidos.
+    """
+
+    if max_in_flight <= 0:
+        raise ValueError("max_in_flight debe ser > 0")
+
+    pending: Set[Future] = set()
+    timed_items = TimedIterator(items)
+    try:
+        for item in timed_items:
+            pending.add(executor.submit(func, item))
+            while pending and len(pending) >= (window() if window is not None else max_in_flight):
+                done, pending = _timed_wait(pending)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = _timed_wait(pending)
+            for future in done:
+                yield future.result()
+    finally:
+        add_time("read", timed_items.seconds)
+        for future in pending:
+            future.cancel()
+
+
+def _timed_wait(pending: Set[Future]) -> Any:
+    """``wait(FIRST_COMPLETED)`` registrando la espera en ``timings``."""
+
+    started = perf_counter()
+    try:
+        return wait(pending, return_when=FIRST_COMPLETED)
+    finally:
+        add_time("wait", perf_counter() - started)
+
+
+def parallel_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+    max_in_flight: int,
+    window: Optional[Callable[[], int]] = None,
+) -> Iterator[R]:
+    """Aplica ``func`` sobre ``items`` en el proceso actual o en un pool acotado.
+
+    Con ``workers == 1`` evalúa en serie sin crear procesos; en otro caso abre
+    un ``ProcessPoolExecutor`` que vive mientras se consume el generador y
+    envía con ``bounded_map`` (``window`` como en esa función).
+
+    Entrega:
+        Resultados en orden de entrada (serie) o de finalización (pool).
+    """
+
+    if workers == 1:
+        timed_items = TimedIterator(items)
+        try:
+            yield from map(func, timed_items)
+        finally:
+            add_time("read", timed_items.seconds)
+        return
+
+    initializer, initargs = worker_initializer()
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        yield from bounded_map(executor, func, items, max_in_flight, window)
+
+
+class Accumulator(Protocol[R]):
+    """Acumulador de resultados parciales (p. ej. ``reducer.StatsAccumulator``)."""
+
+    def add(self, part: R) -> None: ...
+
+    def result(self) -> R: ...
+
+
+def parallel_reduce(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+    max_in_flight: int,
+    new_accumulator: Callable[[], Accumulator[R]],
+) -> R:
+    """Aplica ``func`` sobre ``items`` y reduce los resultados dentro de los workers.
+
+    Cada worker es un proceso que toma tareas de una cola compartida y suma
+    cada resultado a su propio acumulador (``new_accumulator()``), sin
+    devolverlo al padre. Agotada la entrada, los acumulados se combinan en un
+    árbol binomial: el worker ``r`` recibe los de ``r + 1``, ``r + 2``,
+    ``r + 4``... (mientras ``r`` sea múltiplo del doble del salto) y envía el
+    suyo a ``r - lowbit(r)``; el worker 0 entrega el total.
+
+    Parámetros:
+        func: Función a aplicar sobre cada elemento (debe ser serializable).
+        items: Iterable de entrada; se consume a medida que hay lugar en la
+            cola de tareas.
+        workers: Cantidad de procesos worker; con ``1`` se evalúa en serie.
+        max_in_flight: Máximo de elementos en la cola de tareas.
+        new_accumulator: Fábrica serializable del acumulador de cada worker.
+
+    Retorna:
+        El resultado del acumulador con todas las tareas.
+
+    Errores:
+        ValueError: Si ``max_in_flight <= 0``.
+        RuntimeError: Si un worker termina sin entregar su resultado.
+        Cualquier excepción de ``func`` se relanza en el padre.
+
+    Rendimiento:
+        El padre deserializa un solo resultado en lugar de uno por tarea, y
+        cada fusión entre workers ocurre en paralelo con las demás del mismo
+        nivel (``log2(workers)`` niveles).
+    """
+
+    if max_in_flight <= 0:
+        raise ValueError("max_in_flight debe ser > 0")
+
+    timed_items = TimedIterator(items)
+    if workers == 1:
+        accumulator = new_accumulator()
+        for item in timed_items:
+            accumulator.add(func(item))
+        add_time("read", timed_items.seconds)
+        return accumulator.result()
+
+    context = multiprocessing.get_context()
+    tasks = context.Queue(maxsize=max_in_flight)
+    inboxes = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    initializer, initargs = worker_initializer()
+    processes = [
+        context.Process(
+            target=_reduce_worker,
+            args=(rank, workers, func, new_accumulator, tasks, inboxes, results, initializer, initargs),
+            daemon=True,
+        )
+        for rank in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for item in timed_items:
+            _put_task(tasks, (item,), processes, results)
+        for _ in processes:
+            _put_task(tasks, None, processes, results)
+        combined = _get_result(results, processes)
+        # Los workers ya entregaron su parte y solo les queda salir; se los
+        # espera para que corran sus finalizadores (p. ej. el volcado de
+        # ``profiling``) en lugar de terminarlos.
+        for process in processes:
+            process.join()
+        return combined
+    finally:
+        add_time("read", timed_items.seconds)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def _put_task(tasks: Any, task: Any, processes: Sequence[Any], results: Any) -> None:
+    """Encola ``task`` esperando lugar, pero sin colgarse si un worker falló.
+
+    El tiempo bloqueado se registra como espera al pool en ``timings``.
+    """
+
+    started = perf_counter()
+    try:
+        _put_waiting(tasks, task, processes, results)
+    finally:
+        add_time("wait", perf_counter() - started)
+
+
+def _put_waiting(tasks: Any, task: Any, processes: Sequence[Any], results: Any) -> None:
+    while True:
+        try:
+            tasks.put(task, timeout=_POLL_SECONDS)
+            return
+        except queue.Full:
+            pass
+        try:
+            # Antes del final solo pueden llegar errores.
+            _, error = results.get_nowait()
+        except queue.Empty:
+            _check_alive(processes)
+        else:
+            raise error
+
+
+def _get_result(results: Any, processes: Sequence[Any]) -> Any:
+    """Espera el resultado final (o el primer error) registrando la espera."""
+
+    started = perf_counter()
+    try:
+        while True:
+            try:
+                failed, payload = results.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                _check_alive(processes)
+                continue
+            if failed:
+                raise payload
+            return payload
+    finally:
+        add_time("wait", perf_counter() - started)
+
+
+def _check_alive(processes: Sequence[Any]) -> None:
+    if any(process.exitcode not in (None, 0) for process in processes):
+        raise RuntimeError("un worker terminó sin entregar su resultado")
+
+
+def _tree_children(rank: int, workers: int) -> List[int]:
+    """Workers cuyo acumulado recibe ``rank`` en el árbol binomial."""
+
+    children = []
+    step = 1
+    while rank % (2 * step) == 0 and rank + step < workers:
+        children.append(rank + step)
+        step *= 2
+    return children
+
+
+def _reduce_worker(
+    rank: int,
+    workers: int,
+    func: Callable[[T], R],
+    new_accumulator: Callable[[], Accumulator[R]],
+    tasks: Any,
+    inboxes: Sequence[Any],
+    results: Any,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple[Any, ...] = (),
+) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+    stop_recording()
+    try:
+        accumulator = new_accumulator()
+        for task in iter(tasks.get, None):
+            accumulator.add(func(task[0]))
+        for _ in _tree_children(rank, workers):
+            accumulator.add(inboxes[rank].get())
+        combined = accumulator.result()
+    except BaseException as exc:  # noqa: BLE001 - se relanza en el padre
+        try:
+            pickle.dumps(exc)
+        except Exception:  # noqa: BLE001
+            exc = RuntimeError(repr(exc))
+        results.put((True, exc))
+        return
+
+    if rank == 0:
+        results.put((False, combined))
+    else:
+        inboxes[rank - (rank & -rank)].put(combined)
@@ -0,0 +1,192 @@
+"""Transporte de bloques a los workers por memoria compartida.
+
+Cuando el padre es quien lee (lectura en lotes, entradas comprimidas que no
+se pueden repartir por miembros), cada lote viaja al pool serializado con
+pickle y copiado por un *pipe*. Con ``transport="shm"`` el padre escribe los
+bloques crudos en un anillo de ``multiprocessing.shared_memory`` y envía solo
+descriptores ``(segmento, offset, largo)``; el worker lee el bloque desde un
+``memoryview`` del segmento y devuelve su ``PartialStats``. El lugar se
+recicla en cuanto llega ese resultado, por lo que el anillo tiene tantos
+lugares como tareas en vuelo.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TypeVar, Union
+
+from .profiling import worker_initializer
+from .scheduler import parallel_map
+from .timings import TimedIterator, add_time
+
+R = TypeVar("R")
+
+# Formas de enviar los lotes al pool: "pickle" serializa cada lote y "shm"
+# usa el anillo de memoria compartida.
+TRANSPORTS = ("pickle", "shm")
+
+# Holgura de cada lugar del anillo sobre el tamaño de bloque pedido: los
+# bloques se extienden hasta el siguiente ``\n``. Un bloque que aun así no
+# entra (una línea enorme) viaja serializado.
+SLOT_SLACK = 2
+
+# Segmentos abiertos por este proceso worker, por nombre.
+_ATTACHED: Dict[str, shared_memory.SharedMemory] = {}
+
+
+class SharedChunk(NamedTuple):
+    """Descriptor de un bloque escrito en el anillo."""
+
+    name: str
+    offset: int
+    length: int
+
+
+class ChunkRing:
+    """Segmento de memoria compartida dividido en ``slots`` lugares de ``slot_bytes``.
+
+    Parámetros:
+        slots: Cantidad de lugares (bloques en vuelo a la vez).
+        slot_bytes: Capacidad de cada lugar.
+
+    Errores:
+        ValueError: Si ``slots`` o ``slot_bytes`` no son positivos.
+    """
+
+    __slots__ = ("slot_bytes", "_segment", "_free")
+
+    def __init__(self, slots: int, slot_bytes: int) -> None:
+        if slots <= 0:
+            raise ValueError("slots debe ser > 0")
+        if slot_bytes <= 0:
+            raise ValueError("slot_bytes debe ser > 0")
+        self.slot_bytes = slot_bytes
+        self._segment = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self._free: List[int] = list(range(slots))
+
+    @property
+    def free_slots(self) -> int:
+        return len(self._free)
+
+    def put(self, chunk: bytes) -> Optional[SharedChunk]:
+        """Copia ``chunk`` a un lugar libre; ``None`` si no entra en un lugar.
+
+        Errores:
+            RuntimeError: Si no hay lugares libres.
+        """
+
+        if len(chunk) > self.slot_bytes:
+            return None
+        if not self._free:
+            raise RuntimeError("no hay lugares libres en el anillo")
+        offset = self._free.pop() * self.slot_bytes
+        self._segment.buf[offset : offset + len(chunk)] = chunk
+        return SharedChunk(self._segment.name, offset, len(chunk))
+
+    def release(self, descriptor: SharedChunk) -> None:
+        """Devuelve al anillo el lugar de ``descriptor``."""
+
+        self._free.append(descriptor.offset // self.slot_bytes)
+
+    def close(self) -> None:
+        """Libera el segmento (los descriptores dejan de ser válidos)."""
+
+        self._segment.close()
+        self._segment.unlink()
+
+
+def read_shared_chunk(descriptor: SharedChunk) -> bytes:
+    """Lee en el worker el bloque de ``descriptor``.
+
+    El segmento se abre una vez por proceso. Los parsers trabajan sobre
+    ``bytes``, así que el tramo se copia una vez desde el ``memoryview`` (una
+    copia de memoria local, sin pickle ni *pipe*).
+    """
+
+    segment = _ATTACHED.get(descriptor.name)
+    if segment is None:
+        # Los workers comparten el resource tracker del padre, que registra
+        # el segmento una sola vez y lo da de baja en ``ChunkRing.close``.
+        segment = shared_memory.SharedMemory(name=descriptor.name)
+        _ATTACHED[descriptor.name] = segment
+    with segment.buf[descriptor.offset : descriptor.offset + descriptor.length] as view:
+        return bytes(view)
+
+
+def process_shared_chunk(descriptor: Union[SharedChunk, bytes], func: Callable[[bytes], R]) -> R:
+    """Aplica ``func`` al bloque de ``descriptor`` (o al bloque enviado directo)."""
+
+    chunk = read_shared_chunk(descriptor) if isinstance(descriptor, SharedChunk) else descriptor
+    return func(chunk)
+
+
+def shared_memory_map(
+    func: Callable[[bytes], R],
+    chunks: Iterable[bytes],
+    workers: int,
+    max_in_flight: int,
+    slot_bytes: int,
+) -> Iterator[R]:
+    """Aplica ``func`` a bloques de bytes enviados al pool por memoria compartida.
+
+    Parámetros:
+        func: Función de bloque (p. ej. ``worker.process_chunk`` con sus
+            opciones fijadas); debe ser serializable.
+        chunks: Bloques alineados a fin de línea (ver ``reader.read_raw_chunks``).
+        workers: Cantidad de procesos worker; con ``1`` se evalúa en serie.
+        max_in_flight: Máximo de bloques enviados sin resultado; es también la
+            cantidad de lugares del anillo.
+        slot_bytes: Capacidad de cada lugar.
+
+    Entrega:
+        Resultados en orden de finalización.
+
+    Errores:
+        ValueError: Si ``max_in_flight <= 0`` o ``slot_bytes <= 0``.
+
+    Rendimiento:
+        Por cada bloque el padre hace una copia a memoria compartida y el
+        worker una desde ella; el *pipe* solo transporta el descriptor y el
+        ``PartialStats`` de vuelta. La memoria compartida ocupa
+        ``max_in_flight * slot_bytes``.
+    """
+
+    if max_in_flight <= 0:
+        raise ValueError("max_in_flight debe ser > 0")
+
+    if workers == 1:
+        yield from parallel_map(func, chunks, 1, max_in_flight)
+        return
+
+    ring = ChunkRing(max_in_flight, slot_bytes)
+    pending: Dict[Future, Optional[SharedChunk]] = {}
+    timed_chunks = TimedIterator(chunks)
+    initializer, initargs = worker_initializer()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+
+            def _collect() -> Iterator[R]:
+                started = perf_counter()
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                add_time("wait", perf_counter() - started)
+                for future in done:
+                    descriptor = pending.pop(future)
+                    if descriptor is not None:
+                        ring.release(descriptor)
+                    yield future.result()
+
+            for chunk in timed_chunks:
+                descriptor = ring.put(chunk)
+                pending[executor.submit(process_shared_chunk, descriptor or chunk, func)] = descriptor
+                if len(pending) >= max_in_flight:
+                    yield from _collect()
+
+            while pending:
+                yield from _collect()
+    finally:
+        add_time("read", timed_chunks.seconds)
+        for future in pending:
+            future.cancel()
+        ring.close()
@@ -0,0 +1,485 @@
+"""Sketches fusionables para contar URLs frecuentes con memoria acotada.
+
+Con decenas de millones de URLs distintas, los diccionarios exactos por URL
+dominan la memoria y el costo de serializar parciales. El modo aproximado
+reemplaza esos diccionarios por:
+
+- ``SpaceSaving``: guarda a lo sumo ``capacity`` URLs con una cota superior de
+  su conteo y el error máximo de esa cota. Es fusionable: dos resúmenes se
+  combinan sumando conteos y recortando de nuevo a ``capacity``.
+- ``CountMin``: matriz ``depth x width`` de contadores que da, para cualquier
+  URL, una cota superior con error ``<= epsilon * N`` con probabilidad
+  ``1 - delta``. Se usa para ajustar las cotas del top-k.
+
+Los lotes de los workers siguen contándose de forma exacta (su tamaño está
+acotado por ``batch_size``); el plegado en sketches ocurre al acumular (ver
+``reducer.StatsAccumulator``).
+
+Para contar IPs de clientes distintas se usa ``HyperLogLog``: ``2**precision``
+registros de un byte estiman la cardinalidad con error relativo típico
+``1.04 / sqrt(2**precision)``, sin importar cuántas IPs haya. Mientras pocos
+registros están ocupados (p. ej. el sketch de una URL poco visitada) se guarda
+en forma dispersa.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import heapq
+import math
+from array import array
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+try:  # NumPy es opcional: acelera la actualización de ``CountMin``.
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+DEFAULT_CAPACITY = 10_000
+DEFAULT_EPSILON = 1e-3
+DEFAULT_DELTA = 0.01
+
+# Precisión (bits de índice) de ``HyperLogLog``: 2**14 registros, ~0,8 % de error.
+DEFAULT_HLL_PRECISION = 14
+MIN_HLL_PRECISION = 4
+MAX_HLL_PRECISION = 18
+
+_MASK64 = (1 << 64) - 1
+
+# Se recorta a ``capacity`` recién cuando el resumen duplica ese tamaño, para
+# amortizar el costo del recorte entre varios lotes.
+_TRIM_FACTOR = 2
+
+
+@dataclass(frozen=True, slots=True)
+class SketchConfig:
+    """Parámetros del modo aproximado.
+
+    Attributes:
+        capacity: URLs retenidas por ``SpaceSaving`` (por contador).
+        epsilon: Error relativo de ``CountMin`` respecto del total contado.
+        delta: Probabilidad de que ``CountMin`` exceda ese error.
+    """
+
+    capacity: int = DEFAULT_CAPACITY
+    epsilon: float = DEFAULT_EPSILON
+    delta: float = DEFAULT_DELTA
+
+    def __post_init__(self) -> None:
+        if self.capacity <= 0:
+            raise ValueError("capacity debe ser > 0")
+        if not 0 < self.epsilon < 1:
+            raise ValueError("epsilon debe estar en (0, 1)")
+        if not 0 < self.delta < 1:
+            raise ValueError("delta debe estar en (0, 1)")
+
+    @property
+    def width(self) -> int:
+        return math.ceil(math.e / self.epsilon)
+
+    @property
+    def depth(self) -> int:
+        return math.ceil(math.log(1 / self.delta))
+
+    def to_dict(self) -> dict:
+        return {"capacity": self.capacity, "epsilon": self.epsilon, "delta": self.delta}
+
+
+class SpaceSaving:
+    """Resumen de *heavy hitters* fusionable (Space-Saving / Misra-Gries).
+
+    Para una URL retenida, ``counts[url]`` es una cota superior del conteo real
+    y ``counts[url] - errors[url]`` una cota inferior. Una URL no retenida
+    aparece a lo sumo ``floor`` veces.
+    """
+
+    __slots__ = ("capacity", "counts", "errors", "floor")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.floor = 0
+
+    def update(self, counts: Mapping[str, int]) -> None:
+        """Suma conteos exactos (p. ej. los de un lote)."""
+
+        own_counts = self.counts
+        own_errors = self.errors
+        floor = self.floor
+        for key, count in counts.items():
+            current = own_counts.get(key)
+            if current is None:
+                own_counts[key] = floor + count
+                own_errors[key] = floor
+            else:
+                own_counts[key] = current + count
+        if len(own_counts) > self.capacity * _TRIM_FACTOR:
+            self.compact()
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """Fusiona ``other`` en este resumen."""
+
+        counts: Dict[str, int] = {}
+        errors: Dict[str, int] = {}
+        for key in self.counts.keys() | other.counts.keys():
+            counts[key] = self.counts.get(key, self.floor) + other.counts.get(key, other.floor)
+            errors[key] = self.errors.get(key, self.floor) + other.errors.get(key, other.floor)
+        self.counts = counts
+        self.errors = errors
+        self.floor += other.floor
+        if len(counts) > self.capacity * _TRIM_FACTOR:
+            self.compact()
+
+    def compact(self) -> None:
+        """Recorta el resumen a ``capacity`` URLs, actualizando ``floor``."""
+
+        if len(self.counts) <= self.capacity:
+            return
+        kept = heapq.nlargest(self.capacity + 1, self.counts.items(), key=itemgetter(1))
+        self.floor = max(self.floor, kept.pop()[1])
+        self.counts = dict(kept)
+        self.errors = {key: self.errors[key] for key in self.counts}
+
+    def bounds(self, key: str) -> Tuple[int, int]:
+        """Devuelve ``(inferior, superior)`` para el conteo de ``key``."""
+
+        if key in self.counts:
+            return self.counts[key] - self.errors[key], self.counts[key]
+        return 0, self.floor
+
+
+class CountMin:
+    """Sketch Count-Min con hashing estable entre procesos (BLAKE2b)."""
+
+    __slots__ = ("width", "depth", "table", "total")
+
+    def __init__(self, width: int, depth: int) -> None:
+        self.width = width
+        self.depth = depth
+        self.table = array("Q", bytes(8 * width * depth))
+        self.total = 0
+
+    def _cells(self, key: str) -> List[int]:
+        # Doble hashing ``h1 + fila * h2`` en aritmética de 64 bits, igual que
+        # la versión vectorizada de ``_update_numpy``.
+        digest = _digest(key)
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        width = self.width
+        return [row * width + ((first + row * second) & _MASK64) % width for row in range(self.depth)]
+
+    def update(self, counts: Mapping[str, int]) -> None:
+        """Suma conteos exactos."""
+
+        if not counts:
+            return
+        if np is not None:
+            self._update_numpy(counts)
+            return
+        table = self.table
+        for key, count in counts.items():
+            for cell in self._cells(key):
+                table[cell] += count
+            self.total += count
+
+    def _update_numpy(self, counts: Mapping[str, int]) -> None:
+        hashes = np.frombuffer(b"".join(map(_digest, counts)), dtype="<u8").reshape(-1, 2)
+        first = hashes[:, 0]
+        second = hashes[:, 1] | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        cells = (first + rows * second) % np.uint64(self.width) + rows * np.uint64(self.width)
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        added = np.bincount(
+            cells.ravel().astype(np.intp),
+            weights=np.tile(values, self.depth),
+            minlength=len(self.table),
+        )
+        table = np.frombuffer(self.table, dtype=np.uint64)
+        table += added.astype(np.uint64)
+        self.total += int(values.sum())
+
+    def merge(self, other: "CountMin") -> None:
+        """Fusiona ``other`` (debe tener las mismas dimensiones)."""
+
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("CountMin con dimensiones distintas no puede fusionarse")
+        if np is not None:
+            table = np.frombuffer(self.table, dtype=np.uint64)
+            table += np.frombuffer(other.table, dtype=np.uint64)
+        else:
+            self.table = array("Q", map(sum, zip(self.table, other.table)))
+        self.total += other.total
+
+    def estimate(self, key: str) -> int:
+        """Cota superior del conteo de ``key``."""
+
+        return min(self.table[cell] for cell in self._cells(key))
+
+    def error_bound(self) -> int:
+        """Error máximo de ``estimate`` con probabilidad ``1 - delta``."""
+
+        return math.ceil(math.e / self.width * self.total)
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+class HeavyHitters:
+    """Par ``SpaceSaving`` + ``CountMin`` para un contador por URL."""
+
+    __slots__ = ("config", "space_saving", "count_min")
+
+    def __init__(self, config: SketchConfig) -> None:
+        self.config = config
+        self.space_saving = SpaceSaving(config.capacity)
+        self.count_min = CountMin(config.width, config.depth)
+
+    def update(self, counts: Mapping[str, int]) -> None:
+        self.space_saving.update(counts)
+        self.count_min.update(counts)
+
+    def merge(self, other: "HeavyHitters") -> None:
+        self.space_saving.merge(other.space_saving)
+        self.count_min.merge(other.count_min)
+
+    def compact(self) -> None:
+        self.space_saving.compact()
+
+    def bounds(self, key: str) -> Tuple[int, int]:
+        """Cotas ``(inferior, superior)`` combinando ambos sketches."""
+
+        lower, upper = self.space_saving.bounds(key)
+        return lower, min(upper, self.count_min.estimate(key))
+
+    def top(self, limit: int = 10) -> List[Tuple[str, int, int]]:
+        """Devuelve las ``limit`` URLs más frecuentes como ``(url, inferior, superior)``.
+
+        Se ordenan por la cota superior y, ante empates, por URL; el conteo
+        real de cada una está entre ambas cotas.
+        """
+
+        candidates = heapq.nsmallest(limit * 2, self.space_saving.counts.items(), key=lambda item: (-item[1], item[0]))
+        ranked = [(key, *self.bounds(key)) for key, _ in candidates]
+        ranked.sort(key=lambda item: (-item[2], item[0]))
+        return ranked[:limit]
+
+    def error_bounds(self, limit: int = 10) -> dict:
+        """Resumen serializable de las cotas de error del top-``limit``."""
+
+        return {
+            "max_error": self.space_saving.floor,
+            "count_min_error": self.count_min.error_bound(),
+            "confidence": 1 - self.config.delta,
+            "top": [list(item) for item in self.top(limit)],
+        }
+
+
+def top_from_sketch(sketch: Optional[HeavyHitters], limit: int = 10) -> List[Tuple[str, int]]:
+    """Top ``limit`` como pares ``(url, cota_superior)``, vacío si no hay sketch."""
+
+    if sketch is None:
+        return []
+    return [(key, upper) for key, _, upper in sketch.top(limit)]
+
+
+class HyperLogLog:
+    """Estimador fusionable de elementos distintos (HyperLogLog).
+
+    Parámetros:
+        precision: Bits del hash usados como índice de registro; hay
+            ``2**precision`` registros y el error relativo típico es
+            ``1.04 / sqrt(2**precision)``.
+
+    Cada elemento se reduce a un hash estable de 64 bits (BLAKE2b, igual en
+    todos los procesos); el registro de su índice guarda la máxima posición del
+    primer bit en 1 del resto del hash. Fusionar es tomar el máximo registro a
+    registro, por lo que el resultado no depende del orden ni del reparto.
+
+    Mientras ocupa menos de ``2**precision / 32`` registros el sketch es
+    disperso (``sparse``: índice -> valor) y después pasa a un ``array`` de
+    bytes (``registers``).
+
+    Errores:
+        ValueError: Si ``precision`` está fuera de
+            ``[MIN_HLL_PRECISION, MAX_HLL_PRECISION]``.
+    """
+
+    __slots__ = ("precision", "registers", "sparse")
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION) -> None:
+        if not MIN_HLL_PRECISION <= precision <= MAX_HLL_PRECISION:
+            raise ValueError(f"precision debe estar entre {MIN_HLL_PRECISION} y {MAX_HLL_PRECISION}")
+        self.precision = precision
+        self.registers: Optional[array] = None
+        self.sparse: Dict[int, int] = {}
+
+    @property
+    def size(self) -> int:
+        return 1 << self.precision
+
+    def relative_error(self) -> float:
+        """Error relativo típico (un desvío estándar) de ``estimate``."""
+
+        return 1.04 / math.sqrt(self.size)
+
+    def update(self, values: Iterable[Union[str, bytes]]) -> None:
+        """Agrega elementos (texto o bytes; el texto se hashea en UTF-8)."""
+
+        self.update_hashes(map(hll_hash, values))
+
+    def update_hashes(self, hashes: Iterable[int]) -> None:
+        """Agrega elementos ya hasheados con ``hll_hash``."""
+
+        hashes = iter(hashes)
+        shift = 64 - self.precision
+        rest_mask = (1 << shift) - 1
+        registers = self.registers
+        if registers is None:
+            sparse = self.sparse
+            limit = self.size >> 5
+            for value in hashes:
+                index = value >> shift
+                rank = shift - (value & rest_mask).bit_length() + 1
+                if rank > sparse.get(index, 0):
+                    sparse[index] = rank
+                    if len(sparse) > limit:
+                        registers = self._densify()
+                        break
+            else:
+                return
+        for value in hashes:
+            index = value >> shift
+            rank = shift - (value & rest_mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def _densify(self) -> array:
+        registers = array("B", bytes(self.size))
+        for index, rank in self.sparse.items():
+            registers[index] = rank
+        self.registers = registers
+        self.sparse = {}
+        return registers
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fusiona ``other`` (debe tener la misma precisión)."""
+
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLog con precisión distinta no puede fusionarse")
+        if other.registers is None:
+            if self.registers is None:
+                sparse = self.sparse
+                for index, rank in other.sparse.items():
+                    if rank > sparse.get(index, 0):
+                        sparse[index] = rank
+                if len(sparse) > self.size >> 5:
+                    self._densify()
+                return
+            registers = self.registers
+            for index, rank in other.sparse.items():
+                if rank > registers[index]:
+                    registers[index] = rank
+            return
+        registers = self.registers if self.registers is not None else self._densify()
+        if np is not None:
+            own = np.frombuffer(registers, dtype=np.uint8)
+            np.maximum(own, np.frombuffer(other.registers, dtype=np.uint8), out=own)
+        else:
+            self.registers = array("B", map(max, registers, other.registers))
+
+    def estimate(self) -> int:
+        """Cantidad estimada de elementos distintos."""
+
+        size = self.size
+        if self.registers is None:
+            ranks: Iterable[int] = self.sparse.values()
+            zeros = size - len(self.sparse)
+        else:
+            ranks = self.registers
+            zeros = self.registers.count(0)
+        harmonic = zeros + sum(2.0**-rank for rank in ranks if rank)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(size, 0.7213 / (1 + 1.079 / size))
+        raw = alpha * size * size / harmonic
+        if raw <= 2.5 * size and zeros:
+            # Corrección para cardinalidades chicas (linear counting).
+            return round(size * math.log(size / zeros))
+        return round(raw)
+
+    def copy(self) -> "HyperLogLog":
+        clone = HyperLogLog(self.precision)
+        clone.sparse = dict(self.sparse)
+        if self.registers is not None:
+            clone.registers = array("B", self.registers)
+        return clone
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        return self.precision == other.precision and self._dense_bytes() == other._dense_bytes()
+
+    def _dense_bytes(self) -> bytes:
+        if self.registers is not None:
+            return self.registers.tobytes()
+        registers = bytearray(self.size)
+        for index, rank in self.sparse.items():
+            registers[index] = rank
+        return bytes(registers)
+
+    def to_dict(self) -> dict:
+        """Forma serializable a JSON (registros densos en base64)."""
+
+        if self.registers is None:
+            return {"precision": self.precision, "sparse": sorted(self.sparse.items())}
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "HyperLogLog":
+        sketch = cls(data["precision"])
+        if "registers" in data:
+            sketch.registers = array("B", base64.b64decode(data["registers"]))
+        else:
+            sketch.sparse = {int(index): int(rank) for index, rank in data["sparse"]}
+        return sketch
+
+
+def hll_hash(value: Union[str, bytes]) -> int:
+    """Hash estable de 64 bits para ``HyperLogLog``."""
+
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "little")
+
+
+def ip_sketches(
+    pairs: Iterable[Tuple[Hashable, Union[str, bytes]]],
+    precision: int,
+) -> Tuple[HyperLogLog, Dict[Hashable, HyperLogLog]]:
+    """Sketches de IPs distintas, global y por URL, a partir de pares ``(url, ip)``.
+
+    Cada IP distinta se hashea una sola vez aunque aparezca en varias URLs.
+    """
+
+    hashes: Dict[Union[str, bytes], int] = {}
+    by_url: Dict[Hashable, Set[int]] = {}
+    for url, ip in pairs:
+        value = hashes.get(ip)
+        if value is None:
+            value = hashes[ip] = hll_hash(ip)
+        members = by_url.get(url)
+        if members is None:
+            by_url[url] = {value}
+        else:
+            members.add(value)
+
+    total = HyperLogLog(precision)
+    total.update_hashes(hashes.values())
+    sketches: Dict[Hashable, HyperLogLog] = {}
+    for url, members in by_url.items():
+        sketch = sketches[url] = HyperLogLog(precision)
+        sketch.update_hashes(members)
+    return total, sketches
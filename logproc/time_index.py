@@ -0,0 +1,344 @@
+"""Índice disperso de tiempo a offset para leer solo un intervalo de un log.
+
+Pedir "solo de 14:00 a 15:00" sobre un archivo de decenas de GB obligaría a
+recorrerlo entero. Los access logs se escriben en orden (casi) cronológico, así
+que alcanza con ubicar el byte donde empieza cada extremo del intervalo y
+procesar solo ``[inicio, fin)`` con el mismo reparto en rangos de
+``api._run_sharded``.
+
+Hay dos formas de ubicarlo:
+
+- con un índice (*sidecar* JSON): una muestra ``(epoch, offset, línea)`` cada
+  ``step_bytes`` bytes acota cada extremo a un tramo de ``step_bytes``;
+- sin índice, con búsqueda binaria sobre los offsets del archivo
+  (``O(log tamaño)`` lecturas de una línea).
+
+En ambos casos el último tramo se recorre línea por línea, por lo que el
+resultado es exacto si las fechas no decrecen. Con desorden leve (p. ej.
+requests largas registradas al terminar) solo pueden quedar afuera, o
+adentro, líneas vecinas a los extremos.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from .fingerprint import FileFingerprint, file_fingerprint
+from .parser import parse_record_bytes
+from .timeseries import TimestampParser
+
+INDEX_SUFFIX = ".lpidx"
+VERSION = 1
+DEFAULT_STEP_BYTES = 1024 * 1024
+
+# Por debajo de este tramo la búsqueda binaria pasa a recorrer líneas.
+_SCAN_BYTES = 64 * 1024
+
+TimeValue = Union[int, float, datetime, str]
+
+
+@dataclass(slots=True)
+class TimeIndex:
+    """Muestras de tiempo de un archivo, validadas con su huella.
+
+    Attributes:
+        path: Ruta resuelta del archivo indexado.
+        size: Tamaño del archivo al indexarlo.
+        mtime_ns: Fecha de modificación al indexarlo.
+        digest: Huella de contenido (ver ``fingerprint.file_fingerprint``).
+        step_bytes: Distancia en bytes entre muestras.
+        total_lines: Líneas del archivo (terminadas en ``\\n``).
+        samples: Filas ``(epoch, offset, línea)`` ordenadas por offset: la
+            primera línea con fecha válida de cada tramo de ``step_bytes``
+            (``línea`` se cuenta desde 0).
+    """
+
+    path: str
+    size: int
+    mtime_ns: int
+    digest: str
+    step_bytes: int
+    total_lines: int = 0
+    samples: List[Tuple[int, int, int]] = field(default_factory=list)
+
+    def matches(self, fingerprint: FileFingerprint) -> bool:
+        """Indica si el índice corresponde al archivo de ``fingerprint``."""
+
+        return (self.path, self.size, self.mtime_ns, self.digest) == (
+            fingerprint.path,
+            fingerprint.size,
+            fingerprint.mtime_ns,
+            fingerprint.digest,
+        )
+
+    def bracket(self, epoch: int) -> Tuple[int, int]:
+        """Tramo ``[lo, hi]`` de offsets donde empiezan las líneas ``>= epoch``.
+
+        ``lo`` es la última muestra anterior a ``epoch`` y ``hi`` la primera
+        muestra posterior con fecha ``>= epoch`` (o el final del archivo).
+        """
+
+        lo, hi = 0, self.size
+        for sample_epoch, offset, _ in self.samples:
+            if sample_epoch < epoch:
+                lo = offset
+            else:
+                hi = offset
+                break
+        return lo, hi
+
+
+def default_index_path(log_path: str) -> str:
+    """Ruta del índice junto al log (``<log>.lpidx``)."""
+
+    return f"{log_path}{INDEX_SUFFIX}"
+
+
+def build_time_index(path: str, step_bytes: int = DEFAULT_STEP_BYTES) -> TimeIndex:
+    """Recorre ``path`` una vez y toma una muestra de tiempo cada ``step_bytes``.
+
+    Parámetros:
+        path: Archivo de log sin comprimir.
+        step_bytes: Distancia entre muestras; el índice ocupa unas
+            ``tamaño / step_bytes`` filas.
+
+    Retorna:
+        ``TimeIndex`` del archivo.
+
+    Errores:
+        ValueError: Si ``step_bytes <= 0``.
+
+    Rendimiento:
+        Lee el archivo en bloques de ``step_bytes`` y solo parsea las líneas
+        necesarias para obtener una fecha por bloque; el resto se limita a
+        contar saltos de línea.
+    """
+
+    if step_bytes <= 0:
+        raise ValueError("step_bytes debe ser > 0")
+
+    fingerprint = file_fingerprint(path)
+    index = TimeIndex(
+        path=fingerprint.path,
+        size=fingerprint.size,
+        mtime_ns=fingerprint.mtime_ns,
+        digest=fingerprint.digest,
+        step_bytes=step_bytes,
+    )
+    timestamps = TimestampParser()
+    offset = 0
+    lines = 0
+    at_line_start = True
+    with open(path, "rb") as handle:
+        while offset < fingerprint.size:
+            block = handle.read(min(step_bytes, fingerprint.size - offset))
+            if not block:
+                break
+            if at_line_start:
+                position = 0
+            else:
+                newline = block.find(b"\n")
+                position = newline + 1 if newline != -1 else len(block)
+            found = _first_epoch(block, position, timestamps)
+            if found is not None:
+                epoch, position = found
+                index.samples.append((epoch, offset + position, lines + block.count(b"\n", 0, position)))
+            lines += block.count(b"\n")
+            at_line_start = block.endswith(b"\n")
+            offset += len(block)
+    index.total_lines = lines
+    return index
+
+
+def _line_epoch(line: bytes, timestamps: TimestampParser) -> Optional[int]:
+    parsed = parse_record_bytes(line)
+    return timestamps(parsed[3]) if parsed is not None else None
+
+
+def _first_epoch(block: bytes, position: int, timestamps: TimestampParser) -> Optional[Tuple[int, int]]:
+    """Primera línea completa de ``block`` desde ``position`` con fecha válida."""
+
+    while (end := block.find(b"\n", position)) != -1:
+        epoch = _line_epoch(block[position:end], timestamps)
+        if epoch is not None:
+            return epoch, position
+        position = end + 1
+    return None
+
+
+def save_time_index(index: TimeIndex, path: str) -> None:
+    """Guarda ``index`` de forma atómica en ``path``."""
+
+    data = {
+        "version": VERSION,
+        "path": index.path,
+        "size": index.size,
+        "mtime_ns": index.mtime_ns,
+        "digest": index.digest,
+        "step_bytes": index.step_bytes,
+        "total_lines": index.total_lines,
+        "samples": index.samples,
+    }
+    partial_path = f"{path}.tmp"
+    with open(partial_path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, separators=(",", ":"))
+    os.replace(partial_path, path)
+
+
+def load_time_index(path: str) -> Optional[TimeIndex]:
+    """Carga un índice; devuelve ``None`` si no existe o es inválido."""
+
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        if data.pop("version", None) != VERSION:
+            return None
+        data["samples"] = [tuple(sample) for sample in data["samples"]]
+        return TimeIndex(**data)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def ensure_time_index(
+    log_path: str,
+    index_path: Optional[str] = None,
+    step_bytes: int = DEFAULT_STEP_BYTES,
+) -> TimeIndex:
+    """Devuelve el índice vigente de ``log_path``, reconstruyéndolo si cambió.
+
+    Un índice de otro archivo o de una versión anterior del mismo (otro
+    tamaño, ``mtime`` o huella) se descarta y se vuelve a construir.
+    """
+
+    index_path = index_path or default_index_path(log_path)
+    index = load_time_index(index_path)
+    if index is None or not index.matches(file_fingerprint(log_path)):
+        index = build_time_index(log_path, step_bytes=step_bytes)
+        save_time_index(index, index_path)
+    return index
+
+
+def parse_time(value: TimeValue) -> int:
+    """Convierte ``value`` a epoch en segundos.
+
+    Acepta epoch (``int``/``float``), ``datetime`` o texto ISO 8601
+    (``2024-09-10T14:00``) o de access log (``10/Sep/2024:14:00:00 +0000``).
+    Las fechas sin zona horaria se interpretan en UTC, como en
+    ``timeseries``.
+
+    Errores:
+        ValueError: Si el texto no tiene un formato reconocido.
+    """
+
+    if isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, (int, float)):
+        return int(value)
+    else:
+        text = value.strip()
+        if text.lstrip("-").isdigit():
+            return int(text)
+        epoch = TimestampParser(memo_size=1)(text)
+        if epoch is not None:
+            return epoch
+        try:
+            moment = datetime.fromisoformat(text)
+        except ValueError:
+            raise ValueError(f"fecha inválida: {value!r}") from None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def seek_time(handle: BinaryIO, size: int, epoch: int, lo: int = 0, hi: Optional[int] = None) -> int:
+    """Offset de la primera línea con fecha ``>= epoch`` (``size`` si no hay).
+
+    Parámetros:
+        handle: Archivo abierto en binario.
+        size: Tamaño del archivo.
+        epoch: Instante buscado.
+        lo: Inicio de una línea que no está después de la buscada.
+        hi: Offset que no está antes de la línea buscada (por defecto,
+            ``size``), p. ej. el tramo de ``TimeIndex.bracket``.
+
+    Supone fechas no decrecientes; las líneas sin fecha válida se saltean.
+    """
+
+    hi = size if hi is None else hi
+    timestamps = TimestampParser()
+    while hi - lo > _SCAN_BYTES:
+        mid = (lo + hi) // 2
+        line_start, found = _next_epoch(handle, mid, timestamps)
+        if found is not None and found < epoch:
+            lo = line_start
+        else:
+            hi = mid
+
+    handle.seek(lo)
+    position = lo
+    for line in iter(handle.readline, b""):
+        found = _line_epoch(line, timestamps)
+        if found is not None and found >= epoch:
+            return position
+        position += len(line)
+    return position
+
+
+def _next_epoch(handle: BinaryIO, offset: int, timestamps: TimestampParser) -> Tuple[int, Optional[int]]:
+    """Primera línea que empieza en ``offset`` o después y tiene fecha válida."""
+
+    if offset:
+        handle.seek(offset - 1)
+        handle.readline()
+    else:
+        handle.seek(0)
+    position = handle.tell()
+    for line in iter(handle.readline, b""):
+        epoch = _line_epoch(line, timestamps)
+        if epoch is not None:
+            return position, epoch
+        position += len(line)
+    return position, None
+
+
+def time_range_offsets(
+    path: str,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    index: Optional[TimeIndex] = None,
+) -> Tuple[int, int]:
+    """Rango ``[inicio, fin)`` de bytes con las líneas de ``[since, until)``.
+
+    Parámetros:
+        path: Archivo de log sin comprimir.
+        since: Epoch inicial (inclusive); ``None`` es el inicio del archivo.
+        until: Epoch final (exclusivo); ``None`` es el final del archivo.
+        index: Índice vigente del archivo; sin él se usa búsqueda binaria.
+
+    Retorna:
+        Offsets de inicio de línea, listos para ``reader.split_ranges``.
+
+    Errores:
+        ValueError: Si ``until <= since``.
+    """
+
+    if since is not None and until is not None and until <= since:
+        raise ValueError("until debe ser posterior a since")
+
+    size = os.path.getsize(path)
+    with open(path, "rb") as handle:
+        offsets = []
+        for epoch, default in ((since, 0), (until, size)):
+            if epoch is None:
+                offsets.append(default)
+                continue
+            lo, hi = index.bracket(epoch) if index is not None else (0, size)
+            offsets.append(seek_time(handle, size, epoch, lo=lo, hi=hi))
+    start, end = offsets
+    return start, max(start, end)
@@ -0,0 +1,153 @@
+"""Series temporales por bucket y parser de timestamps con memo.
+
+``parse_line`` descarta la fecha de cada línea; con ``time_bucket`` los
+workers agrupan además, por intervalo de ``time_bucket`` segundos, el total de
+líneas, las que matchean el código objetivo y las lentas. Así se ve cuándo
+hubo picos de errores o de latencia.
+
+Parsear la fecha con ``datetime.strptime`` en cada línea se volvería el nuevo
+cuello de botella. ``TimestampParser`` aprovecha que líneas consecutivas
+suelen compartir el mismo segundo (se reutiliza el último resultado) y, si no,
+el mismo minuto: el prefijo ``dd/Mon/yyyy:HH:MM`` (más la zona horaria, si la
+hay) se convierte una sola vez a epoch y se memoiza; los segundos se suman
+aparte.
+"""
+
+from __future__ import annotations
+
+import calendar
+from datetime import datetime, timezone
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+DEFAULT_BUCKET_SECONDS = 60
+DEFAULT_MEMO_SIZE = 100_000
+
+_MONTHS = {
+    name: index
+    for index, name in enumerate(
+        ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), start=1
+    )
+}
+
+# Contadores de cada bucket: líneas válidas, con código objetivo y lentas.
+TOTAL, STATUS, SLOW = range(3)
+
+TimeSeries = Dict[int, List[int]]
+
+
+class TimestampParser:
+    """Convierte fechas de access-log (``10/Sep/2024:15:03:27 [+0000]``) a epoch.
+
+    Parámetros:
+        memo_size: Máximo de prefijos de minuto memoizados; al llenarse el
+            memo se vacía (los logs avanzan en el tiempo, así que los minutos
+            viejos rara vez vuelven).
+
+    Acepta ``str`` o ``bytes`` (ASCII). Devuelve ``None`` si la fecha no tiene
+    el formato esperado.
+    """
+
+    __slots__ = ("memo_size", "_minutes", "_last_text", "_last_epoch")
+
+    def __init__(self, memo_size: int = DEFAULT_MEMO_SIZE) -> None:
+        if memo_size <= 0:
+            raise ValueError("memo_size debe ser > 0")
+        self.memo_size = memo_size
+        self._minutes: Dict[Union[str, bytes], Optional[int]] = {}
+        self._last_text: Union[str, bytes, None] = None
+        self._last_epoch: Optional[int] = None
+
+    def __call__(self, text: Union[str, bytes]) -> Optional[int]:
+        if text == self._last_text:
+            return self._last_epoch
+
+        epoch = None
+        seconds = text[18:20]
+        if len(text) >= 20 and seconds.isdigit():
+            key = text[:17] + text[20:]
+            base = self._minutes.get(key, -1)
+            if base == -1:
+                if len(self._minutes) >= self.memo_size:
+                    self._minutes.clear()
+                minute_text = text if isinstance(text, str) else text.decode("ascii", "replace")
+                base = self._minutes[key] = _parse_minute(minute_text)
+            if base is not None:
+                epoch = base + int(seconds)
+
+        self._last_text = text
+        self._last_epoch = epoch
+        return epoch
+
+
+def _parse_minute(text: str) -> Optional[int]:
+    """Epoch (UTC) del minuto de ``text``, o ``None`` si es inválido."""
+
+    if text[2:3] != "/" or text[6:7] != "/" or text[11:12] != ":" or text[14:15] != ":" or text[17:18] != ":":
+        return None
+    month = _MONTHS.get(text[3:6])
+    fields = (text[0:2], text[7:11], text[12:14], text[15:17])
+    if month is None or not all(field.isdigit() and field.isascii() for field in fields):
+        return None
+    day, year, hour, minute = map(int, fields)
+    if not (1 <= day <= 31 and hour < 24 and minute < 60):
+        return None
+
+    offset = 0
+    zone = text[20:].strip()
+    if zone:
+        if len(zone) != 5 or zone[0] not in "+-" or not zone[1:].isdigit():
+            return None
+        offset = (int(zone[1:3]) * 3600 + int(zone[3:5]) * 60) * (1 if zone[0] == "+" else -1)
+    return calendar.timegm((year, month, day, hour, minute, 0)) - offset
+
+
+def bucket_start(epoch: int, width: int) -> int:
+    """Inicio del bucket de ``width`` segundos que contiene a ``epoch``."""
+
+    return epoch - epoch % width
+
+
+def series_from_counts(counts: Mapping[Tuple[int, bool, bool], int]) -> TimeSeries:
+    """Arma la serie a partir de conteos ``(inicio_bucket, es_status, es_lenta) -> n``."""
+
+    series: TimeSeries = {}
+    for (start, is_status, is_slow), count in counts.items():
+        row = series.get(start)
+        if row is None:
+            row = series[start] = [0, 0, 0]
+        row[TOTAL] += count
+        if is_status:
+            row[STATUS] += count
+        if is_slow:
+            row[SLOW] += count
+    return series
+
+
+def merge_series(target: TimeSeries, source: Mapping[int, List[int]]) -> None:
+    """Suma en ``target`` los contadores de ``source``, bucket por bucket."""
+
+    for start, counts in source.items():
+        current = target.get(start)
+        if current is None:
+            target[start] = list(counts)
+        else:
+            current[TOTAL] += counts[TOTAL]
+            current[STATUS] += counts[STATUS]
+            current[SLOW] += counts[SLOW]
+
+
+def series_rows(series: Mapping[int, List[int]]) -> List[dict]:
+    """Filas ordenadas por tiempo para serializar (``start`` en ISO 8601 UTC).
+
+    Solo se incluyen los buckets con al menos una línea.
+    """
+
+    return [
+        {
+            "start": datetime.fromtimestamp(start, tz=timezone.utc).isoformat(),
+            "total": counts[TOTAL],
+            "status": counts[STATUS],
+            "slow": counts[SLOW],
+        }
+        for start, counts in sorted(series.items())
+    ]
@@ -0,0 +1,174 @@
+"""Tiempos por etapa de una corrida, siempre activos y de bajo costo.
+
+``elapsed_seconds`` no dice si una corrida lenta estuvo limitada por el disco,
+el parseo, la comunicación con el pool o la fusión. Cada etapa suma su tiempo
+en un ``StageTimings``:
+
+- ``read``: obtener la entrada (lotes o bloques del padre, y lectura de
+  rangos en los workers);
+- ``process``: parseo y conteo de los lotes, medido dentro de cada función
+  de lote y devuelto en ``PartialStats.process_seconds`` (con varios workers
+  es la suma de todos y puede superar al tiempo total);
+- ``wait``: tiempo que el padre pasó bloqueado esperando al pool;
+- ``merge``: fusión de parciales (``reducer.StatsAccumulator``), en el padre
+  o, con ``accumulate_in_workers``, la suma de la hecha en los workers
+  (``PartialStats.merge_seconds``);
+- ``top_n``: cálculo de los tops (``metrics.top_n_urls``).
+
+Las etapas del padre se registran en el ``StageTimings`` activo del contexto
+(ver ``recording``); fuera de una corrida, o en un proceso worker, registrar
+no tiene efecto. Cada hilo tiene su propio contexto, así que corridas
+concurrentes (p. ej. en el dashboard) no se mezclan.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+from .memory import current_rss_bytes, peak_rss_bytes
+
+T = TypeVar("T")
+F = TypeVar("F", bound=Callable)
+
+STAGES = ("read", "process", "wait", "merge", "top_n")
+
+
+@dataclass(slots=True)
+class StageTimings:
+    """Segundos acumulados por etapa y bytes de entrada de una corrida.
+
+    Attributes:
+        read: Obtención de la entrada.
+        process: Parseo y conteo (suma de todos los workers).
+        wait: Espera del padre al pool.
+        merge: Fusión de parciales.
+        top_n: Cálculo de los tops.
+        input_bytes: Bytes de entrada procesados, para ``mb_per_second``.
+    """
+
+    read: float = 0.0
+    process: float = 0.0
+    wait: float = 0.0
+    merge: float = 0.0
+    top_n: float = 0.0
+    input_bytes: int = 0
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Suma ``seconds`` a ``stage`` (uno de ``STAGES``)."""
+
+        setattr(self, stage, getattr(self, stage) + seconds)
+
+    def add_partial(self, stats) -> None:
+        """Suma los tiempos medidos en las funciones de lote de ``stats``.
+
+        ``stats`` es el ``PartialStats`` fusionado de la corrida: trae el
+        parseo de todos los lotes y la lectura y la fusión hechas dentro de
+        los workers.
+        """
+
+        self.read += stats.read_seconds
+        self.process += stats.process_seconds
+        self.merge += stats.merge_seconds
+
+    def to_dict(self, elapsed_seconds: float, total_lines: int) -> dict:
+        """Sección ``timings`` de ``ProcessingResult``: etapas y throughput."""
+
+        data = {stage: round(getattr(self, stage), 6) for stage in STAGES}
+        data["lines_per_second"] = round(total_lines / elapsed_seconds, 1) if elapsed_seconds > 0 else 0.0
+        data["mb_per_second"] = round(self.input_bytes / 1024**2 / elapsed_seconds, 3) if elapsed_seconds > 0 else 0.0
+        return data
+
+
+_CURRENT: ContextVar[Optional[StageTimings]] = ContextVar("logproc_stage_timings", default=None)
+
+
+@contextmanager
+def recording(timings: Optional[StageTimings] = None) -> Iterator[StageTimings]:
+    """Activa ``timings`` (o uno nuevo) como destino de ``add_time`` en este contexto."""
+
+    timings = timings if timings is not None else StageTimings()
+    token = _CURRENT.set(timings)
+    try:
+        yield timings
+    finally:
+        _CURRENT.reset(token)
+
+
+def stop_recording() -> None:
+    """Desactiva el registro en el contexto actual.
+
+    Un worker creado con ``fork`` hereda el ``StageTimings`` activo del padre;
+    lo que registre ahí se pierde en una copia. Tras esta llamada lo medido en
+    el worker se devuelve en el ``PartialStats`` (p. ej. ``merge_seconds``).
+    """
+
+    _CURRENT.set(None)
+
+
+def current_timings() -> Optional[StageTimings]:
+    """``StageTimings`` activo, o ``None`` fuera de ``recording``."""
+
+    return _CURRENT.get()
+
+
+def add_time(stage: str, seconds: float) -> None:
+    """Suma ``seconds`` a ``stage`` en el ``StageTimings`` activo, si lo hay."""
+
+    timings = _CURRENT.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+class TimedIterator(Generic[T]):
+    """Envuelve un iterable y acumula en ``seconds`` el tiempo de cada ``next``.
+
+    Sobre un generador de lectura (``reader.read_batches`` y afines) mide el
+    tiempo de lectura sin tocar el lector.
+    """
+
+    __slots__ = ("_items", "seconds")
+
+    def __init__(self, items: Iterable[T]) -> None:
+        self._items = iter(items)
+        self.seconds = 0.0
+
+    def __iter__(self) -> "TimedIterator[T]":
+        return self
+
+    def __next__(self) -> T:
+        started = perf_counter()
+        try:
+            return next(self._items)
+        finally:
+            self.seconds += perf_counter() - started
+
+
+def measured_partial(func: F) -> F:
+    """Decora una función de lote para que informe su duración y memoria.
+
+    La duración se suma a ``process_seconds`` y el RSS del proceso al
+    terminar el lote (actual y pico, ver ``memory``) queda en ``rss_bytes`` y
+    ``peak_rss_bytes``: en un worker es la única forma de que el padre lo vea.
+    Admite funciones que devuelven un ``PartialStats`` o una lista de ellos
+    (una por consulta: todas comparten la misma pasada y reciben su duración).
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = perf_counter() - started
+        rss = current_rss_bytes() or 0
+        peak = peak_rss_bytes() or 0
+        for stats in result if isinstance(result, list) else (result,):
+            stats.process_seconds += elapsed
+            stats.rss_bytes = max(stats.rss_bytes, rss)
+            stats.peak_rss_bytes = max(stats.peak_rss_bytes, peak)
+        return result
+
+    return wrapper  # type: ignore[return-value]
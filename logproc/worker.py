@@ -2,18 +2,59 @@
 
 from __future__ import annotations
 
-from collections import Counter
-from typing import Iterable, Sequence
+from collections import Counter, defaultdict
+from typing import Callable, DefaultDict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 
-from .metrics import PartialStats
-from .parser import parse_line
+from . import columnar
+from .compression import MemberReader
+from .histogram import histograms_from_values
+from .inputs import WorkUnit
+from .metrics import MemberPartial, PartialStats
+from .normalize import UrlNormalizer
+from .parser import (
+    decode_url_counts,
+    decode_url_histograms,
+    decode_url_mergeables,
+    parse_entry,
+    parse_entry_bytes,
+    parse_line,
+    parse_line_bytes,
+    parse_record,
+    parse_record_bytes,
+)
+from .reader import ByteRange, read_mmap_chunks, read_range_batches
+from .reducer import StatsAccumulator, merge_partials
+from .sketches import SketchConfig, ip_sketches
+from .timeseries import TimestampParser, series_from_counts
+from .timings import TimedIterator, measured_partial
 
+# Estimación de bytes por línea para traducir ``batch_size`` (líneas) a tamaño
+# de bloque en el backend ``mmap``, que corta por bytes y no por líneas.
+BYTES_PER_LINE_ESTIMATE = 128
 
+# Motores de conteo por lote: "python" (Counter línea a línea) o "numpy"
+# (columnas vectorizadas, ver ``logproc.columnar``).
+ENGINES = ("python", "numpy")
+
+
+def chunk_bytes_for(batch_size: int) -> int:
+    """Traduce un tamaño de lote en líneas a un tamaño de bloque en bytes."""
+
+    if batch_size <= 0:
+        raise ValueError("batch_size debe ser > 0")
+    return batch_size * BYTES_PER_LINE_ESTIMATE
+
+
+@measured_partial
 def process_batch(
     batch: Iterable[str],
     status_code: int = 500,
     slow_threshold: int = 200,
     status_codes: Sequence[int] | None = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
 ) -> PartialStats:
     """Procesa un lote y devuelve contadores agregados parciales.
 
@@ -22,9 +63,20 @@ def process_batch(
         status_code: Código HTTP a contabilizar (compatibilidad).
         slow_threshold: Umbral en milisegundos para requests "lentas".
         status_codes: Lista de códigos HTTP a contabilizar.
+        normalizer: Normalización de URLs aplicada a los conteos del lote.
+        url_histograms: Si además del histograma global de latencias se
+            arma uno por URL (memoria proporcional a las URLs distintas).
+        time_bucket: Si se indica, agrupa también las líneas válidas en
+            buckets de ``time_bucket`` segundos según su fecha (ver
+            ``timeseries``).
+        distinct_ips: Si se indica, precisión de los sketches ``HyperLogLog``
+            de IPs de clientes distintas, global y por URL (ver
+            ``sketches.HyperLogLog``).
 
     Retorna:
-        ``PartialStats`` con conteos e histogramas parciales por URL.
+        ``PartialStats`` con conteos e histogramas parciales por URL; el
+        decorador ``timings.measured_partial`` deja la duración del lote en
+        ``process_seconds`` y el RSS del proceso en ``rss_bytes``.
 
     Complejidad:
         ``O(b)`` por lote con memoria extra acotada por URLs únicas.
@@ -33,26 +85,466 @@ def process_batch(
     stats = PartialStats()
     status_counter: Counter[str] = Counter()
     slow_counter: Counter[str] = Counter()
+    latencies: Counter[int] = Counter()
+    url_latencies: Optional[DefaultDict[str, List[int]]] = defaultdict(list) if url_histograms else None
+    series_counter: Optional[Counter[Tuple[int, bool, bool]]] = Counter() if time_bucket else None
+    timestamps = TimestampParser() if time_bucket else None
+    ip_pairs: Optional[Set[Tuple[str, str]]] = set() if distinct_ips else None
+    parse = parse_entry if distinct_ips else parse_record if time_bucket else parse_line
 
     target_codes = set(status_codes or [status_code])
 
     for line in batch:
         stats.total_lines += 1
-        parsed = parse_line(line)
+        parsed = parse(line)
         if parsed is None:
             stats.bad_lines += 1
             continue
 
-        url, status, response_time = parsed
+        if ip_pairs is not None:
+            url, status, response_time, date, ip = parsed
+            ip_pairs.add((url, ip))
+        elif series_counter is None:
+            url, status, response_time = parsed
+        else:
+            url, status, response_time, date = parsed
+        latencies[response_time] += 1
+        if url_latencies is not None:
+            url_latencies[url].append(response_time)
 
-        if status in target_codes:
+        is_status = status in target_codes
+        if is_status:
             stats.total_status += 1
             status_counter[url] += 1
 
-        if response_time > slow_threshold:
+        is_slow = response_time > slow_threshold
+        if is_slow:
             stats.total_slow += 1
             slow_counter[url] += 1
 
+        if series_counter is not None:
+            epoch = timestamps(date)
+            if epoch is not None:
+                series_counter[(epoch - epoch % time_bucket, is_status, is_slow)] += 1
+
     stats.status_by_url = dict(status_counter)
     stats.slow_by_url = dict(slow_counter)
+    stats.latency.add_counts(latencies)
+    if series_counter is not None:
+        stats.time_series = series_from_counts(series_counter)
+    if url_latencies is not None:
+        stats.latency_by_url = histograms_from_values(url_latencies)
+    if ip_pairs is not None:
+        stats.ip_sketch, stats.ip_sketch_by_url = ip_sketches(ip_pairs, distinct_ips)
+    if normalizer is not None:
+        normalizer.apply(stats)
     return stats
+
+
+@measured_partial
+def process_chunk(
+    chunk: bytes,
+    status_code: int = 500,
+    slow_threshold: int = 200,
+    status_codes: Sequence[int] | None = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> PartialStats:
+    """Procesa un bloque de bytes con líneas completas sin decodificarlo.
+
+    Parámetros:
+        chunk: Bloque crudo alineado a líneas (ver ``reader.read_mmap_chunks``).
+        status_code: Código HTTP a contabilizar (compatibilidad).
+        slow_threshold: Umbral en milisegundos para requests "lentas".
+        status_codes: Lista de códigos HTTP a contabilizar.
+        normalizer: Normalización de URLs, ver ``process_batch``.
+        url_histograms: Histogramas de latencia por URL, ver ``process_batch``.
+        time_bucket: Serie temporal por buckets, ver ``process_batch``.
+        distinct_ips: IPs distintas, ver ``process_batch``.
+
+    Retorna:
+        ``PartialStats`` equivalente al de ``process_batch`` sobre las mismas
+        líneas decodificadas. Solo se decodifican las URLs contadas, una vez
+        por URL distinta del bloque.
+
+    Complejidad:
+        ``O(b)`` sobre los bytes del bloque.
+    """
+
+    stats = PartialStats()
+    status_counter: Counter[bytes] = Counter()
+    slow_counter: Counter[bytes] = Counter()
+    latencies: Counter[int] = Counter()
+    url_latencies: Optional[DefaultDict[bytes, List[int]]] = defaultdict(list) if url_histograms else None
+    series_counter: Optional[Counter[Tuple[int, bool, bool]]] = Counter() if time_bucket else None
+    timestamps = TimestampParser() if time_bucket else None
+    ip_pairs: Optional[Set[Tuple[bytes, bytes]]] = set() if distinct_ips else None
+    parse = parse_entry_bytes if distinct_ips else parse_record_bytes if time_bucket else parse_line_bytes
+
+    target_codes = set(status_codes or [status_code])
+
+    lines = chunk.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+
+    for line in lines:
+        stats.total_lines += 1
+        parsed = parse(line)
+        if parsed is None:
+            stats.bad_lines += 1
+            continue
+
+        if ip_pairs is not None:
+            url, status, response_time, date, ip = parsed
+            ip_pairs.add((url, ip))
+        elif series_counter is None:
+            url, status, response_time = parsed
+        else:
+            url, status, response_time, date = parsed
+        latencies[response_time] += 1
+        if url_latencies is not None:
+            url_latencies[url].append(response_time)
+
+        is_status = status in target_codes
+        if is_status:
+            stats.total_status += 1
+            status_counter[url] += 1
+
+        is_slow = response_time > slow_threshold
+        if is_slow:
+            stats.total_slow += 1
+            slow_counter[url] += 1
+
+        if series_counter is not None:
+            epoch = timestamps(date)
+            if epoch is not None:
+                series_counter[(epoch - epoch % time_bucket, is_status, is_slow)] += 1
+
+    stats.status_by_url = decode_url_counts(status_counter)
+    stats.slow_by_url = decode_url_counts(slow_counter)
+    stats.latency.add_counts(latencies)
+    if series_counter is not None:
+        stats.time_series = series_from_counts(series_counter)
+    if url_latencies is not None:
+        stats.latency_by_url = decode_url_histograms(histograms_from_values(url_latencies))
+    if ip_pairs is not None:
+        stats.ip_sketch, by_url = ip_sketches(ip_pairs, distinct_ips)
+        stats.ip_sketch_by_url = decode_url_mergeables(by_url)
+    if normalizer is not None:
+        normalizer.apply(stats)
+    return stats
+
+
+def batch_function(backend: str = "text", engine: str = "python") -> Callable[..., PartialStats]:
+    """Devuelve la función de procesamiento de lote para un backend y motor.
+
+    Parámetros:
+        backend: ``"text"`` (listas de ``str``) o ``"mmap"`` (bloques ``bytes``).
+        engine: ``"python"`` o ``"numpy"``. Si NumPy no está instalado, el motor
+            ``"numpy"`` recurre al motor puro Python.
+
+    Errores:
+        ValueError: Si ``engine`` no es uno de ``ENGINES``.
+    """
+
+    if engine not in ENGINES:
+        raise ValueError(f"engine debe ser uno de {ENGINES}")
+
+    if engine == "numpy" and columnar.HAS_NUMPY:
+        return columnar.process_chunk_columnar if backend == "mmap" else columnar.process_batch_columnar
+    return process_chunk if backend == "mmap" else process_batch
+
+
+def process_range(
+    byte_range: ByteRange,
+    path: str,
+    batch_size: int = 10_000,
+    status_code: int = 500,
+    slow_threshold: int = 200,
+    status_codes: Sequence[int] | None = None,
+    backend: str = "text",
+    engine: str = "python",
+    sketch: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> PartialStats:
+    """Lee, parsea y agrega un rango de bytes del archivo dentro del worker.
+
+    Parámetros:
+        byte_range: Tupla ``(inicio, fin)`` alineada a líneas.
+        path: Ruta al archivo de entrada.
+        batch_size: Cantidad de líneas por lote interno.
+        status_code: Código HTTP a contabilizar (compatibilidad).
+        slow_threshold: Umbral en milisegundos para requests "lentas".
+        status_codes: Lista de códigos HTTP a contabilizar.
+        backend: ``"text"`` (líneas decodificadas) o ``"mmap"`` (bloques de
+            bytes mapeados, ver ``process_chunk``).
+        engine: Motor de conteo, ver ``batch_function``.
+        sketch: Modo aproximado; los conteos por URL del rango se resumen en
+            sketches de tamaño acotado (ver ``reducer.StatsAccumulator``).
+        normalizer: Normalización de URLs aplicada en cada lote, ver
+            ``normalize.UrlNormalizer``.
+        url_histograms: Histogramas de latencia por URL, ver ``process_batch``.
+        time_bucket: Serie temporal por buckets, ver ``process_batch``.
+        distinct_ips: IPs distintas, ver ``process_batch``.
+
+    Retorna:
+        Un único ``PartialStats`` para todo el rango; es lo único que viaja de
+        vuelta al proceso padre.
+    """
+
+    start, end = byte_range
+    func = batch_function(backend, engine)
+    if backend == "mmap":
+        batches: Iterable = read_mmap_chunks(path, chunk_bytes=chunk_bytes_for(batch_size), start=start, end=end)
+    else:
+        batches = read_range_batches(path, start, end, batch_size=batch_size)
+    batches = TimedIterator(batches)
+
+    stats = merge_partials(
+        (
+            func(
+                batch,
+                status_code=status_code,
+                slow_threshold=slow_threshold,
+                status_codes=status_codes,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+            for batch in batches
+        ),
+        sketch=sketch,
+    )
+    stats.read_seconds += batches.seconds
+    return stats
+
+
+def process_member_range(
+    byte_range: ByteRange,
+    path: str,
+    codec: str,
+    batch_size: int = 10_000,
+    status_code: int = 500,
+    slow_threshold: int = 200,
+    status_codes: Sequence[int] | None = None,
+    engine: str = "python",
+    sketch: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> MemberPartial:
+    """Descomprime y procesa los miembros que empiezan en ``byte_range``.
+
+    El texto descomprimido se procesa en bloques de bytes (como el backend
+    ``mmap``) sin pasar por el proceso padre. Los fragmentos de línea de los
+    bordes se devuelven en ``head``/``tail`` para ``merge_member_partials``.
+
+    Parámetros:
+        byte_range: Tupla ``(inicio, fin)`` de ``compression.member_ranges``.
+        path: Ruta al archivo comprimido.
+        codec: Códec del archivo, uno de ``compression.CODECS``.
+        batch_size: Cantidad aproximada de líneas por bloque interno.
+        status_code: Código HTTP a contabilizar (compatibilidad).
+        slow_threshold: Umbral en milisegundos para requests "lentas".
+        status_codes: Lista de códigos HTTP a contabilizar.
+        engine: Motor de conteo, ver ``batch_function``.
+        sketch: Modo aproximado, ver ``process_range``.
+        normalizer: Normalización de URLs, ver ``process_batch``.
+        url_histograms: Histogramas de latencia por URL, ver ``process_batch``.
+        time_bucket: Serie temporal por buckets, ver ``process_batch``.
+        distinct_ips: IPs distintas, ver ``process_batch``.
+    """
+
+    start, end = byte_range
+    func = batch_function("mmap", engine)
+    chunk_bytes = chunk_bytes_for(batch_size)
+    reader = MemberReader(path, codec, start, end)
+    data_chunks = TimedIterator(reader)
+    accumulator = StatsAccumulator(sketch)
+    head: Optional[bytes] = None
+    buffer = bytearray()
+
+    def flush() -> int:
+        cut = buffer.rfind(b"\n")
+        if cut != -1:
+            accumulator.add(
+                func(
+                    bytes(buffer[: cut + 1]),
+                    status_code=status_code,
+                    slow_threshold=slow_threshold,
+                    status_codes=status_codes,
+                    normalizer=normalizer,
+                    url_histograms=url_histograms,
+                    time_bucket=time_bucket,
+                    distinct_ips=distinct_ips,
+                )
+            )
+            del buffer[: cut + 1]
+        return cut
+
+    for data in data_chunks:
+        buffer += data
+        if head is None:
+            newline = buffer.find(b"\n")
+            if newline == -1:
+                continue
+            head = bytes(buffer[:newline])
+            del buffer[: newline + 1]
+        if len(buffer) >= chunk_bytes:
+            flush()
+
+    if not reader.valid:
+        return MemberPartial(start=start, stop=start, valid=False)
+    if head is None:
+        return MemberPartial(start=start, stop=reader.stop, head=bytes(buffer))
+
+    flush()
+    stats = accumulator.result()
+    stats.read_seconds += data_chunks.seconds
+    return MemberPartial(
+        start=start,
+        stop=reader.stop,
+        stats=stats,
+        head=head,
+        tail=bytes(buffer),
+        has_newline=True,
+    )
+
+
+def merge_member_partials(
+    parts: Iterable[MemberPartial],
+    size: int,
+    status_code: int = 500,
+    slow_threshold: int = 200,
+    status_codes: Sequence[int] | None = None,
+    engine: str = "python",
+    sketch: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> Optional[PartialStats]:
+    """Fusiona las salidas de ``process_member_range`` uniendo líneas partidas.
+
+    Parámetros:
+        parts: Salidas de los workers, en cualquier orden.
+        size: Tamaño del archivo comprimido.
+        status_code: Código HTTP a contabilizar (compatibilidad).
+        slow_threshold: Umbral en milisegundos para requests "lentas".
+        status_codes: Lista de códigos HTTP a contabilizar.
+        engine: Motor de conteo, ver ``batch_function``.
+        sketch: Modo aproximado, ver ``process_range``.
+        normalizer: Normalización de URLs, ver ``process_batch``.
+        url_histograms: Histogramas de latencia por URL, ver ``process_batch``.
+        time_bucket: Serie temporal por buckets, ver ``process_batch``.
+        distinct_ips: IPs distintas, ver ``process_batch``.
+
+    Retorna:
+        El ``PartialStats`` fusionado, o ``None`` si algún rango empezaba en un
+        falso inicio de miembro o los rangos no se encadenan hasta ``size``; en
+        ese caso el llamador debe reprocesar el archivo secuencialmente.
+    """
+
+    ordered = sorted(parts, key=lambda part: part.start)
+    expected = 0
+    for part in ordered:
+        if not part.valid or part.start != expected:
+            return None
+        expected = part.stop
+    if expected != size:
+        return None
+
+    stitched = []
+    carry = b""
+    for part in ordered:
+        if part.has_newline:
+            stitched.append(carry + part.head)
+            carry = part.tail
+        else:
+            carry += part.head
+    if carry:
+        stitched.append(carry)
+
+    partials = [part.stats for part in ordered]
+    if stitched:
+        partials.append(
+            batch_function("mmap", engine)(
+                b"\n".join(stitched) + b"\n",
+                status_code=status_code,
+                slow_threshold=slow_threshold,
+                status_codes=status_codes,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+        )
+    return merge_partials(partials, sketch=sketch)
+
+
+def process_unit(
+    unit: WorkUnit,
+    batch_size: int = 10_000,
+    status_code: int = 500,
+    slow_threshold: int = 200,
+    status_codes: Sequence[int] | None = None,
+    backend: str = "text",
+    engine: str = "python",
+    sketch: Optional[SketchConfig] = None,
+    normalizer: Optional[UrlNormalizer] = None,
+    url_histograms: bool = False,
+    time_bucket: Optional[int] = None,
+    distinct_ips: Optional[int] = None,
+) -> List[Tuple[str, Union[PartialStats, MemberPartial]]]:
+    """Procesa todos los tramos de una unidad de ``inputs.plan_work``.
+
+    Retorna:
+        Un par ``(ruta, parcial)`` por tramo. Los tramos planos devuelven un
+        ``PartialStats``; los comprimidos, un ``MemberPartial`` que el padre
+        fusiona con ``merge_member_partials`` al reunir todos los del archivo.
+    """
+
+    results: List[Tuple[str, Union[PartialStats, MemberPartial]]] = []
+    for piece in unit.pieces:
+        byte_range = (piece.start, piece.end)
+        if piece.codec is not None:
+            part: Union[PartialStats, MemberPartial] = process_member_range(
+                byte_range,
+                piece.path,
+                piece.codec,
+                batch_size=batch_size,
+                status_code=status_code,
+                slow_threshold=slow_threshold,
+                status_codes=status_codes,
+                engine=engine,
+                sketch=sketch,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+        else:
+            part = process_range(
+                byte_range,
+                piece.path,
+                batch_size=batch_size,
+                status_code=status_code,
+                slow_threshold=slow_threshold,
+                status_codes=status_codes,
+                backend=backend,
+                engine=engine,
+                sketch=sketch,
+                normalizer=normalizer,
+                url_histograms=url_histograms,
+                time_bucket=time_bucket,
+                distinct_ips=distinct_ips,
+            )
+        results.append((piece.path, part))
+    return results
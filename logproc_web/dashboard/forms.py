@@ -7,6 +7,8 @@ import os
 from django import forms
 from django.db import models
 
+from logproc.inputs import expand_inputs
+
 from .models import ProcessingRun
 
 
@@ -18,6 +20,11 @@ class ProcessingRunForm(forms.ModelForm):
         UPLOAD = "upload", "Upload"
 
     profile = forms.BooleanField(required=False, label="Activar profiling")
+    sharded = forms.BooleanField(
+        required=False,
+        label="Leer por rangos en cada worker",
+        help_text="Cada worker abre y lee su propio tramo del archivo (recomendado para archivos grandes).",
+    )
     input_mode = forms.ChoiceField(
         label="Fuente de datos",
         choices=InputMode.choices,
@@ -39,14 +46,22 @@ class ProcessingRunForm(forms.ModelForm):
             "slow_threshold",
             "status_codes",
             "workers",
+            "sharded",
+            "memory_budget_mb",
             "profile",
         ]
         labels = {
-            "input_path": "Ruta al archivo",
+            "input_path": "Ruta, glob o directorio",
             "uploaded_file": "Subir archivo",
             "batch_size": "Tamaño de lote",
             "slow_threshold": "Umbral de lentitud (ms)",
             "workers": "Cantidad de workers",
+            "memory_budget_mb": "Presupuesto de memoria (MB)",
+        }
+        help_texts = {
+            "memory_budget_mb": (
+                "Opcional. Ajusta el tamaño de lote en bytes y los lotes en vuelo según la memoria usada."
+            ),
         }
 
     def __init__(self, *args, **kwargs):
@@ -89,14 +104,21 @@ class ProcessingRunForm(forms.ModelForm):
         input_path = (cleaned.get("input_path") or "").strip()
         uploaded_file = cleaned.get("uploaded_file")
 
+        if cleaned.get("memory_budget_mb") and cleaned.get("sharded"):
+            raise forms.ValidationError("El presupuesto de memoria no se combina con la lectura por rangos.")
+
         if input_mode == self.InputMode.PATH:
             if not input_path:
                 raise forms.ValidationError("Debe indicar una ruta de archivo.")
             if uploaded_file:
                 raise forms.ValidationError("Si usa ruta, no debe subir archivo.")
-            if not os.path.exists(input_path):
+            try:
+                paths = expand_inputs(input_path)
+            except ValueError:
+                raise forms.ValidationError("El glob o directorio indicado no contiene archivos.") from None
+            if not os.path.exists(paths[0]):
                 raise forms.ValidationError("La ruta indicada no existe.")
-            if not os.path.isfile(input_path):
+            if not os.path.isfile(paths[0]):
                 raise forms.ValidationError("La ruta indicada debe ser un archivo regular.")
             cleaned["uploaded_file"] = None
             cleaned["input_path"] = input_path
@@ -6,17 +6,49 @@ externos y reintentos. Este runner con hilo local es deliberadamente liviano.
 
 from __future__ import annotations
 
+import os
 import threading
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 
+from django.conf import settings
 from django.utils import timezone
 
-from logproc.api import process_log
+from logproc.api import process_log, process_queries
+from logproc.column_cache import DEFAULT_MAX_BYTES, ColumnCache
+from logproc.compression import detect_compression
+from logproc.inputs import expand_inputs
+from logproc.queries import QuerySpec
+from logproc.result_cache import ResultCache
+from logproc.timeseries import DEFAULT_BUCKET_SECONDS
 
 from .models import ProcessingRun
 
 
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+# Corridas a la espera de agruparse, por (ruta, batch_size, workers).
+GroupKey = Tuple[str, int, int]
+_pending_groups: Dict[GroupKey, List[int]] = {}
+_pending_lock = threading.Lock()
+
+
+def _get_result_cache() -> ResultCache:
+    """Devuelve la caché de resultados compartida por todas las corridas."""
+
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(
+                directory=getattr(settings, "LOGPROC_RESULT_CACHE_DIR", None),
+                max_entries=getattr(settings, "LOGPROC_RESULT_CACHE_MAX_ENTRIES", 256),
+                ttl_seconds=getattr(settings, "LOGPROC_RESULT_CACHE_TTL_SECONDS", 24 * 60 * 60),
+            )
+        return _result_cache
+
+
 def _resolve_input_path(run: ProcessingRun) -> str:
     """Resuelve la ruta efectiva desde el path explícito o archivo subido."""
 
@@ -34,15 +66,66 @@ def _parse_status_codes(raw_codes: str) -> list[int]:
     return parsed_codes or [500]
 
 
-def _execute_run(run_id: int) -> None:
-    """Ejecuta una corrida y persiste estado final y métricas."""
+def _column_cache() -> Optional[ColumnCache]:
+    """Construye la caché de columnas configurada en settings, si la hay."""
+
+    cache_dir = getattr(settings, "LOGPROC_COLUMN_CACHE_DIR", None)
+    if not cache_dir:
+        return None
+    max_bytes = getattr(settings, "LOGPROC_COLUMN_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+    return ColumnCache(cache_dir, max_bytes=max_bytes)
+
+
+def _is_plain_file(path: str) -> bool:
+    """Indica si ``path`` es un único archivo regular sin comprimir."""
+
+    return os.path.isfile(path) and detect_compression(path) is None
+
+
+def _mark_running(run: ProcessingRun) -> None:
+    """Persiste el inicio de una corrida."""
 
-    run = ProcessingRun.objects.get(pk=run_id)
     run.status = ProcessingRun.Status.RUNNING
     run.started_at = timezone.now()
     run.error_message = ""
     run.save(update_fields=["status", "started_at", "error_message"])
 
+
+def _store_result(run: ProcessingRun, result) -> None:
+    """Copia en la corrida las métricas de un ``ProcessingResult``."""
+
+    run.total_lines = result.total_lines
+    run.bad_lines = result.bad_lines
+    run.total_500 = result.total_status
+    run.total_slow = result.total_slow
+    run.top_url_500 = result.top_url_status[0]
+    run.top_url_500_count = result.top_url_status[1]
+    run.top_url_slow = result.top_url_slow[0]
+    run.top_url_slow_count = result.top_url_slow[1]
+    run.duration_seconds = result.elapsed_seconds
+    run.metrics_json = {
+        "top_10_status": list(result.top_10_status),
+        "top_10_slow": list(result.top_10_slow),
+        "per_file": result.per_file if result.input_files > 1 else {},
+        "latency": result.latency or {},
+        "latency_by_url": result.latency_by_url or {},
+        "time_bucket": result.time_bucket,
+        "time_series": result.time_series or [],
+        "timings": result.timings or {},
+        "peak_rss_bytes": result.peak_rss_bytes,
+        "worker_peak_rss_bytes": result.worker_peak_rss_bytes,
+        "memory_budget": result.memory_budget or {},
+    }
+    run.profile_stats_path = result.profile_stats_path
+    run.status = ProcessingRun.Status.DONE
+
+
+def _execute_run(run_id: int) -> None:
+    """Ejecuta una corrida y persiste estado final y métricas."""
+
+    run = ProcessingRun.objects.get(pk=run_id)
+    _mark_running(run)
+
     try:
         input_path = _resolve_input_path(run)
         stats_dir = Path("profile_stats")
@@ -56,25 +139,24 @@ def _execute_run(run_id: int) -> None:
             status_code=run.status_code,
             status_codes=_parse_status_codes(run.status_codes),
             workers=run.workers,
+            sharded=run.sharded,
+            memory_budget=run.memory_budget_mb * 1024**2 if run.memory_budget_mb else None,
+            # La caché de columnas solo admite un único archivo regular sin
+            # comprimir, no se combina con el presupuesto de memoria (que
+            # parsea por lotes) y reemplazaría la lectura particionada.
+            column_cache=(
+                _column_cache()
+                if _is_plain_file(input_path) and not run.memory_budget_mb and not run.sharded
+                else None
+            ),
+            cache=_get_result_cache(),
             profile=run.profile,
             profile_stats_path=profile_stats_path,
+            per_file=True,
+            url_histograms=True,
+            time_bucket=DEFAULT_BUCKET_SECONDS,
         )
-
-        run.total_lines = result.total_lines
-        run.bad_lines = result.bad_lines
-        run.total_500 = result.total_status
-        run.total_slow = result.total_slow
-        run.top_url_500 = result.top_url_status[0]
-        run.top_url_500_count = result.top_url_status[1]
-        run.top_url_slow = result.top_url_slow[0]
-        run.top_url_slow_count = result.top_url_slow[1]
-        run.duration_seconds = result.elapsed_seconds
-        run.metrics_json = {
-            "top_10_status": list(result.top_10_status),
-            "top_10_slow": list(result.top_10_slow),
-        }
-        run.profile_stats_path = result.profile_stats_path
-        run.status = ProcessingRun.Status.DONE
+        _store_result(run, result)
     except Exception as exc:  # noqa: BLE001
         run.status = ProcessingRun.Status.FAILED
         run.error_message = str(exc)
@@ -83,8 +165,103 @@ def _execute_run(run_id: int) -> None:
         run.save()
 
 
+def _execute_group(run_ids: List[int]) -> None:
+    """Ejecuta corridas sobre la misma entrada con una sola lectura del archivo.
+
+    Las corridas solo difieren en ``slow_threshold`` y códigos HTTP, así que se
+    evalúan juntas con ``process_queries``. Si la pasada compartida falla,
+    todas las corridas del grupo quedan fallidas con el mismo error.
+    """
+
+    if len(run_ids) == 1:
+        _execute_run(run_ids[0])
+        return
+
+    runs = [ProcessingRun.objects.get(pk=run_id) for run_id in run_ids]
+    for run in runs:
+        _mark_running(run)
+
+    try:
+        input_path = runs[0].input_path
+        queries = [
+            QuerySpec(slow_threshold=run.slow_threshold, status_codes=_parse_status_codes(run.status_codes))
+            for run in runs
+        ]
+        results = process_queries(
+            input_path,
+            queries,
+            batch_size=runs[0].batch_size,
+            workers=runs[0].workers,
+            column_cache=_column_cache() if _is_plain_file(input_path) else None,
+            cache=_get_result_cache(),
+            per_file=True,
+            url_histograms=True,
+            time_bucket=DEFAULT_BUCKET_SECONDS,
+        )
+        for run, result in zip(runs, results):
+            _store_result(run, result)
+    except Exception as exc:  # noqa: BLE001
+        for run in runs:
+            run.status = ProcessingRun.Status.FAILED
+            run.error_message = str(exc)
+    finally:
+        for run in runs:
+            run.finished_at = timezone.now()
+            run.save()
+
+
+def _group_key(run: ProcessingRun) -> Optional[GroupKey]:
+    """Clave de agrupación de una corrida, o ``None`` si debe correr sola.
+
+    Las corridas con perfilado (cada una guarda su propio ``.stats``), las de
+    archivos subidos (cada subida es un archivo distinto) y las que
+    ``process_queries`` no admite (presupuesto de memoria, modo particionado o
+    entradas comprimidas) no se agrupan.
+    """
+
+    if run.profile or run.memory_budget_mb or run.sharded or not run.input_path:
+        return None
+    try:
+        paths = expand_inputs(run.input_path)
+    except (OSError, ValueError):
+        # El error se informa al ejecutarla sola.
+        return None
+    if any(detect_compression(path) is not None for path in paths):
+        return None
+    return (run.input_path, run.batch_size, run.workers)
+
+
+def _flush_group(key: GroupKey) -> None:
+    """Ejecuta el grupo pendiente de ``key`` al cerrar su ventana."""
+
+    with _pending_lock:
+        run_ids = _pending_groups.pop(key, [])
+    if run_ids:
+        _execute_group(run_ids)
+
+
 def launch_run_in_background(run: ProcessingRun) -> None:
-    """Inicia un hilo daemon asíncrono para una ejecución."""
+    """Agenda una ejecución en un hilo daemon.
+
+    Las corridas sobre la misma ruta creadas dentro de
+    ``LOGPROC_COALESCE_SECONDS`` se agrupan y comparten una sola lectura del
+    archivo (ver ``_execute_group``). Con ``0`` cada corrida arranca enseguida
+    por separado.
+    """
+
+    window = getattr(settings, "LOGPROC_COALESCE_SECONDS", 0)
+    key = _group_key(run)
+    if key is None or window <= 0:
+        thread = threading.Thread(target=_execute_run, args=(run.pk,), daemon=True)
+        thread.start()
+        return
 
-    thread = threading.Thread(target=_execute_run, args=(run.pk,), daemon=True)
-    thread.start()
+    with _pending_lock:
+        group = _pending_groups.get(key)
+        if group is not None:
+            group.append(run.pk)
+            return
+        _pending_groups[key] = [run.pk]
+    timer = threading.Timer(window, _flush_group, args=(key,))
+    timer.daemon = True
+    timer.start()
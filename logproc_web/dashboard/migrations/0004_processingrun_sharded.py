@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0003_alter_processingrun_input_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="processingrun",
+            name="sharded",
+            field=models.BooleanField(default=False),
+        ),
+    ]
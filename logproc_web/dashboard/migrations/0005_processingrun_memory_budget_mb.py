@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0004_processingrun_sharded"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="processingrun",
+            name="memory_budget_mb",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
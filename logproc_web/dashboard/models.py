@@ -27,6 +27,8 @@ class ProcessingRun(models.Model):
     status_code = models.PositiveIntegerField(default=500)
     status_codes = models.CharField(max_length=200, default="500")
     workers = models.PositiveIntegerField(default=1)
+    sharded = models.BooleanField(default=False)
+    memory_budget_mb = models.PositiveIntegerField(null=True, blank=True)
     profile = models.BooleanField(default=False)
 
     total_lines = models.BigIntegerField(default=0)
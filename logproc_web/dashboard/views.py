@@ -57,6 +57,16 @@ def run_detail(request, run_id: int):
     run = get_object_or_404(ProcessingRun, pk=run_id)
     top_10_status = run.metrics_json.get("top_10_status", []) if run.metrics_json else []
     top_10_slow = run.metrics_json.get("top_10_slow", []) if run.metrics_json else []
+    per_file = run.metrics_json.get("per_file", {}) if run.metrics_json else {}
+    latency = run.metrics_json.get("latency", {}) if run.metrics_json else {}
+    latency_by_url = run.metrics_json.get("latency_by_url", {}) if run.metrics_json else {}
+    time_series = run.metrics_json.get("time_series", []) if run.metrics_json else []
+    time_bucket = run.metrics_json.get("time_bucket") if run.metrics_json else None
+    timings = run.metrics_json.get("timings", {}) if run.metrics_json else {}
+    memory = {
+        key: run.metrics_json.get(key) if run.metrics_json else None
+        for key in ("peak_rss_bytes", "worker_peak_rss_bytes", "memory_budget")
+    }
 
     return render(
         request,
@@ -65,5 +75,12 @@ def run_detail(request, run_id: int):
             "run": run,
             "top_10_status": top_10_status,
             "top_10_slow": top_10_slow,
+            "per_file": per_file,
+            "latency": latency,
+            "latency_by_url": latency_by_url,
+            "time_series": time_series,
+            "time_bucket": time_bucket,
+            "timings": timings,
+            "memory": memory,
         },
     )
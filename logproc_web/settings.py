@@ -64,3 +64,23 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Caché de columnas parseadas de logproc (opcional, desactivada con ``None``):
+# re-ejecutar un mismo archivo con otros umbrales/códigos no vuelve a parsearlo.
+# La primera corrida sobre cada archivo escribe un sidecar de ~18 bytes por
+# línea válida más la tabla de URLs; el directorio se acota con
+# ``LOGPROC_COLUMN_CACHE_MAX_BYTES`` (desalojo LRU). Las corridas que la usan
+# no leen el log, así que no aplica ``sharded``; las corridas particionadas no
+# la usan. Por ejemplo: ``BASE_DIR / "column_cache"``.
+LOGPROC_COLUMN_CACHE_DIR = None
+LOGPROC_COLUMN_CACHE_MAX_BYTES = 2 * 1024**3
+
+# Caché de resultados: una corrida idéntica (mismo archivo, umbral y códigos)
+# se responde sin reprocesar. ``None`` como directorio la mantiene solo en memoria.
+LOGPROC_RESULT_CACHE_DIR = BASE_DIR / "result_cache"
+LOGPROC_RESULT_CACHE_MAX_ENTRIES = 256
+LOGPROC_RESULT_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Las corridas sobre una misma ruta creadas dentro de esta ventana (segundos) se
+# procesan juntas con una sola lectura del archivo. ``0`` desactiva el agrupamiento.
+LOGPROC_COALESCE_SECONDS = 1.0
@@ -0,0 +1,120 @@
+"""Pruebas del modo incremental con checkpoints."""
+
+import os
+
+from logproc import api
+from logproc.api import process_log
+from logproc.checkpoint import load_checkpoint
+from logproc.result_cache import ResultCache
+
+
+def _line(i):
+    return f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 5}" {500 if i % 2 else 200} {i % 400}\n'
+
+
+def _append(path, start, stop, tail=""):
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.writelines(_line(i) for i in range(start, stop))
+        handle.write(tail)
+
+
+def _spy_offsets(monkeypatch):
+    offsets = []
+    original = api._run_sharded
+
+    def spy(*args, **kwargs):
+        offsets.append(kwargs.get("start", 0))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(api, "_run_sharded", spy)
+    return offsets
+
+
+def test_segunda_corrida_procesa_solo_la_cola(tmp_path, monkeypatch):
+    log_path = str(tmp_path / "access.log")
+    checkpoint_path = str(tmp_path / "access.ckpt")
+    offsets = _spy_offsets(monkeypatch)
+
+    _append(log_path, 0, 300)
+    first = process_log(log_path, workers=1, checkpoint_path=checkpoint_path)
+    size_after_first = os.path.getsize(log_path)
+
+    _append(log_path, 300, 450)
+    second = process_log(log_path, workers=2, checkpoint_path=checkpoint_path)
+    full = process_log(log_path, workers=1)
+
+    assert first.total_lines == 300
+    assert offsets == [0, size_after_first]
+    assert (second.total_lines, second.total_status, second.total_slow) == (
+        full.total_lines,
+        full.total_status,
+        full.total_slow,
+    )
+    assert second.top_10_status == full.top_10_status
+    assert load_checkpoint(checkpoint_path).offset == os.path.getsize(log_path)
+
+
+def test_linea_incompleta_espera_a_la_siguiente_corrida(tmp_path):
+    log_path = str(tmp_path / "access.log")
+    checkpoint_path = str(tmp_path / "access.ckpt")
+    partial_line = _line(10)
+
+    _append(log_path, 0, 10, tail=partial_line[:20])
+    first = process_log(log_path, workers=1, checkpoint_path=checkpoint_path)
+    _append(log_path, 0, 0, tail=partial_line[20:])
+    second = process_log(log_path, workers=1, checkpoint_path=checkpoint_path)
+
+    assert first.total_lines == 10
+    assert second.total_lines == 11
+    assert second.bad_lines == 0
+
+
+def test_truncado_y_rotacion_fuerzan_reproceso_completo(tmp_path, monkeypatch):
+    log_path = str(tmp_path / "access.log")
+    checkpoint_path = str(tmp_path / "access.ckpt")
+    offsets = _spy_offsets(monkeypatch)
+
+    _append(log_path, 0, 200)
+    process_log(log_path, workers=1, checkpoint_path=checkpoint_path)
+
+    with open(log_path, "w", encoding="utf-8"):
+        pass
+    _append(log_path, 0, 50)
+    truncated = process_log(log_path, workers=1, checkpoint_path=checkpoint_path)
+
+    rotated_path = str(tmp_path / "access.log.new")
+    _append(rotated_path, 0, 80)
+    os.replace(rotated_path, log_path)
+    rotated = process_log(log_path, workers=1, checkpoint_path=checkpoint_path)
+
+    assert offsets[1:] == [0, 0]
+    assert truncated.total_lines == 50
+    assert rotated.total_lines == 80
+
+
+def test_cambio_de_parametros_reprocesa(tmp_path):
+    log_path = str(tmp_path / "access.log")
+    checkpoint_path = str(tmp_path / "access.ckpt")
+    _append(log_path, 0, 100)
+
+    process_log(log_path, workers=1, status_codes=[500], checkpoint_path=checkpoint_path)
+    result = process_log(log_path, workers=1, status_codes=[200], checkpoint_path=checkpoint_path)
+
+    assert result.total_lines == 100
+    assert result.total_status == 50
+
+
+def test_checkpoint_no_usa_la_cache_de_resultados(tmp_path):
+    log_path = str(tmp_path / "access.log")
+    checkpoint_path = str(tmp_path / "access.ckpt")
+    cache = ResultCache()
+    _append(log_path, 0, 100, tail=_line(100).rstrip("\n"))
+
+    incremental = process_log(log_path, workers=1, cache=cache, checkpoint_path=checkpoint_path)
+    full = process_log(log_path, workers=1, cache=cache)
+    again = process_log(log_path, workers=1, cache=cache, checkpoint_path=checkpoint_path)
+
+    assert incremental.total_lines == 100
+    assert not full.from_cache and full.total_lines == 101
+    assert not again.from_cache and again.total_lines == 100
+    assert load_checkpoint(checkpoint_path).offset == os.path.getsize(log_path) - len(_line(100)) + 1
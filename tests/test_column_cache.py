@@ -0,0 +1,108 @@
+"""Pruebas de la caché persistente de columnas parseadas."""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from logproc import columnar
+from logproc.api import process_log
+from logproc.column_cache import ColumnCache
+from logproc.fingerprint import file_fingerprint
+
+
+def _write_log(path, total_lines, offset=0):
+    with open(path, "a", encoding="utf-8") as handle:
+        for i in range(offset, offset + total_lines):
+            if i % 97 == 0:
+                handle.write("línea rota\n")
+                continue
+            handle.write(f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 13}" {(500, 404, 200)[i % 3]} {i % 600}\n')
+    return str(path)
+
+
+def _assert_same(cached, fresh):
+    assert cached.total_lines == fresh.total_lines
+    assert cached.bad_lines == fresh.bad_lines
+    assert cached.total_status == fresh.total_status
+    assert cached.total_slow == fresh.total_slow
+    assert cached.top_10_status == fresh.top_10_status
+    assert cached.top_10_slow == fresh.top_10_slow
+
+
+@pytest.mark.parametrize("numpy_enabled", [True, False])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cache_responde_igual_que_procesar(tmp_path, monkeypatch, workers, numpy_enabled):
+    if numpy_enabled and not columnar.HAS_NUMPY:
+        pytest.skip("NumPy no instalado")
+    monkeypatch.setattr(columnar, "HAS_NUMPY", numpy_enabled)
+    log_path = _write_log(tmp_path / "access.log", 3_000)
+    cache = ColumnCache(tmp_path / "cache")
+
+    for slow_threshold, status_codes in [(200, [500]), (450, [404, 500]), (0, [200])]:
+        cached = process_log(
+            log_path,
+            batch_size=256,
+            slow_threshold=slow_threshold,
+            status_codes=status_codes,
+            workers=workers,
+            column_cache=cache,
+        )
+        fresh = process_log(log_path, slow_threshold=slow_threshold, status_codes=status_codes, workers=1)
+        _assert_same(cached, fresh)
+
+    assert len(list((tmp_path / "cache").glob("*.cols"))) == 1
+
+
+def test_cache_se_invalida_si_cambia_el_archivo(tmp_path):
+    log_path = _write_log(tmp_path / "access.log", 500)
+    cache = ColumnCache(tmp_path / "cache")
+    process_log(log_path, workers=1, column_cache=cache)
+
+    _write_log(tmp_path / "access.log", 100, offset=500)
+    assert not cache.lookup(file_fingerprint(log_path))
+
+    result = process_log(log_path, workers=1, column_cache=cache)
+    assert result.total_lines == 600
+    assert cache.lookup(file_fingerprint(log_path))
+
+
+def test_cache_desaloja_lru_por_tamano(tmp_path):
+    paths = [_write_log(tmp_path / f"access_{i}.log", 2_000) for i in range(3)]
+    cache = ColumnCache(tmp_path / "cache")
+    process_log(paths[0], workers=1, column_cache=cache)
+    entry_size = os.path.getsize(cache.entry_path(file_fingerprint(paths[0])))
+
+    cache.max_bytes = entry_size * 2
+    process_log(paths[1], workers=1, column_cache=cache)
+    os.utime(cache.entry_path(file_fingerprint(paths[0])), ns=(1, 1))
+    os.utime(cache.entry_path(file_fingerprint(paths[1])), ns=(2, 2))
+    process_log(paths[2], workers=1, column_cache=cache)
+
+    assert not cache.entry_path(file_fingerprint(paths[0])).exists()
+    assert cache.lookup(file_fingerprint(paths[1]))
+    assert cache.lookup(file_fingerprint(paths[2]))
+
+
+def test_escritores_concurrentes_no_se_pisan(tmp_path, monkeypatch):
+    log_path = _write_log(tmp_path / "access.log", 3_000)
+    cache = ColumnCache(tmp_path / "cache")
+    # Ambos escritores terminan de escribir antes de que alguno publique.
+    barrier = threading.Barrier(2, timeout=10)
+    original_replace = os.replace
+
+    def replace(src, dst):
+        barrier.wait()
+        original_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda _: process_log(log_path, workers=1, column_cache=cache), range(2)))
+    monkeypatch.undo()
+
+    fresh = process_log(log_path, workers=1)
+    assert cache.lookup(file_fingerprint(log_path))
+    for result in results + [process_log(log_path, workers=1, column_cache=cache)]:
+        _assert_same(result, fresh)
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == [cache.entry_path(file_fingerprint(log_path)).name]
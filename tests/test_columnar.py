@@ -0,0 +1,74 @@
+"""Pruebas del motor columnar con NumPy y de su fallback puro Python."""
+
+import random
+
+import pytest
+
+from logproc import columnar
+from logproc.worker import batch_function, process_batch, process_chunk
+
+
+def _random_batch(seed, size=2_000):
+    rng = random.Random(seed)
+    batch = []
+    for i in range(size):
+        if rng.random() < 0.05:
+            batch.append("línea rota\n")
+            continue
+        url = f"/u{rng.randint(0, 40)}" + ("?q=ñ" if rng.random() < 0.1 else "")
+        status = rng.choice([200, 404, 500, 503])
+        response_time = rng.choice([rng.randint(0, 400), 2**40])
+        batch.append(f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET {url}" {status} {response_time}\n')
+    return batch
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_motor_numpy_identico_a_python(seed):
+    pytest.importorskip("numpy")
+    batch = _random_batch(seed)
+
+    expected = process_batch(batch, status_codes=[500, 503], slow_threshold=150)
+    result = columnar.process_batch_columnar(batch, status_codes=[500, 503], slow_threshold=150)
+
+    assert result == expected
+    assert list(result.status_by_url) == list(expected.status_by_url)
+    assert list(result.slow_by_url) == list(expected.slow_by_url)
+
+
+@pytest.mark.parametrize("slow_threshold", [2**32 - 2, 2**32 - 1, 2**63, 2**64 - 1, 2**64])
+def test_motor_numpy_identico_con_latencias_enormes(slow_threshold):
+    pytest.importorskip("numpy")
+    times = [0, 2**32 - 1, 2**32, 2**63 + 5, 2**64 - 1]
+    if slow_threshold >= 2**64 - 1:
+        times.append(2**70)
+    batch = [f'10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /u{i}" 500 {value}\n' for i, value in enumerate(times)]
+    chunk = "".join(batch).encode("utf-8")
+
+    options = {"slow_threshold": slow_threshold, "url_histograms": True}
+    assert columnar.process_batch_columnar(batch, **options) == process_batch(batch, **options)
+    assert columnar.process_chunk_columnar(chunk, **options) == process_chunk(chunk, **options)
+
+
+def test_motor_numpy_bytes_identico_a_python():
+    pytest.importorskip("numpy")
+    chunk = "".join(_random_batch(7)).encode("utf-8")
+
+    assert columnar.process_chunk_columnar(chunk, status_codes=[404]) == process_chunk(chunk, status_codes=[404])
+
+
+def test_motor_numpy_lote_vacio():
+    pytest.importorskip("numpy")
+
+    assert columnar.process_batch_columnar([]) == process_batch([])
+
+
+def test_sin_numpy_recurre_a_python(monkeypatch):
+    monkeypatch.setattr(columnar, "HAS_NUMPY", False)
+
+    assert batch_function("text", "numpy") is process_batch
+    assert batch_function("mmap", "numpy") is process_chunk
+
+
+def test_motor_desconocido():
+    with pytest.raises(ValueError):
+        batch_function("text", "fortran")
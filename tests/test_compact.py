@@ -0,0 +1,63 @@
+"""Pruebas del formato compacto de conteos por URL."""
+
+import pickle
+
+from logproc.compact import PackedUrlCounts, UrlTable
+from logproc.metrics import PartialStats
+from logproc.normalize import UrlNormalizer
+from logproc.reducer import StatsAccumulator, merge_partials
+from logproc.worker import process_batch
+
+
+def _batch(offset, count=600):
+    return [
+        f'10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /u/{(offset + i) % 400}" {500 if i % 3 else 200} {i % 400}\n'
+        for i in range(count)
+    ]
+
+
+def test_columnas_ida_y_vuelta_con_ids_implicitos():
+    status = {"/a": 3, "/b": 1, "/c": 70_000}
+    slow = {"/b": 2, "/d": 5, "/e": 2**40}
+    packed = PackedUrlCounts.pack(status, slow)
+
+    assert packed.urls == ["/a", "/c", "/b", "/d", "/e"]
+    assert packed.status_counts.typecode == "I" and packed.slow_counts.typecode == "Q"
+    assert pickle.loads(pickle.dumps(packed)).unpack() == (status, slow)
+    assert PackedUrlCounts.pack({}, {}).unpack() == ({}, {})
+
+    table = UrlTable()
+    table.add(packed)
+    table.add(PackedUrlCounts.pack({"/d": 1}, {"/a": 4}))
+    assert table.counts() == ({"/a": 3, "/b": 1, "/c": 70_000, "/d": 1}, {"/a": 4, "/b": 2, "/d": 5, "/e": 2**40})
+
+
+def test_parciales_deserializados_se_fusionan_igual_que_los_diccionarios():
+    partials = [process_batch(_batch(offset), status_codes=[500]) for offset in range(0, 3_000, 300)]
+    expected = merge_partials(partials)
+
+    restored = [pickle.loads(pickle.dumps(part)) for part in partials]
+    assert restored[0].packed_urls is not None and not restored[0].status_by_url
+    merged = merge_partials(restored)
+    assert (merged.status_by_url, merged.slow_by_url) == (expected.status_by_url, expected.slow_by_url)
+    assert merged.total_status == expected.total_status and merged.latency == expected.latency
+
+    # Parciales del mismo proceso y de otro pueden mezclarse.
+    accumulator = StatsAccumulator()
+    accumulator.add(partials[0])
+    for part in [pickle.loads(pickle.dumps(part)) for part in partials[1:]]:
+        accumulator.add(part)
+    assert accumulator.result().status_by_url == expected.status_by_url
+
+
+def test_parcial_deserializado_se_desempaqueta_al_usarse():
+    part = pickle.loads(pickle.dumps(process_batch(_batch(0), status_codes=[500])))
+    assert part.to_dict()["status_by_url"] == process_batch(_batch(0), status_codes=[500]).status_by_url
+    assert part.packed_urls is None
+
+    other = pickle.loads(pickle.dumps(process_batch(_batch(0), status_codes=[500])))
+    UrlNormalizer(rules=[(r"^/u/\d+$", "/u")]).apply(other)
+    assert other.status_by_url == {"/u": other.total_status}
+
+    empty = pickle.loads(pickle.dumps(PartialStats()))
+    assert empty.packed_urls is None and empty == PartialStats()
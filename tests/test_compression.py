@@ -0,0 +1,95 @@
+"""Pruebas de entrada comprimida (gzip, bz2, xz) y descompresión por miembros."""
+
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from logproc.api import process_log
+from logproc.compression import CODECS, detect_compression, member_ranges
+from logproc.worker import process_member_range
+
+_COMPRESS = {"gzip": gzip.compress, "bz2": bz2.compress, "xz": lzma.compress}
+
+
+def _log_bytes(total=600):
+    lines = [
+        f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 7}" {500 if i % 3 else 200} {i % 400}\n'
+        for i in range(total)
+    ]
+    lines.append("linea rota\n")
+    lines.append('10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /final" 500 999')
+    return "".join(lines).encode("utf-8")
+
+
+def _write_members(path, data, codec, member_bytes):
+    # Corta en offsets arbitrarios para que haya líneas partidas entre miembros.
+    with open(path, "wb") as handle:
+        for offset in range(0, len(data), member_bytes):
+            handle.write(_COMPRESS[codec](data[offset : offset + member_bytes]))
+    return str(path)
+
+
+def _summary(result):
+    return (
+        result.total_lines,
+        result.bad_lines,
+        result.total_status,
+        result.total_slow,
+        result.top_10_status,
+        result.top_10_slow,
+    )
+
+
+@pytest.fixture
+def plain_log(tmp_path):
+    data = _log_bytes()
+    path = tmp_path / "access.log"
+    path.write_bytes(data)
+    return data, str(path)
+
+
+def test_detecta_codec_por_magic_bytes(tmp_path, plain_log):
+    data, plain_path = plain_log
+    assert detect_compression(plain_path) is None
+    for codec in CODECS:
+        path = _write_members(tmp_path / f"access.{codec}", data, codec, len(data))
+        assert detect_compression(path) == codec
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_archivo_de_un_miembro_coincide_con_texto_plano(tmp_path, plain_log, codec):
+    data, plain_path = plain_log
+    path = _write_members(tmp_path / "access.log.N", data, codec, len(data))
+
+    expected = _summary(process_log(plain_path, batch_size=50, workers=1))
+    assert _summary(process_log(path, batch_size=50, workers=1)) == expected
+    assert _summary(process_log(path, batch_size=50, workers=2)) == expected
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_varios_miembros_se_procesan_en_paralelo(tmp_path, plain_log, codec):
+    data, plain_path = plain_log
+    path = _write_members(tmp_path / "access.log.N", data, codec, 997)
+
+    assert len(member_ranges(path, codec, parts=8)) > 1
+    expected = _summary(process_log(plain_path, batch_size=50, workers=1))
+    assert _summary(process_log(path, batch_size=50, workers=2)) == expected
+
+
+def test_rango_que_no_empieza_en_un_miembro_es_invalido(tmp_path, plain_log):
+    data, _ = plain_log
+    path = _write_members(tmp_path / "access.log.gz", data, "gzip", len(data))
+    size = len(open(path, "rb").read())
+
+    assert process_member_range((0, size), path, "gzip").valid
+    assert not process_member_range((1, size), path, "gzip").valid
+
+
+def test_entrada_comprimida_no_admite_checkpoint(tmp_path, plain_log):
+    data, _ = plain_log
+    path = _write_members(tmp_path / "access.log.gz", data, "gzip", len(data))
+
+    with pytest.raises(ValueError):
+        process_log(path, workers=1, checkpoint_path=str(tmp_path / "ckpt"))
@@ -0,0 +1,123 @@
+"""Pruebas del runner de corridas del dashboard."""
+
+import gzip
+import os
+
+import pytest
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "logproc_web.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test.runner import DiscoverRunner  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from logproc_web import settings as project_settings  # noqa: E402
+from logproc_web.dashboard import job_runner  # noqa: E402
+from logproc_web.dashboard.models import ProcessingRun  # noqa: E402
+
+
+def _log_bytes(total=600):
+    return "".join(
+        f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 7}" {500 if i % 3 else 200} {i % 400}\n'
+        for i in range(total)
+    ).encode("utf-8")
+
+
+@pytest.fixture(scope="module")
+def database():
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    yield
+    runner.teardown_databases(old_config)
+
+
+@pytest.fixture
+def dashboard(database, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(job_runner, "_result_cache", None)
+    with override_settings(
+        LOGPROC_COLUMN_CACHE_DIR=tmp_path / "column_cache",
+        LOGPROC_RESULT_CACHE_DIR=None,
+    ):
+        yield tmp_path
+
+
+def _create_run(input_path, **options):
+    options.setdefault("workers", 1)
+    return ProcessingRun.objects.create(input_path=str(input_path), **options)
+
+
+def test_corrida_sobre_log_comprimido(dashboard):
+    plain_path = dashboard / "access.log"
+    plain_path.write_bytes(_log_bytes())
+    gz_path = dashboard / "access.log.gz"
+    gz_path.write_bytes(gzip.compress(_log_bytes()))
+
+    runs = [_create_run(plain_path), _create_run(gz_path)]
+    for run in runs:
+        job_runner._execute_run(run.pk)
+
+    plain, compressed = (ProcessingRun.objects.get(pk=run.pk) for run in runs)
+    assert compressed.status == ProcessingRun.Status.DONE, compressed.error_message
+    assert (compressed.total_lines, compressed.total_500, compressed.total_slow) == (
+        plain.total_lines,
+        plain.total_500,
+        plain.total_slow,
+    )
+
+
+class _InlineThread:
+    """Reemplazo de ``threading.Thread`` que ejecuta el objetivo al arrancar."""
+
+    def __init__(self, target, args=(), daemon=None):
+        self._target = target
+        self._args = args
+
+    def start(self):
+        self._target(*self._args)
+
+
+def test_agrupamiento_deja_afuera_comprimidos_y_particionados(dashboard, monkeypatch):
+    plain_path = dashboard / "access.log"
+    plain_path.write_bytes(_log_bytes())
+    gz_path = dashboard / "access.log.gz"
+    gz_path.write_bytes(gzip.compress(_log_bytes()))
+    monkeypatch.setattr(job_runner.threading, "Thread", _InlineThread)
+
+    plain = _create_run(plain_path)
+    sharded = _create_run(plain_path, sharded=True)
+    assert job_runner._group_key(plain) == (str(plain_path), plain.batch_size, plain.workers)
+    assert job_runner._group_key(sharded) is None
+
+    with override_settings(LOGPROC_COALESCE_SECONDS=60):
+        runs = [_create_run(gz_path, slow_threshold=threshold) for threshold in (100, 300)]
+        for run in runs:
+            job_runner.launch_run_in_background(run)
+    assert not job_runner._pending_groups
+
+    for run, threshold in zip(runs, (100, 300)):
+        run.refresh_from_db()
+        assert run.status == ProcessingRun.Status.DONE, run.error_message
+        job_runner._execute_run(_create_run(plain_path, slow_threshold=threshold).pk)
+        expected = ProcessingRun.objects.filter(input_path=str(plain_path), slow_threshold=threshold).latest("pk")
+        assert (run.total_lines, run.total_slow) == (expected.total_lines, expected.total_slow)
+
+
+def test_cache_de_columnas_opcional_y_no_usada_al_particionar(dashboard):
+    assert project_settings.LOGPROC_COLUMN_CACHE_DIR is None
+    plain_path = dashboard / "access.log"
+    plain_path.write_bytes(_log_bytes())
+    cache_dir = dashboard / "column_cache"
+
+    sharded = _create_run(plain_path, sharded=True, workers=2)
+    job_runner._execute_run(sharded.pk)
+    sharded.refresh_from_db()
+    assert sharded.status == ProcessingRun.Status.DONE, sharded.error_message
+    assert not list(cache_dir.glob("*.cols"))
+
+    # Otro umbral, para no responder desde la caché de resultados.
+    job_runner._execute_run(_create_run(plain_path, slow_threshold=300).pk)
+    assert len(list(cache_dir.glob("*.cols"))) == 1
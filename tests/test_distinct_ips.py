@@ -0,0 +1,124 @@
+"""Pruebas de la estimación de IPs distintas con HyperLogLog."""
+
+import random
+
+import pytest
+
+from logproc.api import process_log
+from logproc.checkpoint import load_checkpoint
+from logproc.column_cache import ColumnCache
+from logproc.normalize import UrlNormalizer
+from logproc.result_cache import ResultCache
+from logproc.sketches import HyperLogLog, SketchConfig
+
+
+def _ip(index):
+    return f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+
+
+def _write_log(path, count=6_000, seed=4):
+    """Log con URLs de popularidad y público distintos; devuelve las IPs exactas."""
+
+    rng = random.Random(seed)
+    exact = {"*": set()}
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(count):
+            url = f"/p/{i % 6}"
+            # /p/0 la visitan pocas IPs muchas veces; las demás, muchas IPs.
+            ip = _ip(rng.randint(0, 20)) if url == "/p/0" else _ip(rng.randint(0, 2_500 * (i % 6)))
+            exact["*"].add(ip)
+            exact.setdefault(url, set()).add(ip)
+            date = f"10/Sep/2024:15:{i // 60 % 60:02d}:{i % 60:02d} +0000"
+            handle.write(f'{ip} - - [{date}] "GET {url}" {500 if i % 2 else 200} {i % 400}\n')
+        handle.write("linea rota\n")
+    return {url: len(ips) for url, ips in exact.items()}
+
+
+@pytest.mark.parametrize("precision", [10, 14])
+def test_error_frente_a_conteos_exactos(precision):
+    for count in (1, 50, 1_000, 20_000, 150_000):
+        sketch = HyperLogLog(precision)
+        sketch.update(_ip(index) for index in range(count))
+        assert abs(sketch.estimate() - count) <= max(1, 3 * sketch.relative_error() * count)
+
+
+def test_fusion_serializacion_y_forma_dispersa():
+    values = [_ip(index) for index in range(30_000)]
+    whole = HyperLogLog(12)
+    whole.update(values)
+
+    left, right = HyperLogLog(12), HyperLogLog(12)
+    left.update(values[:40])
+    right.update(values[20:])
+    assert left.registers is None and right.registers is not None
+    left.merge(right)
+    assert left == whole and left.estimate() == whole.estimate()
+
+    for sketch in (whole, HyperLogLog(12)):
+        assert HyperLogLog.from_dict(sketch.to_dict()) == sketch
+    small = HyperLogLog(12)
+    small.update(values[:10])
+    assert HyperLogLog.from_dict(small.to_dict()).registers is None
+
+    with pytest.raises(ValueError):
+        whole.merge(HyperLogLog(10))
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"workers": 1},
+        {"workers": 2, "sharded": True, "backend": "mmap"},
+        {"workers": 2, "engine": "numpy", "backend": "mmap", "time_bucket": 60},
+    ],
+)
+def test_process_log_estima_ips_globales_y_por_url(tmp_path, options):
+    log_path = tmp_path / "access.log"
+    exact = _write_log(log_path)
+
+    result = process_log(str(log_path), batch_size=500, distinct_ips=14, per_file=True, **options)
+
+    assert abs(result.distinct_ips - exact["*"]) <= 3 * result.distinct_ips_error * exact["*"]
+    assert set(result.distinct_ips_by_url) == {url for url, _ in [*result.top_10_status, *result.top_10_slow]}
+    for url, estimate in result.distinct_ips_by_url.items():
+        assert abs(estimate - exact[url]) <= max(1, 3 * result.distinct_ips_error * exact[url])
+    assert result.distinct_ips_by_url["/p/0"] <= 21
+    assert result.per_file[str(log_path)]["distinct_ips"] == result.distinct_ips
+
+    plain = process_log(str(log_path), batch_size=500, **options)
+    assert plain.distinct_ips is None and plain.distinct_ips_by_url is None
+
+
+def test_ips_con_normalizacion_checkpoint_y_caches(tmp_path):
+    log_path = tmp_path / "access.log"
+    exact = _write_log(log_path, count=3_000)
+    expected = process_log(str(log_path), workers=1, distinct_ips=12)
+
+    normalized = process_log(
+        str(log_path), workers=1, distinct_ips=12, normalizer=UrlNormalizer(rules=[(r"^/p/\d+$", "/p")])
+    )
+    assert normalized.distinct_ips_by_url == {"/p": expected.distinct_ips}
+
+    cache = ResultCache(str(tmp_path / "results"))
+    process_log(str(log_path), workers=1, cache=cache, distinct_ips=12)
+    assert process_log(str(log_path), workers=1, cache=cache, distinct_ips=12).from_cache
+    assert not process_log(str(log_path), workers=1, cache=cache, distinct_ips=14).from_cache
+
+    checkpoint = str(tmp_path / "ckpt.json")
+    process_log(str(log_path), workers=1, checkpoint_path=checkpoint, distinct_ips=12)
+    with open(log_path, "a", encoding="utf-8") as handle:
+        handle.write('192.168.0.1 - - [10/Sep/2024:18:00:00 +0000] "GET /p/0" 500 900\n')
+    resumed = process_log(str(log_path), workers=1, checkpoint_path=checkpoint, distinct_ips=12)
+    # Fusionar sketches equivale a procesar todo de una vez.
+    assert resumed.distinct_ips == process_log(str(log_path), workers=1, distinct_ips=12).distinct_ips
+    assert resumed.distinct_ips_by_url["/p/0"] == exact["/p/0"] + 1
+    assert load_checkpoint(checkpoint).options == {"distinct_ips": 12}
+
+    with pytest.raises(ValueError):
+        process_log(str(log_path), workers=1, distinct_ips=30)
+    with pytest.raises(ValueError):
+        process_log(str(log_path), workers=1, distinct_ips=12, approximate=SketchConfig())
+    with pytest.raises(ValueError):
+        process_log(str(log_path), workers=1, distinct_ips=12, column_cache=ColumnCache(str(tmp_path / "cols")))
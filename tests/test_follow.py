@@ -0,0 +1,107 @@
+"""Pruebas del modo follow con snapshots acumulados."""
+
+import os
+import threading
+
+from logproc.follow import follow_log
+
+
+def _line(i):
+    return f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 5}" {500 if i % 2 else 200} {i % 400}\n'
+
+
+def _append(path, start, stop, tail=""):
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.writelines(_line(i) for i in range(start, stop))
+        handle.write(tail)
+
+
+def _follow(path, stop_event, **kwargs):
+    return follow_log(path, snapshot_interval=0.001, poll_interval=0.001, stop_event=stop_event, **kwargs)
+
+
+def _wait_for(snapshots, total_lines, attempts=2_000):
+    for _ in range(attempts):
+        snapshot = next(snapshots)
+        if snapshot.total_lines >= total_lines:
+            return snapshot
+    raise AssertionError(f"no se alcanzaron {total_lines} líneas")
+
+
+def test_snapshots_acumulan_lineas_agregadas(tmp_path):
+    log_path = str(tmp_path / "access.log")
+    _append(log_path, 0, 100)
+    stop = threading.Event()
+    snapshots = _follow(log_path, stop, from_start=True)
+
+    assert _wait_for(snapshots, 100).total_lines == 100
+
+    partial_line = _line(250)
+    _append(log_path, 100, 250, tail=partial_line[:20])
+    assert _wait_for(snapshots, 250).total_lines == 250
+
+    with open(log_path, "a", encoding="utf-8") as handle:
+        handle.write(partial_line[20:])
+    stop.set()
+    final = list(snapshots)[-1]
+
+    assert final.total_lines == 251
+    assert final.bad_lines == 0
+    assert final.total_status == sum(1 for i in range(251) if i % 2)
+
+
+def test_sin_from_start_ignora_contenido_previo(tmp_path):
+    log_path = str(tmp_path / "access.log")
+    _append(log_path, 0, 50)
+    stop = threading.Event()
+    snapshots = _follow(log_path, stop)
+
+    assert next(snapshots).total_lines == 0
+    _append(log_path, 50, 60)
+    assert _wait_for(snapshots, 10).total_lines == 10
+
+
+def test_rotacion_y_truncamiento(tmp_path):
+    log_path = str(tmp_path / "access.log")
+    _append(log_path, 0, 40)
+    stop = threading.Event()
+    snapshots = _follow(log_path, stop, from_start=True)
+    assert _wait_for(snapshots, 40).total_lines == 40
+
+    os.rename(log_path, str(tmp_path / "access.log.1"))
+    _append(log_path, 0, 25)
+    assert _wait_for(snapshots, 65).total_lines == 65
+
+    with open(log_path, "w", encoding="utf-8"):
+        pass
+    _append(log_path, 0, 5)
+    assert _wait_for(snapshots, 70).total_lines == 70
+
+
+def test_archivo_inexistente_espera_a_que_aparezca(tmp_path):
+    log_path = str(tmp_path / "later.log")
+    stop = threading.Event()
+    snapshots = _follow(log_path, stop)
+
+    assert next(snapshots).total_lines == 0
+    _append(log_path, 0, 7)
+    assert _wait_for(snapshots, 7).total_lines == 7
+    stop.set()
+    assert list(snapshots)[-1].total_lines == 7
+
+
+def test_snapshot_lines_dispara_por_volumen(tmp_path):
+    log_path = str(tmp_path / "access.log")
+    _append(log_path, 0, 30)
+    stop = threading.Event()
+    snapshots = follow_log(
+        log_path,
+        batch_size=10,
+        snapshot_interval=None,
+        snapshot_lines=10,
+        poll_interval=0.001,
+        from_start=True,
+        stop_event=stop,
+    )
+
+    assert [next(snapshots).total_lines for _ in range(3)] == [10, 20, 30]
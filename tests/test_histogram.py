@@ -0,0 +1,112 @@
+"""Pruebas de los histogramas de latencia fusionables."""
+
+import math
+import random
+
+import pytest
+
+from logproc.api import process_log
+from logproc.column_cache import ColumnCache
+from logproc.histogram import BUCKET_COUNT, LatencyHistogram, bucket_bounds, bucket_index
+from logproc.normalize import UrlNormalizer
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(round(q * len(ordered), 6))) - 1]
+
+
+def test_buckets_cubren_el_rango_con_error_relativo_acotado():
+    for value in [0, 1, 63, 64, 65, 127, 128, 1_000, 123_456, 2**32 - 1]:
+        low, high = bucket_bounds(bucket_index(value))
+        assert low <= value < high
+        assert high - low <= max(1, low / 32)
+    assert bucket_index(2**40) == BUCKET_COUNT - 1
+
+
+def test_fusion_y_cuantiles_frente_a_valores_exactos():
+    rng = random.Random(5)
+    values = [int(rng.lognormvariate(4, 1.2)) for _ in range(20_000)]
+
+    whole = LatencyHistogram()
+    whole.add_values(values)
+    left, right = LatencyHistogram(), LatencyHistogram()
+    left.add_values(values[:7_000])
+    right.add_values(values[7_000:])
+    left.merge(right)
+    assert left == whole and left.total == len(values)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = _exact_quantile(values, q)
+        estimate = whole.quantile(q)
+        assert exact <= estimate <= exact + max(1, exact / 32)
+
+    assert whole.count_above(40) == sum(value > 40 for value in values)
+    # 203 cierra su bucket [200, 204): el conteo es exacto.
+    assert whole.count_above(203) == sum(value > 203 for value in values)
+    assert LatencyHistogram.from_dict(whole.to_dict()) == whole
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"workers": 1},
+        {"workers": 2, "sharded": True, "backend": "mmap"},
+        {"workers": 2, "engine": "numpy", "backend": "mmap"},
+    ],
+)
+def test_process_log_expone_cuantiles_globales_y_por_url(tmp_path, options):
+    rng = random.Random(9)
+    log_path = tmp_path / "access.log"
+    latencies = {"/checkout": [], "/home": []}
+    with open(log_path, "w", encoding="utf-8") as handle:
+        for i in range(4_000):
+            url = "/checkout" if i % 4 == 0 else "/home"
+            latency = rng.randint(300, 900) if url == "/checkout" else rng.randint(5, 120)
+            latencies[url].append(latency)
+            handle.write(f'10.0.0.1 - - [10/Sep/2024:15:03:27] "GET {url}" {500 if i % 3 else 200} {latency}\n')
+        handle.write("linea rota\n")
+
+    result = process_log(str(log_path), batch_size=300, url_histograms=True, **options)
+
+    everything = latencies["/checkout"] + latencies["/home"]
+    assert result.latency["count"] == len(everything)
+    assert result.latency["max"] >= max(everything)
+    assert result.count_above(result.slow_threshold) <= result.total_slow
+    assert result.count_above(63) == sum(value > 63 for value in everything)
+
+    checkout = result.latency_by_url["/checkout"]
+    exact_p99 = _exact_quantile(latencies["/checkout"], 0.99)
+    assert exact_p99 <= checkout["p99"] <= exact_p99 + exact_p99 / 32
+    # 295 cierra su bucket [288, 296): todas las latencias de /checkout (>= 300) cuentan.
+    assert result.count_above(295, url="/checkout") == len(latencies["/checkout"])
+
+    plain = process_log(str(log_path), batch_size=300, **options)
+    assert plain.latency == result.latency and plain.latency_by_url is None
+
+
+def test_histogramas_en_columnas_checkpoint_y_normalizacion(tmp_path):
+    log_path = tmp_path / "access.log"
+    with open(log_path, "w", encoding="utf-8") as handle:
+        for i in range(2_000):
+            handle.write(f'10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /p/{i % 5}" 500 {i % 700}\n')
+
+    expected = process_log(str(log_path), workers=1, url_histograms=True)
+
+    columns = ColumnCache(str(tmp_path / "columns"))
+    process_log(str(log_path), workers=1, column_cache=columns)
+    cached = process_log(str(log_path), workers=1, column_cache=columns, url_histograms=True)
+    assert cached.latency == expected.latency and cached.latency_by_url == expected.latency_by_url
+
+    checkpoint = str(tmp_path / "ckpt.json")
+    process_log(str(log_path), workers=1, checkpoint_path=checkpoint, url_histograms=True)
+    with open(log_path, "a", encoding="utf-8") as handle:
+        handle.write('10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /p/1" 500 5000\n')
+    resumed = process_log(str(log_path), workers=1, checkpoint_path=checkpoint, url_histograms=True)
+    assert resumed.latency["count"] == expected.latency["count"] + 1
+    assert resumed.latency_by_url["/p/1"]["max"] >= 5000
+
+    normalized = process_log(
+        str(log_path), workers=1, url_histograms=True, normalizer=UrlNormalizer(collapse_ids=True)
+    )
+    assert normalized.latency_by_url["/p/{id}"]["count"] == resumed.latency["count"]
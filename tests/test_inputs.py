@@ -0,0 +1,105 @@
+"""Pruebas de entradas múltiples: expansión, plan de trabajo y resultado fusionado."""
+
+import gzip
+import os
+
+import pytest
+
+from logproc.api import process_log
+from logproc.inputs import expand_inputs, plan_work
+from logproc.result_cache import ResultCache
+
+
+def _lines(start, stop):
+    return "".join(
+        f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 7}" {500 if i % 3 else 200} {i % 400}\n'
+        for i in range(start, stop)
+    )
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    root = tmp_path / "logs"
+    (root / "host-a").mkdir(parents=True)
+    (root / "host-b").mkdir()
+    (root / ".hidden").mkdir()
+    (root / "host-a" / "access.log").write_text(_lines(0, 2_000))
+    (root / "host-a" / "access.log.1").write_text(_lines(2_000, 2_050))
+    (root / "host-b" / "access.log").write_text(_lines(2_050, 2_080))
+    (root / "host-b" / "empty.log").write_text("")
+    data = _lines(2_080, 2_600).encode()
+    with open(root / "host-b" / "access.log.2.gz", "wb") as handle:
+        for offset in range(0, len(data), 4_001):
+            handle.write(gzip.compress(data[offset : offset + 4_001]))
+    (root / ".hidden" / "skip.log").write_text("no deberia leerse\n")
+    return root
+
+
+def _summary(result):
+    return (
+        result.total_lines,
+        result.bad_lines,
+        result.total_status,
+        result.total_slow,
+        result.top_10_status,
+        result.top_10_slow,
+    )
+
+
+def test_expande_directorios_globs_y_sin_duplicados(log_dir):
+    from_dir = expand_inputs(str(log_dir))
+    assert len(from_dir) == 5
+    assert not any(".hidden" in path for path in from_dir)
+
+    from_glob = expand_inputs([str(log_dir / "*" / "access.log"), str(log_dir / "host-a" / "access.log")])
+    assert from_glob == [str(log_dir / "host-a" / "access.log"), str(log_dir / "host-b" / "access.log")]
+
+    with pytest.raises(ValueError):
+        expand_inputs(str(log_dir / "*.nada"))
+
+
+def test_plan_parte_grandes_agrupa_chicos_y_cubre_todo(log_dir):
+    paths = expand_inputs(str(log_dir))
+    units = plan_work(paths, parts=8)
+
+    costs = [unit.cost for unit in units]
+    assert costs == sorted(costs, reverse=True)
+
+    big = str(log_dir / "host-a" / "access.log")
+    big_pieces = sorted((piece.start, piece.end) for unit in units for piece in unit.pieces if piece.path == big)
+    assert len(big_pieces) > 1
+    assert big_pieces[0][0] == 0 and big_pieces[-1][1] == os.path.getsize(big)
+    assert all(prev[1] == cur[0] for prev, cur in zip(big_pieces, big_pieces[1:]))
+    assert any(len(unit.pieces) > 1 for unit in units)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resultado_fusionado_y_desglose_por_archivo(tmp_path, log_dir, workers):
+    plain = tmp_path / "all.log"
+    plain.write_text(_lines(0, 2_600))
+    expected = _summary(process_log(str(plain), workers=1))
+
+    result = process_log(str(log_dir), batch_size=100, workers=workers, per_file=True)
+
+    assert _summary(result) == expected
+    assert result.input_files == 5
+    assert sum(item["total_lines"] for item in result.per_file.values()) == result.total_lines
+    assert result.per_file[str(log_dir / "host-b" / "empty.log")]["total_lines"] == 0
+    assert result.per_file[str(log_dir / "host-b" / "access.log.2.gz")]["total_lines"] == 520
+
+
+def test_cache_de_resultados_con_varios_archivos(tmp_path, log_dir):
+    cache = ResultCache(str(tmp_path / "cache"))
+    first = process_log(str(log_dir), workers=1, cache=cache)
+    second = process_log(str(log_dir), workers=1, cache=cache)
+    assert second.from_cache and second.total_lines == first.total_lines
+
+    with open(log_dir / "host-b" / "access.log", "a", encoding="utf-8") as handle:
+        handle.write(_lines(0, 3))
+    third = process_log(str(log_dir), workers=1, cache=cache)
+    assert not third.from_cache and third.total_lines == first.total_lines + 3
+
+
+def test_varios_archivos_no_admiten_checkpoint(tmp_path, log_dir):
+    with pytest.raises(ValueError):
+        process_log(str(log_dir), workers=1, checkpoint_path=str(tmp_path / "ckpt"))
@@ -0,0 +1,165 @@
+"""Pruebas del presupuesto de memoria y la medición de RSS."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from logproc import memory
+from logproc.__main__ import build_parser
+from logproc.api import process_log
+from logproc.memory import MAX_CHUNK_BYTES, MIN_CHUNK_BYTES, MemoryBudget
+from logproc.reader import read_raw_chunks
+from logproc.scheduler import bounded_map
+
+MB = 1024**2
+
+
+def _write_log(path, count=8_000):
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(count):
+            query = "?q=" + "x" * (i % 80) if i % 4 else ""
+            handle.write(f'10.0.0.{i % 50} - - [10/Sep/2024:15:00:00 +0000] "GET /p/{i % 40}{query}" ')
+            handle.write(f"{500 if i % 3 else 200} {i % 400}\n")
+        handle.write("linea rota\n")
+
+
+def test_budget_achica_y_agranda_segun_el_rss(monkeypatch):
+    rss = {"value": 10 * MB}
+    monkeypatch.setattr(memory, "current_rss_bytes", lambda: rss["value"])
+    budget = MemoryBudget(100 * MB, workers=2, chunk_bytes=4 * MB, max_in_flight=3)
+    assert MIN_CHUNK_BYTES <= budget.chunk_bytes <= 4 * MB
+
+    # Padre 10 MB + 2 workers de 45 MB: por encima del 85 %.
+    for _ in range(20):
+        budget.observe(45 * MB)
+    assert budget.chunk_bytes == MIN_CHUNK_BYTES and budget.window() == 1
+    shrinks = budget.shrinks
+    budget.observe(45 * MB)
+    assert budget.shrinks == shrinks
+
+    # Holgado: primero recupera la ventana, de a un paso por ventana devuelta.
+    budget.observe(5 * MB)
+    assert budget.window() == 2 and budget.chunk_bytes == MIN_CHUNK_BYTES
+    budget.observe(5 * MB)
+    assert budget.window() == 2
+    for _ in range(200):
+        budget.observe(5 * MB)
+    assert budget.window() == 3 and budget.chunk_bytes == MAX_CHUNK_BYTES
+    assert budget.to_dict()["grows"] == budget.grows > 0
+
+    with pytest.raises(ValueError):
+        MemoryBudget(0, workers=1, chunk_bytes=MB, max_in_flight=1)
+
+
+def test_lectura_con_tamano_variable_y_ventana_dinamica(tmp_path):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path, count=2_000)
+    sizes = iter([100, 5_000, 1, 20_000] * 100)
+
+    chunks = list(read_raw_chunks(str(log_path), chunk_bytes=1, chunk_size=lambda: next(sizes)))
+    assert b"".join(chunks) == log_path.read_bytes()
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+
+    window = {"value": 4}
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work(value):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        threading.Event().wait(0.002)
+        with lock:
+            running -= 1
+        return value
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = []
+        for value in bounded_map(executor, work, range(60), max_in_flight=4, window=lambda: window["value"]):
+            results.append(value)
+            if len(results) == 10:
+                window["value"] = 1
+                peak = 0
+    assert sorted(results) == list(range(60))
+    assert peak == 1
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_log_con_presupuesto_equivale_al_normal(tmp_path, workers):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+
+    expected = process_log(str(log_path), batch_size=500, workers=workers)
+    tight = process_log(str(log_path), batch_size=500, workers=workers, memory_budget=MB)
+    roomy = process_log(str(log_path), batch_size=500, workers=workers, memory_budget=1024 * MB, engine="numpy")
+
+    for result in (tight, roomy):
+        assert (result.total_lines, result.bad_lines, result.total_status, result.total_slow) == (
+            expected.total_lines,
+            expected.bad_lines,
+            expected.total_status,
+            expected.total_slow,
+        )
+        assert result.top_10_status == expected.top_10_status
+        assert result.latency == expected.latency
+    assert tight.memory_budget["chunk_bytes"] <= MIN_CHUNK_BYTES and tight.memory_budget["shrinks"] > 0
+    assert roomy.memory_budget["shrinks"] == 0 and expected.memory_budget is None
+    if memory.HAS_RESOURCE:
+        assert expected.peak_rss_bytes > 0 and expected.worker_peak_rss_bytes > 0
+        assert expected.to_dict()["peak_rss_bytes"] == expected.peak_rss_bytes
+
+
+def test_presupuesto_valida_combinaciones(tmp_path):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path, count=100)
+    other_path = tmp_path / "other.log"
+    _write_log(other_path, count=10)
+
+    for options in (
+        {"memory_budget": 0},
+        {"memory_budget": MB, "sharded": True},
+        {"memory_budget": MB, "prefetch": 2},
+        {"memory_budget": MB, "transport": "shm"},
+        {"memory_budget": MB, "checkpoint_path": str(tmp_path / "ckpt.json")},
+        {"memory_budget": MB, "since": "10/Sep/2024:00:00:00 +0000"},
+        {"memory_budget": MB, "input_path": [str(log_path), str(other_path)]},
+    ):
+        options.setdefault("input_path", str(log_path))
+        with pytest.raises(ValueError):
+            process_log(workers=1, **options)
+
+
+def test_cli_rechaza_presupuesto_no_positivo(capsys):
+    parser = build_parser()
+    assert parser.parse_args(["--input", "a.log", "--memory-budget", "64"]).memory_budget == 64
+    assert parser.parse_args(["--input", "a.log"]).memory_budget is None
+
+    for value in ("0", "-5", "abc"):
+        with pytest.raises(SystemExit) as excinfo:
+            parser.parse_args(["--input", "a.log", "--memory-budget", value])
+        assert excinfo.value.code == 2
+    assert "--memory-budget" in capsys.readouterr().err
+
+
+def test_presupuesto_con_backend_texto_parsea_igual_que_sin_presupuesto(tmp_path):
+    log_path = tmp_path / "access.log"
+    with open(log_path, "w", encoding="utf-8") as handle:
+        for i in range(3_000):
+            # Dígitos arábigo-índicos y URLs no ASCII: el parser de bytes no los acepta.
+            status = "٥٠٠" if i % 5 == 0 else "500"
+            handle.write(f'10.0.0.{i % 50} - - [10/Sep/2024:15:00:00 +0000] "GET /ñandú/{i % 30}" {status} {i % 400}\r\n')
+
+    expected = process_log(str(log_path), batch_size=200, workers=1)
+    budgeted = process_log(str(log_path), batch_size=200, workers=1, memory_budget=MB)
+
+    assert expected.bad_lines == 0
+    assert budgeted.to_dict()["top_10_status"] == expected.to_dict()["top_10_status"]
+    assert (budgeted.total_lines, budgeted.bad_lines, budgeted.total_status, budgeted.total_slow) == (
+        expected.total_lines,
+        expected.bad_lines,
+        expected.total_status,
+        expected.total_slow,
+    )
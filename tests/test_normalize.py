@@ -0,0 +1,100 @@
+"""Pruebas de la normalización de URLs antes de contar."""
+
+import pickle
+
+import pytest
+
+from logproc.api import process_log
+from logproc.checkpoint import load_checkpoint
+from logproc.column_cache import ColumnCache
+from logproc.normalize import UrlNormalizer
+from logproc.result_cache import ResultCache
+
+UUID = "3f2504e0-4f89-11d3-9a0c-0305e82c3301"
+
+
+def _write_log(path, count=3_000):
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(count):
+            if i % 3 == 0:
+                url = f"/search?q={i}&p={i % 7}"
+            elif i % 3 == 1:
+                url = f"/products/{i}"
+            else:
+                url = f"/orders/{UUID}/items#{i}"
+            handle.write(f'10.0.0.1 - - [10/Sep/2024:15:03:27] "GET {url}" {500 if i % 2 else 200} {i % 400}\n')
+
+
+def test_transformaciones_y_orden_de_reglas():
+    normalizer = UrlNormalizer(
+        strip_query=True,
+        collapse_ids=True,
+        rules=[(r"^/users/[^/]+", "/users/{user}"), (r"\{id\}$", "{item}")],
+    )
+    assert normalizer("/search?q=1&p=2") == "/search"
+    assert normalizer("/products/123/reviews") == "/products/{id}/reviews"
+    assert normalizer(f"/orders/{UUID}#top") == "/orders/{uuid}"
+    assert normalizer("/users/ana/photos/42") == "/users/{user}/photos/{item}"
+    assert normalizer("/v2/products") == "/v2/products"
+
+    keep_query = UrlNormalizer(collapse_ids=True)
+    assert keep_query("/products/7?ref=home") == "/products/{id}?ref=home"
+    assert keep_query.normalize_counts({"/a/1": 2, "/a/2": 3, "/b": 1}) == {"/a/{id}": 5, "/b": 1}
+
+    with pytest.raises(ValueError):
+        UrlNormalizer(rules=[("(", "x")])
+
+
+def test_pickle_descarta_el_memo_y_reutiliza_la_instancia():
+    normalizer = UrlNormalizer(collapse_ids=True)
+    normalizer("/products/1")
+
+    payload = pickle.dumps(normalizer)
+    assert b"/products/1" not in payload
+    restored = pickle.loads(payload)
+    assert restored.to_dict() == normalizer.to_dict()
+    assert pickle.loads(payload) is restored
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"workers": 1},
+        {"workers": 2, "sharded": True, "backend": "mmap"},
+        {"workers": 2, "engine": "numpy"},
+    ],
+)
+def test_process_log_colapsa_cardinalidad(tmp_path, options):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+    normalizer = UrlNormalizer(strip_query=True, collapse_ids=True)
+
+    raw = process_log(str(log_path), batch_size=250, **options)
+    result = process_log(str(log_path), batch_size=250, normalizer=normalizer, **options)
+
+    assert (result.total_status, result.total_slow) == (raw.total_status, raw.total_slow)
+    assert {url for url, _ in result.top_10_status} == {"/search", "/products/{id}", "/orders/{uuid}/items"}
+    assert sum(count for _, count in result.top_10_status) == result.total_status
+
+
+def test_normalizacion_en_cache_checkpoint_y_columnas(tmp_path):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+    normalizer = UrlNormalizer(strip_query=True, collapse_ids=True)
+    expected = process_log(str(log_path), workers=1, normalizer=normalizer)
+
+    cache = ResultCache(str(tmp_path / "results"))
+    process_log(str(log_path), workers=1, cache=cache)
+    cached = process_log(str(log_path), workers=1, cache=cache, normalizer=normalizer)
+    assert not cached.from_cache and cached.top_10_status == expected.top_10_status
+
+    columns = ColumnCache(str(tmp_path / "columns"))
+    process_log(str(log_path), workers=1, column_cache=columns)
+    from_columns = process_log(str(log_path), workers=1, column_cache=columns, normalizer=normalizer)
+    assert from_columns.top_10_status == expected.top_10_status
+
+    checkpoint = str(tmp_path / "ckpt.json")
+    process_log(str(log_path), workers=1, checkpoint_path=checkpoint)
+    incremental = process_log(str(log_path), workers=1, checkpoint_path=checkpoint, normalizer=normalizer)
+    assert incremental.top_10_status == expected.top_10_status
+    assert load_checkpoint(checkpoint).options == {"normalizer": normalizer.to_dict()}
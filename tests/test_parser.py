@@ -1,12 +1,73 @@
 """Pruebas de utilidades del parser."""
 
-from logproc.parser import parse_line
+import random
 
+import pytest
 
-def test_parse_log_line_ok():
+from logproc.parser import parse_line, parse_line_bytes, parse_line_regex
+
+PARSERS = [parse_line, parse_line_regex]
+
+
+@pytest.mark.parametrize("parser", PARSERS, ids=lambda func: func.__name__)
+def test_parse_log_line_ok(parser):
     line = '192.168.0.1 - - [10/Sep/2024:15:03:27] "GET /index.html" 200 125'
-    assert parse_line(line) == ("/index.html", 200, 125)
+    assert parser(line) == ("/index.html", 200, 125)
+
+
+@pytest.mark.parametrize("parser", PARSERS, ids=lambda func: func.__name__)
+def test_parse_log_line_bad(parser):
+    assert parser("línea malformada") is None
+
+
+def test_parse_line_bytes_coincide_con_texto():
+    lines = [
+        '192.168.0.1 - - [10/Sep/2024:15:03:27] "GET /index.html?q=1" 200 125\r\n',
+        '192.168.0.1 - - [10/Sep/2024:15:03:27] "get /index.html" 200 125',
+        '192.168.0.1 - - [10/Sep/2024:15:03:27] "GET /a" 2000 125',
+        "",
+    ]
+
+    for line in lines:
+        parsed = parse_line(line)
+        parsed_bytes = parse_line_bytes(line.encode("utf-8"))
+        if parsed is None:
+            assert parsed_bytes is None
+        else:
+            url, status, response_time = parsed_bytes
+            assert (url.decode("utf-8"), status, response_time) == parsed
+
+
+_FUZZ_ALPHABET = [" ", "  ", "\t", " ", " ", "-", "[", "]", '"', "0", "7", "٣", "²", "A", "x", "\x00", "\n"]
+
+
+def _mutate(rng, line):
+    chars = list(line)
+    for _ in range(rng.randint(1, 3)):
+        action = rng.random()
+        position = rng.randrange(len(chars) + 1)
+        if action < 0.4:
+            chars.insert(position, rng.choice(_FUZZ_ALPHABET))
+        elif action < 0.8 and chars:
+            del chars[min(position, len(chars) - 1)]
+        elif chars:
+            chars[min(position, len(chars) - 1)] = rng.choice(_FUZZ_ALPHABET)
+    return "".join(chars)
+
 
+def test_parse_line_fuzz_diferencial_contra_regex():
+    rng = random.Random(20240910)
+    methods = ["GET", "POST", "PUT", "DELETE", "PATCH", "PURGE", "get"]
+    for _ in range(20_000):
+        line = (
+            f"{rng.randint(1, 254)}.{rng.randint(0, 255)}.0.{rng.randint(1, 254)} - - "
+            f"[{rng.randint(1, 28):02d}/Sep/2024:15:03:{rng.randint(0, 59):02d}] "
+            f'"{rng.choice(methods)} /p/{rng.randint(0, 999)}?q={rng.random():.3f}" '
+            f"{rng.choice([200, 404, 500])} {rng.randint(0, 9_999)}"
+        )
+        if rng.random() < 0.7:
+            line = _mutate(rng, line)
+        if rng.random() < 0.2:
+            line = rng.choice([" ", "\t", ""]) + line + rng.choice(["\n", "\r\n", " "])
 
-def test_parse_log_line_bad():
-    assert parse_line("línea malformada") is None
+        assert parse_line(line) == parse_line_regex(line), repr(line)
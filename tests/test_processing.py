@@ -1,7 +1,8 @@
 """Pruebas unitarias y de punta a punta del pipeline de procesamiento."""
 
 from logproc.api import process_log
-from logproc.worker import process_batch
+from logproc.metrics import top_n_urls, top_url
+from logproc.worker import process_batch, process_chunk
 
 
 def test_filtrado_500():
@@ -32,6 +33,14 @@ def test_filtrado_lento():
     assert max(partial.slow_by_url.items(), key=lambda x: x[1]) == ("/slow", 2)
 
 
+def test_empates_del_top_no_dependen_del_orden_de_insercion():
+    counts = {"/c": 2, "/b": 5, "/a": 2, "/d": 5}
+    reordered = dict(reversed(counts.items()))
+
+    assert top_n_urls(counts, limit=3) == top_n_urls(reordered, limit=3) == [("/b", 5), ("/d", 5), ("/a", 2)]
+    assert top_url(counts) == top_url(reordered) == ("/b", 5)
+
+
 def test_procesamiento_archivo(tmp_path):
     lines = [
         '10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /a" 500 250',
@@ -71,3 +80,53 @@ def test_filtrado_multiple_status():
     assert partial.total_status == 2
     assert partial.status_by_url["/a"] == 1
     assert partial.status_by_url["/b"] == 1
+
+
+def test_procesamiento_particionado_igual_a_secuencial(tmp_path):
+    lines = [
+        f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 7}" {500 if i % 3 else 200} {i % 400}'
+        for i in range(1_000)
+    ]
+    log_file = tmp_path / "access.log"
+    log_file.write_text("\n".join(lines) + "\nbasura\n", encoding="utf-8")
+
+    secuencial = process_log(str(log_file), batch_size=64, workers=1)
+    particionado = process_log(str(log_file), batch_size=64, workers=2, sharded=True)
+
+    assert particionado.total_lines == secuencial.total_lines == 1_001
+    assert particionado.bad_lines == secuencial.bad_lines == 1
+    assert particionado.total_status == secuencial.total_status
+    assert particionado.total_slow == secuencial.total_slow
+    assert particionado.top_10_status == secuencial.top_10_status
+    assert particionado.top_10_slow == secuencial.top_10_slow
+
+
+def test_backend_mmap_igual_a_texto(tmp_path):
+    lines = [
+        f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /ñ{i % 5}" {500 if i % 4 else 404} {i % 350}'
+        for i in range(500)
+    ]
+    log_file = tmp_path / "access.log"
+    log_file.write_text("\n".join(lines) + "\n\nbasura", encoding="utf-8")
+
+    texto = process_log(str(log_file), batch_size=32, workers=1)
+    for sharded in (False, True):
+        mmap_result = process_log(str(log_file), batch_size=32, workers=2, backend="mmap", sharded=sharded)
+        assert mmap_result.total_lines == texto.total_lines == 502
+        assert mmap_result.bad_lines == texto.bad_lines == 2
+        assert mmap_result.total_status == texto.total_status
+        assert mmap_result.total_slow == texto.total_slow
+        assert mmap_result.top_10_status == texto.top_10_status
+        assert mmap_result.top_10_slow == texto.top_10_slow
+
+
+def test_process_chunk_igual_a_process_batch():
+    batch = [
+        '10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /a" 500 250\n',
+        '10.0.0.2 - - [10/Sep/2024:15:03:28] "GET /b" 200 90\n',
+        "basura\n",
+    ]
+
+    partial = process_chunk("".join(batch).encode("utf-8"), status_codes=[500])
+
+    assert partial == process_batch(batch, status_codes=[500])
@@ -0,0 +1,131 @@
+"""Pruebas de la evaluación de varias consultas en una sola pasada."""
+
+import random
+
+import pytest
+
+from logproc.api import process_log, process_queries
+from logproc.column_cache import ColumnCache
+from logproc.normalize import UrlNormalizer
+from logproc.queries import QuerySpec, process_batch_queries
+from logproc.result_cache import ResultCache
+from logproc.worker import batch_function
+
+QUERIES = [
+    QuerySpec(slow_threshold=100, status_codes=(500,)),
+    QuerySpec(slow_threshold=300, status_codes=(404, 500)),
+    QuerySpec(slow_threshold=0, status_codes=(200,)),
+]
+
+
+def _lines(count=2_000, seed=3):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        if i % 101 == 0:
+            lines.append("linea rota\n")
+            continue
+        url = f"/p/{rng.randint(0, 30)}" if i % 5 else f"/items/{rng.randint(0, 9)}?q={i}"
+        status = rng.choice([200, 200, 404, 500])
+        lines.append(
+            f'10.0.0.1 - - [10/Sep/2024:15:{i // 60 % 60:02d}:{i % 60:02d} +0000] "GET {url}" {status} '
+            f"{rng.randint(0, 600)}\n"
+        )
+    return lines
+
+
+def _comparable(stats):
+    return (
+        stats.total_lines,
+        stats.bad_lines,
+        stats.total_status,
+        stats.total_slow,
+        stats.status_by_url,
+        stats.slow_by_url,
+        stats.latency,
+        stats.latency_by_url,
+        stats.time_series,
+        stats.ip_sketch,
+        stats.ip_sketch_by_url,
+    )
+
+
+@pytest.mark.parametrize("backend", ["text", "mmap"])
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_lote_equivale_a_una_pasada_por_consulta(backend, engine):
+    lines = _lines()
+    batch = "".join(lines).encode("utf-8") if backend == "mmap" else lines
+    normalizer = UrlNormalizer(strip_query=True)
+    options = {"normalizer": normalizer, "url_histograms": True, "time_bucket": 60, "distinct_ips": 10}
+
+    parts = process_batch_queries(batch, QUERIES, backend=backend, engine=engine, **options)
+
+    func = batch_function(backend, engine)
+    for query, part in zip(QUERIES, parts):
+        expected = func(batch, slow_threshold=query.slow_threshold, status_codes=query.status_codes, **options)
+        assert _comparable(part) == _comparable(expected)
+
+
+def test_query_spec_valida():
+    assert QuerySpec(status_codes=[404, 500]).status_codes == (404, 500)
+    with pytest.raises(ValueError):
+        QuerySpec(status_codes=())
+    with pytest.raises(ValueError):
+        QuerySpec(slow_threshold=-1)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"workers": 1},
+        {"workers": 2, "backend": "mmap", "engine": "numpy"},
+    ],
+)
+def test_process_queries_equivale_a_process_log(tmp_path, options):
+    paths = []
+    for index in range(2):
+        path = tmp_path / f"access{index}.log"
+        path.write_text("".join(_lines(seed=index)), encoding="utf-8")
+        paths.append(str(path))
+
+    results = process_queries(paths, QUERIES, batch_size=300, per_file=True, **options)
+
+    for query, result in zip(QUERIES, results):
+        expected = process_log(
+            paths,
+            batch_size=300,
+            slow_threshold=query.slow_threshold,
+            status_codes=list(query.status_codes),
+            per_file=True,
+            **options,
+        )
+        assert (result.total_lines, result.total_status, result.total_slow) == (
+            expected.total_lines,
+            expected.total_status,
+            expected.total_slow,
+        )
+        assert result.top_10_status == expected.top_10_status
+        assert {path: stats["total_status"] for path, stats in result.per_file.items()} == {
+            path: stats["total_status"] for path, stats in expected.per_file.items()
+        }
+        assert result.status_codes == query.status_codes and result.slow_threshold == query.slow_threshold
+
+
+def test_process_queries_con_caches(tmp_path):
+    log_path = tmp_path / "access.log"
+    log_path.write_text("".join(_lines()), encoding="utf-8")
+
+    cache = ResultCache(str(tmp_path / "results"))
+    first = process_log(str(log_path), workers=1, cache=cache, slow_threshold=100, status_codes=[500])
+    results = process_queries(str(log_path), QUERIES, workers=1, cache=cache)
+    assert results[0].from_cache and results[0].top_10_status == first.top_10_status
+    assert not results[1].from_cache
+    assert process_log(str(log_path), workers=1, cache=cache, slow_threshold=300, status_codes=[404, 500]).from_cache
+
+    columns = ColumnCache(str(tmp_path / "columns"))
+    from_columns = process_queries(str(log_path), QUERIES, workers=1, column_cache=columns)
+    for result, expected in zip(from_columns, results):
+        assert (result.total_status, result.total_slow) == (expected.total_status, expected.total_slow)
+
+    with pytest.raises(ValueError):
+        process_queries(str(log_path), [])
@@ -0,0 +1,131 @@
+"""Pruebas del lector en streaming y de la partición por rangos de bytes."""
+
+import pytest
+
+from logproc.api import process_log
+from logproc.reader import (
+    Prefetcher,
+    batches_from_chunks,
+    read_batches,
+    read_mmap_chunks,
+    read_range_batches,
+    read_raw_chunks,
+    split_ranges,
+)
+
+
+def _write_lines(tmp_path, lines):
+    log_file = tmp_path / "access.log"
+    log_file.write_text("".join(lines), encoding="utf-8")
+    return str(log_file)
+
+
+def test_split_ranges_cubre_archivo_sin_cortar_lineas(tmp_path):
+    lines = [f'10.0.0.{i} - - [10/Sep/2024:15:03:27] "GET /u{i}" 200 {i}\n' for i in range(97)]
+    path = _write_lines(tmp_path, lines)
+
+    ranges = split_ranges(path, parts=7)
+
+    assert ranges[0][0] == 0
+    assert all(prev[1] == nxt[0] for prev, nxt in zip(ranges, ranges[1:]))
+    rebuilt = [line for start, end in ranges for batch in read_range_batches(path, start, end, 5) for line in batch]
+    assert rebuilt == [line for batch in read_batches(path, 5) for line in batch]
+
+
+def test_split_ranges_archivo_chico_devuelve_menos_rangos(tmp_path):
+    path = _write_lines(tmp_path, ["a\n", "b"])
+
+    ranges = split_ranges(path, parts=16)
+
+    assert len(ranges) <= 3
+    rebuilt = [line for start, end in ranges for batch in read_range_batches(path, start, end) for line in batch]
+    assert rebuilt == ["a\n", "b"]
+
+
+def test_read_mmap_chunks_entrega_lineas_completas(tmp_path):
+    lines = [f"linea-{i}-{'x' * (i % 13)}\n" for i in range(200)]
+    path = _write_lines(tmp_path, lines + ["ultima-sin-salto"])
+
+    chunks = list(read_mmap_chunks(path, chunk_bytes=50))
+
+    assert all(chunk.endswith(b"\n") for chunk in chunks[:-1])
+    assert b"".join(chunks).decode("utf-8") == "".join(lines) + "ultima-sin-salto"
+
+
+def test_read_mmap_chunks_archivo_vacio(tmp_path):
+    path = _write_lines(tmp_path, [])
+
+    assert list(read_mmap_chunks(path)) == []
+
+
+def test_read_raw_chunks_y_lotes_equivalen_a_read_batches(tmp_path):
+    lines = [f"linea-{i}-{'x' * (i % 71)}\n" for i in range(500)] + ["\n", "ñandú\n"]
+    path = _write_lines(tmp_path, lines + ["ultima-sin-salto"])
+
+    for chunk_bytes in (1, 64, 1 << 20):
+        chunks = list(read_raw_chunks(path, chunk_bytes=chunk_bytes))
+        assert all(chunk.endswith(b"\n") for chunk in chunks[:-1])
+        assert b"".join(chunks).decode("utf-8") == "".join(lines) + "ultima-sin-salto"
+
+    expected = list(read_batches(path, 37))
+    prefetcher = Prefetcher(read_raw_chunks(path, chunk_bytes=100), depth=2)
+    assert list(batches_from_chunks(prefetcher, 37)) == expected
+    assert prefetcher.items_read > 2 and prefetcher.wait_seconds >= 0
+
+
+def test_lotes_desde_bloques_con_fines_de_linea_universales(tmp_path):
+    path = tmp_path / "access.log"
+    endings = (b"\n", b"\r\n", b"\r")
+    path.write_bytes(b"".join(b"linea-%d%s" % (i, endings[i % 3]) for i in range(200)) + b"fin\r")
+
+    expected = list(read_batches(str(path), 16))
+    for chunk_bytes in (7, 1 << 20):
+        assert list(batches_from_chunks(read_raw_chunks(str(path), chunk_bytes=chunk_bytes), 16)) == expected
+
+
+def test_prefetcher_propaga_errores_y_se_detiene_al_cortar():
+    def failing():
+        yield 1
+        raise OSError("disco")
+
+    with pytest.raises(OSError):
+        list(Prefetcher(failing()))
+
+    closed = []
+
+    def source():
+        try:
+            yield from range(1_000)
+        finally:
+            closed.append(True)
+
+    items = source()
+    prefetcher = Prefetcher(items, depth=1)
+    for value in prefetcher:
+        if value == 3:
+            break
+    prefetcher.close()
+    assert not prefetcher._thread.is_alive() and closed == [True]
+
+    with pytest.raises(ValueError):
+        Prefetcher([], depth=0)
+
+
+@pytest.mark.parametrize("options", [{"workers": 1}, {"workers": 2, "backend": "mmap"}])
+def test_process_log_con_prefetch_equivale_a_lectura_directa(tmp_path, options):
+    lines = [
+        f'10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /u{i % 5}" {500 if i % 2 else 200} {i % 400}\n' for i in range(3_000)
+    ]
+    path = _write_lines(tmp_path, lines + ["linea rota\n"])
+
+    expected = process_log(path, batch_size=200, **options)
+    result = process_log(path, batch_size=200, prefetch=2, **options)
+
+    assert result.prefetch_wait_seconds is not None and expected.prefetch_wait_seconds is None
+    assert (result.total_lines, result.bad_lines, result.total_status, result.total_slow) == (
+        expected.total_lines,
+        expected.bad_lines,
+        expected.total_status,
+        expected.total_slow,
+    )
+    assert result.top_10_status == expected.top_10_status
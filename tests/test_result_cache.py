@@ -0,0 +1,95 @@
+"""Pruebas de la caché de resultados de ``process_log``."""
+
+from logproc.api import process_log, process_queries
+from logproc.queries import QuerySpec
+from logproc.fingerprint import file_fingerprint
+from logproc.result_cache import ResultCache, result_key
+
+
+def _write_log(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+LINES = [
+    '10.0.0.1 - - [10/Sep/2024:15:03:27] "GET /a" 500 250',
+    '10.0.0.2 - - [10/Sep/2024:15:03:28] "GET /b" 404 201',
+    '10.0.0.3 - - [10/Sep/2024:15:03:29] "GET /a" 500 190',
+]
+
+
+def test_resultado_identico_sale_de_cache(tmp_path):
+    log_path = _write_log(tmp_path / "access.log", LINES)
+    cache = ResultCache()
+
+    first = process_log(log_path, workers=1, status_codes=[500, 404], cache=cache)
+    second = process_log(log_path, workers=1, batch_size=1, status_codes=[404, 500], cache=cache)
+    other = process_log(log_path, workers=1, slow_threshold=100, status_codes=[500, 404], cache=cache)
+
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.status_codes == (404, 500)
+    assert (second.total_status, second.top_10_status) == (first.total_status, first.top_10_status)
+    assert not other.from_cache
+    assert other.total_slow == 3
+
+
+def test_cache_en_disco_entre_instancias_y_ttl(tmp_path):
+    log_path = _write_log(tmp_path / "access.log", LINES)
+    process_log(log_path, workers=1, cache=ResultCache(tmp_path / "cache"))
+
+    again = process_log(log_path, workers=1, cache=ResultCache(tmp_path / "cache"))
+    expired = process_log(log_path, workers=1, cache=ResultCache(tmp_path / "cache", ttl_seconds=-1))
+
+    assert again.from_cache
+    assert again.top_url_status == ("/a", 2)
+    assert not expired.from_cache
+
+
+def test_cache_se_invalida_si_cambia_el_archivo(tmp_path):
+    log_path = _write_log(tmp_path / "access.log", LINES)
+    cache = ResultCache()
+    process_log(log_path, workers=1, cache=cache)
+
+    _write_log(tmp_path / "access.log", LINES * 2)
+    result = process_log(log_path, workers=1, cache=cache)
+
+    assert not result.from_cache
+    assert result.total_lines == 6
+
+
+def test_cache_lru_acotada(tmp_path):
+    log_path = _write_log(tmp_path / "access.log", LINES)
+    fingerprint = file_fingerprint(log_path)
+    cache = ResultCache(tmp_path / "cache", max_entries=2)
+    result = process_log(log_path, workers=1)
+
+    keys = [result_key(fingerprint, threshold, [500]) for threshold in (1, 2, 3)]
+    cache.put(keys[0], result)
+    cache.put(keys[1], result)
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], result)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 2
+
+
+def test_cache_distingue_parser_de_texto_y_de_bytes(tmp_path):
+    # Los dígitos arábigo-índicos solo los acepta el parser de texto.
+    log_path = _write_log(tmp_path / "access.log", LINES + ['10.0.0.4 - - [10/Sep/2024:15:03:30] "GET /c" ٥٠٠ 10'])
+    cache = ResultCache()
+
+    text = process_log(log_path, workers=1, prefetch=2, cache=cache)
+    mmap_result = process_log(log_path, workers=1, backend="mmap", cache=cache)
+    mmap_again = process_log(log_path, workers=1, backend="mmap", cache=cache)
+    uncached = process_log(log_path, workers=1, backend="mmap")
+
+    assert text.prefetch_wait_seconds is not None
+    assert not mmap_result.from_cache and mmap_again.from_cache
+    assert (mmap_result.total_status, mmap_result.bad_lines) == (uncached.total_status, uncached.bad_lines)
+    assert (text.total_status, text.bad_lines) != (uncached.total_status, uncached.bad_lines)
+
+    (queried,) = process_queries(log_path, [QuerySpec(slow_threshold=200, status_codes=(500,))], workers=1, cache=cache)
+    assert queried.from_cache and queried.total_status == text.total_status
+    assert queried.prefetch_wait_seconds is None and queried.timings is None
@@ -0,0 +1,150 @@
+"""Pruebas de la ventana acotada de envíos al pool de procesos."""
+
+import pstats
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from logproc.api import process_log
+from logproc.profiling import run_with_profile, worker_initializer, worker_stats_paths
+from logproc.scheduler import bounded_map, parallel_map, parallel_reduce
+
+
+def test_bounded_map_aplica_contrapresion():
+    pulled = 0
+    max_ahead = 0
+    consumed = 0
+    lock = threading.Lock()
+
+    def items():
+        nonlocal pulled, max_ahead
+        for value in range(50):
+            with lock:
+                pulled += 1
+                max_ahead = max(max_ahead, pulled - consumed)
+            yield value
+
+    results = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for result in bounded_map(executor, lambda value: value * 2, items(), max_in_flight=3):
+            with lock:
+                consumed += 1
+            results.append(result)
+
+    assert sorted(results) == [value * 2 for value in range(50)]
+    assert max_ahead <= 3
+
+
+def test_bounded_map_valida_ventana():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(ValueError):
+            list(bounded_map(executor, str, [1], max_in_flight=0))
+
+
+def _peak_parent_memory(tmp_path, total_lines):
+    log_file = tmp_path / f"access_{total_lines}.log"
+    with open(log_file, "w", encoding="utf-8") as handle:
+        for i in range(total_lines):
+            handle.write(f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 7}?q={"x" * 60}" 500 {i % 400}\n')
+
+    tracemalloc.start()
+    try:
+        result = process_log(str(log_file), batch_size=200, workers=2)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result.total_lines == total_lines
+    return peak
+
+
+def test_memoria_del_padre_no_crece_con_el_tamano_de_entrada(tmp_path):
+    small_peak = _peak_parent_memory(tmp_path, 5_000)
+    large_peak = _peak_parent_memory(tmp_path, 40_000)
+
+    assert large_peak < small_peak * 2
+
+
+class _SumAccumulator:
+    def __init__(self):
+        self.parts = []
+
+    def add(self, part):
+        self.parts.append(part)
+
+    def result(self):
+        return sorted(value for part in self.parts for value in (part if isinstance(part, list) else [part]))
+
+
+def _square(value):
+    return value * value
+
+
+def _fail_on_seven(value):
+    if value == 7:
+        raise KeyError("siete")
+    return value
+
+
+@pytest.mark.parametrize("workers", [1, 3, 5])
+def test_parallel_reduce_combina_todos_los_resultados(workers):
+    result = parallel_reduce(_square, range(200), workers=workers, max_in_flight=4, new_accumulator=_SumAccumulator)
+    assert result == [value * value for value in range(200)]
+
+
+def test_parallel_reduce_propaga_errores_de_los_workers():
+    with pytest.raises(KeyError):
+        parallel_reduce(_fail_on_seven, range(50), workers=3, max_in_flight=2, new_accumulator=_SumAccumulator)
+    with pytest.raises(ValueError):
+        parallel_reduce(_square, [1], workers=2, max_in_flight=0, new_accumulator=_SumAccumulator)
+
+
+@pytest.mark.parametrize("options", [{}, {"sharded": True, "backend": "mmap"}, {"url_histograms": True}])
+def test_acumulacion_en_workers_equivale_a_fusion_en_el_padre(tmp_path, options):
+    log_file = tmp_path / "access.log"
+    with open(log_file, "w", encoding="utf-8") as handle:
+        for i in range(6_000):
+            status = 500 if i % 3 else 200
+            handle.write(f'10.0.0.{i % 250} - - [10/Sep/2024:15:03:27] "GET /u{i % 37}" {status} {i % 400}\n')
+        handle.write("linea rota\n")
+
+    expected = process_log(str(log_file), batch_size=250, workers=3, **options)
+    result = process_log(str(log_file), batch_size=250, workers=3, accumulate_in_workers=True, **options)
+
+    assert (result.total_lines, result.bad_lines, result.total_status, result.total_slow) == (
+        expected.total_lines,
+        expected.bad_lines,
+        expected.total_status,
+        expected.total_slow,
+    )
+    assert result.top_10_status == expected.top_10_status
+    assert result.latency == expected.latency
+    assert result.latency_by_url == expected.latency_by_url
+
+
+def _profile_pools():
+    squares = parallel_map(_square, range(20), workers=2, max_in_flight=2)
+    assert sorted(squares) == [value * value for value in range(20)]
+    return parallel_reduce(_square, range(20), workers=2, max_in_flight=2, new_accumulator=_SumAccumulator)
+
+
+def test_profile_combina_padre_y_workers(tmp_path, capsys):
+    stats_path = str(tmp_path / "profile.stats")
+    (tmp_path / "profile.stats.worker-1").write_bytes(b"")  # de una corrida anterior
+
+    result = run_with_profile(_profile_pools, stats_path=stats_path)
+
+    assert result == [value * value for value in range(20)]
+    workers = worker_stats_paths(stats_path)
+    assert len(workers) == 4 and all(path.stat().st_size for path in workers)
+    assert (tmp_path / "profile.stats.parent").exists()
+    calls = {key[2]: value[1] for key, value in pstats.Stats(stats_path).stats.items()}
+    # ``_square`` solo corre en los workers: 20 llamadas por pool.
+    assert calls["_square"] == 40
+    assert "[profile]" in capsys.readouterr().out
+
+    assert worker_initializer() == (None, ())
+    run_with_profile(lambda: None, stats_path=stats_path)
+    assert worker_stats_paths(stats_path) == [] and not (tmp_path / "profile.stats.parent").exists()
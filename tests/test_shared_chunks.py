@@ -0,0 +1,75 @@
+"""Pruebas del transporte de bloques por memoria compartida."""
+
+import gzip
+
+import pytest
+
+from logproc.api import process_log
+from logproc.shared_chunks import ChunkRing, SharedChunk, read_shared_chunk, shared_memory_map
+
+
+def _write_log(path, count=8_000):
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(count):
+            status = 500 if i % 3 else 200
+            handle.write(f'10.0.0.{i % 200} - - [10/Sep/2024:15:03:27 +0000] "GET /u{i % 41}" {status} {i % 400}\n')
+        handle.write("linea rota\n")
+
+
+def _length(chunk):
+    return len(chunk)
+
+
+def test_anillo_recicla_lugares_y_rechaza_bloques_grandes():
+    ring = ChunkRing(slots=2, slot_bytes=8)
+    try:
+        first = ring.put(b"hola\n")
+        second = ring.put(b"chau\n")
+        assert isinstance(first, SharedChunk) and ring.free_slots == 0
+        assert read_shared_chunk(first) == b"hola\n" and read_shared_chunk(second) == b"chau\n"
+        with pytest.raises(RuntimeError):
+            ring.put(b"x")
+        ring.release(first)
+        third = ring.put(b"otra\n")
+        assert third.offset == first.offset and read_shared_chunk(third) == b"otra\n"
+        assert ring.put(b"x" * 9) is None
+    finally:
+        ring.close()
+
+    with pytest.raises(ValueError):
+        ChunkRing(slots=0, slot_bytes=8)
+
+
+def test_shared_memory_map_entrega_cada_bloque():
+    chunks = [b"x" * size for size in range(1, 60)] + [b"y" * 500]
+    results = shared_memory_map(_length, chunks, workers=2, max_in_flight=3, slot_bytes=64)
+    assert sorted(results) == sorted(len(chunk) for chunk in chunks)
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+@pytest.mark.parametrize("options", [{"backend": "text"}, {"backend": "mmap", "engine": "numpy", "time_bucket": 60}])
+def test_process_log_con_shm_equivale_a_pickle(tmp_path, compressed, options):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+    if compressed:
+        gz_path = tmp_path / "access.log.gz"
+        gz_path.write_bytes(gzip.compress(log_path.read_bytes()))
+        log_path = gz_path
+
+    expected = process_log(str(log_path), batch_size=300, workers=2, **options)
+    result = process_log(str(log_path), batch_size=300, workers=2, transport="shm", **options)
+
+    assert (result.total_lines, result.bad_lines, result.total_status, result.total_slow) == (
+        expected.total_lines,
+        expected.bad_lines,
+        expected.total_status,
+        expected.total_slow,
+    )
+    assert result.top_10_status == expected.top_10_status
+    assert result.latency == expected.latency
+    assert result.time_series == expected.time_series
+
+    with pytest.raises(ValueError):
+        process_log(str(log_path), workers=2, transport="pipe")
+    with pytest.raises(ValueError):
+        process_log(str(log_path), workers=2, transport="shm", accumulate_in_workers=True)
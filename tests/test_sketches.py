@@ -0,0 +1,84 @@
+"""Pruebas del modo aproximado con sketches Space-Saving + Count-Min."""
+
+import random
+from collections import Counter
+
+import pytest
+
+from logproc.api import process_log
+from logproc.sketches import HeavyHitters, SketchConfig
+
+
+def _zipf_counts(seed=7, distinct=20_000, total=200_000):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    urls = rng.choices([f"/p/{rank}" for rank in range(distinct)], weights=weights, k=total)
+    return Counter(urls)
+
+
+def _batches(counts, size=5_000):
+    items = list(counts.items())
+    for offset in range(0, len(items), size):
+        yield dict(items[offset : offset + size])
+
+
+def test_top_k_aproximado_contiene_al_exacto_con_cotas_validas():
+    exact = _zipf_counts()
+    config = SketchConfig(capacity=500)
+
+    # Dos sketches construidos por separado y fusionados, como en los workers.
+    left, right = HeavyHitters(config), HeavyHitters(config)
+    for index, batch in enumerate(_batches(exact)):
+        (left if index % 2 else right).update(batch)
+    left.merge(right)
+    left.compact()
+
+    top = left.top(10)
+    assert [url for url, _, _ in top] == [url for url, _ in exact.most_common(10)]
+    for url, lower, upper in top:
+        assert lower <= exact[url] <= upper
+    assert len(left.space_saving.counts) <= config.capacity
+
+    bounds = left.error_bounds()
+    assert bounds["max_error"] == left.space_saving.floor
+    assert bounds["count_min_error"] <= config.epsilon * sum(exact.values()) + 1
+
+
+def test_config_invalida():
+    with pytest.raises(ValueError):
+        SketchConfig(capacity=0)
+    with pytest.raises(ValueError):
+        SketchConfig(epsilon=1.5)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_log_aproximado_frente_al_exacto(tmp_path, workers):
+    rng = random.Random(3)
+    log_path = tmp_path / "access.log"
+    with open(log_path, "w", encoding="utf-8") as handle:
+        for i in range(30_000):
+            # Pocas URLs pesadas y una cola enorme de URLs únicas por query string.
+            url = f"/api/{rng.randint(0, 4)}" if i % 3 == 0 else f"/search?q={i}"
+            status = 500 if i % 2 else 200
+            handle.write(f'10.0.0.1 - - [10/Sep/2024:15:03:27] "GET {url}" {status} {rng.randint(0, 400)}\n')
+
+    exact = process_log(str(log_path), batch_size=1_000, workers=workers, sharded=True)
+    approx = process_log(
+        str(log_path),
+        batch_size=1_000,
+        workers=workers,
+        sharded=True,
+        approximate=SketchConfig(capacity=50),
+    )
+
+    assert approx.approximate and not exact.approximate
+    assert (approx.total_lines, approx.total_status, approx.total_slow) == (
+        exact.total_lines,
+        exact.total_status,
+        exact.total_slow,
+    )
+    exact_counts = dict(exact.top_10_status)
+    for url, lower, upper in approx.error_bounds["status"]["top"][:5]:
+        assert url in exact_counts
+        assert lower <= exact_counts[url] <= upper
+    assert approx.top_url_slow[0] == exact.top_url_slow[0]
@@ -0,0 +1,127 @@
+"""Pruebas del índice de tiempo y del filtrado por ``since``/``until``."""
+
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from logproc.__main__ import main
+from logproc.api import process_log
+from logproc.time_index import (
+    build_time_index,
+    ensure_time_index,
+    load_time_index,
+    parse_time,
+    time_range_offsets,
+)
+
+START = int(datetime(2024, 9, 10, 12, 0, tzinfo=timezone.utc).timestamp())
+
+
+def _write_log(path, count=20_000):
+    """Una línea por segundo desde las 12:00 UTC, con algunas malformadas."""
+
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(count):
+            if i % 997 == 5:
+                handle.write("linea rota\n")
+                continue
+            moment = datetime.fromtimestamp(START + i, tz=timezone.utc)
+            date = moment.strftime("%d/%b/%Y:%H:%M:%S +0000")
+            status = 500 if i % 4 == 0 else 200
+            handle.write(f'10.0.0.1 - - [{date}] "GET /p/{i % 13}" {status} {i % 500}\n')
+
+
+def _expected(count, since, until):
+    seconds = [i for i in range(count) if i % 997 != 5 and since <= START + i < until]
+    return len(seconds), sum(i % 4 == 0 for i in seconds), sum(i % 500 > 200 for i in seconds)
+
+
+def test_parse_time_acepta_varios_formatos():
+    assert parse_time("2024-09-10T12:00") == START
+    assert parse_time("2024-09-10T09:00-03:00") == START
+    assert parse_time("10/Sep/2024:12:00:00 +0000") == START
+    assert parse_time(str(START)) == START
+    assert parse_time(datetime(2024, 9, 10, 12, 0)) == START
+    with pytest.raises(ValueError):
+        parse_time("ayer")
+
+
+def test_indice_muestrea_y_se_invalida(tmp_path):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+
+    index = build_time_index(str(log_path), step_bytes=16 * 1024)
+    assert index.total_lines == 20_000
+    assert len(index.samples) >= os.path.getsize(log_path) // (16 * 1024)
+    with open(log_path, "rb") as handle:
+        lines = handle.readlines()
+    for epoch, offset, line in index.samples:
+        assert sum(map(len, lines[:line])) == offset
+        assert epoch == START + line
+
+    index_path = str(tmp_path / "access.idx")
+    ensure_time_index(str(log_path), index_path, step_bytes=16 * 1024)
+    assert load_time_index(index_path) == index
+    with open(log_path, "a", encoding="utf-8") as handle:
+        handle.write("linea rota\n")
+    assert ensure_time_index(str(log_path), index_path).total_lines == 20_001
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_offsets_con_y_sin_indice(tmp_path, use_index):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+    index = build_time_index(str(log_path), step_bytes=8 * 1024) if use_index else None
+
+    with open(log_path, "rb") as handle:
+        lines = handle.readlines()
+    for since, until in ((START + 4_321, START + 7_777), (START - 10, START + 5), (START + 19_990, START + 30_000)):
+        start, end = time_range_offsets(str(log_path), since, until, index=index)
+        first = next(i for i in range(20_000) if i % 997 != 5 and START + i >= since)
+        assert start == sum(map(len, lines[:first]))
+        assert end >= start
+
+    with pytest.raises(ValueError):
+        time_range_offsets(str(log_path), START + 10, START + 10)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"workers": 1},
+        {"workers": 2, "backend": "mmap", "engine": "numpy"},
+    ],
+)
+def test_process_log_solo_procesa_el_intervalo(tmp_path, options):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+    since, until = START + 3_600, START + 7_200
+
+    result = process_log(
+        str(log_path), batch_size=500, since="2024-09-10T13:00", until="2024-09-10T14:00", **options
+    )
+    total, status, slow = _expected(20_000, since, until)
+    assert (result.total_lines - result.bad_lines, result.total_status, result.total_slow) == (total, status, slow)
+    assert result.byte_range[1] - result.byte_range[0] < os.path.getsize(log_path) / 4
+
+    indexed = process_log(
+        str(log_path), batch_size=500, since=since, until=until, time_index=str(tmp_path / "idx"), **options
+    )
+    assert indexed.byte_range == result.byte_range and indexed.total_status == result.total_status
+
+    open_ended = process_log(str(log_path), since=START + 19_000, **options)
+    assert open_ended.total_lines - open_ended.bad_lines == _expected(20_000, START + 19_000, START + 20_000)[0]
+
+    with pytest.raises(ValueError):
+        process_log(str(log_path), since=since, checkpoint_path=str(tmp_path / "ckpt.json"))
+
+
+def test_cli_index(tmp_path, capsys):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path, count=2_000)
+
+    assert main(["index", "--input", str(log_path), "--step-kb", "4"]) == 0
+    index = load_time_index(f"{log_path}.lpidx")
+    assert index is not None and index.step_bytes == 4096 and index.total_lines == 2_000
+    assert "muestras:" in capsys.readouterr().out
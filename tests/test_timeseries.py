@@ -0,0 +1,121 @@
+"""Pruebas de la serie temporal por buckets y del parser de timestamps."""
+
+import calendar
+from datetime import datetime
+
+import pytest
+
+from logproc.api import process_log
+from logproc.checkpoint import load_checkpoint
+from logproc.column_cache import ColumnCache
+from logproc.result_cache import ResultCache
+from logproc.timeseries import TimestampParser, merge_series, series_rows
+
+
+def _strptime_epoch(text):
+    return calendar.timegm(datetime.strptime(text, "%d/%b/%Y:%H:%M:%S %z").utctimetuple())
+
+
+def _write_log(path, count=3_000):
+    """Una línea cada 2 s a partir de 15:03:00; algunas sin fecha válida."""
+
+    expected = {}
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(count):
+            second = 2 * i
+            minute, second = divmod(second, 60)
+            date = f"10/Sep/2024:{15 + (3 + minute) // 60:02d}:{(3 + minute) % 60:02d}:{second:02d} +0000"
+            if i % 250 == 7:
+                date = "fecha invalida"
+            status = 500 if i % 3 == 0 else 200
+            latency = 50 + (i * 37) % 400
+            handle.write(f'10.0.0.1 - - [{date}] "GET /p/{i % 9}" {status} {latency}\n')
+            if date != "fecha invalida":
+                start = _strptime_epoch(date) // 60 * 60
+                row = expected.setdefault(start, [0, 0, 0])
+                row[0] += 1
+                row[1] += status == 500
+                row[2] += latency > 200
+        handle.write("linea rota\n")
+    return expected
+
+
+def test_parser_equivale_a_strptime_y_memoiza_por_minuto():
+    parser = TimestampParser(memo_size=2)
+    for text in (
+        "10/Sep/2024:15:03:27 +0000",
+        "10/Sep/2024:15:03:59 +0000",
+        "29/Feb/2024:23:59:01 -0300",
+        "01/Jan/2025:00:00:00 +0545",
+        "31/Dec/2024:23:59:59 +0000",
+    ):
+        assert parser(text) == _strptime_epoch(text)
+        assert parser(text.encode("ascii")) == _strptime_epoch(text)
+    assert len(parser._minutes) <= 2
+
+    assert parser("10/Sep/2024:15:03:27") == _strptime_epoch("10/Sep/2024:15:03:27 +0000")
+    for invalid in ("", "fecha invalida", "10/Foo/2024:15:03:27", "10/Sep/2024:25:03:27", "10/Sep/2024:15:03:27 UTC"):
+        assert parser(invalid) is None
+
+    with pytest.raises(ValueError):
+        TimestampParser(memo_size=0)
+
+
+def test_merge_series_y_filas_ordenadas():
+    target = {120: [1, 1, 0]}
+    merge_series(target, {60: [2, 0, 1], 120: [3, 1, 1]})
+    assert target == {60: [2, 0, 1], 120: [4, 2, 1]}
+    assert series_rows(target) == [
+        {"start": "1970-01-01T00:01:00+00:00", "total": 2, "status": 0, "slow": 1},
+        {"start": "1970-01-01T00:02:00+00:00", "total": 4, "status": 2, "slow": 1},
+    ]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"workers": 1},
+        {"workers": 2, "sharded": True, "backend": "mmap"},
+        {"workers": 2, "engine": "numpy"},
+        {"workers": 2, "engine": "numpy", "backend": "mmap", "sharded": True},
+    ],
+)
+def test_process_log_agrupa_por_bucket(tmp_path, options):
+    log_path = tmp_path / "access.log"
+    expected = _write_log(log_path)
+
+    result = process_log(str(log_path), batch_size=300, time_bucket=60, **options)
+
+    assert result.time_bucket == 60
+    assert [row["start"] for row in result.time_series] == [row["start"] for row in series_rows(expected)]
+    assert result.time_series == series_rows(expected)
+    assert sum(row["status"] for row in result.time_series) <= result.total_status
+
+    assert process_log(str(log_path), batch_size=300, **options).time_series is None
+
+
+def test_serie_en_columnas_cache_y_checkpoint(tmp_path):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+    expected = process_log(str(log_path), workers=1, time_bucket=300)
+
+    columns = ColumnCache(str(tmp_path / "columns"))
+    process_log(str(log_path), workers=1, column_cache=columns)
+    from_columns = process_log(str(log_path), workers=1, column_cache=columns, time_bucket=300)
+    assert from_columns.time_series == expected.time_series
+
+    cache = ResultCache(str(tmp_path / "results"))
+    process_log(str(log_path), workers=1, cache=cache, time_bucket=60)
+    assert not process_log(str(log_path), workers=1, cache=cache, time_bucket=300).from_cache
+
+    checkpoint = str(tmp_path / "ckpt.json")
+    process_log(str(log_path), workers=1, checkpoint_path=checkpoint, time_bucket=300)
+    with open(log_path, "a", encoding="utf-8") as handle:
+        handle.write('10.0.0.1 - - [10/Sep/2024:18:00:00 +0000] "GET /p/1" 500 900\n')
+    resumed = process_log(str(log_path), workers=1, checkpoint_path=checkpoint, time_bucket=300)
+    assert resumed.time_series[:-1] == expected.time_series
+    assert resumed.time_series[-1] == {"start": "2024-09-10T18:00:00+00:00", "total": 1, "status": 1, "slow": 1}
+    assert load_checkpoint(checkpoint).options == {"time_bucket": 300}
+
+    with pytest.raises(ValueError):
+        process_log(str(log_path), workers=1, time_bucket=0)
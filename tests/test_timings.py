@@ -0,0 +1,112 @@
+"""Pruebas de los tiempos por etapa."""
+
+import pickle
+
+import pytest
+
+from logproc.__main__ import print_summary
+from logproc.api import process_log, process_queries
+from logproc.metrics import PartialStats, top_n_urls
+from logproc.queries import QuerySpec
+from logproc.reducer import merge_partials
+from logproc.result_cache import ResultCache
+from logproc.timings import STAGES, StageTimings, TimedIterator, add_time, current_timings, recording
+from logproc.worker import process_batch
+
+
+def _write_log(path, count=4_000):
+    with open(path, "w", encoding="utf-8") as handle:
+        for i in range(count):
+            date = f"10/Sep/2024:15:{i // 60 % 60:02d}:{i % 60:02d} +0000"
+            handle.write(f'10.0.0.{i % 50} - - [{date}] "GET /p/{i % 30}" {500 if i % 3 else 200} {i % 400}\n')
+
+
+def test_registro_solo_dentro_de_recording():
+    add_time("merge", 1.0)
+    assert current_timings() is None
+
+    with recording() as timings:
+        add_time("merge", 0.5)
+        with recording(StageTimings()) as inner:
+            add_time("merge", 2.0)
+        assert current_timings() is timings
+    assert timings.merge == 0.5 and inner.merge == 2.0
+
+    items = TimedIterator(iter(range(3)))
+    assert list(items) == [0, 1, 2] and items.seconds >= 0
+
+    timings.input_bytes = 2 * 1024**2
+    data = timings.to_dict(elapsed_seconds=2.0, total_lines=100)
+    assert set(data) == {*STAGES, "lines_per_second", "mb_per_second"}
+    assert data["lines_per_second"] == 50.0 and data["mb_per_second"] == 1.0
+    assert StageTimings().to_dict(0.0, 10)["lines_per_second"] == 0.0
+
+
+def test_parciales_llevan_sus_tiempos_sin_afectar_la_forma_json():
+    stats = process_batch(['1.1.1.1 - - [10/Sep/2024:15:00:00 +0000] "GET /a" 500 300'])
+    assert stats.process_seconds > 0
+
+    restored = pickle.loads(pickle.dumps(stats))
+    assert restored.process_seconds == stats.process_seconds
+    assert "process_seconds" not in stats.to_dict() and "read_seconds" not in stats.to_dict()
+    restored.unpack_urls()
+    assert restored == PartialStats.from_dict(stats.to_dict())
+
+    with recording() as timings:
+        merged = merge_partials([stats, restored])
+        top_n_urls(merged.status_by_url)
+    assert merged.process_seconds == pytest.approx(2 * stats.process_seconds)
+    assert timings.merge > 0 and timings.top_n > 0
+    assert merged.merge_seconds == 0
+
+    # Fuera de una corrida (como en un worker) la fusión viaja en el parcial.
+    in_worker = pickle.loads(pickle.dumps(merge_partials([stats, restored])))
+    assert in_worker.merge_seconds > 0 and "merge_seconds" not in in_worker.to_dict()
+    with recording() as timings:
+        merge_partials([in_worker])
+    assert timings.merge > 0
+    timings.add_partial(in_worker)
+    assert timings.merge > in_worker.merge_seconds
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"workers": 1},
+        {"workers": 2, "sharded": True, "backend": "mmap"},
+        {"workers": 2, "accumulate_in_workers": True},
+        {"workers": 2, "transport": "shm"},
+    ],
+)
+def test_process_log_informa_tiempos_y_throughput(tmp_path, options):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path)
+
+    result = process_log(str(log_path), batch_size=500, **options)
+
+    timings = result.timings
+    assert set(timings) == {*STAGES, "lines_per_second", "mb_per_second"}
+    assert timings["read"] > 0 and timings["process"] > 0 and timings["merge"] > 0 and timings["top_n"] > 0
+    assert all(timings[stage] >= 0 for stage in STAGES)
+    assert timings["lines_per_second"] == round(result.total_lines / result.elapsed_seconds, 1)
+    assert timings["mb_per_second"] > 0
+    assert result.to_dict()["timings"] == timings
+
+
+def test_tiempos_en_cache_consultas_y_resumen(tmp_path, capsys):
+    log_path = tmp_path / "access.log"
+    _write_log(log_path, count=1_000)
+    cache = ResultCache(str(tmp_path / "results"))
+
+    result = process_log(str(log_path), workers=1, cache=cache)
+    assert result.timings is not None
+    assert process_log(str(log_path), workers=1, cache=cache).timings is None
+
+    first, second = process_queries(
+        str(log_path), [QuerySpec(slow_threshold=100), QuerySpec(slow_threshold=300)], workers=1
+    )
+    assert first.timings == second.timings and first.timings["process"] > 0
+
+    print_summary(result)
+    output = capsys.readouterr().out
+    assert "--- Tiempos por etapa ---" in output and "lineas_por_segundo" in output